@@ -0,0 +1,112 @@
+# budget.py
+# ----------------------------------------------------------
+# Presupuesto de trabajo para el parser y el analizador
+# Limita nodos visitados y tiempo de reloj por solicitud
+# ----------------------------------------------------------
+
+import os
+import time
+
+
+class BudgetExceededError(Exception):
+    """Se agotó el presupuesto de análisis (nodos o tiempo)."""
+
+
+# ----------------------------------------------------------
+# Presupuestos por endpoint (configurables por variables de entorno)
+# ----------------------------------------------------------
+
+# max_nodes / max_time_ms: valores por defecto de cada solicitud.
+# max_nodes_limit / max_time_ms_limit: máximo que un cliente puede pedir
+# en el campo "budget" de la solicitud.
+ENDPOINT_BUDGETS = {
+    # Solicitudes interactivas: límites estrictos para no bloquear workers
+    "analyze-by-system": {
+        "max_nodes": int(os.getenv("ANALYZE_MAX_NODES", "50000")),
+        "max_time_ms": float(os.getenv("ANALYZE_MAX_TIME_MS", "2000")),
+        "max_nodes_limit": int(os.getenv("ANALYZE_MAX_NODES_LIMIT", "500000")),
+        "max_time_ms_limit": float(os.getenv("ANALYZE_MAX_TIME_MS_LIMIT", "10000")),
+    },
+    # Lotes: cada programa corre en un proceso del pool, fuera del servidor
+    "analyze-by-system-batch": {
+        "max_nodes": int(os.getenv("BATCH_MAX_NODES", "200000")),
+        "max_time_ms": float(os.getenv("BATCH_MAX_TIME_MS", "10000")),
+        "max_nodes_limit": int(os.getenv("BATCH_MAX_NODES_LIMIT", "1000000")),
+        "max_time_ms_limit": float(os.getenv("BATCH_MAX_TIME_MS_LIMIT", "60000")),
+    },
+}
+
+
+class AnalysisBudget:
+    """
+    Presupuesto cooperativo: el parser y el analizador llaman a tick()
+    por cada token o nodo procesado. Al superar cualquiera de los límites
+    se lanza BudgetExceededError.
+    """
+
+    # Cada cuántos ticks se consulta el reloj
+    TIME_CHECK_INTERVAL = 32
+
+    def __init__(self, max_nodes=None, max_time_ms=None):
+        self.max_nodes = max_nodes
+        self.max_time_ms = max_time_ms
+        self.nodes = 0
+        self.started_at = None
+        self.elapsed_ms = 0.0
+        self.exhausted = False
+        self.stage = None  # Etapa en la que se agotó (parse / analysis)
+
+    @classmethod
+    def for_endpoint(cls, endpoint, max_nodes=None, max_time_ms=None):
+        """
+        Crea el presupuesto configurado para un endpoint. max_nodes y
+        max_time_ms (pedidos por el cliente) reemplazan a los valores por
+        defecto, acotados al máximo del endpoint.
+        """
+        limits = ENDPOINT_BUDGETS.get(endpoint, ENDPOINT_BUDGETS["analyze-by-system"])
+        return cls(
+            max_nodes=limits["max_nodes"] if max_nodes is None else min(max_nodes, limits["max_nodes_limit"]),
+            max_time_ms=limits["max_time_ms"] if max_time_ms is None else min(max_time_ms, limits["max_time_ms_limit"]),
+        )
+
+    def tick(self, stage):
+        """Consume una unidad de trabajo en la etapa indicada."""
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+        self.nodes += 1
+
+        if self.exhausted:
+            raise BudgetExceededError(self._message())
+
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self._exhaust(stage)
+
+        if self.max_time_ms is not None and self.nodes % self.TIME_CHECK_INTERVAL == 0:
+            self.elapsed_ms = (time.perf_counter() - self.started_at) * 1000
+            if self.elapsed_ms > self.max_time_ms:
+                self._exhaust(stage)
+
+    def _exhaust(self, stage):
+        self.exhausted = True
+        self.stage = stage
+        raise BudgetExceededError(self._message())
+
+    def _message(self):
+        return (
+            f"Presupuesto de análisis agotado en la etapa '{self.stage}' "
+            f"({self.nodes} nodos, {self.elapsed_ms:.1f} ms)"
+        )
+
+    def report(self):
+        """Resumen del presupuesto para incluir en la respuesta."""
+        if self.started_at is not None:
+            self.elapsed_ms = (time.perf_counter() - self.started_at) * 1000
+        return {
+            "max_nodes": self.max_nodes,
+            "max_time_ms": self.max_time_ms,
+            "nodes_used": self.nodes,
+            "time_ms": round(self.elapsed_ms, 3),
+            "exhausted": self.exhausted,
+            "stage": self.stage,
+        }
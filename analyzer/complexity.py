@@ -6,30 +6,149 @@
 
 from math import log2
 
+from analyzer.budget import BudgetExceededError
+
+# Versión del motor de análisis. Incrementarla cuando cambie el resultado
+# para un mismo programa: invalida cachés de resultados y ETags.
+ANALYZER_VERSION = "2.0.4"
+
+# ----------------------------------------------------------
+# Álgebra de complejidades con múltiples variables de tamaño
+# ----------------------------------------------------------
+#
+# Las complejidades se manejan como texto ("n^2", "n log n", "n * m",
+# "n + m"). Internamente cada texto es una suma de monomios, y cada
+# monomio asigna a su variable de tamaño un exponente (exp, poly, log):
+#   2^n → (1, 0, 0)    n^2 → (0, 2, 0)    log n → (0, 0, 1)
+
+# Variables de tamaño convencionales (se muestran primero)
+SYMBOL_ORDER = ["n", "m", "k", "V", "E"]
+
+# Exponente nulo de una variable que no aparece en el monomio
+_ZERO_POWER = (0, 0, 0)
+
+
+def _symbol_key(symbol):
+    """Orden estable de las variables de tamaño al mostrar un monomio."""
+    if symbol in SYMBOL_ORDER:
+        return (0, SYMBOL_ORDER.index(symbol), "")
+    return (1, 0, symbol.lower())
+
+
+def _parse_monomial(text):
+    """Convierte un monomio ("n^2 * m", "n log n") en tupla de potencias."""
+    powers = {}
+
+    def add(symbol, power):
+        current = powers.get(symbol, _ZERO_POWER)
+        powers[symbol] = tuple(a + b for a, b in zip(current, power))
+
+    tokens = text.replace("*", " ").split()
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "1":
+            i += 1
+            continue
+        if token.startswith("log") and i + 1 < len(tokens):
+            exponent = token[4:] if token.startswith("log^") else "1"
+            add(tokens[i + 1], (0, 0, int(exponent) if exponent.isdigit() else 1))
+            i += 2
+            continue
+        base, _, exponent = token.partition("^")
+        if exponent and base.isdigit():
+            # b^n → exponente en base 2 (2^n, 4^n = 2^n * 2^n, ...)
+            add(exponent, (max(1, round(log2(int(base)))), 0, 0))
+        elif exponent.isdigit():
+            add(base, (0, int(exponent), 0))
+        else:
+            add(token, (0, 1, 0))
+        i += 1
+
+    return tuple(sorted(
+        ((symbol, power) for symbol, power in powers.items() if power != _ZERO_POWER),
+        key=lambda item: _symbol_key(item[0])
+    ))
+
+
+def _parse_complexity(expr):
+    """Descompone una complejidad en su conjunto de monomios."""
+    return {_parse_monomial(term) for term in str(expr).split(" + ")}
+
+
+def _dominates(a, b):
+    """Indica si el monomio a crece al menos tan rápido como b."""
+    powers = dict(a)
+    return all(powers.get(symbol, _ZERO_POWER) >= power for symbol, power in b)
+
+
+def _multiply(a, b):
+    """Producto de dos monomios (suma de exponentes por variable)."""
+    powers = dict(a)
+    for symbol, power in b:
+        current = powers.get(symbol, _ZERO_POWER)
+        powers[symbol] = tuple(x + y for x, y in zip(current, power))
+    return tuple(sorted(powers.items(), key=lambda item: _symbol_key(item[0])))
+
+
+def _reduce(terms):
+    """Elimina los monomios dominados, conservando los incomparables."""
+    return {
+        term for term in terms
+        if not any(other != term and _dominates(other, term) for other in terms)
+    }
+
+
+def _render_monomial(term):
+    parts = []
+    for symbol, (exp, poly, log) in term:
+        if exp:
+            parts.append(f"{2 ** exp}^{symbol}")
+        factors = []
+        if poly:
+            factors.append(symbol if poly == 1 else f"{symbol}^{poly}")
+        if log:
+            factors.append(f"log {symbol}" if log == 1 else f"log^{log} {symbol}")
+        if factors:
+            parts.append(" ".join(factors))
+    return " * ".join(parts) if parts else "1"
+
+
+def _render_complexity(terms):
+    def weight(term):
+        totals = [sum(power[i] for _, power in term) for i in range(3)]
+        return (-totals[0], -totals[1], -totals[2], [_symbol_key(s) for s, _ in term])
+
+    rendered = [_render_monomial(term) for term in sorted(terms, key=weight)]
+    return " + ".join(rendered) if rendered else "1"
+
+
 # ----------------------------------------------------------
 # Utilidades básicas
 # ----------------------------------------------------------
 
 def BigO(expr_list):
-    """Combina múltiples complejidades y retorna la dominante."""
+    """
+    Combina múltiples complejidades y retorna la dominante.
+    Los términos incomparables (ej: n y m) se conservan como suma.
+    """
     if not expr_list:
         return "1"
 
-    order = ["1", "log n", "n", "n log n", "n^2", "n^3", "2^n"]
-    scored = [(order.index(e) if e in order else len(order), e) for e in expr_list]
-    return max(scored)[1]
+    terms = set()
+    for expr in expr_list:
+        terms |= _parse_complexity(expr)
+    return _render_complexity(_reduce(terms))
 
 
 def combine_multiplicative(a, b):
-    """Reglas simples de multiplicación de complejidad."""
-    if a == "1": return b
-    if b == "1": return a
-    if a == "n" and b == "log n": return "n log n"
-    if a == "log n" and b == "n": return "n log n"
-    if a == "n" and b == "n": return "n^2"
-    if a == "n^2" and b == "n": return "n^3"
-    if a == "n" and b == "n^2": return "n^3"
-    return f"{a} * {b}"
+    """Multiplica dos complejidades (ej: n * m, n * log n = n log n)."""
+    terms = {
+        _multiply(x, y)
+        for x in _parse_complexity(a)
+        for y in _parse_complexity(b)
+    }
+    return _render_complexity(_reduce(terms))
 
 
 def combine_additive(a, b):
@@ -37,19 +156,84 @@ def combine_additive(a, b):
     return BigO([a, b])
 
 
+def evaluate_complexity(expr, size):
+    """
+    Valor numérico de una complejidad con todas las variables de tamaño
+    iguales a size (ej: "n^2 + n * m" con size=10 → 200).
+    """
+    total = 0.0
+    for term in _parse_complexity(expr):
+        value = 1.0
+        for _, (exp, poly, log) in term:
+            try:
+                value *= 2.0 ** (exp * size) * size ** poly * log2(size) ** log
+            except OverflowError:
+                return float("inf")
+        total += value
+    return total
+
+
+# ----------------------------------------------------------
+# Modelo probabilístico del caso promedio
+# ----------------------------------------------------------
+#
+# - if_condition: probabilidad de que se cumpla la condición de un IF
+# - search_hit: probabilidad de que una búsqueda (return dentro de un
+#   ciclo) encuentre el elemento; la posición se asume uniforme
+# - break_condition: probabilidad por iteración de salir con break
+#   (número de iteraciones con distribución geométrica)
+
+DEFAULT_PROBABILITIES = {
+    "if_condition": 0.5,
+    "search_hit": 0.5,
+    "break_condition": 0.5,
+}
+
+
 # ----------------------------------------------------------
 # Clase que representa un resultado de complejidad
 # ----------------------------------------------------------
 
 class ComplexityResult:
-    def __init__(self, best="1", worst="1", avg=None, has_early_exit=False):
+    def __init__(self, best="1", worst="1", avg=None, has_early_exit=False, space="1", exits=None):
         self.best = best  # Omega
         self.worst = worst  # O
         self.avg = avg if avg else worst  # Theta (por defecto = worst)
         self.has_early_exit = has_early_exit
+        self.space = space  # Espacio auxiliar (peor caso)
+        # Tipos de salida temprana pendientes: "return" sale de todos los
+        # ciclos, "break" solo del ciclo más interno
+        self.exits = frozenset(exits or ())
     
     def __repr__(self):
-        return f"ComplexityResult(best={self.best}, worst={self.worst}, avg={self.avg})"
+        return (
+            f"ComplexityResult(best={self.best}, worst={self.worst}, "
+            f"avg={self.avg}, space={self.space})"
+        )
+
+
+# ----------------------------------------------------------
+# Traza de ejecuciones por sentencia
+# ----------------------------------------------------------
+
+# Tipo de operación de cada sentencia registrada en la traza
+TRACED_STATEMENTS = {
+    "for": "loop_control",
+    "while": "loop_control",
+    "repeat": "loop_control",
+    "if": "comparison",
+    "assignment": "assignment",
+    "return": "return",
+    "break": "jump",
+    "continue": "jump",
+    "call": "call",
+    "array_decl": "declaration",
+    "object": "declaration",
+    "class": "declaration",
+    "graph_class": "declaration",
+    "graph_instance": "declaration",
+    "subroutine": "subroutine",
+}
 
 
 # ----------------------------------------------------------
@@ -57,13 +241,32 @@ class ComplexityResult:
 # ----------------------------------------------------------
 
 class ComplexityAnalyzer:
-    def __init__(self):
+    def __init__(self, probabilities=None, budget=None, trace=False):
         self.details = {
             "loops": [],
             "recursion": None,
             "combination": "",
-            "early_exit_detected": False
+            "early_exit_detected": False,
+            "average_case": []
         }
+        # Probabilidades del modelo de caso promedio (configurables)
+        self.probabilities = dict(DEFAULT_PROBABILITIES)
+        self.probabilities.update(probabilities or {})
+        # Presupuesto de trabajo (AnalysisBudget) y si el análisis quedó truncado
+        self.budget = budget
+        self.truncated = False
+        # Variables de tamaño conocidas: variable → complejidad de su valor
+        # (ej: n 🡨 length(A), variable de control de un ciclo, mitad 🡨 n div 2)
+        self.sizes = {}
+        # Dimensiones de arreglos: nombre → [tamaño por dimensión]
+        self.array_dims = {}
+        # Variables asignadas en algún punto del programa
+        self.assigned = set()
+        # Memoria auxiliar detectada (arreglos, subarreglos, objetos, pila)
+        self.space_details = []
+        # Con trace=True: sentencias en orden de aparición con su número de
+        # ejecuciones en el peor caso (base de las tablas de costo locales)
+        self.trace = [] if trace else None
 
     # ------------------------------------------------------
     # Entrada principal
@@ -71,24 +274,34 @@ class ComplexityAnalyzer:
 
     def analyze(self, ast):
         """Punto de entrada: recibe el árbol completo."""
+        self.assigned = self._modified_vars(ast)
         result = self._analyze_node(ast)
 
         O = f"O({result.worst})"
         Omega = f"Ω({result.best})"
-        
-        # Si best == worst, entonces existe Theta (cota fuerte)
-        if result.best == result.worst:
-            Theta = f"Θ({result.avg})"
-        else:
-            Theta = "N/A"  # No hay Theta cuando los casos difieren
+        # Theta: caso promedio según el modelo probabilístico
+        Theta = f"Θ({result.avg})"
 
-        return {
+        analysis = {
             "O": O,
             "Omega": Omega,
             "Theta": Theta,
+            "space": {
+                "O": f"O({result.space})",
+                "details": self.space_details
+            },
             "details": self.details
         }
 
+        # Resultado parcial: el costo de los nodos sin analizar es
+        # desconocido, así que no hay cota que publicar; los detalles solo
+        # describen lo visitado
+        if self.truncated:
+            analysis.update(O=None, Omega=None, Theta=None, truncated=True)
+            analysis["space"]["O"] = None
+
+        return analysis
+
     # ------------------------------------------------------
     # Evaluación recursiva del árbol
     # ------------------------------------------------------
@@ -99,8 +312,21 @@ class ComplexityAnalyzer:
         if not isinstance(node, dict):
             return ComplexityResult()
 
+        # Presupuesto agotado: los nodos restantes no se analizan. Su costo
+        # es desconocido (no O(1)): analyze() no publica cotas si truncated
+        if self.budget is not None and not self.truncated:
+            try:
+                self.budget.tick("analysis")
+            except BudgetExceededError:
+                self.truncated = True
+        if self.truncated:
+            return ComplexityResult()
+
         nodetype = node.get("type")
 
+        if self.trace is not None and nodetype in TRACED_STATEMENTS:
+            self._trace_statement(node)
+
         if nodetype == "program":
             return self._sequence(node.get("body", []))
 
@@ -120,24 +346,33 @@ class ComplexityAnalyzer:
             return self._if_statement(node)
 
         if nodetype == "return":
-            return ComplexityResult(best="1", worst="1", has_early_exit=True)
+            return ComplexityResult(best="1", worst="1", has_early_exit=True, exits={"return"})
 
         if nodetype == "break":
-            return ComplexityResult(best="1", worst="1", has_early_exit=True)
+            return ComplexityResult(best="1", worst="1", has_early_exit=True, exits={"break"})
 
         if nodetype == "continue":
             return ComplexityResult()
 
         if nodetype == "subroutine":
             return self._subroutine(node)
+
+        if nodetype == "assignment":
+            # Las asignaciones son O(1), pero pueden definir variables de tamaño
+            # y copiar subarreglos (temp 🡨 A[1..j] ocupa O(j) de memoria)
+            self._track_assignment(node)
+            return ComplexityResult(space=self._slice_space(node.get("expr")))
         
         if nodetype == "var":
             # Analizar si la variable tiene acceso a rangos
             return self._analyze_variable(node)
         
         if nodetype == "array_decl":
-            # Declarar un arreglo de tamaño n es O(n)
-            return ComplexityResult(best="n", worst="n")
+            # Declarar un arreglo es lineal en su tamaño (array temp[n] → O(n))
+            size = self._size_of(node.get("size"))
+            self.array_dims[node.get("name")] = [size]
+            self.space_details.append(f"Arreglo auxiliar {node.get('name')} → O({size})")
+            return ComplexityResult(best=size, worst=size, space=size)
         
         if nodetype == "binop":
             # Operaciones binarias - analizar si involucran strings
@@ -151,6 +386,11 @@ class ComplexityAnalyzer:
             # Crear instancia de grafo es O(1) (solo declaración)
             return ComplexityResult()
 
+        if nodetype == "object":
+            # Un objeto ocupa memoria constante (sus atributos)
+            self.space_details.append(f"Objeto {node.get('name')} ({node.get('class')}) → O(1)")
+            return ComplexityResult()
+
         # Otros nodos → complejidad constante
         return ComplexityResult()
 
@@ -161,19 +401,32 @@ class ComplexityAnalyzer:
     def _sequence(self, elements):
         best_total = "1"
         worst_total = "1"
+        avg_total = "1"
+        space_total = "1"
         has_early_exit = False
+        exits = set()
 
         for el in elements:
             result = self._analyze_node(el)
             
             best_total = combine_additive(best_total, result.best)
             worst_total = combine_additive(worst_total, result.worst)
+            avg_total = combine_additive(avg_total, result.avg)
+            space_total = combine_additive(space_total, result.space)
+            exits |= result.exits
             
             if result.has_early_exit:
                 has_early_exit = True
 
         self.details["combination"] = "Suma de complejidades secuenciales"
-        return ComplexityResult(best=best_total, worst=worst_total, has_early_exit=has_early_exit)
+        return ComplexityResult(
+            best=best_total,
+            worst=worst_total,
+            avg=avg_total,
+            has_early_exit=has_early_exit,
+            space=space_total,
+            exits=exits
+        )
 
     # ------------------------------------------------------
     # CICLOS
@@ -181,61 +434,387 @@ class ComplexityAnalyzer:
 
     def _for_loop(self, node):
         body = node.get("body")
+        var = node.get("var")
+        trace_start = self._trace_mark()
+
+        # Las iteraciones dependen de la variable de tamaño del límite superior
+        iter_c = self._size_of(node.get("end"))
+
+        # Dentro del cuerpo, la variable de control está acotada por el límite
+        previous = self.sizes.get(var)
+        self.sizes[var] = iter_c
         body_result = self._analyze_node(body)
-        
-        iter_c = "n"
-        
+        if previous is None:
+            self.sizes.pop(var, None)
+        else:
+            self.sizes[var] = previous
+        self._trace_loop(trace_start, iter_c)
+
         # Si el cuerpo tiene salida temprana (return/break dentro de un if)
-        if body_result.has_early_exit:
-            self.details["loops"].append("Ciclo FOR con salida temprana → Ω(1), O(n)")
+        if body_result.exits:
+            self.details["loops"].append(f"Ciclo FOR con salida temprana → Ω(1), O({iter_c})")
             self.details["early_exit_detected"] = True
             return ComplexityResult(
                 best="1",  # Mejor caso: sale en primera iteración
                 worst=combine_multiplicative(iter_c, body_result.worst),  # Peor caso: recorre todo
-                has_early_exit=True
+                avg=self._average_iterations("FOR", iter_c, body_result),
+                has_early_exit="return" in body_result.exits,
+                space=body_result.space,  # La memoria del cuerpo se reutiliza en cada iteración
+                exits=body_result.exits - {"break"}
             )
         else:
-            self.details["loops"].append("Ciclo FOR → O(n)")
+            self.details["loops"].append(f"Ciclo FOR → O({iter_c})")
             complexity = combine_multiplicative(iter_c, body_result.worst)
-            return ComplexityResult(best=complexity, worst=complexity)
+            return ComplexityResult(
+                best=combine_multiplicative(iter_c, body_result.best),
+                worst=complexity,
+                avg=combine_multiplicative(iter_c, body_result.avg),
+                space=body_result.space
+            )
 
     def _while_loop(self, node):
         body = node.get("body")
+        trace_start = self._trace_mark()
         body_result = self._analyze_node(body)
         
-        iter_c = "n"
+        iter_c = self._condition_size(node.get("condition"), body, until=False)
+        self._trace_loop(trace_start, iter_c)
         
-        if body_result.has_early_exit:
-            self.details["loops"].append("Ciclo WHILE con salida temprana → Ω(1), O(n)")
+        if body_result.exits:
+            self.details["loops"].append(f"Ciclo WHILE con salida temprana → Ω(1), O({iter_c})")
             self.details["early_exit_detected"] = True
             return ComplexityResult(
                 best="1",
                 worst=combine_multiplicative(iter_c, body_result.worst),
-                has_early_exit=True
+                avg=self._average_iterations("WHILE", iter_c, body_result),
+                has_early_exit="return" in body_result.exits,
+                space=body_result.space,
+                exits=body_result.exits - {"break"}
             )
         else:
-            self.details["loops"].append("Ciclo WHILE → O(n)")
+            self.details["loops"].append(f"Ciclo WHILE → O({iter_c})")
             complexity = combine_multiplicative(iter_c, body_result.worst)
-            return ComplexityResult(best=complexity, worst=complexity)
+            return ComplexityResult(
+                best=combine_multiplicative(iter_c, body_result.best),
+                worst=complexity,
+                avg=combine_multiplicative(iter_c, body_result.avg),
+                space=body_result.space
+            )
 
     def _repeat_loop(self, node):
         body = node.get("body")
+        trace_start = self._trace_mark()
         body_result = self._analyze_node(body)
 
-        iter_c = "n"
+        iter_c = self._condition_size(node.get("condition"), body, until=True)
+        self._trace_loop(trace_start, iter_c)
         
-        if body_result.has_early_exit:
-            self.details["loops"].append("Ciclo REPEAT con salida temprana → Ω(1), O(n)")
+        if body_result.exits:
+            self.details["loops"].append(f"Ciclo REPEAT con salida temprana → Ω(1), O({iter_c})")
             self.details["early_exit_detected"] = True
             return ComplexityResult(
                 best="1",
                 worst=combine_multiplicative(iter_c, body_result.worst),
-                has_early_exit=True
+                avg=self._average_iterations("REPEAT", iter_c, body_result),
+                has_early_exit="return" in body_result.exits,
+                space=body_result.space,
+                exits=body_result.exits - {"break"}
             )
         else:
-            self.details["loops"].append("Ciclo REPEAT → O(n)")
+            self.details["loops"].append(f"Ciclo REPEAT → O({iter_c})")
             complexity = combine_multiplicative(iter_c, body_result.worst)
-            return ComplexityResult(best=complexity, worst=complexity)
+            return ComplexityResult(
+                best=combine_multiplicative(iter_c, body_result.best),
+                worst=complexity,
+                avg=combine_multiplicative(iter_c, body_result.avg),
+                space=body_result.space
+            )
+
+    # ------------------------------------------------------
+    # Traza de ejecuciones
+    # ------------------------------------------------------
+
+    def _trace_statement(self, node):
+        """
+        Registra una sentencia con una ejecución; los ciclos que la
+        contienen multiplican después ese número por sus iteraciones.
+        """
+        nodetype = node.get("type")
+        executions = "1"
+        if nodetype == "array_decl":
+            # Inicializar el arreglo cuesta tanto como su tamaño
+            executions = self._size_of(node.get("size"))
+        # Un return se ejecuta a lo sumo una vez por llamada y un break una
+        # vez por pasada del ciclo que interrumpe: no se multiplican por las
+        # iteraciones de los ciclos que atraviesan
+        skip = {"return": float("inf"), "break": 1}.get(nodetype, 0)
+        self.trace.append({
+            "node": node,
+            "operation": TRACED_STATEMENTS[nodetype],
+            "executions": executions,
+            "iterations": None,
+            "skip": skip,
+        })
+
+    def _trace_mark(self):
+        """Posición de la traza antes del cuerpo de un ciclo."""
+        return len(self.trace) if self.trace is not None else None
+
+    def _trace_loop(self, start, iterations):
+        """
+        Multiplica por las iteraciones del ciclo las sentencias registradas
+        en su cuerpo. La sentencia del ciclo (trace[start - 1]) evalúa su
+        control una vez por iteración.
+        """
+        if self.trace is None:
+            return
+        header = self.trace[start - 1]
+        header["executions"] = iterations
+        header["iterations"] = iterations
+        for entry in self.trace[start:]:
+            if entry["skip"]:
+                entry["skip"] -= 1
+                continue
+            entry["executions"] = combine_multiplicative(iterations, entry["executions"])
+
+    # ------------------------------------------------------
+    # Caso promedio de ciclos con salida temprana
+    # ------------------------------------------------------
+
+    def _average_iterations(self, kind, iter_c, body_result):
+        """
+        Calcula el costo esperado de un ciclo con salida temprana:
+        - break con probabilidad p por iteración → geométrica:
+          E[iteraciones] = (1 - (1-p)^n) / p ≤ 1/p → Θ(1)
+        - return de búsqueda con probabilidad q de encontrar el elemento
+          en una posición uniforme → E[iteraciones] = q(n+1)/2 + (1-q)n → Θ(n)
+        """
+        p_break = self.probabilities["break_condition"]
+        q_hit = self.probabilities["search_hit"]
+
+        if "break" in body_result.exits and p_break > 0:
+            expected = "1"
+            formula = (
+                f"E[iteraciones] = (1 - {1 - p_break:g}^{iter_c}) / {p_break:g} "
+                f"≤ {1 / p_break:g}"
+            )
+            model = f"geométrica, p = {p_break:g}"
+        elif "return" in body_result.exits:
+            expected = iter_c
+            if q_hit >= 1:
+                formula = f"E[iteraciones] = ({iter_c} + 1)/2"
+            else:
+                formula = (
+                    f"E[iteraciones] = {q_hit:g}·({iter_c} + 1)/2 + {1 - q_hit:g}·{iter_c}"
+                )
+            model = f"posición uniforme, q = {q_hit:g}"
+        else:
+            # break con p = 0: el ciclo recorre todas sus iteraciones
+            expected = iter_c
+            formula = f"E[iteraciones] = {iter_c}"
+            model = "recorrido completo"
+
+        self.details["average_case"].append(
+            f"Ciclo {kind} ({model}): {formula} → Θ({expected})"
+        )
+        return combine_multiplicative(expected, body_result.avg)
+
+    # ------------------------------------------------------
+    # Variables de tamaño (n, m, V, E, ...)
+    # ------------------------------------------------------
+
+    def _size_of(self, expr):
+        """
+        Calcula la complejidad del valor de una expresión usada como límite
+        de un ciclo. Cada variable libre es su propia variable de tamaño:
+        "for j 🡨 1 to m" itera O(m) veces, no O(n).
+        """
+        if not isinstance(expr, dict):
+            return "n"
+
+        exprtype = expr.get("type")
+
+        if exprtype == "number":
+            return "1"
+
+        if exprtype == "var":
+            if expr.get("access"):
+                # El valor de un elemento (A[i]) no se conoce
+                return "n"
+            key = self._variable_key(expr)
+            return self.sizes.get(key, key)
+
+        if exprtype == "length":
+            return self._length_of(expr.get("arg"))
+
+        if exprtype in ("ceiling", "floor"):
+            return self._size_of(expr.get("arg"))
+
+        if exprtype == "binop":
+            op = expr.get("op")
+            left = self._size_of(expr.get("left"))
+            right = self._size_of(expr.get("right"))
+            if op in ("+", "-"):
+                return BigO([left, right])
+            if op == "*":
+                return combine_multiplicative(left, right)
+            if op == "mod":
+                return right
+            # División (/, div): cota superior lineal en el dividendo
+            return left
+
+        if exprtype == "call":
+            return "n"
+
+        # Literales (strings, booleanos, NULL)
+        return "1"
+
+    def _length_of(self, arg):
+        """Tamaño de length(X) según las dimensiones conocidas de X."""
+        if not isinstance(arg, dict) or arg.get("type") != "var":
+            return self._size_of(arg)
+
+        key = self._variable_key(arg)
+        access = arg.get("access") or []
+
+        # length(A[1..j]) → tamaño del rango
+        for acc in access:
+            index = acc.get("index") if isinstance(acc, dict) else None
+            if isinstance(index, dict) and index.get("type") == "range":
+                return self._size_of(index.get("end"))
+
+        dims = self.array_dims.get(key, [])
+        depth = len(access)
+        if depth < len(dims) and dims[depth]:
+            return dims[depth]
+        if depth == 0:
+            return f"|{key}|"
+        return "n"
+
+    def _variable_key(self, var):
+        """Nombre de una variable incluyendo el campo (obj.campo)."""
+        name = var.get("name", "unknown")
+        if var.get("field"):
+            return f"{name}.{var.get('field')}"
+        return name
+
+    def _track_assignment(self, node):
+        """Registra variables que toman el valor de un tamaño conocido."""
+        target = node.get("var")
+        expr = node.get("expr")
+        if not isinstance(target, dict) or target.get("access"):
+            return
+
+        name = self._variable_key(target)
+
+        if isinstance(expr, dict) and expr.get("type") == "length":
+            size = self._length_of(expr.get("arg"))
+            if size.startswith("|"):
+                # Tamaño desconocido: la variable pasa a nombrar el tamaño
+                # del arreglo (n 🡨 length(A) → A tiene n elementos)
+                arg = expr.get("arg")
+                self.array_dims[self._variable_key(arg)] = [name]
+                size = name
+            self.sizes[name] = size
+            return
+
+        # Solo expresiones construidas con tamaños ya conocidos (mitad 🡨 n div 2)
+        names = self._collect_var_names(expr)
+        if names and name not in names and all(n in self.sizes for n in names):
+            self.sizes[name] = self._size_of(expr)
+
+    def _register_params(self, params):
+        """Los parámetros escalares y las dimensiones de arreglos son tamaños."""
+        for param in params or []:
+            if not isinstance(param, dict) or param.get("type") != "param":
+                continue
+            name = param.get("name")
+            dims = param.get("dims")
+            if dims:
+                self.array_dims[name] = [
+                    self._size_of(dim) if dim is not None else None
+                    for dim in dims
+                ]
+            elif not param.get("class"):
+                self.sizes.setdefault(name, name)
+
+    def _collect_var_names(self, node):
+        """Nombres de las variables usadas en una expresión."""
+        names = []
+        if isinstance(node, dict):
+            if node.get("type") == "var":
+                names.append(self._variable_key(node))
+            for value in node.values():
+                if isinstance(value, (dict, list)):
+                    names.extend(self._collect_var_names(value))
+        elif isinstance(node, list):
+            for item in node:
+                names.extend(self._collect_var_names(item))
+        return names
+
+    def _modified_vars(self, node):
+        """Variables asignadas dentro de un bloque (contadores del ciclo)."""
+        modified = set()
+        if isinstance(node, dict):
+            if node.get("type") == "assignment" and isinstance(node.get("var"), dict):
+                modified.add(self._variable_key(node["var"]))
+            if node.get("type") == "for":
+                modified.add(node.get("var"))
+            for value in node.values():
+                if isinstance(value, (dict, list)):
+                    modified |= self._modified_vars(value)
+        elif isinstance(node, list):
+            for item in node:
+                modified |= self._modified_vars(item)
+        return modified
+
+    def _condition_size(self, condition, body, until=False):
+        """
+        Deduce la variable de tamaño de la condición de un WHILE/REPEAT.
+        En "while (i < n)" el contador i cambia en el cuerpo y n es el límite;
+        en "while (x < 10)" el límite es constante → O(1).
+        Las condiciones centinela (cola ≠ NULL) no indican tamaño → O(n).
+        """
+        modified = self._modified_vars(body)
+
+        def comparisons(node):
+            if not isinstance(node, dict):
+                return []
+            if node.get("type") == "comparison":
+                return [node]
+            if node.get("type") in ("and", "or"):
+                return comparisons(node.get("left")) + comparisons(node.get("right"))
+            if node.get("type") == "not":
+                return comparisons(node.get("expr"))
+            return []
+
+        for comparison in comparisons(condition):
+            op = comparison.get("op")
+            if op not in ("<", "<=", ">", ">="):
+                continue
+            # El límite está del lado hacia el que avanza el contador
+            grows = op in ("<", "<=")
+            sides = ["right", "left"] if grows != until else ["left", "right"]
+            for side in sides:
+                expr = comparison.get(side)
+                names = self._collect_var_names(expr)
+                if not names:
+                    # Límite constante (while (x < 10)): si el contador del
+                    # otro lado avanza hacia él, las iteraciones son O(1)
+                    counter = self._collect_var_names(comparison.get(sides[1]))
+                    if side == sides[0] and self._size_of(expr) == "1" and any(n in modified for n in counter):
+                        return "1"
+                    continue
+                if any(name in modified for name in names):
+                    continue
+                # Solo tamaños conocidos o variables libres (no valores como key 🡨 A[i])
+                if any(name in self.assigned and name not in self.sizes for name in names):
+                    continue
+                size = self._size_of(expr)
+                if size != "1":
+                    return size
+
+        return "n"
 
     # ------------------------------------------------------
     # IF
@@ -254,8 +833,25 @@ class ComplexityAnalyzer:
         worst_case = BigO([then_result.worst, else_result.worst])
         
         has_early_exit = then_result.has_early_exit or else_result.has_early_exit
+        space = BigO([then_result.space, else_result.space])
+
+        # Caso promedio: p·then + (1-p)·else, solo importan las ramas con probabilidad > 0
+        p_then = self.probabilities["if_condition"]
+        branches = []
+        if p_then > 0:
+            branches.append(then_result.avg)
+        if p_then < 1:
+            branches.append(else_result.avg)
+        avg_case = BigO(branches)
         
-        return ComplexityResult(best=best_case, worst=worst_case, has_early_exit=has_early_exit)
+        return ComplexityResult(
+            best=best_case,
+            worst=worst_case,
+            avg=avg_case,
+            has_early_exit=has_early_exit,
+            space=space,
+            exits=then_result.exits | else_result.exits
+        )
 
     # ------------------------------------------------------
     # Análisis de operaciones binarias
@@ -319,6 +915,8 @@ class ComplexityAnalyzer:
     def _subroutine(self, node):
         block = node.get("body")
         name = node.get("name")
+
+        self._register_params(node.get("params"))
         
         # Detectar recursión
         recursive_type = self._detect_recursion(node)
@@ -327,12 +925,13 @@ class ComplexityAnalyzer:
         has_early_return = self._has_early_return_before_recursion(block, name)
 
         body_result = self._analyze_node(block)
+        space = self._recursion_space(recursive_type, body_result.space)
 
         if recursive_type == "simple":
             self.details["recursion"] = "T(n) = T(n-1) + cost"
             if has_early_return:
-                return ComplexityResult(best="1", worst="n")
-            return ComplexityResult(best="n", worst="n")
+                return ComplexityResult(best="1", worst="n", space=space)
+            return ComplexityResult(best="n", worst="n", space=space)
 
         if recursive_type == "divide":
             # Contar cuántas llamadas recursivas hay realmente
@@ -341,18 +940,63 @@ class ComplexityAnalyzer:
             if num_calls == 1:
                 # Una sola llamada con división: T(n) = T(n/2) + cost → O(log n)
                 self.details["recursion"] = "T(n) = T(n/2) + cost"
-                return ComplexityResult(best="log n", worst="log n")
+                return ComplexityResult(best="log n", worst="log n", space=space)
             else:
                 # Múltiples llamadas con división: T(n) = 2T(n/2) + cost → O(n log n)
                 self.details["recursion"] = "T(n) = 2T(n/2) + cost"
-                return ComplexityResult(best="n log n", worst="n log n")
+                return ComplexityResult(best="n log n", worst="n log n", space=space)
         
         if recursive_type == "exponential":
             # La recursión ya fue registrada en _detect_recursion con el número exacto de llamadas
-            return ComplexityResult(best="2^n", worst="2^n")
+            return ComplexityResult(best="2^n", worst="2^n", space=space)
 
+        # Un return sale de la subrutina, no de los ciclos que la rodean
+        body_result.exits = frozenset()
         return body_result
 
+    # ------------------------------------------------------
+    # Complejidad espacial
+    # ------------------------------------------------------
+
+    def _recursion_space(self, recursive_type, frame_space):
+        """
+        Espacio de una subrutina: la pila tiene tantos marcos como la
+        profundidad de la recurrencia y cada marco ocupa frame_space.
+        """
+        if recursive_type is None:
+            return frame_space
+
+        # Profundidad: T(n-1) → n marcos, T(n/2) → log n marcos
+        depth = "log n" if recursive_type == "divide" else "n"
+        self.space_details.append(f"Pila de recursión (profundidad {depth}) → O({depth})")
+
+        if recursive_type == "divide":
+            # Los marcos trabajan sobre mitades: n + n/2 + ... = O(n),
+            # así que domina el marco más grande o la propia pila
+            return BigO([depth, frame_space])
+        return combine_multiplicative(depth, frame_space)
+
+    def _slice_space(self, expr):
+        """Memoria de los subarreglos copiados en una expresión (A[1..j] → O(j))."""
+        space = "1"
+        if isinstance(expr, dict):
+            if expr.get("type") == "var":
+                for acc in expr.get("access") or []:
+                    index = acc.get("index") if isinstance(acc, dict) else None
+                    if isinstance(index, dict) and index.get("type") == "range":
+                        size = self._size_of(index.get("end"))
+                        self.space_details.append(
+                            f"Subarreglo {self._variable_key(expr)}[..] → O({size})"
+                        )
+                        space = combine_additive(space, size)
+            for value in expr.values():
+                if isinstance(value, (dict, list)):
+                    space = combine_additive(space, self._slice_space(value))
+        elif isinstance(expr, list):
+            for item in expr:
+                space = combine_additive(space, self._slice_space(item))
+        return space
+
     # ------------------------------------------------------
     # Detectar salida temprana en recursión
     # ------------------------------------------------------
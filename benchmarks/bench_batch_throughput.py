@@ -0,0 +1,60 @@
+"""
+Benchmark de throughput: llamadas individuales a /analyze-by-system frente
+a una sola llamada a /analyze-by-system/batch.
+
+Usa los programas de pseudocodes/ repetidos hasta completar N programas.
+
+Uso:
+    python -m benchmarks.bench_batch_throughput [N]
+"""
+
+import glob
+import os
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.batch_service import BATCH_WORKERS
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_programs(count):
+    """Carga los programas de ejemplo y los repite hasta completar `count`."""
+    sources = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "pseudocodes", "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            sources.append(f.read())
+    return [sources[i % len(sources)] for i in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    programs = load_programs(count)
+
+    with TestClient(app) as client:
+        # Calentar el parser del proceso y el pool de workers
+        client.post("/analyze-by-system", json={"pseudocode": programs[0]})
+        client.post("/analyze-by-system/batch", json={"programs": programs[:BATCH_WORKERS * 2]})
+
+        start = time.perf_counter()
+        for text in programs:
+            client.post("/analyze-by-system", json={"pseudocode": text})
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = client.post("/analyze-by-system/batch", json={"programs": programs})
+        batch = time.perf_counter() - start
+
+    body = response.json()
+    print(f"Programas: {count}  Workers: {BATCH_WORKERS}  Errores en el lote: {body['errors']}")
+    print(f"Secuencial (1 solicitud por programa): {sequential:.3f} s  ({count / sequential:.1f} programas/s)")
+    print(f"Lote (1 solicitud):                    {batch:.3f} s  ({count / batch:.1f} programas/s)")
+    print(f"Aceleración: {sequential / batch:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark de tamaño de payload y tiempo de decodificación en el cliente
+para cada representación negociable (JSON, MessagePack, gzip, brotli).
+
+Respuestas típicas:
+- un análisis de /analyze-by-system (programa de pseudocodes/),
+- un lote de 100 análisis de /analyze-by-system/batch,
+- un análisis grande de /analyze-by-llm (sintético).
+
+Uso:
+    python -m benchmarks.bench_content_negotiation [repeticiones]
+"""
+
+import gzip
+import json
+import sys
+import time
+
+from benchmarks.bench_batch_throughput import load_programs
+from benchmarks.bench_serialization import sample_llm_response
+from main import _build_analysis_response
+from models.responses import BatchAnalyzeResponse
+from services.analysis_service import analyze_pseudocode
+from services.serialization import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    Representation,
+    brotli,
+    compress,
+    msgpack,
+)
+
+
+def typical_responses():
+    programs = load_programs(100)
+    single = _build_analysis_response(analyze_pseudocode(programs[0]))
+    batch = [_build_analysis_response(analyze_pseudocode(text)) for text in programs]
+    return [
+        ("/analyze-by-system", single),
+        ("/analyze-by-system/batch (100)", BatchAnalyzeResponse(results=batch, total=len(batch), errors=0)),
+        ("/analyze-by-llm", sample_llm_response(60)),
+    ]
+
+
+def variants():
+    """(nombre, media type, codificación, función de decodificación del cliente)."""
+    options = [
+        ("JSON", JSON_MEDIA_TYPE, None, json.loads),
+        ("JSON + gzip", JSON_MEDIA_TYPE, "gzip", lambda body: json.loads(gzip.decompress(body))),
+    ]
+    if brotli is not None:
+        options.append(("JSON + br", JSON_MEDIA_TYPE, "br", lambda body: json.loads(brotli.decompress(body))))
+    if msgpack is not None:
+        options.append(("MessagePack", MSGPACK_MEDIA_TYPE, None, msgpack.unpackb))
+        options.append(
+            ("MessagePack + gzip", MSGPACK_MEDIA_TYPE, "gzip", lambda body: msgpack.unpackb(gzip.decompress(body)))
+        )
+    return options
+
+
+def timed(fn, repeat):
+    """Microsegundos promedio por llamada."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    if msgpack is None or brotli is None:
+        print("Aviso: msgpack o brotli no están instalados; se omiten sus variantes.")
+
+    for endpoint, model in typical_responses():
+        print(endpoint)
+        baseline = None
+        for name, media_type, encoding, decode in variants():
+            body = Representation(media_type).render(model)
+            if encoding:
+                body = compress(body, encoding)
+            micros = timed(lambda: decode(body), repeat)
+            baseline = baseline or len(body)
+            print(f"  {name:<20} {len(body):>9,} bytes ({len(body) / baseline:6.1%})  decodificación {micros:9.1f} μs")
+
+
+if __name__ == "__main__":
+    main()
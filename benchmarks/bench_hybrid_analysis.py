@@ -0,0 +1,186 @@
+"""
+Ahorro del análisis híbrido de /analyze-by-llm sobre el corpus pseudocodes/.
+
+Para cada programa se arma el prompt que se enviaría en cada modo (completo
+o, si el analizador local es concluyente, el reducido) y la respuesta que
+escribiría el modelo: las secciones narrativas (un paso por sentencia y un
+diagrama de flujo) más, en el modo completo, las secciones cuantitativas
+con la misma forma que las calculadas localmente. Los tokens se estiman
+con ~4 caracteres por token.
+
+La latencia se mide de punta a punta con LLMAnalysisService contra un
+servidor local que imita /v1/messages y tarda `intervalo` segundos por
+cada fragmento de 16 caracteres de la respuesta (un modelo que genera
+~4 tokens por fragmento). Todos los programas se analizan a la vez.
+
+Uso:
+    python -m benchmarks.bench_hybrid_analysis [intervalo_s]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import services.llm_analysis_service as llm_analysis_service
+import services.llm_service as llm_service
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.hybrid_analysis import _statement_lines, local_sections
+from services.llm_analysis_service import LLMAnalysisService
+from services.llm_service import AsyncLLMService, create_async_client
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = os.path.join(ROOT, "pseudocodes")
+CHARS_PER_TOKEN = 4
+
+
+def load_corpus():
+    names = sorted(os.listdir(CORPUS), key=lambda name: int(name.split()[1]))
+    programs = []
+    for name in names:
+        with open(os.path.join(CORPUS, name), encoding="utf-8") as f:
+            programs.append((name, f.read()))
+    return programs
+
+
+def narrative_sections(program):
+    """Secciones narrativas que escribiría el modelo para el programa."""
+    lines = _statement_lines(program) or [(1, program.strip())]
+    return {
+        "step_by_step_analysis": [
+            {
+                "step": i,
+                "code_line": code,
+                "explanation": "Ejecuta la sentencia dentro de la estructura de control que la contiene.",
+                "executions": "n",
+                "complexity_contribution": "O(n)",
+                "detailed_reasoning": "La sentencia se repite una vez por cada iteración de los ciclos que la rodean, "
+                                      "así que su contribución es el producto de sus iteraciones.",
+            }
+            for i, (_, code) in enumerate(lines, start=1)
+        ],
+        "pattern_classification": {
+            "primary_pattern": "Recorrido secuencial",
+            "confidence": 0.9,
+            "characteristics": ["Ciclos con límites fijos", "Acceso secuencial a los datos"],
+            "similar_algorithms": ["Suma de un arreglo", "Búsqueda lineal"],
+            "alternative_approaches": None,
+        },
+        "execution_diagram": {
+            "recursion_tree": None,
+            "flowchart": {
+                "format": "mermaid",
+                "diagram": "flowchart TD\n" + "\n".join(
+                    f'N{i}["{code}"] --> N{i + 1}["..."]' for i, (_, code) in enumerate(lines)
+                ),
+            },
+        },
+    }
+
+
+def quantitative_sections(program, local):
+    """Secciones cuantitativas del modo completo (las locales o de la misma forma)."""
+    if local is not None:
+        return local
+    lines = _statement_lines(program) or [(1, program.strip())]
+    return {
+        "basic_complexity": {
+            "O": "O(n)", "Omega": "Ω(n)", "Theta": "Θ(n)", "tight_bound": True,
+            "summary": "El peor caso es O(n), el mejor caso Ω(n) y el caso promedio Θ(n).",
+        },
+        "mathematical_representation": {
+            "type": "recurrence", "recurrence_relation": "T(n) = T(n-1) + c", "base_case": "T(1) = c",
+            "solution_method": "Sustitución", "solution_steps": ["T(n) = T(n-1) + c = ... = c·n"],
+            "summation": None, "expansion": None, "final_result": "O(n)", "latex_notation": "T(n) = T(n-1) + c",
+        },
+        "cost_analysis": {
+            "instruction_breakdown": [
+                {
+                    "line": number, "code": code, "operation_type": "assignment", "executions_count": "n",
+                    "time_per_execution_us": 0.2, "total_time_formula": "0.2·n", "total_time_n_1000": "200.0 µs",
+                }
+                for number, code in lines
+            ],
+            "summary": {
+                "total_time_formula": "0.2·n µs", "for_n_10": "2.0 µs", "for_n_100": "20.0 µs",
+                "for_n_1000": "200.0 µs", "for_n_10000": "2,000.0 µs (≈2.0 ms)",
+            },
+        },
+    }
+
+
+def tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def plan(programs, hybrid):
+    """(prompt, respuesta del modelo, secciones locales) por programa."""
+    llm_analysis_service.LLM_HYBRID_ANALYSIS = hybrid
+    service = LLMAnalysisService(llm_service=AsyncLLMService(client=object()))
+    plans = []
+    for _, program in programs:
+        prompt, local = service.plan(program)
+        reply = narrative_sections(program)
+        if local is None:
+            reply = {"pseudocode": program, **quantitative_sections(program, local_sections(program)), **reply}
+        plans.append((prompt, json.dumps(reply, ensure_ascii=False), local))
+    return plans
+
+
+async def timed_analyses(base_url, programs, hybrid):
+    llm_analysis_service.LLM_HYBRID_ANALYSIS = hybrid
+    client = create_async_client(base_url=base_url)
+
+    async def one(program):
+        start = time.perf_counter()
+        # Un servicio por análisis: AsyncLLMService guarda el uso de la última llamada
+        await LLMAnalysisService(AsyncLLMService(client)).analyze_pseudocode_async(program)
+        return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*[one(program) for _, program in programs])
+    await client.close()
+    return latencies
+
+
+def main():
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else 0.01
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-stub")
+    # Se mide la llamada al modelo: sin caché de respuestas
+    llm_service.llm_response_cache = None
+    programs = load_corpus()
+
+    full = plan(programs, hybrid=False)
+    hybrid = plan(programs, hybrid=True)
+    replies = {prompt: reply for prompt, reply, _ in full + hybrid}
+
+    def reply_for(request):
+        return replies[request["messages"][0]["content"]]
+
+    start = time.perf_counter()
+    for _, program in programs:
+        local_sections(program)
+    local_ms = (time.perf_counter() - start) * 1000 / len(programs)
+
+    with StubAnthropicServer(reply_text=reply_for, token_interval=interval) as stub:
+        full_latencies = asyncio.run(timed_analyses(stub.base_url, programs, hybrid=False))
+        hybrid_latencies = asyncio.run(timed_analyses(stub.base_url, programs, hybrid=True))
+    llm_analysis_service.LLM_HYBRID_ANALYSIS = True
+
+    eligible = [i for i, (_, _, local) in enumerate(hybrid) if local is not None]
+    print(f"Programas: {len(programs)}, resueltos en modo híbrido: {len(eligible)}")
+    print(f"Análisis local: {local_ms:.2f} ms por programa")
+    for label, indexes in (("Corpus completo", range(len(programs))), ("Solo programas híbridos", eligible)):
+        print(label)
+        for mode, plans, latencies in (("completo", full, full_latencies), ("híbrido", hybrid, hybrid_latencies)):
+            input_tokens = sum(tokens(plans[i][0]) for i in indexes)
+            output_tokens = sum(tokens(plans[i][1]) for i in indexes)
+            latency = statistics.median(latencies[i] for i in indexes)
+            print(f"  {mode:<9} entrada {input_tokens:7d} tokens   salida {output_tokens:7d} tokens   "
+                  f"latencia p50 {latency:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Micro-benchmark de la extracción del JSON de la respuesta del modelo.
+
+Compara, sobre salidas sintéticas de ~8000 tokens (un AnalyzeByLLMResponse
+con diagramas Mermaid cuyas llaves van dentro de cadenas):
+- la extracción anterior (regex perezosa del bloque ```json y, sin
+  bloque, conteo de llaves carácter a carácter sin distinguir cadenas),
+- extract_json (JSONObjectExtractor en una sola pasada),
+- JSONObjectExtractor alimentado con fragmentos de 16 caracteres, como
+  los deltas de un stream.
+
+Cada forma de salida se mide con y sin bloque ```json; la columna final
+indica si el resultado coincide con el objeto original. La relación es
+respecto de la primera variante que no falla.
+
+Uso:
+    python -m benchmarks.bench_json_extraction [tokens] [repeticiones]
+"""
+
+import json
+import re
+import sys
+import time
+
+from benchmarks.bench_serialization import sample_llm_response
+from services.json_stream import JSONObjectExtractor
+from services.llm_service import extract_json
+
+
+# Caracteres por token aproximados de la salida del modelo
+CHARS_PER_TOKEN = 4
+CHUNK_CHARS = 16
+
+
+def legacy_extract_json(response_text):
+    """Extracción previa a JSONObjectExtractor (referencia)."""
+    response_text = response_text.strip()
+    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
+    if json_match:
+        json_str = json_match.group(1)
+    else:
+        brace_count = 0
+        start_idx = response_text.find('{')
+        json_str = response_text
+        if start_idx != -1:
+            for i in range(start_idx, len(response_text)):
+                if response_text[i] == '{':
+                    brace_count += 1
+                elif response_text[i] == '}':
+                    brace_count -= 1
+                    if brace_count == 0:
+                        json_str = response_text[start_idx:i+1]
+                        break
+    return json.loads(json_str.strip())
+
+
+def sample_output(tokens, unbalanced):
+    """(objeto, JSON con sangría) de aproximadamente `tokens` tokens."""
+    steps = 1
+    while True:
+        analysis = sample_llm_response(steps).model_dump(mode="json", exclude={"llm_metadata", "timings"})
+        if unbalanced:
+            # Etiqueta con una llave sin pareja, válida dentro de una cadena JSON
+            analysis["execution_diagram"]["flowchart"]["diagram"] += ' D["abre {"]'
+        text = json.dumps(analysis, ensure_ascii=False, indent=2)
+        if len(text) >= tokens * CHARS_PER_TOKEN:
+            return analysis, text
+        steps += 1
+
+
+def streamed(text):
+    chunks = [text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS)]
+
+    def run():
+        extractor = JSONObjectExtractor()
+        for chunk in chunks:
+            if extractor.feed(chunk) is not None:
+                break
+        return json.loads(extractor.result)
+    return run
+
+
+def timed(fn, repeat):
+    """Microsegundos promedio por llamada."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def matches(fn, expected):
+    try:
+        return "ok" if fn() == expected else "distinto"
+    except ValueError:
+        return "error"
+
+
+def main():
+    tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    for unbalanced in (False, True):
+        analysis, body = sample_output(tokens, unbalanced)
+        shapes = [
+            ("con bloque ```json", f"Este es el análisis:\n```json\n{body}\n```\nEspero que sirva."),
+            ("sin bloque", f"Este es el análisis:\n{body}\nEspero que sirva."),
+        ]
+        label = "llaves sin pareja en Mermaid" if unbalanced else "llaves balanceadas en Mermaid"
+        print(f"Salida de ~{len(body) // CHARS_PER_TOKEN} tokens ({len(body) / 1024:.1f} KiB), {label}:")
+        for shape, text in shapes:
+            candidates = [
+                ("extracción anterior", lambda: legacy_extract_json(text)),
+                ("extract_json (una pasada)", lambda: extract_json(text)),
+                (f"JSONObjectExtractor ({CHUNK_CHARS} car.)", streamed(text)),
+            ]
+            print(f"  {shape}:")
+            baseline = None
+            for name, fn in candidates:
+                result = matches(fn, analysis)
+                if result == "error":
+                    print(f"    {name:<34} {'—':>9}              {result}")
+                    continue
+                micros = timed(fn, repeat)
+                baseline = baseline or micros
+                print(f"    {name:<34} {micros:9.1f} μs  ({baseline / micros:.2f}x)  {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Latencia de /analyze-by-llm con la caché de respuestas del LLM: fallo
+(llamada al modelo simulado), acierto en memoria y acierto en disco
+(memoria vacía, como tras un reinicio del worker).
+
+Cada solicitud cambia de API key para no chocar con el límite de tasa del
+pool llm. El modelo simulado responde al instante, así que el fallo mide
+solo la sobrecarga del cliente; contra la API real se suman segundos.
+
+Uso:
+    python -m benchmarks.bench_llm_cache [repeticiones]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+import services.llm_service as llm_service
+from benchmarks.bench_serialization import sample_llm_response
+from benchmarks.stub_anthropic import StubAnthropicServer
+from main import app
+from services.llm_service import create_async_client
+from services.result_cache import ResultCache, SQLiteCacheBackend
+
+
+def new_cache(path):
+    return ResultCache(max_entries=256, ttl_seconds=3600, backend=SQLiteCacheBackend(path))
+
+
+async def timed_posts(client, programs, key_prefix):
+    latencies = []
+    for i, program in enumerate(programs):
+        start = time.perf_counter()
+        response = await client.post("/analyze-by-llm", json={"pseudocode": program}, headers={"X-API-Key": f"{key_prefix}-{i}"})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    return latencies
+
+
+async def run(base_url, path, repeat):
+    programs = [f"x{i} 🡨 {i}" for i in range(repeat)]
+    llm_service._async_client = create_async_client(base_url=base_url)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        llm_service.llm_response_cache = new_cache(path)
+        miss = await timed_posts(client, programs, "miss")
+        memory_hit = await timed_posts(client, programs, "memoria")
+        llm_service.llm_response_cache = new_cache(path)
+        disk_hit = await timed_posts(client, programs, "disco")
+    await llm_service._async_client.close()
+    return miss, memory_hit, disk_hit
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-stub")
+    analysis = sample_llm_response(20).model_dump(mode="json", exclude={"llm_metadata", "timings"})
+
+    with tempfile.TemporaryDirectory() as directory, \
+            StubAnthropicServer(reply_text=json.dumps(analysis, ensure_ascii=False)) as stub:
+        results = asyncio.run(run(stub.base_url, os.path.join(directory, "llm.sqlite3"), repeat))
+
+    print(f"Solicitudes por caso: {repeat}")
+    for label, latencies in zip(("Fallo (modelo local):", "Acierto en memoria:", "Acierto en disco:"), results):
+        print(f"  {label:<24} p50 {statistics.median(latencies):6.2f} ms   media {statistics.mean(latencies):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Costo por solicitud del cliente de Anthropic: un cliente nuevo en cada
+solicitud (como hacían /analyze-by-llm y /complete-code) frente al cliente
+compartido de la aplicación con su pool keep-alive.
+
+Las llamadas van a un servidor local que imita /v1/messages, así que lo
+medido es solo la sobrecarga del lado del cliente: construir el cliente
+(contexto SSL, pool de httpx) y abrir la conexión TCP. Contra la API real
+cada conexión nueva paga además el handshake TLS (1-2 RTT).
+
+Uso:
+    python -m benchmarks.bench_llm_client [solicitudes]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+from anthropic import Anthropic
+
+from benchmarks.stub_anthropic import StubAnthropicServer
+import services.llm_service as llm_service
+from services.llm_service import LLMService, create_client
+
+
+def run(stub, make_client, count):
+    """Latencias (ms) de `count` llamadas y conexiones abiertas en el servidor."""
+    connections = stub.connections
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        LLMService(make_client()).generate_completion("prompt")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, stub.connections - connections
+
+
+def report(label, latencies, connections):
+    print(
+        f"  {label:<28} media {statistics.mean(latencies):7.2f} ms   "
+        f"p50 {statistics.median(latencies):7.2f} ms   conexiones {connections}"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-stub")
+    # Se mide la llamada al modelo: sin caché de respuestas
+    llm_service.llm_response_cache = None
+
+    with StubAnthropicServer(reply_text="hola") as stub:
+        # Cliente por solicitud, como antes (nunca se cerraba)
+        per_request = run(stub, lambda: Anthropic(base_url=stub.base_url), count)
+
+        shared_client = create_client(base_url=stub.base_url)
+        shared_client.messages.create(model="m", max_tokens=1, messages=[{"role": "user", "content": "x"}])
+        shared = run(stub, lambda: shared_client, count)
+        shared_client.close()
+
+    start = time.perf_counter()
+    for _ in range(20):
+        Anthropic(base_url=stub.base_url)
+    construction = (time.perf_counter() - start) / 20 * 1000
+
+    print(f"Solicitudes: {count}")
+    print(f"  Construcción de un cliente:  {construction:7.2f} ms (contexto SSL y pool de httpx)")
+    report("Cliente por solicitud:", *per_request)
+    report("Cliente compartido:", *shared)
+    saved = statistics.mean(per_request[0]) - statistics.mean(shared[0])
+    print(f"  Sobrecarga eliminada por solicitud: {saved:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
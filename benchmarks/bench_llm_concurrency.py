@@ -0,0 +1,76 @@
+"""
+Llamadas al LLM simultáneas en un solo worker: pipeline bloqueante en el
+pool de hilos del servidor (como eran /complete-code y /analyze-by-llm)
+frente al pipeline asíncrono.
+
+Un servidor local imita /v1/messages con una latencia fija, así que el
+tiempo total muestra cuántas llamadas se solapan: con N solicitudes y
+latencia L, el bloqueante tarda al menos L * ceil(N / hilos) y el
+asíncrono ~L más el CPU de las N llamadas. El servidor simulado corre en
+otro proceso para no competir por el GIL con el cliente.
+
+Uso:
+    python -m benchmarks.bench_llm_concurrency [solicitudes] [latencia_s]
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from services.completion_service import CompletionService
+import services.llm_service as llm_service
+from services.llm_service import AsyncLLMService, LLMService, create_async_client, create_client
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin\n    ► completar: sumar i a total\nend"
+
+
+async def blocking(base_url, count):
+    """Cada solicitud ocupa un hilo del pool de Starlette mientras espera."""
+    service = CompletionService(LLMService(create_client(base_url=base_url)))
+    await asyncio.gather(*[run_in_threadpool(service.complete_code, PSEUDOCODE) for _ in range(count)])
+
+
+async def non_blocking(base_url, count):
+    client = create_async_client(base_url=base_url)
+    service = CompletionService(AsyncLLMService(client))
+    await asyncio.gather(*[service.complete_code_async(PSEUDOCODE) for _ in range(count)])
+    await client.close()
+
+
+def measure(pipeline, base_url, count):
+    start = time.perf_counter()
+    asyncio.run(pipeline(base_url, count))
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-stub")
+    # Se mide la llamada al modelo: sin caché de respuestas
+    llm_service.llm_response_cache = None
+
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_anthropic", str(latency), "total 🡨 total + i"],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        base_url = stub.stdout.readline().strip()
+        blocking_seconds = measure(blocking, base_url, count)
+        async_seconds = measure(non_blocking, base_url, count)
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(f"Solicitudes simultáneas: {count}, latencia del modelo: {latency:.1f} s")
+    print(f"  Bloqueante (pool de hilos): {blocking_seconds:6.2f} s  ({count / blocking_seconds:6.1f} solicitudes/s)")
+    print(f"  Asíncrono:                  {async_seconds:6.2f} s  ({count / async_seconds:6.1f} solicitudes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Tiempo hasta el primer byte útil: /analyze-by-llm y /complete-code frente
+a sus versiones en streaming (Server-Sent Events).
+
+Levanta uvicorn apuntando a un servidor local que imita /v1/messages y
+genera la respuesta por fragmentos (CHUNK_CHARS caracteres cada
+`intervalo` segundos, como un modelo que produce tokens). Reporta, para
+cada endpoint, cuándo llega la primera sección / el primer fragmento y
+cuándo termina la respuesta.
+
+Uso:
+    python -m benchmarks.bench_llm_streaming [intervalo_s] [repeticiones]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_serialization import sample_llm_response
+from benchmarks.stub_anthropic import StubAnthropicServer
+
+
+PORT = 8798
+BASE_URL = f"http://127.0.0.1:{PORT}"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_CHARS = 64
+COMPLETION = "\n".join(f"    total 🡨 total + A[{i}]" for i in range(200))
+
+
+def wait_until_ready():
+    for _ in range(100):
+        try:
+            httpx.get(f"{BASE_URL}/health", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("El servidor no inició")
+
+
+def timed_post(client, path, payload, key):
+    """(segundos hasta el primer evento útil, segundos hasta el final)."""
+    start = time.perf_counter()
+    first = None
+    with client.stream("POST", path, json=payload, headers={"X-API-Key": key}) as response:
+        for line in response.iter_lines():
+            if first is None and line.startswith("event: ") and line != "event: done":
+                first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return first if first is not None else total, total
+
+
+def run(stub_text, interval, repeat, endpoints, payload):
+    results = {}
+    with StubAnthropicServer(reply_text=stub_text, token_interval=interval, chunk_chars=CHUNK_CHARS) as stub:
+        env = dict(os.environ, ANTHROPIC_API_KEY="sk-stub", ANTHROPIC_BASE_URL=stub.base_url, LLM_CACHE_MAX_ENTRIES="0")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+            cwd=ROOT, env=env
+        )
+        try:
+            wait_until_ready()
+            with httpx.Client(base_url=BASE_URL, timeout=120) as client:
+                for path in endpoints:
+                    samples = [timed_post(client, path, payload, f"bench-{path}-{i}") for i in range(repeat)]
+                    results[path] = samples
+        finally:
+            server.terminate()
+            server.wait()
+    return results, -(-len(stub_text) // CHUNK_CHARS)
+
+
+def report(results, chunks, interval):
+    print(f"  Respuesta del modelo: {chunks} fragmentos, {chunks * interval:.1f} s de generación")
+    for path, samples in results.items():
+        first = statistics.median(sample[0] for sample in samples)
+        total = statistics.median(sample[1] for sample in samples)
+        print(f"  {path:<24} primer byte útil {first * 1000:8.1f} ms   total {total * 1000:8.1f} ms")
+
+
+def main():
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else 0.02
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    analysis = sample_llm_response(20).model_dump(mode="json", exclude={"llm_metadata", "timings"})
+    analysis_text = json.dumps(analysis, ensure_ascii=False)
+
+    print("/analyze-by-llm")
+    report(*run(analysis_text, interval, repeat, ("/analyze-by-llm", "/analyze-by-llm/stream"),
+                {"pseudocode": "for i 🡨 1 to n do begin x 🡨 x + 1 end"}), interval)
+    print("/complete-code")
+    report(*run(COMPLETION, interval, repeat, ("/complete-code", "/complete-code/stream"),
+                {"pseudocode": "for i 🡨 1 to n do begin\n    ► completar\nend"}), interval)
+
+
+if __name__ == "__main__":
+    main()
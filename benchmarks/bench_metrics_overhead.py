@@ -0,0 +1,80 @@
+"""
+Costo por solicitud de la recolección de métricas.
+
+Mide, en microsegundos por solicitud:
+- record_request (contador + histograma de latencia),
+- record_stages con las 9 etapas de /analyze-by-system,
+- MetricsMiddleware alrededor de una app ASGI vacía frente a la app sola,
+- el StageTimer completo (9 etapas + header Server-Timing).
+
+Uso:
+    python -m benchmarks.bench_metrics_overhead [repeticiones]
+"""
+
+import asyncio
+import sys
+import time
+
+from services.metrics import MetricsMiddleware, MetricsRegistry, record_request, record_stages
+from services.timing import StageTimer
+
+
+STAGES = ("cache", "queue", "grammar_load", "parse", "transform", "analysis", "fingerprint", "validation", "serialization")
+
+
+def timed(fn, repeat):
+    """Microsegundos promedio por llamada."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def empty_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def run_asgi(app, repeat):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await app({"type": "http", "method": "POST", "path": "/analyze-by-system"}, receive, send)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def full_timer():
+    timer = StageTimer("/analyze-by-system")
+    for stage in STAGES:
+        with timer.stage(stage):
+            pass
+    timer.finish()
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    stages = {stage: 0.5 for stage in STAGES}
+
+    request = timed(lambda: record_request("/analyze-by-system", "POST", 200, 0.0042), repeat)
+    stage_histograms = timed(lambda: record_stages("/analyze-by-system", stages), repeat)
+    bare = asyncio.run(run_asgi(empty_app, repeat))
+    wrapped = asyncio.run(run_asgi(MetricsMiddleware(empty_app), repeat))
+    timer = timed(full_timer, repeat)
+    render = timed(MetricsRegistry().render, 1000)
+
+    print(f"Repeticiones: {repeat}")
+    print(f"  record_request:                         {request:6.2f} μs")
+    print(f"  record_stages (9 etapas):               {stage_histograms:6.2f} μs")
+    print(f"  MetricsMiddleware (sobre app vacía):    {wrapped - bare:6.2f} μs")
+    print(f"  StageTimer (9 etapas + Server-Timing):  {timer:6.2f} μs")
+    print(f"  Scrape de un registro vacío:            {render:6.2f} μs")
+
+
+if __name__ == "__main__":
+    main()
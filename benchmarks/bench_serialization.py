@@ -0,0 +1,123 @@
+"""
+Micro-benchmark de serialización de una respuesta grande de /analyze-by-llm.
+
+Compara, para un AnalyzeByLLMResponse sintético ya construido:
+- la ruta por defecto de FastAPI (revalidación con response_model +
+  jsonable_encoder + JSONResponse),
+- model_dump_json de Pydantic,
+- ModelResponse (orjson sobre model_dump, sin revalidar).
+
+Uso:
+    python -m benchmarks.bench_serialization [pasos] [repeticiones]
+"""
+
+import asyncio
+import sys
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models.responses import AnalyzeByLLMResponse
+from services.serialization import ModelResponse, orjson
+
+
+def sample_llm_response(steps):
+    """Análisis por LLM sintético con `steps` pasos e instrucciones."""
+    return AnalyzeByLLMResponse(
+        pseudocode="for i 🡨 1 to n do begin for j 🡨 1 to n do begin suma 🡨 suma + A[i][j] end end\n" * 20,
+        basic_complexity={
+            "O": "O(n^2)", "Omega": "Ω(n^2)", "Theta": "Θ(n^2)", "tight_bound": True,
+            "summary": "El algoritmo recorre la matriz completa una vez. " * 6,
+        },
+        step_by_step_analysis=[
+            {
+                "step": i,
+                "code_line": f"for j 🡨 1 to n do begin suma 🡨 suma + A[{i}][j] end",
+                "explanation": "Recorre la fila completa de la matriz acumulando la suma. " * 3,
+                "executions": "n^2",
+                "complexity_contribution": "O(n^2)",
+                "detailed_reasoning": "El ciclo interno se ejecuta n veces por cada iteración del externo. " * 5,
+            }
+            for i in range(steps)
+        ],
+        pattern_classification={
+            "primary_pattern": "Recorrido de matriz",
+            "confidence": 0.93,
+            "characteristics": ["Ciclos anidados", "Acceso secuencial"] * 10,
+            "similar_algorithms": ["Suma de matrices", "Transposición"] * 5,
+        },
+        mathematical_representation={
+            "type": "summation",
+            "summation": "Σ_{i=1}^{n} Σ_{j=1}^{n} c",
+            "final_result": "c·n^2",
+            "solution_steps": ["Se resuelve la sumatoria interna y luego la externa"] * 15,
+        },
+        execution_diagram={"flowchart": {"format": "mermaid", "diagram": "graph TD; A[Inicio]-->B{i ≤ n}; " * 200}},
+        cost_analysis={
+            "instruction_breakdown": [
+                {
+                    "line": i,
+                    "code": "suma 🡨 suma + A[i][j]",
+                    "operation_type": "asignación",
+                    "executions_count": "n^2",
+                    "time_per_execution_us": 0.01,
+                    "total_time_formula": "0.01·n^2 μs",
+                    "total_time_n_1000": "10 ms",
+                }
+                for i in range(steps)
+            ],
+            "summary": {
+                "total_time_formula": "0.03·n^2 μs",
+                "for_n_10": "3 μs", "for_n_100": "300 μs", "for_n_1000": "30 ms", "for_n_10000": "3 s",
+            },
+        },
+        llm_metadata={
+            "model_used": "claude-sonnet",
+            "tokens": {"input": 1200, "output": 6000, "total": 7200},
+            "estimated_cost_usd": 0.0936,
+            "processing_time_ms": 41000.0,
+        },
+    )
+
+
+def timed(fn, repeat):
+    """Microsegundos promedio por llamada."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    analysis = sample_llm_response(steps)
+    field = create_response_field(name="response", type_=AnalyzeByLLMResponse)
+    loop = asyncio.new_event_loop()
+
+    def fastapi_default():
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=analysis, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    candidates = [
+        ("FastAPI por defecto (response_model)", fastapi_default),
+        ("model_dump_json de Pydantic", lambda: analysis.model_dump_json().encode("utf-8")),
+        ("ModelResponse" + (" (orjson)" if orjson else " (sin orjson)"), lambda: ModelResponse(analysis).body),
+    ]
+
+    print(f"Pasos: {steps}  Tamaño del cuerpo: {len(fastapi_default()) / 1024:.1f} KiB  Repeticiones: {repeat}")
+    baseline = None
+    for name, fn in candidates:
+        micros = timed(fn, repeat)
+        baseline = baseline or micros
+        print(f"  {name:<40} {micros:9.1f} μs  ({baseline / micros:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Prueba de carga: latencia de /health mientras /analyze-by-system está saturado.
+
+Levanta uvicorn con cada tipo de ejecutor (ANALYSIS_EXECUTOR=thread/process),
+mide /health en reposo y luego bajo carga (clientes concurrentes enviando
+programas distintos para evitar la caché) y reporta p50/p99 y las
+respuestas 503.
+
+Uso:
+    python -m benchmarks.load_health_latency [segundos] [clientes]
+"""
+
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+PORT = 8799
+BASE_URL = f"http://127.0.0.1:{PORT}"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def heavy_program(seed):
+    """Programa de ~100 ms de análisis; seed cambia los nombres para evitar la caché."""
+    return " ".join(
+        f"for i 🡨 1 to n do begin for j 🡨 1 to n do begin x{seed}_{t} 🡨 x{seed}_{t} + A[i][j] end end"
+        for t in range(100)
+    )
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def sample_health(client, seconds):
+    latencies = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def saturate(client, stop, counters, worker_id):
+    seed = worker_id * 1_000_000
+    while not stop.is_set():
+        seed += 1
+        response = await client.post("/analyze-by-system", json={"pseudocode": heavy_program(seed)})
+        counters[response.status_code] = counters.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            # Cliente correcto: respeta Retry-After
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+
+async def measure(seconds, clients):
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60) as client:
+        idle = await sample_health(client, seconds)
+
+        stop = asyncio.Event()
+        counters = {}
+        load = [asyncio.create_task(saturate(client, stop, counters, i)) for i in range(clients)]
+        await asyncio.sleep(0.5)  # dejar que la carga se estabilice
+        loaded = await sample_health(client, seconds)
+        stop.set()
+        await asyncio.gather(*load)
+
+    return idle, loaded, counters
+
+
+def wait_until_ready():
+    for _ in range(100):
+        try:
+            httpx.get(f"{BASE_URL}/health", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("El servidor no inició")
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    for kind in ("thread", "process"):
+        env = dict(os.environ, ANALYSIS_EXECUTOR=kind)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+            cwd=ROOT, env=env
+        )
+        try:
+            wait_until_ready()
+            idle, loaded, counters = asyncio.run(measure(seconds, clients))
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(f"Ejecutor: {kind}  clientes: {clients}  respuestas: {dict(sorted(counters.items()))}")
+        print(f"  /health en reposo:  p50 {statistics.median(idle):6.2f} ms  p99 {percentile(idle, 0.99):6.2f} ms")
+        print(f"  /health con carga:  p50 {statistics.median(loaded):6.2f} ms  p99 {percentile(loaded, 0.99):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Servidor HTTP local que imita POST /v1/messages de la API de Anthropic.
+
+Responde siempre el mismo mensaje (opcionalmente tras una demora) y cuenta
+las conexiones TCP aceptadas y las solicitudes atendidas, de modo que los
+benchmarks y las pruebas pueden verificar la reutilización de conexiones
+sin salir a la red. Con "stream": true responde los eventos SSE de la API,
+un fragmento de texto cada `token_interval` segundos; sin streaming espera
+ese mismo tiempo de generación antes de responder. Imita también el prompt
+caching: el texto hasta el último bloque con cache_control se informa como
+cache_creation_input_tokens la primera vez y como cache_read_input_tokens
+las siguientes (~4 caracteres por token). `reply_text` puede ser una función
+que recibe el cuerpo de la solicitud y devuelve el texto de la respuesta.
+
+`faults` inyecta fallas en las primeras solicitudes, una entrada por
+solicitud en orden de llegada: {"status": 529, "retry_after": 0} responde
+ese error de la API y {"delay": 2.0} demora la respuesta esos segundos.
+
+También imita la API de Message Batches (POST /v1/messages/batches, GET
+/v1/messages/batches/{id} y .../results): cada lote se responde con
+`reply_text` y figura en curso durante las primeras `batch_polls` consultas.
+
+Uso:
+    with StubAnthropicServer(reply_text="hola") as stub:
+        client = create_client(base_url=stub.base_url)
+
+    # En otro proceso (no compite por el GIL con el cliente medido)
+    python -m benchmarks.stub_anthropic [latencia_s] [texto]
+"""
+
+import itertools
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def message_body(text, model="modelo-de-prueba", input_tokens=10, output_tokens=20, stop_reason="end_turn",
+                 cache_usage=None):
+    """Cuerpo JSON de una respuesta de /v1/messages."""
+    return {
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens, **(cache_usage or {})}
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1: la conexión queda abierta entre solicitudes (keep-alive)
+    protocol_version = "HTTP/1.1"
+    # Headers y cuerpo se escriben por separado: sin TCP_NODELAY cada
+    # respuesta esperaría el ACK retardado (~40 ms)
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/").endswith("/messages/batches"):
+            self._create_batch(request)
+            return
+        with self.server.lock:
+            self.server.requests += 1
+            fault = self.server.faults.pop(0) if self.server.faults else {}
+        if "status" in fault:
+            self._error(fault["status"], fault.get("retry_after"))
+            return
+        if self.server.delay or fault.get("delay"):
+            time.sleep(self.server.delay + fault.get("delay", 0.0))
+
+        text = self.server.reply_text
+        if callable(text):
+            text = text(request)
+        chunks = [text[i:i + self.server.chunk_chars] for i in range(0, len(text), self.server.chunk_chars)]
+        cache_usage = self._prompt_cache_usage(request)
+        if request.get("stream"):
+            self._stream(chunks, request.get("model", "modelo-de-prueba"), cache_usage)
+            return
+        if self.server.token_interval:
+            time.sleep(self.server.token_interval * len(chunks))
+
+        body = json.dumps(message_body(
+            text, request.get("model", "modelo-de-prueba"), stop_reason=self.server.stop_reason,
+            cache_usage=cache_usage
+        )).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = self.path.rstrip("/").split("/")
+        batch = self.server.batches.get(parts[4]) if len(parts) > 4 and parts[3] == "batches" else None
+        if batch is None:
+            self._error(404)
+            return
+        if parts[-1] == "results":
+            lines = "".join(json.dumps(result) + "\n" for result in batch["results"]).encode()
+            self._send(200, lines, "application/x-jsonl")
+            return
+        with self.server.lock:
+            batch["polls"] += 1
+        self._send(200, json.dumps(self._batch_body(batch)).encode())
+
+    def _create_batch(self, request):
+        results = []
+        for item in request.get("requests", []):
+            params = item["params"]
+            text = self.server.reply_text
+            if callable(text):
+                text = text(params)
+            results.append({
+                "custom_id": item["custom_id"],
+                "result": {"type": "succeeded", "message": message_body(text, params.get("model", "modelo-de-prueba"))}
+            })
+        with self.server.lock:
+            self.server.requests += 1
+            batch = {"id": f"msgbatch_stub{next(self.server.batch_ids)}", "polls": 0, "results": results}
+            self.server.batches[batch["id"]] = batch
+        self._send(200, json.dumps(self._batch_body(batch)).encode())
+
+    def _batch_body(self, batch):
+        ended = batch["polls"] > self.server.batch_polls
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else len(batch["results"]),
+                "succeeded": len(batch["results"]) if ended else 0,
+                "errored": 0, "canceled": 0, "expired": 0
+            },
+            "results_url": f"{self.server.base_url}/v1/messages/batches/{batch['id']}/results" if ended else None
+        }
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, retry_after=None):
+        kind = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+        body = json.dumps({"type": "error", "error": {"type": kind, "message": f"Error simulado {status}"}}).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        if retry_after is not None:
+            self.send_header("retry-after", str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _prompt_cache_usage(self, request):
+        blocks = [
+            block
+            for message in request.get("messages", [])
+            if isinstance(message.get("content"), list)
+            for block in message["content"]
+        ]
+        marked = [i for i, block in enumerate(blocks) if block.get("cache_control")]
+        if not marked:
+            return None
+        prefix = "".join(block.get("text", "") for block in blocks[:marked[-1] + 1])
+        tokens = len(prefix) // 4
+        with self.server.lock:
+            hit = prefix in self.server.cached_prefixes
+            self.server.cached_prefixes.add(prefix)
+        return {
+            "cache_creation_input_tokens": 0 if hit else tokens,
+            "cache_read_input_tokens": tokens if hit else 0
+        }
+
+    def _stream(self, chunks, model, cache_usage=None):
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+
+        message = message_body("", model, stop_reason=None, cache_usage=cache_usage)
+        message["content"] = []
+        self._event("message_start", {"type": "message_start", "message": message})
+        self._event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+        })
+        for chunk in chunks:
+            if self.server.token_interval:
+                time.sleep(self.server.token_interval)
+            self._event("content_block_delta", {
+                "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}
+            })
+        self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": self.server.stop_reason, "stop_sequence": None},
+            "usage": {"output_tokens": 20}
+        })
+        self._event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _event(self, name, data):
+        payload = f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    # Cientos de conexiones simultáneas: con la cola de 5 por defecto las
+    # demás esperarían la retransmisión del SYN (1 s)
+    request_queue_size = 1024
+
+
+class StubAnthropicServer:
+    """Servidor en un hilo, en un puerto libre de 127.0.0.1."""
+
+    def __init__(self, reply_text="{}", delay=0.0, stop_reason="end_turn", token_interval=0.0, chunk_chars=16,
+                 faults=None, batch_polls=0):
+        self.server = _Server(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = 0
+        self.server.requests = 0
+        self.server.cached_prefixes = set()
+        self.server.reply_text = reply_text
+        self.server.delay = delay
+        self.server.stop_reason = stop_reason
+        self.server.token_interval = token_interval
+        self.server.chunk_chars = chunk_chars
+        self.server.faults = list(faults or [])
+        self.server.batches = {}
+        self.server.batch_ids = itertools.count(1)
+        self.server.batch_polls = batch_polls
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.server.base_url = self.base_url
+
+    @property
+    def connections(self):
+        return self.server.connections
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.0
+    reply_text = sys.argv[2] if len(sys.argv) > 2 else "{}"
+    stub = StubAnthropicServer(reply_text=reply_text, delay=delay)
+    print(stub.base_url, flush=True)
+    stub.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,35 @@
-from fastapi import FastAPI, HTTPException
+import math
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Header, Path
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Union
-from services.analysis_service import analyze_pseudocode
+from typing import Optional, Union
+from services.result_cache import result_cache, get_cached_analysis, store_analysis
+from services.analysis_service import analyze_with_budget
+from services.executor import analysis_executor, ExecutorSaturatedError
+from services.admission import AdmissionMiddleware, admission_controller
+from services.serialization import (
+    ModelResponse, NEGOTIATED_CONTENT, SSE_CONTENT, SSE_HEADERS, SSE_MEDIA_TYPE, dumps, negotiate, sse_event
+)
+from services.timing import StageTimer
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, metrics, record_llm_usage
+from analyzer.budget import AnalysisBudget
+from services.batch_service import analyze_batch, analyze_stream, iter_ndjson, shutdown_pool, BATCH_MAX_ITEMS
 from services.completion_service import CompletionService
+from services.llm_service import AsyncLLMService, close_client, init_client, llm_flights, llm_response_cache
 from services.llm_analysis_service import LLMAnalysisService
-from models.requests import AnalyzeCodeRequest, CompleteCodeRequest, AnalyzeByLLMRequest
+from services.llm_policy import LLMError, llm_policy
+from services.http_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    LLM_CACHE_CONTROL,
+    llm_result_cache,
+    system_analysis_key,
+    llm_analysis_key,
+    make_etag,
+    etag_matches
+)
+from models.requests import AnalyzeCodeRequest, BatchAnalyzeRequest, CompleteCodeRequest, AnalyzeByLLMRequest
 from models.responses import (
     RootResponse,
     HealthResponse,
@@ -13,6 +38,11 @@ from models.responses import (
     AnalyzeCodeErrorResponse,
     CompleteCodeResponse,
     ComplexityDetails,
+    SpaceComplexity,
+    AnalysisBudgetReport,
+    BatchAnalyzeResponse,
+    ResultCacheStats,
+    AdmissionStats,
     AnalyzeByLLMResponse
 )
 from dotenv import load_dotenv
@@ -20,12 +50,40 @@ from dotenv import load_dotenv
 # Cargar variables de entorno
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de la aplicación: inicia el volcado de métricas entre
+    workers (si METRICS_MULTIPROC_DIR está definido) y crea el cliente del
+    LLM compartido por todas las solicitudes; al apagar el servidor cierra
+    sus conexiones y libera los pools del análisis (individual y por lotes).
+    """
+    metrics.start_flusher()
+    init_client()
+    yield
+    await close_client()
+    analysis_executor.shutdown()
+    shutdown_pool()
+
+
 app = FastAPI(
     title="Complexity Analyzer API",
     description="API base con FastAPI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # Las rutas que devuelven modelos sin ModelResponse también se serializan con orjson
+    default_response_class=ModelResponse
 )
 
+# Métricas por endpoint. Queda por dentro de la admisión: mide solo las
+# solicitudes admitidas (los rechazos se cuentan en las métricas de admisión).
+app.add_middleware(MetricsMiddleware)
+
+# Control de admisión por cliente (X-API-Key). Se agrega antes que CORS para
+# que CORS quede por fuera y los rechazos (429/503) lleven sus headers.
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +94,76 @@ app.add_middleware(
 )
 
 
+# --- Métricas de los componentes, leídas al momento del scrape ------------
+
+metrics.describe("complexity_cache_hits_total", "counter", "Aciertos de caché por caché (system, llm, llm_response)")
+metrics.describe("complexity_cache_misses_total", "counter", "Fallos de caché por caché (system, llm, llm_response)")
+metrics.describe("complexity_cache_entries", "gauge", "Entradas en memoria por caché")
+metrics.describe("complexity_cache_hit_ratio", "gauge", "Proporción de aciertos por caché (todos los workers)")
+metrics.describe("complexity_llm_calls_started_total", "counter", "Llamadas al modelo iniciadas (fallos de la caché de respuestas)")
+metrics.describe("complexity_llm_calls_coalesced_total", "counter", "Solicitudes que esperaron una llamada idéntica en curso en lugar de repetirla")
+metrics.describe("complexity_llm_calls_in_flight", "gauge", "Llamadas distintas al modelo en curso")
+metrics.describe("complexity_llm_attempts_total", "counter", "Intentos de llamada al modelo (incluidos reintentos y copias por hedging)")
+metrics.describe("complexity_llm_retries_total", "counter", "Reintentos de llamadas al modelo tras un error transitorio")
+metrics.describe("complexity_llm_hedged_total", "counter", "Copias lanzadas por hedging y cuántas respondieron primero (outcome)")
+metrics.describe("complexity_llm_errors_total", "counter", "Llamadas al modelo fallidas por tipo de error")
+metrics.describe("complexity_admission_in_flight", "gauge", "Solicitudes admitidas en curso por pool")
+metrics.describe("complexity_admission_waiting", "gauge", "Solicitudes esperando cupo por pool")
+metrics.describe("complexity_admission_admitted_total", "counter", "Solicitudes admitidas por pool")
+metrics.describe("complexity_admission_rejected_total", "counter", "Solicitudes rechazadas por pool y motivo (rate, deadline)")
+metrics.describe("complexity_executor_in_flight", "gauge", "Análisis en el pool de ejecución (en curso y en cola)")
+metrics.describe("complexity_executor_queue_depth", "gauge", "Análisis esperando un worker del pool")
+metrics.describe("complexity_executor_rejected_total", "counter", "Análisis rechazados por pool saturado (503)")
+
+
+def _service_samples():
+    caches = (("system", result_cache), ("llm", llm_result_cache), ("llm_response", llm_response_cache))
+    for name, cache in caches:
+        if cache is None:
+            continue
+        stats = cache.stats()
+        yield "complexity_cache_hits_total", {"cache": name}, stats["hits"]
+        yield "complexity_cache_misses_total", {"cache": name}, stats["misses"]
+        yield "complexity_cache_entries", {"cache": name}, stats["size"]
+
+    stats = llm_flights.stats()
+    yield "complexity_llm_calls_started_total", {}, stats["started"]
+    yield "complexity_llm_calls_coalesced_total", {}, stats["coalesced"]
+    yield "complexity_llm_calls_in_flight", {}, stats["in_flight"]
+
+    stats = llm_policy.stats()
+    yield "complexity_llm_attempts_total", {}, stats["attempts"]
+    yield "complexity_llm_retries_total", {}, stats["retries"]
+    yield "complexity_llm_hedged_total", {"outcome": "launched"}, stats["hedged"]
+    yield "complexity_llm_hedged_total", {"outcome": "won"}, stats["hedge_wins"]
+    for error, count in stats["errors"].items():
+        yield "complexity_llm_errors_total", {"error": error}, count
+
+    for pool, stats in admission_controller.stats().items():
+        yield "complexity_admission_in_flight", {"pool": pool}, stats["in_flight"]
+        yield "complexity_admission_waiting", {"pool": pool}, stats["waiting"]
+        yield "complexity_admission_admitted_total", {"pool": pool}, stats["admitted"]
+        yield "complexity_admission_rejected_total", {"pool": pool, "reason": "rate"}, stats["rejected_rate"]
+        yield "complexity_admission_rejected_total", {"pool": pool, "reason": "deadline"}, stats["rejected_deadline"]
+
+    stats = analysis_executor.stats()
+    yield "complexity_executor_in_flight", {}, stats["in_flight"]
+    yield "complexity_executor_queue_depth", {}, max(0, stats["in_flight"] - stats["max_workers"])
+    yield "complexity_executor_rejected_total", {}, stats["rejected"]
+
+
+def _cache_hit_ratios(counters):
+    for name in ("system", "llm", "llm_response"):
+        labels = (("cache", name),)
+        hits = counters.get(("complexity_cache_hits_total", labels), 0.0)
+        misses = counters.get(("complexity_cache_misses_total", labels), 0.0)
+        yield "complexity_cache_hit_ratio", {"cache": name}, hits / (hits + misses) if hits + misses else 0.0
+
+
+metrics.add_collector(lambda: list(_service_samples()))
+metrics.add_derived(_cache_hit_ratios)
+
+
 @app.get("/", response_model=RootResponse)
 async def root():
     """
@@ -66,21 +194,249 @@ async def get_info():
 
 @app.post(
     "/analyze-by-system",
-    response_model=Union[AnalyzeCodeResponse, AnalyzeCodeErrorResponse]
+    response_model=Union[AnalyzeCodeResponse, AnalyzeCodeErrorResponse],
+    responses={200: NEGOTIATED_CONTENT, 503: {"description": "Análisis saturado; reintentar tras Retry-After"}}
 )
-def analyze_endpoint(request: AnalyzeCodeRequest):
+async def analyze_endpoint(
+    request: AnalyzeCodeRequest,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    debug: bool = False
+):
     """
     Endpoint para analizar la complejidad de pseudocódigo.
     Recibe un payload con el código en el campo 'pseudocode' y devuelve
     el análisis de complejidad.
+
+    El análisis tiene un presupuesto de nodos y tiempo (el del endpoint o el
+    pedido en "budget", acotado al máximo del servidor); si se agota, la
+    respuesta se marca como truncada y las cotas son null.
+    Los análisis completos se guardan en la caché de resultados.
+
+    Los análisis completos llevan un ETag débil (hash del contenido y de la
+    versión del analizador; débil porque "budget" cambia en cada solicitud)
+    y Content-Location con la forma GET; si el cliente envía If-None-Match
+    con ese ETag se responde 304 sin analizar.
+
+    El parseo y el análisis se ejecutan en un pool acotado (services/executor.py)
+    para no bloquear el event loop; si el pool y su cola están llenos se
+    responde 503 con Retry-After.
+
+    Según Accept y Accept-Encoding la respuesta puede ser MessagePack y
+    venir comprimida con gzip o brotli (ver services/serialization.py).
+
+    El header Server-Timing desglosa la solicitud por etapa (cache, queue,
+    grammar_load, parse, transform, analysis, fingerprint, validation,
+    serialization); con ?debug=true los tiempos también van en "timings".
     """
-    result = analyze_pseudocode(request.pseudocode)
-    
+    timer = StageTimer("/analyze-by-system")
+    representation = negotiate(accept, accept_encoding)
+    probabilities = request.probabilities.model_dump() if request.probabilities else None
+    limits = request.budget.model_dump() if request.budget else None
+    content_hash = system_analysis_key(request.pseudocode, probabilities)
+    etag = make_etag(content_hash + representation.etag_suffix, weak=True)
+
+    if etag_matches(if_none_match, etag):
+        return representation.not_modified({"ETag": etag}, timer)
+
+    with timer.stage("cache"):
+        result = get_cached_analysis(request.pseudocode, probabilities)
+    if result is not None:
+        # Acierto de caché: no se consume presupuesto
+        budget_report = AnalysisBudget.for_endpoint("analyze-by-system", **(limits or {})).report()
+    else:
+        try:
+            start = time.perf_counter()
+            result, budget_report, stages = await analysis_executor.run(
+                analyze_with_budget, request.pseudocode, probabilities, "analyze-by-system", limits
+            )
+        except ExecutorSaturatedError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        # Lo que no midió el worker es espera en la cola del pool y envío entre procesos
+        timer.merge(stages)
+        timer.add("queue", max(0.0, (time.perf_counter() - start) * 1000 - sum(stages.values())))
+        with timer.stage("cache"):
+            store_analysis(request.pseudocode, probabilities, result)
+
+    result["budget"] = budget_report
+
+    headers = {}
+    if "error" not in result and not result.get("truncated"):
+        headers["ETag"] = etag
+        headers["Content-Location"] = f"/analyze-by-system/{content_hash}"
+
+    with timer.stage("validation"):
+        analysis = _build_analysis_response(result)
+    if debug:
+        analysis.timings = timer.to_dict()
+    return representation.response(analysis, headers, timer)
+
+
+@app.get(
+    "/analyze-by-system/{content_hash}",
+    response_model=AnalyzeCodeResponse,
+    responses={
+        200: NEGOTIATED_CONTENT,
+        304: {"description": "Sin cambios (If-None-Match)"},
+        404: {"description": "Resultado no disponible"}
+    }
+)
+async def get_analysis_by_hash(
+    content_hash: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    debug: bool = False
+):
+    """
+    Forma GET de /analyze-by-system direccionada por contenido.
+    content_hash es el que devuelve Content-Location al hacer POST; la
+    respuesta (sin "budget") es inmutable y lleva un ETag fuerte, así que
+    navegadores y CDN pueden cachearla.
+    Si el resultado ya no está en la caché del servidor se responde 404 y
+    el cliente debe volver a enviar el pseudocódigo por POST.
+    """
+    timer = StageTimer("/analyze-by-system/{content_hash}")
+    representation = negotiate(accept, accept_encoding)
+    # Con ?debug=true el cuerpo incluye los tiempos de esta solicitud: no
+    # es idéntico byte a byte al cuerpo normal, así que su ETag es débil
+    etag = make_etag(content_hash + representation.etag_suffix, weak=debug)
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+    if etag_matches(if_none_match, etag):
+        return representation.not_modified(headers, timer)
+
+    with timer.stage("cache"):
+        result = result_cache.get(content_hash)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Resultado no disponible; envíe el pseudocódigo por POST.")
+    # If-None-Match: * solo coincide con un resultado existente
+    if etag_matches(if_none_match, etag, exists=True):
+        return representation.not_modified(headers, timer)
+
+    with timer.stage("validation"):
+        analysis = _build_analysis_response(result)
+    if debug:
+        analysis.timings = timer.to_dict()
+    return representation.response(analysis, headers, timer)
+
+
+@app.get("/cache/stats", response_model=ResultCacheStats)
+async def cache_stats():
+    """
+    Estadísticas de la caché de resultados de /analyze-by-system en este
+    proceso (aciertos, fallos, descartes por tamaño y por TTL).
+    """
+    return ResultCacheStats(**result_cache.stats())
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Métricas en formato de texto de Prometheus: solicitudes y latencia por
+    endpoint, duración por etapa del pipeline, cachés, consumo del LLM,
+    colas y solicitudes en curso. Con METRICS_MULTIPROC_DIR suma las de
+    todos los workers.
+    """
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/admission/stats", response_model=AdmissionStats)
+async def admission_stats():
+    """
+    Estado del control de admisión por pool (system, llm): solicitudes en
+    curso y en cola, rechazos y tiempos de espera en cola.
+    """
+    return AdmissionStats(pools=admission_controller.stats())
+
+
+@app.post("/analyze-by-system/batch", response_model=BatchAnalyzeResponse, responses={200: NEGOTIATED_CONTENT})
+def analyze_batch_endpoint(
+    request: BatchAnalyzeRequest,
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Endpoint para analizar varios programas en una sola solicitud.
+    El análisis se reparte en un pool de procesos con el parser precargado;
+    los resultados se devuelven en el mismo orden de entrada y un error en
+    un programa no afecta a los demás.
+    """
+    if len(request.programs) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote excede el máximo de {BATCH_MAX_ITEMS} programas."
+        )
+
+    timer = StageTimer("/analyze-by-system/batch")
+    probabilities = request.probabilities.model_dump() if request.probabilities else None
+    limits = request.budget.model_dump() if request.budget else None
+    with timer.stage("analysis"):
+        raw_results = analyze_batch(request.programs, probabilities, limits)
+    with timer.stage("validation"):
+        results = [_build_analysis_response(result) for result in raw_results]
+    errors = sum(1 for result in results if isinstance(result, AnalyzeCodeErrorResponse))
+
+    return negotiate(accept, accept_encoding).response(
+        BatchAnalyzeResponse(results=results, total=len(results), errors=errors),
+        timer=timer
+    )
+
+
+class IncrementalStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que no escucha la desconexión en paralelo.
+    En Starlette esa tarea consume los mensajes del cuerpo de la solicitud,
+    lo que impide leerlo de forma incremental mientras se responde; una
+    desconexión del cliente se detecta igual al fallar el envío.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post(
+    "/analyze-by-system/stream",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}}
+        }
+    }
+)
+async def analyze_stream_endpoint(request: Request):
+    """
+    Endpoint de análisis por lotes en streaming.
+    El cuerpo es NDJSON: una línea por programa con el mismo formato de
+    /analyze-by-system ({"pseudocode": ..., "probabilities": ...}).
+    La respuesta es NDJSON con una línea por programa en cuanto termina su
+    análisis; el campo "index" indica la línea de entrada para reordenar.
+    """
+    async def result_lines():
+        async for index, result in analyze_stream(iter_ndjson(request.stream())):
+            body = _build_analysis_response(result).model_dump()
+            yield dumps({"index": index, **body}) + b"\n"
+
+    return IncrementalStreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+
+def _build_analysis_response(result):
+    """
+    Convierte el diccionario de analyze_pseudocode (con el reporte de
+    presupuesto en "budget") en la respuesta tipada del endpoint.
+    """
+    budget_report = AnalysisBudgetReport(**result["budget"]) if result.get("budget") else None
+
     # Verificar si hay un error en la respuesta
     if "error" in result:
         return AnalyzeCodeErrorResponse(
             error=result["error"],
-            details=result.get("details", "")
+            details=result.get("details", ""),
+            truncated=result.get("truncated", False),
+            budget=budget_report
         )
     
     # Construir la respuesta exitosa
@@ -88,19 +444,29 @@ def analyze_endpoint(request: AnalyzeCodeRequest):
         loops=result.get("details", {}).get("loops", []),
         recursion=result.get("details", {}).get("recursion"),
         combination=result.get("details", {}).get("combination", ""),
-        early_exit_detected=result.get("details", {}).get("early_exit_detected", False)
+        early_exit_detected=result.get("details", {}).get("early_exit_detected", False),
+        average_case=result.get("details", {}).get("average_case", [])
+    )
+
+    space = SpaceComplexity(
+        O=result.get("space", {}).get("O", "O(1)"),
+        details=result.get("space", {}).get("details", [])
     )
     
     return AnalyzeCodeResponse(
         O=result["O"],
         Omega=result["Omega"],
         Theta=result["Theta"],
-        details=details
+        space=space,
+        details=details,
+        truncated=result.get("truncated", False),
+        budget=budget_report,
+        fingerprint=result.get("fingerprint")
     )
 
 
 @app.post("/complete-code", response_model=CompleteCodeResponse)
-def complete_code_endpoint(request: CompleteCodeRequest):
+async def complete_code_endpoint(request: CompleteCodeRequest, debug: bool = False):
     """
     Endpoint para completar pseudocódigo usando IA.
     Recibe un payload con el código en el campo 'pseudocode' y detecta
@@ -109,13 +475,32 @@ def complete_code_endpoint(request: CompleteCodeRequest):
     
     Retorna:
     - pseudocode: El pseudocódigo completo (original o completado)
+    - llm_metadata: Modelo, tokens (incluidos los leídos/escritos en el
+      prompt caching del proveedor) y resultado de la caché de respuestas
+
+    El header Server-Timing incluye prompt_build y llm_wait. La llamada al
+    LLM es asíncrona: mientras espera no ocupa un hilo del servidor.
+
+    Errores del LLM: 504 si vence el plazo de la solicitud, 503 si el
+    proveedor no está disponible tras los reintentos y 502 si rechaza la
+    solicitud.
     """
+    timer = StageTimer("/complete-code")
     try:
-        completion_service = CompletionService()
-        completed_code = completion_service.complete_code(request.pseudocode)
+        start_time = time.time()
+        completion_service = CompletionService(AsyncLLMService())
+        completed_code = await completion_service.complete_code_async(request.pseudocode, timer)
         
-        return CompleteCodeResponse(pseudocode=completed_code)
+        completion = CompleteCodeResponse(
+            pseudocode=completed_code,
+            llm_metadata=completion_service.llm_metadata((time.time() - start_time) * 1000)
+        )
+        if debug:
+            completion.timings = timer.to_dict()
+        return negotiate().response(completion, timer=timer)
         
+    except LLMError as e:
+        raise _llm_http_error(e)
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except FileNotFoundError as e:
@@ -124,8 +509,71 @@ def complete_code_endpoint(request: CompleteCodeRequest):
         raise HTTPException(status_code=500, detail=f"Error al completar el código: {str(e)}")
 
 
-@app.post("/analyze-by-llm", response_model=AnalyzeByLLMResponse)
-def analyze_by_llm_endpoint(request: AnalyzeByLLMRequest):
+def _llm_http_error(error: LLMError) -> HTTPException:
+    """
+    Respuesta de un error tipado del LLM: 504 si venció el plazo, 503 (con
+    Retry-After si el proveedor lo informó) si no está disponible y 502 si
+    rechazó la solicitud o la respuesta no es válida.
+    """
+    headers = None
+    if error.retry_after is not None:
+        headers = {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    return HTTPException(status_code=error.status_code, detail=str(error), headers=headers)
+
+
+async def _sse_events(events):
+    """
+    Convierte los eventos de un servicio en Server-Sent Events. Un error a
+    mitad del stream (los headers ya se enviaron) se informa con un evento
+    "error" en lugar de un código HTTP; los errores del LLM incluyen en
+    "status" el código que habría correspondido.
+    """
+    try:
+        async for event, data in events:
+            yield sse_event(event, data)
+    except LLMError as e:
+        yield sse_event("error", {"detail": str(e), "status": e.status_code})
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+
+
+@app.post("/complete-code/stream", response_class=StreamingResponse, responses={200: SSE_CONTENT})
+async def complete_code_stream_endpoint(request: CompleteCodeRequest):
+    """
+    Versión en streaming de /complete-code (Server-Sent Events).
+
+    Eventos:
+    - delta: {"text": ...} con cada fragmento generado por el modelo
+    - done: {"pseudocode": ..., "llm_metadata": ...} con el código completado y limpio
+    - error: {"detail": ..., "status": ...} si la generación falla a mitad del stream
+    """
+    try:
+        start_time = time.time()
+        completion_service = CompletionService(AsyncLLMService())
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        async for event, data in completion_service.stream_completion(request.pseudocode):
+            if event == "delta":
+                yield "delta", {"text": data}
+            else:
+                yield "done", CompleteCodeResponse(
+                    pseudocode=data,
+                    llm_metadata=completion_service.llm_metadata((time.time() - start_time) * 1000)
+                )
+
+    return StreamingResponse(_sse_events(events()), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@app.post("/analyze-by-llm", response_model=AnalyzeByLLMResponse, responses={200: NEGOTIATED_CONTENT})
+async def analyze_by_llm_endpoint(
+    request: AnalyzeByLLMRequest,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    debug: bool = False
+):
     """
     Endpoint para analizar pseudocódigo usando LLM.
     Recibe un payload con el pseudocódigo y genera un análisis completo
@@ -139,20 +587,139 @@ def analyze_by_llm_endpoint(request: AnalyzeByLLMRequest):
     - Diagramas de ejecución
     - Análisis de costo por instrucción
     - Recomendaciones de optimización
+
+    La respuesta lleva un ETag débil (hash del pseudocódigo, del modelo y
+    del prompt; débil porque la salida del modelo no es determinista); con
+    If-None-Match se responde 304 sin llamar al LLM.
+    Como es la respuesta más grande, conviene pedirla comprimida
+    (Accept-Encoding: br o gzip) o en MessagePack.
+
+    El header Server-Timing desglosa prompt_build, llm_wait,
+    json_extraction, validation y serialization (con ?debug=true también
+    en "timings").
+    La llamada al LLM es asíncrona (cliente AsyncAnthropic compartido), así
+    que un worker puede tener muchas en curso sin agotar su pool de hilos.
+    Los errores del LLM responden 504 (plazo vencido), 503 (proveedor no
+    disponible tras los reintentos) o 502 (solicitud o respuesta inválida).
     
     Retorna:
     - Análisis completo de complejidad generado por LLM
     """
+    timer = StageTimer("/analyze-by-llm")
+    representation = negotiate(accept, accept_encoding)
+    content_hash = llm_analysis_key(request.pseudocode)
+    etag = make_etag(content_hash + representation.etag_suffix, weak=True)
+
+    if etag_matches(if_none_match, etag):
+        return representation.not_modified({"ETag": etag}, timer)
+
     try:
-        analysis_service = LLMAnalysisService()
-        analysis_result = analysis_service.analyze_pseudocode(request.pseudocode)
+        analysis_service = LLMAnalysisService(AsyncLLMService())
+        analysis_result = await analysis_service.analyze_pseudocode_async(request.pseudocode, timer)
         
         # Convertir el diccionario a la respuesta tipada
-        return AnalyzeByLLMResponse(**analysis_result)
+        with timer.stage("validation"):
+            analysis = AnalyzeByLLMResponse(**analysis_result)
         
+    except LLMError as e:
+        raise _llm_http_error(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al analizar el pseudocódigo: {str(e)}")
+
+    llm_result_cache.set(content_hash, analysis.model_dump(mode="json"))
+    usage = analysis.llm_metadata
+    # Un acierto de la caché o una llamada compartida no consumió tokens
+    if usage.cache_status not in ("hit", "coalesced"):
+        record_llm_usage(usage.model_used, usage.tokens.input, usage.tokens.output, usage.estimated_cost_usd)
+
+    if debug:
+        analysis.timings = timer.to_dict()
+    return representation.response(
+        analysis,
+        {"ETag": etag, "Content-Location": f"/analyze-by-llm/{content_hash}"},
+        timer
+    )
+
+
+@app.post("/analyze-by-llm/stream", response_class=StreamingResponse, responses={200: SSE_CONTENT})
+async def analyze_by_llm_stream_endpoint(request: AnalyzeByLLMRequest):
+    """
+    Versión en streaming de /analyze-by-llm (Server-Sent Events): cada
+    sección del análisis se envía en cuanto el modelo la termina, sin
+    esperar la respuesta completa.
+
+    Eventos:
+    - section: {"name": "basic_complexity", "value": {...}} por cada
+      sección de primer nivel, en el orden en que las genera el modelo
+    - done: el análisis completo y validado (AnalyzeByLLMResponse); queda
+      disponible en GET /analyze-by-llm/{content_hash} como con el POST
+    - error: {"detail": ..., "status": ...} si la generación o la validación fallan
+    """
+    try:
+        analysis_service = LLMAnalysisService(AsyncLLMService())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    content_hash = llm_analysis_key(request.pseudocode)
+
+    async def events():
+        async for event, data in analysis_service.stream_analysis(request.pseudocode):
+            if event == "section":
+                name, value = data
+                yield "section", {"name": name, "value": value}
+                continue
+            analysis = AnalyzeByLLMResponse(**data)
+            llm_result_cache.set(content_hash, analysis.model_dump(mode="json"))
+            usage = analysis.llm_metadata
+            if usage.cache_status not in ("hit", "coalesced"):
+                record_llm_usage(usage.model_used, usage.tokens.input, usage.tokens.output, usage.estimated_cost_usd)
+            yield "done", analysis
+
+    return StreamingResponse(_sse_events(events()), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@app.get(
+    "/analyze-by-llm/{content_hash}",
+    response_model=AnalyzeByLLMResponse,
+    responses={
+        200: NEGOTIATED_CONTENT,
+        304: {"description": "Sin cambios (If-None-Match)"},
+        404: {"description": "Resultado no disponible"}
+    }
+)
+async def get_llm_analysis_by_hash(
+    content_hash: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    debug: bool = False
+):
+    """
+    Forma GET de /analyze-by-llm direccionada por contenido. Otra llamada
+    al modelo puede dar otro análisis, así que no es inmutable: se cachea
+    durante el TTL de la copia en memoria (LLM_CACHE_CONTROL). Devuelve
+    404 si el análisis ya no está en memoria en este proceso.
+    """
+    timer = StageTimer("/analyze-by-llm/{content_hash}")
+    representation = negotiate(accept, accept_encoding)
+    etag = make_etag(content_hash + representation.etag_suffix, weak=True)
+    headers = {"ETag": etag, "Cache-Control": LLM_CACHE_CONTROL}
+
+    if etag_matches(if_none_match, etag):
+        return representation.not_modified(headers, timer)
+
+    with timer.stage("cache"):
+        analysis = llm_result_cache.get(content_hash)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Resultado no disponible; envíe el pseudocódigo por POST.")
+    # If-None-Match: * solo coincide con un resultado existente
+    if etag_matches(if_none_match, etag, exists=True):
+        return representation.not_modified(headers, timer)
+
+    # El diccionario guardado ya pasó por AnalyzeByLLMResponse: se sirve sin revalidar
+    if debug:
+        analysis["timings"] = timer.to_dict()
+    return representation.response(analysis, headers, timer)
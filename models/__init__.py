@@ -2,18 +2,32 @@
 Modelos Pydantic para las entradas y salidas de los endpoints de la API
 """
 
-from .requests import AnalyzeCodeRequest, CompleteCodeRequest
+from .requests import (
+    AnalysisBudgetRequest,
+    AnalyzeCodeRequest,
+    AverageCaseProbabilities,
+    BatchAnalyzeRequest,
+    CompleteCodeRequest
+)
 from .responses import (
     RootResponse,
     HealthResponse,
     InfoResponse,
     AnalyzeCodeResponse,
     AnalyzeCodeErrorResponse,
-    CompleteCodeResponse
+    CompleteCodeResponse,
+    SpaceComplexity,
+    AnalysisBudgetReport,
+    BatchAnalyzeResponse,
+    ResultCacheStats,
+    AdmissionStats
 )
 
 __all__ = [
+    "AnalysisBudgetRequest",
     "AnalyzeCodeRequest",
+    "AverageCaseProbabilities",
+    "BatchAnalyzeRequest",
     "CompleteCodeRequest",
     "RootResponse",
     "HealthResponse",
@@ -21,5 +35,10 @@ __all__ = [
     "AnalyzeCodeResponse",
     "AnalyzeCodeErrorResponse",
     "CompleteCodeResponse",
+    "SpaceComplexity",
+    "AnalysisBudgetReport",
+    "BatchAnalyzeResponse",
+    "ResultCacheStats",
+    "AdmissionStats",
 ]
 
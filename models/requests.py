@@ -2,9 +2,42 @@
 Modelos de entrada (requests) para los endpoints de la API
 """
 
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
+class AverageCaseProbabilities(BaseModel):
+    """
+    Probabilidades del modelo de caso promedio (Theta)
+    """
+    if_condition: float = Field(
+        default=0.5, ge=0.0, le=1.0,
+        description="Probabilidad de que se cumpla la condición de un IF"
+    )
+    search_hit: float = Field(
+        default=0.5, ge=0.0, le=1.0,
+        description="Probabilidad de que una búsqueda (return en un ciclo) encuentre el elemento"
+    )
+    break_condition: float = Field(
+        default=0.5, ge=0.0, le=1.0,
+        description="Probabilidad por iteración de salir de un ciclo con break"
+    )
+
+
+class AnalysisBudgetRequest(BaseModel):
+    """
+    Presupuesto de análisis pedido por el cliente (se acota al máximo del servidor)
+    """
+    max_nodes: Optional[int] = Field(
+        None, ge=1,
+        description="Máximo de nodos/tokens (por defecto el del endpoint)"
+    )
+    max_time_ms: Optional[float] = Field(
+        None, gt=0,
+        description="Tiempo máximo en ms (por defecto el del endpoint)"
+    )
+
+
 class AnalyzeCodeRequest(BaseModel):
     """
     Modelo de entrada para el endpoint /analyze-by-system
@@ -14,6 +47,14 @@ class AnalyzeCodeRequest(BaseModel):
         description="Código en pseudocódigo a analizar",
         min_length=1
     )
+    probabilities: Optional[AverageCaseProbabilities] = Field(
+        None,
+        description="Probabilidades para el caso promedio (por defecto 0.5)"
+    )
+    budget: Optional[AnalysisBudgetRequest] = Field(
+        None,
+        description="Presupuesto de análisis (por defecto el del endpoint, acotado a su máximo)"
+    )
 
     class Config:
         json_schema_extra = {
@@ -23,6 +64,35 @@ class AnalyzeCodeRequest(BaseModel):
         }
 
 
+class BatchAnalyzeRequest(BaseModel):
+    """
+    Modelo de entrada para el endpoint /analyze-by-system/batch
+    """
+    programs: List[str] = Field(
+        ...,
+        description="Lista de programas en pseudocódigo a analizar",
+        min_length=1
+    )
+    probabilities: Optional[AverageCaseProbabilities] = Field(
+        None,
+        description="Probabilidades para el caso promedio (se aplican a todos los programas)"
+    )
+    budget: Optional[AnalysisBudgetRequest] = Field(
+        None,
+        description="Presupuesto de análisis por programa (por defecto el del endpoint, acotado a su máximo)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "programs": [
+                    "for i 🡨 1 to n do begin\n    x 🡨 x + i\nend",
+                    "for i 🡨 1 to n do begin\n    for j 🡨 1 to n do begin\n        x 🡨 x + j\n    end\nend"
+                ]
+            }
+        }
+
+
 class CompleteCodeRequest(BaseModel):
     """
     Modelo de entrada para el endpoint /complete-code
@@ -2,7 +2,7 @@
 Modelos de salida (responses) para los endpoints de la API
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -76,16 +76,57 @@ class ComplexityDetails(BaseModel):
         default=False,
         description="Indica si se detectó una salida temprana en el código"
     )
+    average_case: List[str] = Field(
+        default_factory=list,
+        description="Iteraciones esperadas de los ciclos con salida temprana (caso promedio)"
+    )
+
+
+class SpaceComplexity(BaseModel):
+    """
+    Modelo para la complejidad espacial en la respuesta de análisis
+    """
+    O: Optional[str] = Field(..., description="Notación Big O del espacio auxiliar (peor caso); null si el análisis quedó truncado")
+    details: List[str] = Field(
+        default_factory=list,
+        description="Memoria auxiliar detectada (arreglos, subarreglos, objetos, pila de recursión)"
+    )
+
+
+class AnalysisBudgetReport(BaseModel):
+    """
+    Modelo para el presupuesto de análisis consumido por la solicitud
+    """
+    max_nodes: Optional[int] = Field(None, description="Máximo de nodos/tokens permitidos")
+    max_time_ms: Optional[float] = Field(None, description="Tiempo máximo permitido en ms")
+    nodes_used: int = Field(..., description="Nodos/tokens procesados")
+    time_ms: float = Field(..., description="Tiempo consumido en ms")
+    exhausted: bool = Field(..., description="Indica si se agotó el presupuesto")
+    stage: Optional[str] = Field(None, description="Etapa en la que se agotó (parse, transform, analysis)")
 
 
 class AnalyzeCodeResponse(BaseModel):
     """
     Modelo de salida exitosa para el endpoint POST /analyze-by-system
     """
-    O: str = Field(..., description="Notación Big O (peor caso)")
-    Omega: str = Field(..., description="Notación Omega (mejor caso)")
-    Theta: str = Field(..., description="Notación Theta (caso promedio) o 'N/A' si no existe")
+    O: Optional[str] = Field(..., description="Notación Big O (peor caso); null si el análisis quedó truncado")
+    Omega: Optional[str] = Field(..., description="Notación Omega (mejor caso); null si el análisis quedó truncado")
+    Theta: Optional[str] = Field(..., description="Notación Theta (caso promedio); null si el análisis quedó truncado")
+    space: SpaceComplexity = Field(..., description="Complejidad espacial (memoria auxiliar)")
     details: ComplexityDetails = Field(..., description="Detalles del análisis de complejidad")
+    truncated: bool = Field(
+        default=False,
+        description="Indica si el análisis se detuvo por presupuesto (cotas desconocidas)"
+    )
+    budget: Optional[AnalysisBudgetReport] = Field(None, description="Presupuesto de análisis consumido")
+    fingerprint: Optional[str] = Field(
+        None,
+        description="Huella SHA-256 del programa en forma canónica (igual para programas equivalentes)"
+    )
+    timings: Optional[Dict[str, float]] = Field(
+        None,
+        description="Tiempos por etapa en ms (solo con ?debug=true; también en el header Server-Timing)"
+    )
 
     class Config:
         json_schema_extra = {
@@ -93,11 +134,16 @@ class AnalyzeCodeResponse(BaseModel):
                 "O": "O(n)",
                 "Omega": "Ω(n)",
                 "Theta": "Θ(n)",
+                "space": {
+                    "O": "O(1)",
+                    "details": []
+                },
                 "details": {
                     "loops": ["Ciclo FOR → O(n)"],
                     "recursion": None,
                     "combination": "",
-                    "early_exit_detected": False
+                    "early_exit_detected": False,
+                    "average_case": []
                 }
             }
         }
@@ -109,6 +155,15 @@ class AnalyzeCodeErrorResponse(BaseModel):
     """
     error: str = Field(..., description="Mensaje de error")
     details: str = Field(..., description="Detalles del error")
+    truncated: bool = Field(
+        default=False,
+        description="Indica si el error se debe a que se agotó el presupuesto de análisis"
+    )
+    budget: Optional[AnalysisBudgetReport] = Field(None, description="Presupuesto de análisis consumido")
+    timings: Optional[Dict[str, float]] = Field(
+        None,
+        description="Tiempos por etapa en ms (solo con ?debug=true; también en el header Server-Timing)"
+    )
 
     class Config:
         json_schema_extra = {
@@ -119,11 +174,127 @@ class AnalyzeCodeErrorResponse(BaseModel):
         }
 
 
+class BatchAnalyzeResponse(BaseModel):
+    """
+    Modelo de salida para el endpoint POST /analyze-by-system/batch
+    """
+    results: List[Union[AnalyzeCodeResponse, AnalyzeCodeErrorResponse]] = Field(
+        ...,
+        description="Resultados en el mismo orden de entrada (análisis o error por programa)"
+    )
+    total: int = Field(..., description="Número de programas analizados")
+    errors: int = Field(..., description="Número de programas con error")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "results": [
+                    {
+                        "O": "O(n)",
+                        "Omega": "Ω(n)",
+                        "Theta": "Θ(n)",
+                        "space": {"O": "O(1)", "details": []},
+                        "details": {
+                            "loops": ["Ciclo FOR → O(n)"],
+                            "recursion": None,
+                            "combination": "",
+                            "early_exit_detected": False,
+                            "average_case": []
+                        }
+                    },
+                    {
+                        "error": "Error de sintaxis en el pseudocódigo.",
+                        "details": "Unexpected token at line 1"
+                    }
+                ],
+                "total": 2,
+                "errors": 1
+            }
+        }
+
+
+class ResultCacheStats(BaseModel):
+    """
+    Modelo de salida para el endpoint GET /cache/stats
+    """
+    hits: int = Field(..., description="Consultas resueltas desde la caché")
+    misses: int = Field(..., description="Consultas que requirieron analizar")
+    hit_ratio: float = Field(..., description="Proporción de aciertos")
+    evictions: int = Field(..., description="Entradas descartadas por el límite de tamaño (LRU)")
+    expirations: int = Field(..., description="Entradas descartadas por TTL")
+    shared_hits: int = Field(..., description="Aciertos obtenidos del respaldo compartido (SQLite)")
+    size: int = Field(..., description="Entradas en memoria")
+    max_entries: int = Field(..., description="Máximo de entradas")
+    ttl_seconds: float = Field(..., description="Tiempo de vida de cada entrada en segundos")
+    backend: str = Field(..., description="Almacenamiento: memory o sqlite")
+    analyzer_version: str = Field(..., description="Versión del analizador incluida en las claves")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "hits": 120,
+                "misses": 30,
+                "hit_ratio": 0.8,
+                "evictions": 0,
+                "expirations": 2,
+                "shared_hits": 5,
+                "size": 28,
+                "max_entries": 1024,
+                "ttl_seconds": 3600.0,
+                "backend": "memory",
+                "analyzer_version": "2.0.0"
+            }
+        }
+
+
+class AdmissionPoolLimits(BaseModel):
+    """
+    Límites configurados de un pool de admisión
+    """
+    max_concurrent: int = Field(..., description="Solicitudes simultáneas del pool (todos los clientes)")
+    per_key_concurrent: int = Field(..., description="Solicitudes simultáneas por cliente")
+    rate_per_second: float = Field(..., description="Tasa sostenida por cliente (token bucket)")
+    burst: float = Field(..., description="Ráfaga máxima por cliente")
+    queue_timeout_ms: float = Field(..., description="Plazo máximo de espera en cola")
+    request_timeout_ms: float = Field(0.0, description="Plazo total de la solicitud desde que llega (0: sin plazo)")
+
+
+class AdmissionPoolStats(BaseModel):
+    """
+    Estado y métricas de espera en cola de un pool de admisión
+    """
+    limits: AdmissionPoolLimits = Field(..., description="Límites configurados")
+    in_flight: int = Field(..., description="Solicitudes en curso")
+    waiting: int = Field(..., description="Solicitudes esperando cupo")
+    admitted: int = Field(..., description="Solicitudes admitidas")
+    queued: int = Field(..., description="Solicitudes admitidas o rechazadas que tuvieron que esperar")
+    rejected_rate: int = Field(..., description="Rechazos por tasa excedida (429)")
+    rejected_deadline: int = Field(..., description="Rechazos por plazo de cola vencido (503)")
+    wait_ms_avg: float = Field(..., description="Espera promedio en cola (ms)")
+    wait_ms_max: float = Field(..., description="Espera máxima en cola (ms)")
+    wait_ms_histogram: Dict[str, int] = Field(..., description="Histograma de espera en cola (le_<ms>)")
+
+
+class AdmissionStats(BaseModel):
+    """
+    Modelo de salida para el endpoint GET /admission/stats
+    """
+    pools: Dict[str, AdmissionPoolStats] = Field(..., description="Métricas por pool (system, llm)")
+
+
 class CompleteCodeResponse(BaseModel):
     """
     Modelo de salida para el endpoint POST /complete-code
     """
     pseudocode: str = Field(..., description="Pseudocódigo completado (o original si no había comentarios de completado)")
+    llm_metadata: Optional["LLMMetadata"] = Field(
+        None,
+        description="Metadatos de la llamada al LLM, con los tokens del prompt caching (None si no hubo llamada)"
+    )
+    timings: Optional[Dict[str, float]] = Field(
+        None,
+        description="Tiempos por etapa en ms (solo con ?debug=true; también en el header Server-Timing)"
+    )
 
     class Config:
         json_schema_extra = {
@@ -225,9 +396,15 @@ class CostAnalysis(BaseModel):
 
 class TokenUsage(BaseModel):
     """Uso de tokens"""
-    input: int = Field(default=0, description="Tokens de entrada")
+    input: int = Field(default=0, description="Tokens de entrada (sin los del prompt caching)")
     output: int = Field(default=0, description="Tokens de salida")
     total: int = Field(default=0, description="Total de tokens")
+    cache_creation_input: Optional[int] = Field(
+        None, description="Tokens del prefijo escritos en la caché de prompts del proveedor"
+    )
+    cache_read_input: Optional[int] = Field(
+        None, description="Tokens del prefijo leídos de la caché de prompts del proveedor"
+    )
 
 
 class LLMMetadata(BaseModel):
@@ -238,6 +415,18 @@ class LLMMetadata(BaseModel):
     tokens: TokenUsage = Field(..., description="Tokens usados (input, output, total)")
     estimated_cost_usd: Optional[float] = Field(None, description="Costo estimado en USD")
     processing_time_ms: Optional[float] = Field(None, description="Tiempo de procesamiento en ms")
+    cache_status: Optional[str] = Field(
+        None,
+        description="Caché de respuestas del LLM: hit (sin llamar al modelo), miss, batch (job por lotes), "
+                    "coalesced (compartió la llamada en curso de otra solicitud idéntica) o disabled"
+    )
+    local_sections: Optional[List[str]] = Field(
+        None,
+        description="Secciones calculadas por el analizador local en el modo híbrido (None si todo lo generó el LLM)"
+    )
+
+
+CompleteCodeResponse.model_rebuild()
 
 
 class AnalyzeByLLMResponse(BaseModel):
@@ -252,4 +441,8 @@ class AnalyzeByLLMResponse(BaseModel):
     mathematical_representation: MathematicalRepresentation = Field(..., description="Representación matemática")
     execution_diagram: Optional[ExecutionDiagram] = Field(None, description="Diagramas de ejecución")
     cost_analysis: Optional[CostAnalysis] = Field(None, description="Análisis de costo")
-    llm_metadata: LLMMetadata = Field(..., description="Metadatos del LLM")
\ No newline at end of file
+    llm_metadata: LLMMetadata = Field(..., description="Metadatos del LLM")
+    timings: Optional[Dict[str, float]] = Field(
+        None,
+        description="Tiempos por etapa en ms (solo con ?debug=true; también en el header Server-Timing)"
+    )
\ No newline at end of file
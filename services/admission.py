@@ -0,0 +1,335 @@
+# -------------------------------------------------------------
+# Control de admisión por cliente (API key)
+# Cada endpoint costoso pertenece a un pool (system / llm) con su propio
+# límite de concurrencia global, concurrencia por cliente, tasa por
+# cliente (token bucket) y plazo máximo de espera en cola. Así un pico de
+# tráfico al LLM no degrada la latencia del analizador del sistema.
+# -------------------------------------------------------------
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+
+# Límites de cada barra del histograma de espera en cola (ms)
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# Máximo de clientes con token bucket en memoria (se descartan los más antiguos)
+MAX_TRACKED_KEYS = 10000
+
+API_KEY_HEADER = b"x-api-key"
+FORWARDED_FOR_HEADER = b"x-forwarded-for"
+
+# Proxies propios (IPs separadas por coma) cuyo X-Forwarded-For es
+# confiable. Sin valor, el cliente sin API key se identifica por la IP del
+# par TCP: detrás de un proxy todos sus clientes comparten esa clave.
+TRUSTED_PROXIES = frozenset(
+    address.strip() for address in os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",") if address.strip()
+)
+
+# Instante (time.monotonic) en que vence la solicitud en curso, o None si su
+# pool no tiene plazo. Lo fija AdmissionMiddleware al recibirla, así que la
+# espera en cola también cuenta; las llamadas al LLM derivan de él su timeout.
+request_deadline: ContextVar = ContextVar("request_deadline", default=None)
+
+
+def _env_number(name, default):
+    return type(default)(os.getenv(name, str(default)))
+
+
+class PoolLimits:
+    """Límites de un pool, configurables con ADMISSION_<POOL>_*."""
+
+    def __init__(self, name, max_concurrent, per_key_concurrent, rate_per_second, burst, queue_timeout_ms,
+                 request_timeout_ms=0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.per_key_concurrent = per_key_concurrent
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.queue_timeout_ms = queue_timeout_ms
+        # Plazo total de la solicitud desde que llega (0: sin plazo)
+        self.request_timeout_ms = request_timeout_ms
+
+    @classmethod
+    def from_env(cls, name, **defaults):
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(name, **{key: _env_number(prefix + key.upper(), value) for key, value in defaults.items()})
+
+
+# El analizador del sistema es barato: límites holgados y espera corta.
+# El LLM es costoso y lento: pocos en paralelo por cliente, espera larga y
+# un plazo total que acota la espera del modelo y sus reintentos.
+DEFAULT_POOLS = {
+    "system": PoolLimits.from_env(
+        "system", max_concurrent=64, per_key_concurrent=8,
+        rate_per_second=20.0, burst=40.0, queue_timeout_ms=2000.0
+    ),
+    "llm": PoolLimits.from_env(
+        "llm", max_concurrent=16, per_key_concurrent=2,
+        rate_per_second=0.5, burst=5.0, queue_timeout_ms=10000.0, request_timeout_ms=120000.0
+    ),
+}
+
+# Prefijo de ruta → pool. Las demás rutas (/health, /cache/stats, ...) no se limitan.
+ROUTE_POOLS = (
+    ("/analyze-by-system", "system"),
+    ("/analyze-by-llm", "llm"),
+    ("/complete-code", "llm"),
+)
+
+# Los GET de estas rutas son búsquedas en caché por content_hash (y sus
+# revalidaciones 304): nunca llaman al modelo, así que usan el pool barato.
+CACHE_LOOKUP_METHODS = ("GET", "HEAD")
+CACHE_LOOKUP_POOL = "system"
+
+
+class AdmissionRejected(Exception):
+    """La solicitud no se admite (tasa excedida o plazo de cola vencido)."""
+
+    def __init__(self, status_code, message, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Pool:
+    def __init__(self, limits):
+        self.limits = limits
+        self.in_flight = 0
+        self.waiting = 0
+        self.per_key = {}             # API key → solicitudes en curso
+        self.buckets = OrderedDict()  # API key → (tokens, instante de la última recarga)
+        self.condition = None         # Se crea dentro del event loop (ver get_condition)
+        self.condition_loop = None
+        # Métricas
+        self.admitted = 0
+        self.rejected_rate = 0
+        self.rejected_deadline = 0
+        self.queued = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def take_token(self, key, now):
+        """
+        Token bucket por cliente. Devuelve 0 si hay token o los segundos
+        hasta el próximo. Con rate_per_second <= 0 la tasa no se limita.
+        """
+        limits = self.limits
+        if limits.rate_per_second <= 0:
+            return 0.0
+        tokens, last = self.buckets.pop(key, (limits.burst, now))
+        tokens = min(limits.burst, tokens + (now - last) * limits.rate_per_second)
+        if len(self.buckets) >= MAX_TRACKED_KEYS:
+            self.buckets.popitem(last=False)
+
+        if tokens >= 1:
+            self.buckets[key] = (tokens - 1, now)
+            return 0.0
+        self.buckets[key] = (tokens, now)
+        return (1 - tokens) / limits.rate_per_second
+
+    def get_condition(self):
+        """Condición para esperar cupo, ligada al event loop en ejecución."""
+        loop = asyncio.get_running_loop()
+        if self.condition is None or self.condition_loop is not loop:
+            self.condition = asyncio.Condition()
+            self.condition_loop = loop
+        return self.condition
+
+    def has_slot(self, key):
+        return (
+            self.in_flight < self.limits.max_concurrent
+            and self.per_key.get(key, 0) < self.limits.per_key_concurrent
+        )
+
+    def record_wait(self, wait_ms):
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        for position, limit in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= limit:
+                self.wait_histogram[position] += 1
+                return
+        self.wait_histogram[-1] += 1
+
+
+class AdmissionController:
+    """
+    Admite o rechaza solicitudes por pool y cliente. Todo el estado se
+    modifica desde el event loop, así que no necesita locks.
+    """
+
+    def __init__(self, pools=None, clock=time.monotonic):
+        self.pools = {name: _Pool(limits) for name, limits in (pools or DEFAULT_POOLS).items()}
+        self.clock = clock
+
+    async def acquire(self, pool_name, key):
+        """
+        Reserva un cupo para el cliente. Lanza AdmissionRejected con 429 si
+        excede su tasa, o con 503 si no obtiene cupo antes del plazo de cola.
+        """
+        pool = self.pools[pool_name]
+        limits = pool.limits
+
+        retry_after = pool.take_token(key, self.clock())
+        if retry_after > 0:
+            pool.rejected_rate += 1
+            raise AdmissionRejected(429, f"Límite de solicitudes excedido para el pool '{pool_name}'.", retry_after)
+
+        start = self.clock()
+        if not pool.has_slot(key):
+            condition = pool.get_condition()
+            pool.queued += 1
+            pool.waiting += 1
+            try:
+                async with condition:
+                    await asyncio.wait_for(
+                        condition.wait_for(lambda: pool.has_slot(key)),
+                        timeout=limits.queue_timeout_ms / 1000
+                    )
+            except asyncio.TimeoutError:
+                pool.rejected_deadline += 1
+                raise AdmissionRejected(
+                    503, f"Tiempo de espera en cola agotado para el pool '{pool_name}'.",
+                    limits.queue_timeout_ms / 1000
+                )
+            finally:
+                pool.waiting -= 1
+
+        pool.record_wait((self.clock() - start) * 1000)
+        pool.admitted += 1
+        pool.in_flight += 1
+        pool.per_key[key] = pool.per_key.get(key, 0) + 1
+
+    async def release(self, pool_name, key):
+        """Libera el cupo y despierta a las solicitudes en cola."""
+        pool = self.pools[pool_name]
+        pool.in_flight -= 1
+        remaining = pool.per_key[key] - 1
+        if remaining:
+            pool.per_key[key] = remaining
+        else:
+            del pool.per_key[key]
+
+        if pool.waiting:
+            condition = pool.get_condition()
+            async with condition:
+                condition.notify_all()
+
+    def stats(self):
+        """Estado y métricas de espera en cola por pool."""
+        report = {}
+        for name, pool in self.pools.items():
+            limits = pool.limits
+            report[name] = {
+                "limits": {
+                    "max_concurrent": limits.max_concurrent,
+                    "per_key_concurrent": limits.per_key_concurrent,
+                    "rate_per_second": limits.rate_per_second,
+                    "burst": limits.burst,
+                    "queue_timeout_ms": limits.queue_timeout_ms,
+                    "request_timeout_ms": limits.request_timeout_ms,
+                },
+                "in_flight": pool.in_flight,
+                "waiting": pool.waiting,
+                "admitted": pool.admitted,
+                "queued": pool.queued,
+                "rejected_rate": pool.rejected_rate,
+                "rejected_deadline": pool.rejected_deadline,
+                "wait_ms_avg": round(pool.wait_ms_total / pool.admitted, 3) if pool.admitted else 0.0,
+                "wait_ms_max": round(pool.wait_ms_max, 3),
+                "wait_ms_histogram": {
+                    **{f"le_{limit}": count for limit, count in zip(WAIT_BUCKETS_MS, pool.wait_histogram)},
+                    "le_inf": pool.wait_histogram[-1],
+                },
+            }
+        return report
+
+
+def client_key(scope, trusted_proxies=None):
+    """
+    API key del cliente (X-API-Key) o, si no la envía, su dirección IP.
+    Si el par TCP es uno de trusted_proxies (por defecto TRUSTED_PROXIES)
+    la IP es la última de X-Forwarded-For que no pertenece a un proxy
+    propio; las anteriores las escribe el cliente y no son confiables.
+    """
+    trusted = TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+    forwarded = []
+    for name, value in scope.get("headers", ()):
+        if name == API_KEY_HEADER:
+            return "key:" + value.decode("latin-1")
+        if name == FORWARDED_FOR_HEADER:
+            forwarded.extend(address.strip() for address in value.decode("latin-1").split(","))
+
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if address in trusted:
+        for hop in reversed(forwarded):
+            if hop and hop not in trusted:
+                return "ip:" + hop
+    return "ip:" + address
+
+
+def route_pool(path, method="POST"):
+    for prefix, pool_name in ROUTE_POOLS:
+        if path == prefix or path.startswith(prefix + "/"):
+            return CACHE_LOOKUP_POOL if method in CACHE_LOOKUP_METHODS else pool_name
+    return None
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI: aplica el control de admisión a las rutas de
+    ROUTE_POOLS (los GET, al pool de las búsquedas en caché). El cupo se mantiene hasta que termina de enviarse la
+    respuesta (incluidas las respuestas en streaming). Fija además
+    request_deadline según el plazo total del pool.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        pool_name = route_pool(scope["path"], scope["method"]) if scope["type"] == "http" else None
+        if pool_name is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        key = client_key(scope)
+        timeout_ms = self.controller.pools[pool_name].limits.request_timeout_ms
+        deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms > 0 else None
+        token = request_deadline.set(deadline)
+        try:
+            await self.controller.acquire(pool_name, key)
+        except AdmissionRejected as e:
+            request_deadline.reset(token)
+            await self._reject(send, e)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self.controller.release(pool_name, key)
+            request_deadline.reset(token)
+
+    async def _reject(self, send, error):
+        body = json.dumps({"detail": str(error)}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(error.retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Controlador compartido de la aplicación
+admission_controller = AdmissionController()
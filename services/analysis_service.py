@@ -2,20 +2,64 @@
 # Servicio central que integra parser.py y complexity.py
 # -------------------------------------------------------------
 
+from contextlib import nullcontext
+
 from syntax.parser import PseudocodeParser
+from syntax.canonical import fingerprint
 from analyzer.complexity import ComplexityAnalyzer
+from analyzer.budget import AnalysisBudget, BudgetExceededError
+from services.timing import StageTimer
+
+
+# Construir la gramática LALR es mucho más costoso que analizar un programa,
+# así que el parser se crea una sola vez por proceso y se reutiliza.
+_parser = None
+
+
+def get_parser():
+    """Devuelve el parser compartido del proceso (lo crea la primera vez)."""
+    global _parser
+    if _parser is None:
+        _parser = PseudocodeParser()
+    return _parser
 
 
-def analyze_pseudocode(text: str):
+def analyze_pseudocode(text: str, probabilities: dict = None, budget=None, timer=None):
     """
     Recibe pseudocódigo en texto plano, lo convierte a un AST,
     lo analiza y devuelve el JSON con complejidades.
+
+    probabilities permite ajustar el modelo del caso promedio
+    (if_condition, search_hit, break_condition).
+
+    budget (AnalysisBudget) limita nodos y tiempo; si se agota durante el
+    análisis el resultado se marca con "truncated" y las cotas son None
+    (el costo de lo que no se analizó es desconocido).
+
+    El resultado incluye "fingerprint": huella del AST alfa-normalizado,
+    igual para programas que solo difieren en nombres, espacios o comentarios.
+
+    timer (StageTimer) mide las etapas grammar_load, parse, transform,
+    analysis y fingerprint.
     """
 
+    def stage(name):
+        return timer.stage(name) if timer else nullcontext()
+
+    with stage("grammar_load"):
+        parser = get_parser()
+
     # 1. Parsear texto → AST
-    parser = PseudocodeParser()
     try:
-        ast = parser.parse(text)
+        ast = parser.parse(text, budget, timer)
+    except BudgetExceededError as e:
+        # Sin AST no hay ninguna cota parcial que devolver
+        return {
+            "error": "Presupuesto de análisis agotado.",
+            "details": str(e),
+            "truncated": True,
+            "budget": budget.report()
+        }
     except Exception as e:
         return {
             "error": "Error de sintaxis en el pseudocódigo.",
@@ -23,13 +67,34 @@ def analyze_pseudocode(text: str):
         }
 
     # 2. Analizar complejidad
-    analyzer = ComplexityAnalyzer()
+    analyzer = ComplexityAnalyzer(probabilities, budget)
     try:
-        result = analyzer.analyze(ast)
+        with stage("analysis"):
+            result = analyzer.analyze(ast)
     except Exception as e:
         return {
             "error": "Error al analizar complejidad.",
             "details": str(e)
         }
 
-    return result
\ No newline at end of file
+    with stage("fingerprint"):
+        result["fingerprint"] = fingerprint(ast)
+
+    if result.get("truncated"):
+        result["budget"] = budget.report()
+
+    return result
+
+def analyze_with_budget(text: str, probabilities: dict = None, endpoint: str = "analyze-by-system",
+                        limits: dict = None):
+    """
+    Analiza con el presupuesto del endpoint (o el pedido en limits:
+    max_nodes, max_time_ms, acotado al máximo del endpoint) y devuelve
+    (resultado, reporte, tiempos por etapa). Pensada para ejecutarse en otro hilo o proceso: el
+    reporte y los tiempos viajan junto con el resultado porque el
+    presupuesto y el timer no se comparten entre procesos.
+    """
+    budget = AnalysisBudget.for_endpoint(endpoint, **(limits or {}))
+    timer = StageTimer()
+    result = analyze_pseudocode(text, probabilities, budget, timer)
+    return result, budget.report(), timer.stages
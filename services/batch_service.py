@@ -0,0 +1,255 @@
+# -------------------------------------------------------------
+# Análisis por lotes en un pool de procesos
+# Cada worker mantiene su propio parser precargado; los resultados se
+# devuelven en el mismo orden de entrada (o en streaming NDJSON, a
+# medida que terminan), con errores por elemento.
+# -------------------------------------------------------------
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pydantic import ValidationError
+
+from analyzer.budget import AnalysisBudget
+from models.requests import AnalyzeCodeRequest
+from services.analysis_service import get_parser
+from services.result_cache import analyze_with_cache
+
+
+# Número de procesos del pool (por defecto, uno por CPU)
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 1)))
+
+# Máximo de programas aceptados en una sola solicitud
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+
+# Programas en vuelo por flujo NDJSON (acota la memoria del servidor)
+STREAM_WINDOW = int(os.getenv("STREAM_WINDOW", str(BATCH_WORKERS * 2)))
+
+# Máximo de bytes de una línea NDJSON; una línea más larga se descarta
+# mientras llega y responde su propio error
+NDJSON_MAX_LINE_BYTES = int(os.getenv("NDJSON_MAX_LINE_BYTES", str(1024 * 1024)))
+
+_pool = None
+
+
+def _init_worker():
+    """Inicializador de cada proceso: precarga la gramática LALR."""
+    get_parser()
+
+
+def analyze_one(text: str, probabilities: dict = None, endpoint: str = "analyze-by-system-batch",
+                limits: dict = None):
+    """
+    Analiza un programa con el presupuesto del endpoint indicado (o el
+    pedido en limits, acotado al máximo del endpoint), usando la caché de
+    resultados del proceso. Siempre incluye el reporte del presupuesto en
+    el resultado.
+    """
+    budget = AnalysisBudget.for_endpoint(endpoint, **(limits or {}))
+    try:
+        result = analyze_with_cache(text, probabilities, budget)
+    except Exception as e:
+        result = {
+            "error": "Error al analizar complejidad.",
+            "details": str(e)
+        }
+    result["budget"] = budget.report()
+    return result
+
+
+def _analyze_item(args):
+    text, probabilities, limits = args
+    return analyze_one(text, probabilities, limits=limits)
+
+
+def get_pool():
+    """Devuelve el pool de procesos compartido (lo crea y precalienta la primera vez)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, initializer=_init_worker)
+    return _pool
+
+
+def shutdown_pool():
+    """Detiene el pool (al apagar la aplicación)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def analyze_batch(programs, probabilities: dict = None, limits: dict = None):
+    """
+    Analiza una lista de programas en paralelo, cada uno con el presupuesto
+    de lotes (o el pedido en limits).
+
+    Devuelve una lista del mismo tamaño y orden que `programs`; cada elemento
+    es el resultado de analyze_pseudocode o un diccionario con "error".
+    """
+    if not programs:
+        return []
+
+    # Repartir en bloques reduce el costo de serializar cada tarea
+    chunksize = max(1, len(programs) // (BATCH_WORKERS * 4))
+    items = [(text, probabilities, limits) for text in programs]
+
+    try:
+        return list(get_pool().map(_analyze_item, items, chunksize=chunksize))
+    except Exception:
+        # Pool dañado (p. ej. un worker terminó abruptamente): se recrea y se
+        # reintenta cada elemento por separado para aislar el error
+        shutdown_pool()
+
+    results = []
+    for item in items:
+        try:
+            results.append(get_pool().submit(_analyze_item, item).result())
+        except Exception as e:
+            shutdown_pool()
+            results.append({
+                "error": "Error al analizar complejidad.",
+                "details": str(e)
+            })
+    return results
+
+
+# -------------------------------------------------------------
+# Lotes en streaming (NDJSON)
+# -------------------------------------------------------------
+
+class OversizedLine:
+    """Línea NDJSON que superó el máximo de bytes (su contenido se descartó)."""
+
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+
+
+async def iter_ndjson(chunks, max_line_bytes: int = None):
+    """
+    Divide un flujo asíncrono de bytes en líneas NDJSON no vacías.
+    Solo se retienen los fragmentos de la línea incompleta actual (cada
+    byte se copia una vez, al unirla) y como máximo max_line_bytes: una
+    línea más larga se descarta mientras llega y se entrega como
+    OversizedLine.
+    """
+    max_line_bytes = max_line_bytes or NDJSON_MAX_LINE_BYTES
+    pieces = []
+    size = 0
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            piece = chunk[start:] if end == -1 else chunk[start:end]
+            size += len(piece)
+            if size > max_line_bytes:
+                pieces = []
+            elif piece:
+                pieces.append(piece)
+            if end == -1:
+                break
+            if size > max_line_bytes:
+                yield OversizedLine(size, max_line_bytes)
+            else:
+                line = b"".join(pieces)
+                if line.strip():
+                    yield line
+            pieces = []
+            size = 0
+            start = end + 1
+    if size > max_line_bytes:
+        yield OversizedLine(size, max_line_bytes)
+    elif pieces:
+        line = b"".join(pieces)
+        if line.strip():
+            yield line
+
+
+def parse_stream_line(line):
+    """
+    Valida una línea NDJSON con el mismo esquema de /analyze-by-system.
+    Devuelve (pseudocode, probabilities, limits) o un diccionario con "error".
+    """
+    if isinstance(line, OversizedLine):
+        return {
+            "error": "Línea NDJSON demasiado larga.",
+            "details": f"La línea tiene {line.size} bytes; el máximo es {line.limit}."
+        }
+    try:
+        request = AnalyzeCodeRequest.model_validate_json(line)
+    except ValidationError as e:
+        return {
+            "error": "Línea NDJSON inválida.",
+            "details": str(e)
+        }
+    probabilities = request.probabilities.model_dump() if request.probabilities else None
+    limits = request.budget.model_dump() if request.budget else None
+    return request.pseudocode, probabilities, limits
+
+
+async def analyze_stream(lines, window: int = None):
+    """
+    Analiza las líneas NDJSON a medida que llegan y produce (index, resultado)
+    en orden de finalización. La lectura de la siguiente línea y los análisis
+    en curso se esperan a la vez, así que cada resultado sale en cuanto está
+    listo. Como máximo `window` programas están en el pool a la vez, por lo
+    que la memoria no depende del tamaño del lote.
+    """
+    loop = asyncio.get_running_loop()
+    window = window or STREAM_WINDOW
+    lines = lines.__aiter__()
+    pending = {}  # future → índice de la línea
+    next_line = None
+    exhausted = False
+    index = 0
+
+    try:
+        while not exhausted or pending:
+            # Leer otra línea solo si hay espacio en la ventana
+            if not exhausted and next_line is None and len(pending) < window:
+                next_line = asyncio.ensure_future(lines.__anext__())
+
+            waiting = set(pending)
+            if next_line is not None:
+                waiting.add(next_line)
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if next_line in done:
+                try:
+                    line = next_line.result()
+                except StopAsyncIteration:
+                    exhausted = True
+                else:
+                    item = parse_stream_line(line)
+                    if isinstance(item, dict):
+                        yield index, item
+                    else:
+                        try:
+                            pending[loop.run_in_executor(get_pool(), _analyze_item, item)] = index
+                        except Exception as e:
+                            # Pool dañado: se descarta para recrearlo en la siguiente línea
+                            shutdown_pool()
+                            yield index, {
+                                "error": "Error al analizar complejidad.",
+                                "details": str(e)
+                            }
+                    index += 1
+                next_line = None
+
+            for future in done:
+                if future not in pending:
+                    continue
+                position = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {
+                        "error": "Error al analizar complejidad.",
+                        "details": str(e)
+                    }
+                yield position, result
+    finally:
+        # El cliente se desconectó o el flujo terminó: no dejar lecturas colgadas
+        if next_line is not None:
+            next_line.cancel()
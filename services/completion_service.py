@@ -5,15 +5,20 @@ Detecta comentarios con "completar" o "Completar" y genera código faltante
 
 import os
 import re
-from services.llm_service import LLMService
+from contextlib import nullcontext
+from services.llm_policy import LLMError
+from services.llm_service import CachedPrompt, LLMService
 
 
 class CompletionService:
     """Servicio para completar pseudocódigo con IA"""
     
-    def __init__(self):
-        """Inicializa el servicio de completado"""
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: LLMService = None):
+        """
+        Inicializa el servicio de completado. Con un AsyncLLMService se usa
+        complete_code_async.
+        """
+        self.llm_service = llm_service or LLMService()
         self.prompt_template_path = os.path.join(
             os.path.dirname(os.path.dirname(__file__)),
             "prompts",
@@ -60,9 +65,12 @@ class CompletionService:
         pattern = r'►\s*[Cc]ompletar'
         return bool(re.search(pattern, code, re.IGNORECASE))
     
-    def _build_prompt(self, code: str, grammar: str, template: str) -> str:
+    def _build_prompt(self, code: str, grammar: str, template: str) -> CachedPrompt:
         """
-        Construye el prompt final combinando el template con el código y la gramática
+        Construye el prompt final combinando el template con el código y la gramática.
+        Todo lo anterior a {pseudocode} (instrucciones, gramática y reglas) es
+        igual en cada solicitud y se envía como prefijo cacheado en el
+        proveedor; solo el código del usuario va en el sufijo.
         
         Args:
             code: El pseudocódigo a completar
@@ -70,9 +78,10 @@ class CompletionService:
             template: El template del prompt
             
         Returns:
-            El prompt completo listo para enviar al LLM
+            El prompt listo para enviar al LLM (prefijo estático + sufijo)
         """
-        return template.format(grammar=grammar, pseudocode=code)
+        head, tail = template.split("{pseudocode}", 1)
+        return CachedPrompt(head.format(grammar=grammar), code + tail)
     
     def _clean_markdown_blocks(self, code: str) -> str:
         """
@@ -116,12 +125,58 @@ class CompletionService:
         
         return code.strip()
     
-    def complete_code(self, code: str) -> str:
+    def _prepare_prompt(self, code: str, timer=None) -> CachedPrompt:
+        with timer.stage("prompt_build") if timer else nullcontext():
+            # Cargar template y gramática
+            template = self._load_prompt_template()
+            grammar = self._load_grammar()
+            
+            # Construir el prompt
+            return self._build_prompt(code, grammar, template)
+    
+    def _finish_completion(self, code: str, completed_code: str) -> str:
+        """Limpia el código generado y respeta el salto de línea final del original."""
+        # Limpiar bloques de markdown que el LLM pueda haber generado
+        completed_code = self._clean_markdown_blocks(completed_code)
+        
+        # Limpiar el código generado
+        # Eliminar espacios en blanco al inicio, pero preservar saltos de línea al final si el original los tenía
+        completed_code = completed_code.lstrip()
+        
+        # Preservar el salto de línea final si el código original terminaba con uno
+        original_ends_with_newline = code.endswith('\n')
+        if original_ends_with_newline and not completed_code.endswith('\n'):
+            completed_code += '\n'
+        elif not original_ends_with_newline and completed_code.endswith('\n'):
+            # Si el original no terminaba con salto de línea, eliminar el del generado
+            completed_code = completed_code.rstrip('\n')
+        
+        return completed_code
+    
+    def llm_metadata(self, processing_time_ms: float = None):
+        """
+        Metadatos de la última completación (formato de LLMMetadata), con los
+        tokens leídos y escritos en el prompt caching. None si no se llamó
+        al modelo (el código no tenía comentarios de completado).
+        """
+        tokens = self.llm_service.token_usage()
+        if tokens is None:
+            return None
+        return {
+            "model_used": self.llm_service.model,
+            "tokens": tokens,
+            "estimated_cost_usd": None,
+            "processing_time_ms": processing_time_ms,
+            "cache_status": self.llm_service.cache_status
+        }
+    
+    def complete_code(self, code: str, timer=None) -> str:
         """
         Completa el pseudocódigo si tiene comentarios de completado
         
         Args:
             code: El pseudocódigo a completar
+            timer: StageTimer opcional; mide "prompt_build" y "llm_wait"
             
         Returns:
             El código completado (original si no hay comentarios de completado, o completado por IA)
@@ -131,35 +186,51 @@ class CompletionService:
             return code
         
         try:
-            # Cargar template y gramática
-            template = self._load_prompt_template()
-            grammar = self._load_grammar()
-            
-            # Construir el prompt
-            prompt = self._build_prompt(code, grammar, template)
+            prompt = self._prepare_prompt(code, timer)
             
             # Generar completación con LLM
-            completed_code = self.llm_service.generate_completion(prompt)
+            completed_code = self.llm_service.generate_completion(prompt, timer=timer)
             
-            # Limpiar bloques de markdown que el LLM pueda haber generado
-            completed_code = self._clean_markdown_blocks(completed_code)
-            
-            # Limpiar el código generado
-            # Eliminar espacios en blanco al inicio, pero preservar saltos de línea al final si el original los tenía
-            completed_code = completed_code.lstrip()
-            
-            # Preservar el salto de línea final si el código original terminaba con uno
-            original_ends_with_newline = code.endswith('\n')
-            if original_ends_with_newline and not completed_code.endswith('\n'):
-                completed_code += '\n'
-            elif not original_ends_with_newline and completed_code.endswith('\n'):
-                # Si el original no terminaba con salto de línea, eliminar el del generado
-                completed_code = completed_code.rstrip('\n')
-            
-            return completed_code
+            return self._finish_completion(code, completed_code)
             
+        except LLMError:
+            raise
         except Exception as e:
             # Si hay un error, retornar el código original
             # En producción, podrías querer loguear el error
             raise Exception(f"Error al completar el código: {str(e)}")
-
+    
+    async def complete_code_async(self, code: str, timer=None) -> str:
+        """
+        Versión asíncrona de complete_code. Requiere que el servicio se haya
+        creado con un AsyncLLMService.
+        """
+        if not self._has_completion_comments(code):
+            return code
+        
+        try:
+            prompt = self._prepare_prompt(code, timer)
+            completed_code = await self.llm_service.generate_completion(prompt, timer=timer)
+            return self._finish_completion(code, completed_code)
+            
+        except LLMError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al completar el código: {str(e)}")
+    
+    async def stream_completion(self, code: str):
+        """
+        Versión en streaming de complete_code_async. Genera eventos
+        ("delta", texto) con cada fragmento del modelo y al final
+        ("done", código completado y limpio). Requiere un AsyncLLMService.
+        """
+        if not self._has_completion_comments(code):
+            yield "done", code
+            return
+        
+        prompt = self._prepare_prompt(code)
+        parts = []
+        async for delta in self.llm_service.stream_completion(prompt):
+            parts.append(delta)
+            yield "delta", delta
+        yield "done", self._finish_completion(code, "".join(parts))
@@ -0,0 +1,127 @@
+# -------------------------------------------------------------
+# Capa de ejecución del análisis para los endpoints asíncronos
+# El parseo y el análisis son trabajo de CPU: se envían a un pool
+# (hilos o procesos) con una cola acotada, de modo que el event loop
+# queda libre para las rutas baratas (/health, /cache/stats, ...).
+# -------------------------------------------------------------
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from services.analysis_service import get_parser
+
+
+# "process" evita que el análisis compita por el GIL con el event loop;
+# "thread" comparte la caché y el parser del proceso, con menor latencia de arranque
+ANALYSIS_EXECUTOR = os.getenv("ANALYSIS_EXECUTOR", "process")
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+# Solicitudes que pueden esperar turno además de las que se están ejecutando
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "32"))
+# Segundos sugeridos al cliente en Retry-After cuando el pool está saturado
+ANALYSIS_RETRY_AFTER = int(os.getenv("ANALYSIS_RETRY_AFTER", "1"))
+# Prioridad (nice) de los procesos de análisis: el event loop gana la CPU
+ANALYSIS_WORKER_NICE = int(os.getenv("ANALYSIS_WORKER_NICE", "10"))
+
+
+class ExecutorSaturatedError(Exception):
+    """El pool y su cola están llenos: la solicitud se rechaza (503)."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("El servicio de análisis está saturado; intente de nuevo más tarde.")
+        self.retry_after = retry_after
+
+
+def _init_worker():
+    """
+    Inicializador de cada proceso: baja su prioridad para que las rutas
+    baratas del servidor no esperen detrás del análisis, y precarga la
+    gramática LALR.
+    """
+    if ANALYSIS_WORKER_NICE and hasattr(os, "nice"):
+        os.nice(ANALYSIS_WORKER_NICE)
+    get_parser()
+
+
+class AnalysisExecutor:
+    """
+    Pool acotado: como máximo max_workers + max_queue tareas admitidas a la
+    vez. Una tarea ocupa su cupo hasta que termina en el pool, aunque el
+    cliente se desconecte antes. El contador solo se modifica desde el
+    event loop, así que no necesita lock.
+    """
+
+    def __init__(self, kind=ANALYSIS_EXECUTOR, max_workers=ANALYSIS_WORKERS,
+                 max_queue=ANALYSIS_QUEUE_SIZE, retry_after=ANALYSIS_RETRY_AFTER):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"ANALYSIS_EXECUTOR debe ser 'thread' o 'process', no '{kind}'")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+        return self._pool
+
+    async def run(self, fn, *args):
+        """
+        Ejecuta fn(*args) en el pool y espera el resultado sin bloquear el
+        event loop. Lanza ExecutorSaturatedError si no hay cupo.
+
+        El cupo se libera en un callback del futuro del pool y no al salir
+        de esta corrutina: si la solicitud se cancela, una tarea que ya
+        empezó sigue ejecutándose y debe seguir contando.
+        """
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturatedError(self.retry_after)
+
+        loop = asyncio.get_running_loop()
+        future = self._get_pool().submit(functools.partial(fn, *args))
+        self.in_flight += 1
+        # Se registra antes que el de wrap_future: el cupo ya está libre
+        # cuando la corrutina recibe el resultado
+        future.add_done_callback(lambda _: self._release_soon(loop))
+        return await asyncio.wrap_future(future)
+
+    def _release_soon(self, loop):
+        """Callback del futuro (en un hilo del pool): libera el cupo en el event loop."""
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # El event loop ya se cerró (apagado): nadie más lee el contador
+            pass
+
+    def _release(self):
+        self.in_flight -= 1
+        self.completed += 1
+
+    def shutdown(self):
+        """Detiene el pool (al apagar la aplicación)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+# Ejecutor compartido de /analyze-by-system
+analysis_executor = AnalysisExecutor()
@@ -0,0 +1,78 @@
+# -------------------------------------------------------------
+# Caché HTTP condicional para los endpoints de análisis
+# ETags derivados del contenido de la solicitud y de la versión del
+# motor, y almacenamiento de respuestas para la forma GET direccionada
+# por contenido.
+# -------------------------------------------------------------
+
+import hashlib
+import json
+
+from services.llm_analysis_service import engine_version as llm_engine_version
+from services.result_cache import ResultCache, cache_key
+
+
+# GET /analyze-by-system se identifica por el hash del contenido (que
+# incluye la versión del analizador, determinista), así que nunca cambia:
+# caché pública inmutable.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Sufijos que services/serialization.py agrega al ETag de un cuerpo comprimido
+ENCODING_ETAG_SUFFIXES = ("-gzip", "-br")
+
+# Análisis por LLM recientes, para servir GET /analyze-by-llm/{content_hash}
+llm_result_cache = ResultCache()
+
+# La salida del modelo no es determinista y el servidor solo la conserva
+# en memoria durante el TTL: sin immutable y por ese mismo tiempo.
+LLM_CACHE_CONTROL = f"public, max-age={int(llm_result_cache.ttl_seconds)}"
+
+
+def system_analysis_key(text: str, probabilities: dict = None) -> str:
+    """Hash de contenido de /analyze-by-system (el mismo de la caché de resultados)."""
+    return cache_key(text, probabilities)
+
+
+def llm_analysis_key(text: str) -> str:
+    """
+    Hash de contenido de /analyze-by-llm. Usa el texto exacto: los
+    comentarios y el formato forman parte de lo que lee el modelo.
+    """
+    payload = json.dumps({"engine": llm_engine_version(), "source": text}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_etag(key: str, weak: bool = False) -> str:
+    """
+    ETag a partir de un hash de contenido. Es débil (W/) cuando el cuerpo
+    no es idéntico byte a byte entre respuestas con el mismo hash: el
+    presupuesto consumido de /analyze-by-system o la salida del modelo.
+    """
+    return f'W/"{key}"' if weak else f'"{key}"'
+
+
+def _strip_encoding(tag: str) -> str:
+    """ETag sin el sufijo de codificación (-gzip, -br) que agrega la compresión."""
+    for suffix in ENCODING_ETAG_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: str, etag: str, exists: bool = False) -> bool:
+    """
+    Evalúa If-None-Match contra un ETag. Según HTTP, If-None-Match usa
+    comparación débil: se ignora el prefijo W/ de ambos lados. Las
+    versiones comprimidas de una misma representación también coinciden.
+
+    "*" solo coincide si el llamador sabe que la representación existe
+    (exists): en los POST se ignora, porque todavía no hay un resultado
+    calculado y un 304 describiría una representación inexistente.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return exists
+    opaque = etag.removeprefix("W/")
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(_strip_encoding(tag.removeprefix("W/")) == opaque for tag in candidates)
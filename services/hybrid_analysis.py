@@ -0,0 +1,298 @@
+# -------------------------------------------------------------
+# Análisis híbrido para /analyze-by-llm
+# Cuando ComplexityAnalyzer da un resultado definitivo (programas con
+# ciclos, sin recursión ni llamadas), las secciones cuantitativas de
+# AnalyzeByLLMResponse se calculan localmente:
+#   - basic_complexity: cotas O, Ω y Θ del analizador
+#   - mathematical_representation: sumatorias de los ciclos
+#   - cost_analysis: ejecuciones por línea (traza del analizador) y
+#     costo estimado por tipo de operación
+# El modelo solo escribe las partes narrativas, con un prompt reducido.
+# -------------------------------------------------------------
+
+import re
+
+from analyzer.budget import AnalysisBudget
+from analyzer.complexity import ComplexityAnalyzer, BigO, evaluate_complexity
+from services.analysis_service import get_parser
+
+
+# Secciones que se calculan localmente y las que sigue escribiendo el modelo
+LOCAL_SECTIONS = ("basic_complexity", "mathematical_representation", "cost_analysis")
+NARRATIVE_SECTIONS = ("step_by_step_analysis", "pattern_classification", "execution_diagram")
+
+# Tiempo estimado por ejecución de cada tipo de operación (µs)
+OPERATION_COST_US = {
+    "loop_control": 0.5,
+    "comparison": 0.3,
+    "assignment": 0.2,
+    "return": 0.1,
+    "jump": 0.1,
+    "declaration": 0.2,
+    "subroutine": 0.1,
+}
+
+LOOP_TYPES = ("for", "while", "repeat")
+
+# Tamaños de entrada del resumen de costos
+SUMMARY_SIZES = (10, 100, 1000, 10000)
+
+# Código incompleto: el modelo debe interpretar la instrucción del comentario
+_COMPLETION_RE = re.compile(r"►\s*completar", re.IGNORECASE)
+
+# Líneas del código fuente que no son sentencias (delimitadores de bloques
+# y la condición de un repeat, que pertenece a la línea del ciclo)
+_STRUCTURAL_LINE_RE = re.compile(r"^(begin|end\.?|else|else begin|end else|end else begin|until\b.*)$", re.IGNORECASE)
+
+
+def local_sections(pseudocode: str, timer=None):
+    """
+    Secciones calculadas localmente ({nombre: valor}) o None si el
+    analizador no es concluyente: error de sintaxis, presupuesto agotado,
+    recursión, llamadas a subrutinas, break en un ciclo anidado (cuántas
+    veces corre el ciclo interno depende de los datos), comentarios de
+    completado o líneas con más de una sentencia (la tabla de costos
+    necesita una por línea).
+    """
+    if _COMPLETION_RE.search(pseudocode):
+        return None
+
+    budget = AnalysisBudget.for_endpoint("analyze-by-system")
+    try:
+        ast = get_parser().parse(pseudocode, budget, timer)
+    except Exception:
+        return None
+    if _contains(ast, "call") or _nested_break(ast):
+        return None
+
+    analyzer = ComplexityAnalyzer(budget=budget, trace=True)
+    try:
+        result = analyzer.analyze(ast)
+    except Exception:
+        return None
+    if result.get("truncated") or result["details"]["recursion"] is not None:
+        return None
+
+    lines = _statement_lines(pseudocode)
+    if len(lines) != len(analyzer.trace):
+        return None
+
+    iterations = {id(entry["node"]): entry["iterations"] for entry in analyzer.trace}
+    return {
+        "basic_complexity": _basic_complexity(result),
+        "mathematical_representation": _mathematical_representation(ast, result, analyzer.trace, iterations),
+        "cost_analysis": _cost_analysis(analyzer.trace, lines),
+    }
+
+
+def _contains(node, nodetype):
+    if isinstance(node, dict):
+        if node.get("type") == nodetype:
+            return True
+        return any(_contains(value, nodetype) for value in node.values())
+    if isinstance(node, list):
+        return any(_contains(item, nodetype) for item in node)
+    return False
+
+
+def _nested_break(node, depth=0):
+    """¿Hay un break dentro de un ciclo que a su vez está dentro de otro?"""
+    if isinstance(node, dict):
+        nodetype = node.get("type")
+        if nodetype == "break":
+            return depth >= 2
+        if nodetype in LOOP_TYPES:
+            depth += 1
+        return any(_nested_break(value, depth) for value in node.values())
+    if isinstance(node, list):
+        return any(_nested_break(item, depth) for item in node)
+    return False
+
+
+def _statement_lines(pseudocode):
+    """(número de línea, texto) de cada línea con una sentencia."""
+    lines = []
+    for number, line in enumerate(pseudocode.splitlines(), start=1):
+        text = line.strip()
+        if not text or _STRUCTURAL_LINE_RE.match(text) or text.startswith("►"):
+            continue
+        lines.append((number, text))
+    return lines
+
+
+def _bound(expr):
+    """Cota de un resultado ("O(n^2)" → "n^2")."""
+    return expr[expr.index("(") + 1:-1]
+
+
+# -------------------------------------------------------------
+# basic_complexity
+# -------------------------------------------------------------
+
+def _basic_complexity(result):
+    details = result["details"]
+    loops = len(details["loops"])
+    summary = f"El peor caso es {result['O']}, el mejor caso {result['Omega']} y el caso promedio {result['Theta']}"
+    if loops:
+        summary += f"; lo determinan {loops} ciclos" if loops > 1 else "; lo determina un ciclo"
+    if details["early_exit_detected"]:
+        summary += " con salida temprana"
+    return {
+        "O": result["O"],
+        "Omega": result["Omega"],
+        "Theta": result["Theta"],
+        "tight_bound": _bound(result["O"]) == _bound(result["Omega"]),
+        "summary": summary + ".",
+    }
+
+
+# -------------------------------------------------------------
+# mathematical_representation
+# -------------------------------------------------------------
+
+def _render(expr):
+    """Texto de una expresión del AST (límites de los ciclos)."""
+    if not isinstance(expr, dict):
+        return str(expr)
+    exprtype = expr.get("type")
+    if exprtype == "number":
+        return str(expr.get("value"))
+    if exprtype == "var":
+        text = expr.get("name", "")
+        if expr.get("field"):
+            text += f".{expr['field']}"
+        for access in expr.get("access") or []:
+            index = access.get("index", {}) if isinstance(access, dict) else {}
+            if index.get("type") == "range":
+                text += f"[{_render(index.get('start'))}..{_render(index.get('end'))}]"
+            else:
+                text += f"[{_render(index.get('value'))}]"
+        return text
+    if exprtype == "binop":
+        return f"{_render(expr.get('left'))} {expr.get('op')} {_render(expr.get('right'))}"
+    if exprtype == "length":
+        return f"length({_render(expr.get('arg'))})"
+    if exprtype == "ceiling":
+        return f"┌{_render(expr.get('arg'))}┐"
+    if exprtype == "floor":
+        return f"└{_render(expr.get('arg'))}┘"
+    return "?"
+
+
+def _summation_terms(statements, iterations, latex):
+    """Términos de la sumatoria de una secuencia de sentencias."""
+    terms = []
+    for node in statements:
+        if not isinstance(node, dict):
+            continue
+        nodetype = node.get("type")
+        term = "c"
+        if nodetype in ("for", "while", "repeat"):
+            inner = _summation_terms(_body(node.get("body")), iterations, latex)
+            if nodetype == "for":
+                var, start, end = node.get("var"), _render(node.get("start")), _render(node.get("end"))
+            else:
+                var, start, end = "k", "1", iterations.get(id(node)) or "n"
+            sigma = f"\\sum_{{{var}={start}}}^{{{end}}}" if latex else f"Σ({var}={start} to {end})"
+            term = f"{sigma} {_join(inner, latex, group=True)}"
+        elif nodetype == "if":
+            then_terms = _summation_terms(_body(node.get("then")), iterations, latex)
+            else_terms = _summation_terms(_body(node.get("else")), iterations, latex)
+            branches = [branch for branch in (then_terms, else_terms) if branch and branch != ["c"]]
+            if len(branches) == 2:
+                maximum = "\\max" if latex else "max"
+                term = f"c + {maximum}({_join(then_terms, latex)}, {_join(else_terms, latex)})"
+            elif branches:
+                term = f"c + {_join(branches[0], latex)}"
+        elif nodetype == "subroutine":
+            terms.extend(_summation_terms(_body(node.get("body")), iterations, latex))
+            continue
+        terms.append(term)
+    # Las sentencias constantes consecutivas se agrupan en una sola c
+    return [term for i, term in enumerate(terms) if term != "c" or i == 0 or terms[i - 1] != "c"]
+
+
+def _body(node):
+    if isinstance(node, dict):
+        return node.get("body", []) if node.get("type") in ("block", "program") else [node]
+    return node or []
+
+
+def _join(terms, latex=False, group=False):
+    text = " + ".join(terms) if terms else "c"
+    if group and len(terms) > 1:
+        return f"\\left({text}\\right)" if latex else f"({text})"
+    return text
+
+
+def _mathematical_representation(ast, result, trace, iterations):
+    statements = _body(ast)
+    summation = _join(_summation_terms(statements, iterations, latex=False))
+    latex = _join(_summation_terms(statements, iterations, latex=True))
+
+    # Expansión: una constante por cada número de ejecuciones distinto
+    executions = BigO([entry["executions"] for entry in trace]) if trace else "1"
+    counts = sorted({entry["executions"] for entry in trace}, key=lambda e: -evaluate_complexity(e, 1000))
+    expansion = " + ".join(
+        f"c{i}" if count == "1" else f"c{i}·{count}" for i, count in enumerate(counts, start=1)
+    )
+
+    details = result["details"]
+    return {
+        "type": "summation",
+        "recurrence_relation": None,
+        "base_case": None,
+        "solution_method": "Suma de sumatorias: ciclos anidados se multiplican y secuenciales se suman",
+        "solution_steps": details["loops"] + details["average_case"] or None,
+        "summation": f"T(n) = {summation}",
+        "expansion": f"T(n) = {expansion or 'c'} = O({executions})",
+        "final_result": result["O"],
+        "latex_notation": f"T(n) = {latex}",
+    }
+
+
+# -------------------------------------------------------------
+# cost_analysis
+# -------------------------------------------------------------
+
+def _format_us(value):
+    text = f"{value:,.1f} µs"
+    if value >= 1_000_000:
+        return f"{text} (≈{value / 1_000_000:,.1f} s)"
+    if value >= 1000:
+        return f"{text} (≈{value / 1000:,.1f} ms)"
+    return text
+
+
+def _cost_analysis(trace, lines):
+    breakdown = []
+    totals = {}
+    for entry, (number, code) in zip(trace, lines):
+        cost = OPERATION_COST_US.get(entry["operation"], 0.2)
+        executions = entry["executions"]
+        totals[executions] = totals.get(executions, 0.0) + cost
+        breakdown.append({
+            "line": number,
+            "code": code,
+            "operation_type": entry["operation"],
+            "executions_count": executions,
+            "time_per_execution_us": cost,
+            "total_time_formula": f"{cost:g}" if executions == "1" else f"{cost:g}·{executions}",
+            "total_time_n_1000": _format_us(cost * evaluate_complexity(executions, 1000)),
+        })
+
+    ordered = sorted(totals.items(), key=lambda item: -evaluate_complexity(item[0], 1000))
+    formula = " + ".join(
+        f"{cost:g}" if executions == "1" else f"{cost:g}·{executions}" for executions, cost in ordered
+    )
+
+    def total_at(size):
+        return _format_us(sum(cost * evaluate_complexity(executions, size) for executions, cost in ordered))
+
+    return {
+        "instruction_breakdown": breakdown,
+        "summary": {
+            "total_time_formula": f"{formula} µs",
+            **{f"for_n_{size}": total_at(size) for size in SUMMARY_SIZES},
+        },
+    }
@@ -0,0 +1,248 @@
+# -------------------------------------------------------------
+# Lectura incremental de JSON en el texto del modelo
+#   - JSONSectionParser: entrega cada miembro de primer nivel
+#     ("basic_complexity", "step_by_step_analysis", ...) en cuanto su
+#     valor se cierra.
+#   - JSONObjectExtractor: encuentra el primer objeto completo de primer
+#     nivel, aunque venga rodeado de texto o de un bloque ```json.
+# Ambos reciben el texto en fragmentos y examinan cada carácter una sola
+# vez: siguen el estado de cadenas y escapes (las llaves de los diagramas
+# Mermaid dentro de cadenas no cuentan), guardan solo el texto en curso y
+# saltan entre caracteres relevantes con expresiones regulares.
+# -------------------------------------------------------------
+
+import json
+import re
+
+
+# Estados
+_PREAMBLE = 0       # Antes del primer "{" (texto o ```json del modelo)
+_EXPECT_KEY = 1     # Entre miembros: espera una clave o el "}" final
+_KEY = 2            # Dentro de la cadena de la clave
+_EXPECT_COLON = 3
+_EXPECT_VALUE = 4
+_CONTAINER = 5      # Valor objeto o arreglo (con anidamiento)
+_STRING = 6         # Valor cadena
+_SCALAR = 7         # Número, true, false o null
+_DONE = 8
+
+# Saltos hasta el siguiente carácter relevante (match desde la posición
+# actual: consumen tramos completos, sin probar carácter por carácter)
+#   - Contenido de una cadena: se detiene en la comilla de cierre o en un
+#     "\" al final del fragmento.
+#   - Dentro de un objeto/arreglo: texto sin llaves ni comillas y cadenas
+#     completas; se detiene en una llave o en una cadena sin cerrar.
+_STRING_BODY_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_CONTAINER_SKIP_RE = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+# Siguiente carácter relevante fuera de cadenas y valores compuestos
+_SCALAR_END_RE = re.compile(r'[,}\s]')
+_NON_SPACE_RE = re.compile(r'\S')
+
+
+class _ContainerScanner:
+    """Recorrido de cadenas y valores objeto/arreglo que puede cortarse entre fragmentos."""
+
+    depth = 0         # Anidamiento dentro del valor objeto/arreglo
+    in_string = False
+    escaped = False   # El fragmento anterior terminó en "\"
+
+    def _scan_string(self, chunk, i):
+        """Índice de la comilla que cierra la cadena en curso, o -1."""
+        if self.escaped:
+            if i >= len(chunk):
+                return -1
+            self.escaped = False
+            i += 1
+        i = _STRING_BODY_RE.match(chunk, i).end()
+        if i >= len(chunk):
+            return -1
+        if chunk[i] == '"':
+            return i
+        self.escaped = True  # "\" al final del fragmento
+        return -1
+
+    def _scan_container(self, chunk, i):
+        """Índice del corchete/llave que cierra el valor en curso, o -1."""
+        while True:
+            if self.in_string:
+                end = self._scan_string(chunk, i)
+                if end == -1:
+                    return -1
+                self.in_string = False
+                i = end + 1
+            i = _CONTAINER_SKIP_RE.match(chunk, i).end()
+            if i >= len(chunk):
+                return -1
+            char = chunk[i]
+            if char == '"':
+                # Cadena que sigue en el próximo fragmento
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return i
+            i += 1
+
+
+class JSONSectionParser(_ContainerScanner):
+    """
+    Uso:
+        parser = JSONSectionParser()
+        for chunk in fragmentos:
+            for key, value in parser.feed(chunk):
+                ...
+        parser.done  # True al cerrar el objeto de primer nivel
+
+    Un valor mal formado lanza json.JSONDecodeError al cerrarse.
+    """
+
+    def __init__(self):
+        self.state = _PREAMBLE
+        self.parts = []        # Texto del miembro en curso (clave o valor)
+        self.key = None
+        self.depth = 0         # Anidamiento dentro de un valor objeto/arreglo
+        self.in_string = False
+        self.escaped = False   # El fragmento anterior terminó en "\"
+
+    @property
+    def done(self) -> bool:
+        return self.state == _DONE
+
+    def feed(self, chunk: str):
+        """Procesa un fragmento y devuelve los miembros que se cerraron en él."""
+        sections = []
+        i = 0
+        n = len(chunk)
+        while i < n:
+            state = self.state
+
+            if state == _PREAMBLE:
+                i = chunk.find("{", i)
+                if i == -1:
+                    return sections
+                self.state = _EXPECT_KEY
+                i += 1
+
+            elif state == _EXPECT_KEY:
+                match = _NON_SPACE_RE.search(chunk, i)
+                if match is None:
+                    return sections
+                i = match.start()
+                char = chunk[i]
+                if char == '"':
+                    self.state = _KEY
+                    self.parts = []
+                elif char == "}":
+                    self.state = _DONE
+                    return sections
+                elif char != ",":
+                    raise json.JSONDecodeError("Se esperaba una clave", chunk, i)
+                i += 1
+
+            elif state == _KEY or state == _STRING:
+                end = self._scan_string(chunk, i)
+                if end == -1:
+                    self.parts.append(chunk[i:])
+                    return sections
+                self.parts.append(chunk[i:end])
+                text = "".join(self.parts)
+                if state == _KEY:
+                    self.key = json.loads('"' + text + '"')
+                    self.state = _EXPECT_COLON
+                else:
+                    sections.append((self.key, json.loads('"' + text + '"')))
+                    self.state = _EXPECT_KEY
+                i = end + 1
+
+            elif state == _EXPECT_COLON:
+                i = chunk.find(":", i)
+                if i == -1:
+                    return sections
+                self.state = _EXPECT_VALUE
+                i += 1
+
+            elif state == _EXPECT_VALUE:
+                match = _NON_SPACE_RE.search(chunk, i)
+                if match is None:
+                    return sections
+                i = match.start()
+                char = chunk[i]
+                self.parts = []
+                if char == '"':
+                    self.state = _STRING
+                    i += 1
+                elif char in "{[":
+                    self.state = _CONTAINER
+                    self.depth = 0
+                    self.in_string = False
+                else:
+                    self.state = _SCALAR
+
+            elif state == _CONTAINER:
+                end = self._scan_container(chunk, i)
+                if end == -1:
+                    self.parts.append(chunk[i:])
+                    return sections
+                self.parts.append(chunk[i:end + 1])
+                sections.append((self.key, json.loads("".join(self.parts))))
+                self.state = _EXPECT_KEY
+                i = end + 1
+
+            elif state == _SCALAR:
+                match = _SCALAR_END_RE.search(chunk, i)
+                if match is None:
+                    self.parts.append(chunk[i:])
+                    return sections
+                end = match.start()
+                self.parts.append(chunk[i:end])
+                sections.append((self.key, json.loads("".join(self.parts))))
+                self.state = _EXPECT_KEY
+                i = end
+
+            else:
+                return sections
+        return sections
+
+
+class JSONObjectExtractor(_ContainerScanner):
+    """
+    Uso:
+        extractor = JSONObjectExtractor()
+        for chunk in fragmentos:
+            if extractor.feed(chunk) is not None:
+                break
+        extractor.result  # Texto del primer objeto completo, o None
+
+    El objeto empieza en la primera "{" del texto (se salta el texto previo
+    y la apertura de un bloque ```json) y el texto posterior se ignora.
+    """
+
+    def __init__(self):
+        self.parts = []    # Texto del objeto en curso
+        self.started = False
+        self.result = None
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, chunk: str):
+        """Procesa un fragmento; devuelve el texto del objeto en cuanto se cierra."""
+        if self.result is not None:
+            return self.result
+        i = 0
+        if not self.started:
+            i = chunk.find("{")
+            if i == -1:
+                return None
+            self.started = True
+        end = self._scan_container(chunk, i)
+        if end == -1:
+            self.parts.append(chunk[i:])
+            return None
+        self.parts.append(chunk[i:end + 1])
+        self.result = "".join(self.parts)
+        self.parts = []
+        return self.result
@@ -6,30 +6,85 @@ Genera un análisis completo de complejidad computacional
 import os
 import time
 import json
+import hashlib
+from contextlib import nullcontext
+from functools import lru_cache
 from typing import Dict, Any
-from services.llm_service import LLMService
+from analyzer.complexity import ANALYZER_VERSION
+from services.hybrid_analysis import local_sections
+from services.json_stream import JSONObjectExtractor, JSONSectionParser
+from services.llm_policy import LLMError
+from services.llm_service import LLMService, extract_json, get_model_name, usage_tokens
+
+
+PROMPT_TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    "prompts",
+    "analyze_by_llm.txt"
+)
+
+# Prompt reducido del análisis híbrido: solo las secciones narrativas
+NARRATIVE_PROMPT_TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    "prompts",
+    "analyze_by_llm_narrative.txt"
+)
+
+# Análisis híbrido (services/hybrid_analysis.py): si el analizador local es
+# concluyente, calcula las secciones cuantitativas y el modelo solo escribe
+# las narrativas. LLM_HYBRID_ANALYSIS=0 pide siempre el análisis completo.
+LLM_HYBRID_ANALYSIS = os.getenv("LLM_HYBRID_ANALYSIS", "1") != "0"
+
+
+@lru_cache(maxsize=1)
+def _prompt_template_hash() -> str:
+    digest = hashlib.sha256()
+    for path in (PROMPT_TEMPLATE_PATH, NARRATIVE_PROMPT_TEMPLATE_PATH):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def engine_version() -> str:
+    """
+    Versión del motor de análisis por LLM: modelo + hash de los templates
+    del prompt y, en modo híbrido, la versión del analizador local. Cambia
+    si cambia cualquiera de ellos (invalida ETags).
+    """
+    version = f"{get_model_name()}:{_prompt_template_hash()}"
+    if LLM_HYBRID_ANALYSIS:
+        version += f":hybrid-{ANALYZER_VERSION}"
+    return version
 
 
 class LLMAnalysisService:
     """Servicio para analizar pseudocódigo con LLM"""
     
-    def __init__(self):
-        """Inicializa el servicio de análisis por LLM"""
-        self.llm_service = LLMService()
-        self.prompt_template_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "prompts",
-            "analyze_by_llm.txt"
-        )
+    def __init__(self, llm_service: LLMService = None):
+        """
+        Inicializa el servicio de análisis por LLM. Con un AsyncLLMService
+        se usa analyze_pseudocode_async. Sin llm_service, el LLMService se
+        crea al llamar al modelo por primera vez: plan y analysis_from_text
+        no lo necesitan.
+        """
+        self._llm_service = llm_service
+        self.prompt_template_path = PROMPT_TEMPLATE_PATH
+    
+    @property
+    def llm_service(self) -> LLMService:
+        if self._llm_service is None:
+            self._llm_service = LLMService()
+        return self._llm_service
     
-    def _load_prompt_template(self) -> str:
+    def _load_prompt_template(self, path: str = None) -> str:
         """Carga el template del prompt desde el archivo"""
+        path = path or self.prompt_template_path
         try:
-            with open(self.prompt_template_path, "r", encoding="utf-8") as f:
+            with open(path, "r", encoding="utf-8") as f:
                 return f.read()
         except FileNotFoundError:
             raise FileNotFoundError(
-                f"No se encontró el archivo de prompt en: {self.prompt_template_path}"
+                f"No se encontró el archivo de prompt en: {path}"
             )
     
     def _build_prompt(self, pseudocode: str, template: str) -> str:
@@ -45,106 +100,247 @@ class LLMAnalysisService:
         """
         return template.format(pseudocode=pseudocode)
     
+    def _build_narrative_prompt(self, pseudocode: str, local: Dict[str, Any], template: str) -> str:
+        """
+        Prompt reducido del modo híbrido: el pseudocódigo y los resultados
+        locales como contexto, para que la explicación no los contradiga.
+        La tabla de costos no se envía: no hace falta para la narrativa.
+        """
+        representation = local["mathematical_representation"]
+        local_results = json.dumps({
+            "basic_complexity": local["basic_complexity"],
+            "summation": representation["summation"],
+            "final_result": representation["final_result"]
+        }, ensure_ascii=False, indent=2)
+        return template.format(pseudocode=pseudocode, local_results=local_results)
+    
     def _extract_metadata_from_response(self, response_dict: Dict[str, Any], 
-                                       processing_time_ms: float) -> Dict[str, Any]:
+                                       processing_time_ms: float, local=None, call=None) -> Dict[str, Any]:
         """
-        Extrae o actualiza los metadatos del LLM en la respuesta
+        Metadatos del LLM de la respuesta, con el modelo, los tokens y el
+        estado de la caché informados por la API (nunca los del texto del
+        modelo)
         
         Args:
             response_dict: El diccionario de respuesta del LLM
             processing_time_ms: Tiempo de procesamiento en milisegundos
+            local: Secciones calculadas localmente (modo híbrido) o None
+            call: (modelo, uso de tokens, cache_status) de una respuesta
+                obtenida fuera del servicio; sin valor, los de la última
+                llamada de llm_service
             
         Returns:
             Diccionario con los metadatos actualizados
         """
-        # Obtener el modelo usado del servicio
-        model_used = self.llm_service.model
-        
-        # Si ya hay metadatos en la respuesta, actualizarlos
-        if "llm_metadata" in response_dict:
-            metadata = response_dict["llm_metadata"]
-            # Asegurar que tokens sea un diccionario con las claves correctas
-            if isinstance(metadata.get("tokens"), dict):
-                tokens = metadata["tokens"]
-            else:
-                tokens = {"input": 0, "output": 0, "total": 0}
-            
-            metadata = {
-                "model_used": metadata.get("model_used", model_used),
-                "tokens": {
-                    "input": tokens.get("input", 0),
-                    "output": tokens.get("output", 0),
-                    "total": tokens.get("total", 0)
-                },
-                "estimated_cost_usd": metadata.get("estimated_cost_usd"),
-                "processing_time_ms": processing_time_ms
-            }
+        # Obtener el modelo usado, los tokens y el resultado de la caché
+        if call is None:
+            model_used = self.llm_service.model
+            tokens = self.llm_service.token_usage()
+            cache_status = self.llm_service.cache_status
         else:
-            # Crear metadatos si no existen
-            metadata = {
-                "model_used": model_used,
-                "tokens": {
-                    "input": 0,
-                    "output": 0,
-                    "total": 0
-                },
-                "estimated_cost_usd": None,
-                "processing_time_ms": processing_time_ms
-            }
+            model_used, usage, cache_status = call
+            tokens = usage_tokens(usage)
+        
+        # Los metadatos salen siempre de la API: si el modelo escribió un
+        # llm_metadata propio (tokens o costo inventados) se descarta, porque
+        # /metrics exporta estos valores como consumo real
+        response_dict.pop("llm_metadata", None)
+        metadata = {
+            "model_used": model_used,
+            "tokens": tokens or {
+                "input": 0,
+                "output": 0,
+                "total": 0
+            },
+            "estimated_cost_usd": None,
+            "processing_time_ms": processing_time_ms,
+            "cache_status": cache_status
+        }
         
+        metadata["local_sections"] = list(local) if local else None
         return metadata
     
-    def analyze_pseudocode(self, pseudocode: str) -> Dict[str, Any]:
+    def _prepare_prompt(self, pseudocode: str, timer=None) -> str:
+        with timer.stage("prompt_build") if timer else nullcontext():
+            # Cargar template
+            template = self._load_prompt_template()
+            
+            # Construir el prompt
+            return self._build_prompt(pseudocode, template)
+    
+    def plan(self, pseudocode: str, timer=None):
+        """
+        (prompt, secciones locales). En modo híbrido, si el analizador local
+        es concluyente, el prompt es el reducido y las secciones locales se
+        agregan a la respuesta del modelo; si no, (prompt completo, None).
+        Es el mismo prompt que enviaría /analyze-by-llm, así que sirve para
+        preparar las solicitudes de un lote.
+        """
+        local = None
+        if LLM_HYBRID_ANALYSIS:
+            with timer.stage("local_analysis") if timer else nullcontext():
+                local = local_sections(pseudocode)
+        if local is None:
+            return self._prepare_prompt(pseudocode, timer), None
+        
+        with timer.stage("prompt_build") if timer else nullcontext():
+            template = self._load_prompt_template(NARRATIVE_PROMPT_TEMPLATE_PATH)
+            return self._build_narrative_prompt(pseudocode, local, template), local
+    
+    def _complete_analysis(self, analysis_dict: Dict[str, Any], pseudocode: str,
+                           start_time: float, local=None, call=None) -> Dict[str, Any]:
+        """Completa la respuesta del LLM con el pseudocódigo, las secciones locales, los metadatos y los campos opcionales."""
+        # Calcular tiempo de procesamiento
+        processing_time_ms = (time.time() - start_time) * 1000
+        
+        # Asegurar que el pseudocódigo esté en la respuesta
+        if "pseudocode" not in analysis_dict:
+            analysis_dict["pseudocode"] = pseudocode
+        
+        # Las secciones locales reemplazan lo que el modelo haya agregado
+        if local:
+            analysis_dict.update(local)
+        
+        # Actualizar metadatos
+        analysis_dict["llm_metadata"] = self._extract_metadata_from_response(
+            analysis_dict, 
+            processing_time_ms,
+            local,
+            call
+        )
+        
+        # Asegurar que los campos opcionales estén presentes o sean None
+        if "execution_diagram" not in analysis_dict:
+            analysis_dict["execution_diagram"] = None
+        if "cost_analysis" not in analysis_dict:
+            analysis_dict["cost_analysis"] = None
+        
+        return analysis_dict
+    
+    def analysis_from_text(self, text: str, pseudocode: str, local=None, usage: Dict[str, Any] = None,
+                           cache_status: str = None, model: str = None, start_time: float = None) -> Dict[str, Any]:
+        """
+        Análisis completo a partir del texto de una respuesta del modelo
+        obtenida fuera del servicio (p. ej. el resultado de un lote), para
+        el prompt de plan(pseudocode). No usa ni modifica el estado de
+        llm_service.
+        
+        Args:
+            text: Texto de la respuesta del modelo
+            pseudocode: El pseudocódigo analizado
+            local: Secciones locales que devolvió plan(pseudocode)
+            usage: Tokens de la respuesta con los campos de la API
+            cache_status: Origen de la respuesta para llm_metadata
+            model: Modelo que la generó (por defecto el configurado)
+            start_time: Inicio para processing_time_ms (por defecto ahora)
+            
+        Raises:
+            json.JSONDecodeError: Si el texto no contiene un objeto JSON
+        """
+        call = (model or get_model_name(), usage, cache_status)
+        return self._complete_analysis(
+            extract_json(text), pseudocode, time.time() if start_time is None else start_time, local, call
+        )
+    
+    def analyze_pseudocode(self, pseudocode: str, timer=None) -> Dict[str, Any]:
         """
         Analiza el pseudocódigo usando LLM y genera un análisis completo
         
         Args:
             pseudocode: El pseudocódigo a analizar
+            timer: StageTimer opcional; mide "prompt_build", "llm_wait" y
+                "json_extraction"
             
         Returns:
             Diccionario con el análisis completo de complejidad
             
         Raises:
-            Exception: Si hay un error al analizar el pseudocódigo
+            LLMError: Si la llamada al modelo falla o vence el plazo
+            Exception: Si hay otro error al analizar el pseudocódigo
         """
         try:
             # Medir tiempo de inicio
             start_time = time.time()
-            
-            # Cargar template
-            template = self._load_prompt_template()
-            
-            # Construir el prompt
-            prompt = self._build_prompt(pseudocode, template)
+            prompt, local = self.plan(pseudocode, timer)
             
             # Generar análisis con LLM (usando JSON estructurado)
             # Usar max_tokens más alto para respuestas completas
             analysis_dict = self.llm_service.generate_json_completion(
                 prompt, 
-                max_tokens=8000
+                max_tokens=8000,
+                timer=timer
             )
             
-            # Calcular tiempo de procesamiento
-            processing_time_ms = (time.time() - start_time) * 1000
+            return self._complete_analysis(analysis_dict, pseudocode, start_time, local)
             
-            # Asegurar que el pseudocódigo esté en la respuesta
-            if "pseudocode" not in analysis_dict:
-                analysis_dict["pseudocode"] = pseudocode
+        except LLMError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al analizar el pseudocódigo con LLM: {str(e)}")
+    
+    async def analyze_pseudocode_async(self, pseudocode: str, timer=None) -> Dict[str, Any]:
+        """
+        Versión asíncrona de analyze_pseudocode. Requiere que el servicio se
+        haya creado con un AsyncLLMService.
+        """
+        try:
+            start_time = time.time()
+            prompt, local = self.plan(pseudocode, timer)
             
-            # Actualizar metadatos
-            analysis_dict["llm_metadata"] = self._extract_metadata_from_response(
-                analysis_dict, 
-                processing_time_ms
+            analysis_dict = await self.llm_service.generate_json_completion(
+                prompt, 
+                max_tokens=8000,
+                timer=timer
             )
             
-            # Asegurar que los campos opcionales estén presentes o sean None
-            if "execution_diagram" not in analysis_dict:
-                analysis_dict["execution_diagram"] = None
-            if "cost_analysis" not in analysis_dict:
-                analysis_dict["cost_analysis"] = None
-            
-            return analysis_dict
+            return self._complete_analysis(analysis_dict, pseudocode, start_time, local)
             
+        except LLMError:
+            raise
         except Exception as e:
             raise Exception(f"Error al analizar el pseudocódigo con LLM: {str(e)}")
-
+    
+    async def stream_analysis(self, pseudocode: str):
+        """
+        Versión en streaming de analyze_pseudocode_async. Genera un evento
+        ("section", (clave, valor)) por cada sección de primer nivel del
+        JSON en cuanto el modelo la cierra, y al final ("done", análisis
+        completo con metadatos). Si el parser incremental no reconoce la
+        respuesta, solo se emite el resultado final: el texto recibido y
+        el resto del stream pasan a un JSONObjectExtractor. En modo híbrido las secciones locales se emiten primero,
+        antes de llamar al modelo. Requiere un AsyncLLMService.
+        """
+        start_time = time.time()
+        prompt, local = self.plan(pseudocode)
+        for key, value in (local or {}).items():
+            yield "section", (key, value)
+        
+        parser = JSONSectionParser()
+        extractor = None
+        sections = {}
+        parts = []
+        async for delta in self.llm_service.stream_completion(prompt, max_tokens=8000):
+            parts.append(delta)
+            if parser is None:
+                extractor.feed(delta)
+                continue
+            try:
+                for key, value in parser.feed(delta):
+                    # Una sección local no se reemplaza por la del modelo, y
+                    # los metadatos los pone el servicio (ver _extract_metadata_from_response)
+                    if (local and key in local) or key == "llm_metadata":
+                        continue
+                    sections[key] = value
+                    yield "section", (key, value)
+            except json.JSONDecodeError:
+                parser = None
+                extractor = JSONObjectExtractor()
+                extractor.feed("".join(parts))
+        
+        if parser is not None and parser.done:
+            analysis_dict = sections
+        elif extractor is not None and extractor.done:
+            analysis_dict = json.loads(extractor.result)
+        else:
+            analysis_dict = extract_json("".join(parts))
+        yield "done", self._complete_analysis(analysis_dict, pseudocode, start_time, local)
@@ -0,0 +1,316 @@
+# -------------------------------------------------------------
+# Análisis masivo por LLM fuera de línea (Message Batches)
+# Reprocesar todo el archivo de programas con /analyze-by-llm, una
+# llamada a la vez, es lento y paga el precio completo de cada llamada.
+# Este job arma los mismos prompts que el endpoint, los envía en lotes
+# por la interfaz de batches del proveedor (procesamiento asíncrono, a
+# mitad de precio), consulta hasta que terminan y valida cada resultado
+# como AnalyzeByLLMResponse. Las respuestas válidas se guardan en la
+# caché de respuestas del LLM con la misma clave que usaría el endpoint,
+# así que después /analyze-by-llm las sirve sin llamar al modelo (el
+# respaldo SQLite se comparte entre procesos).
+#
+# El proveedor es intercambiable: AnthropicBatchProvider usa la API de
+# Message Batches y LocalBatchProvider responde en memoria (pruebas y
+# ensayos sin red).
+#
+# Uso:
+#     python -m services.llm_batch_service DIRECTORIO [salida.jsonl] [--store ARCHIVO]
+# El almacén es el archivo SQLite de la caché de respuestas que lee el
+# servidor (--store o LLM_CACHE_SQLITE_PATH); sin él el job no se ejecuta.
+# -------------------------------------------------------------
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import httpx
+
+import services.llm_service as llm_service
+from models.responses import AnalyzeByLLMResponse
+from services.http_cache import llm_analysis_key
+from services.llm_analysis_service import LLMAnalysisService
+from services.llm_policy import llm_error, llm_policy
+from services.llm_service import _USAGE_FIELDS, _message_params, get_client, get_model_name, response_cache_key
+from services.result_cache import ResultCache, SQLiteCacheBackend
+
+
+# Máximo de solicitudes por lote (límite de la API de Message Batches)
+LLM_BATCH_MAX_REQUESTS = int(os.getenv("LLM_BATCH_MAX_REQUESTS", "10000"))
+# Segundos entre consultas del estado de un lote
+LLM_BATCH_POLL_SECONDS = float(os.getenv("LLM_BATCH_POLL_SECONDS", "60"))
+
+# Los mismos max_tokens que /analyze-by-llm: forman parte de la clave de caché
+ANALYSIS_MAX_TOKENS = 8000
+
+
+# -------------------------------------------------------------
+# Proveedores
+# Interfaz: submit(solicitudes) → id del lote; ended(id) → bool;
+# results(id) → iterable de {"custom_id", "result"} con el formato de la
+# API (result.type: succeeded, errored, canceled o expired).
+# -------------------------------------------------------------
+
+class AnthropicBatchProvider:
+    """
+    Message Batches de Anthropic (beta). Las consultas (ended, results) son
+    GET idempotentes y usan la política de reintentos de las llamadas. El
+    envío (submit) se intenta una sola vez: un POST que venció pudo haber
+    creado el lote igual, y reenviarlo crearía otro con las mismas
+    solicitudes (y se pagarían dos veces).
+    """
+
+    BETA_HEADER = {"anthropic-beta": "message-batches-2024-09-24"}
+    PATH = "/v1/messages/batches"
+
+    def __init__(self, client=None, policy=None):
+        self.client = client or get_client()
+        self.policy = policy or llm_policy
+
+    def _get(self, path, **kwargs):
+        """GET con plazo y reintentos."""
+        return self.policy.call(
+            lambda timeout: self.client.get(path, options={"headers": self.BETA_HEADER, "timeout": timeout}, **kwargs)
+        )
+
+    def submit(self, requests):
+        """Crea el lote en un solo intento; un fallo se informa como LLMError, sin reintentar."""
+        try:
+            batch = self.client.post(
+                self.PATH, body={"requests": requests}, cast_to=object,
+                options={"headers": self.BETA_HEADER, "timeout": self.policy.timeout()}
+            )
+        except Exception as e:
+            typed = llm_error(e)
+            if typed is None:
+                raise
+            raise typed from e
+        return batch["id"]
+
+    def ended(self, batch_id):
+        batch = self._get(f"{self.PATH}/{batch_id}", cast_to=object)
+        return batch["processing_status"] == "ended"
+
+    def results(self, batch_id):
+        response = self._get(f"{self.PATH}/{batch_id}/results", cast_to=httpx.Response)
+        return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+class LocalBatchProvider:
+    """
+    Proveedor en memoria: cada solicitud se responde con respond(params)
+    (texto del modelo; una excepción la marca como errored) y el lote
+    termina tras `polls` consultas.
+    """
+
+    def __init__(self, respond, polls=1):
+        self.respond = respond
+        self.polls = polls
+        self.batches = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, requests):
+        batch_id = f"local_batch_{next(self._ids)}"
+        self.batches[batch_id] = {"requests": requests, "polls": 0}
+        return batch_id
+
+    def ended(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        return batch["polls"] >= self.polls
+
+    def results(self, batch_id):
+        for request in self.batches[batch_id]["requests"]:
+            try:
+                text = self.respond(request["params"])
+            except Exception as e:
+                result = {"type": "errored", "error": {"type": "api_error", "message": str(e)}}
+            else:
+                result = {"type": "succeeded", "message": {
+                    "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn",
+                    "usage": {"input_tokens": len(request["params"]["messages"][0]["content"]) // 4,
+                              "output_tokens": len(text) // 4}
+                }}
+            yield {"custom_id": request["custom_id"], "result": result}
+
+
+# -------------------------------------------------------------
+# Job
+# -------------------------------------------------------------
+
+def _result_error(result):
+    """Mensaje de error de un resultado que no terminó bien."""
+    if result["type"] == "errored":
+        error = result.get("error") or {}
+        return f"{error.get('type', 'error')}: {error.get('message', '')}".strip()
+    return f"La solicitud del lote terminó como {result['type']}"
+
+
+def _validate(service, model, pseudocode, local, text, usage, cache_status, start_time):
+    """Análisis validado de una respuesta del modelo, con sus tokens y cache_status en los metadatos."""
+    analysis = service.analysis_from_text(
+        text, pseudocode, local, usage={field: usage.get(field) for field in _USAGE_FIELDS},
+        cache_status=cache_status, model=model, start_time=start_time
+    )
+    return AnalyzeByLLMResponse(**analysis)
+
+
+def run_bulk_analysis(programs, provider, cache=None, refresh=False,
+                      max_requests=LLM_BATCH_MAX_REQUESTS, poll_interval=LLM_BATCH_POLL_SECONDS, sleep=time.sleep):
+    """
+    Analiza por lotes una secuencia de (nombre, pseudocódigo).
+
+    Los programas idénticos se envían una sola vez y, salvo con refresh,
+    los que ya están en la caché de respuestas no se envían. Cada
+    respuesta válida se guarda en `cache` (por defecto la caché de
+    respuestas del LLM del proceso).
+
+    Returns:
+        Reporte con los lotes enviados, los contadores por estado, las
+        respuestas guardadas en la caché (stored) y un elemento por
+        programa (nombre, content_hash, status: succeeded, cached o
+        failed, error y el análisis validado).
+    """
+    cache = llm_service.llm_response_cache if cache is None else cache
+    service = LLMAnalysisService()
+    model = get_model_name()
+
+    stored = 0
+    items = []
+    pending = {}  # content_hash → (pseudocódigo, prompt, secciones locales)
+    for name, pseudocode in programs:
+        content_hash = llm_analysis_key(pseudocode)
+        items.append({"name": name, "content_hash": content_hash, "status": None, "error": None, "analysis": None})
+        if content_hash in pending:
+            continue
+        prompt, local = service.plan(pseudocode)
+        pending[content_hash] = (pseudocode, prompt, local)
+
+    # Ya en la caché: se validan como lo haría el endpoint con un acierto
+    outcomes = {}
+    start_time = time.time()
+    for content_hash, (pseudocode, prompt, local) in list(pending.items()):
+        entry = None if refresh or cache is None else cache.get(response_cache_key(model, ANALYSIS_MAX_TOKENS, prompt))
+        if entry is None:
+            continue
+        try:
+            analysis = _validate(service, model, pseudocode, local, entry["text"], entry, "hit", start_time)
+        except Exception:
+            continue  # Respuesta guardada inválida: se vuelve a pedir
+        outcomes[content_hash] = ("cached", None, analysis)
+        del pending[content_hash]
+
+    requests = [
+        {"custom_id": content_hash, "params": _message_params(model, prompt, ANALYSIS_MAX_TOKENS)}
+        for content_hash, (_, prompt, _) in pending.items()
+    ]
+    batch_ids = [
+        provider.submit(requests[start:start + max_requests]) for start in range(0, len(requests), max_requests)
+    ]
+
+    for batch_id in batch_ids:
+        while not provider.ended(batch_id):
+            sleep(poll_interval)
+        for entry in provider.results(batch_id):
+            content_hash = entry["custom_id"]
+            pseudocode, prompt, local = pending[content_hash]
+            result = entry["result"]
+            if result["type"] != "succeeded":
+                outcomes[content_hash] = ("failed", _result_error(result), None)
+                continue
+            message = result["message"]
+            usage = message.get("usage") or {}
+            try:
+                text = message["content"][0]["text"]
+                analysis = _validate(service, model, pseudocode, local, text, usage, "batch", start_time)
+            except Exception as e:
+                outcomes[content_hash] = ("failed", f"Respuesta inválida: {e}", None)
+                continue
+            # Como en LLMService._store_response: una respuesta cortada no se guarda
+            if cache is not None and message.get("stop_reason") != "max_tokens":
+                cache.set(
+                    response_cache_key(model, ANALYSIS_MAX_TOKENS, prompt),
+                    {"text": text, **{field: usage.get(field) for field in _USAGE_FIELDS}}
+                )
+                stored += 1
+            outcomes[content_hash] = ("succeeded", None, analysis)
+
+    counts = {"succeeded": 0, "cached": 0, "failed": 0}
+    for item in items:
+        status, error, analysis = outcomes.get(item["content_hash"], ("failed", "Sin resultado en el lote", None))
+        item.update(status=status, error=error, analysis=analysis.model_dump(mode="json") if analysis else None)
+        counts[status] += 1
+    return {"batches": batch_ids, "submitted": len(requests), **counts, "stored": stored, "items": items}
+
+
+def load_programs(directory):
+    """(nombre, pseudocódigo) de cada archivo del directorio, en orden."""
+    programs = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                programs.append((name, f.read()))
+    return programs
+
+
+def open_store(path, entries=0):
+    """
+    Caché de respuestas sobre el archivo SQLite `path`, con la TTL del
+    servidor. El archivo conserva al menos `entries` respuestas aunque
+    superen LLM_CACHE_DISK_MAX_ENTRIES.
+    """
+    backend = SQLiteCacheBackend(path, max_entries=max(llm_service.LLM_CACHE_DISK_MAX_ENTRIES, entries))
+    return ResultCache(
+        max_entries=max(1, llm_service.LLM_CACHE_MAX_ENTRIES), ttl_seconds=llm_service.LLM_CACHE_TTL_SECONDS,
+        backend=backend
+    )
+
+
+def main(argv=None, provider=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m services.llm_batch_service",
+        description="Análisis por LLM de un directorio de programas con Message Batches."
+    )
+    parser.add_argument("directory", help="Directorio con un programa por archivo")
+    parser.add_argument("output", nargs="?", help="Archivo JSONL con el análisis de cada programa")
+    parser.add_argument(
+        "--store", default=llm_service.LLM_CACHE_SQLITE_PATH or None,
+        help="Archivo SQLite de la caché de respuestas que lee el servidor (por defecto LLM_CACHE_SQLITE_PATH)"
+    )
+    args = parser.parse_args(argv)
+    # Sin almacén persistente se pagaría el lote completo y el servidor no
+    # podría leer ningún resultado
+    if not args.store:
+        parser.error("falta el almacén de resultados: use --store ARCHIVO o defina LLM_CACHE_SQLITE_PATH")
+
+    programs = load_programs(args.directory)
+    if len(programs) > llm_service.LLM_CACHE_DISK_MAX_ENTRIES:
+        print(
+            f"Aviso: {len(programs)} programas superan LLM_CACHE_DISK_MAX_ENTRIES="
+            f"{llm_service.LLM_CACHE_DISK_MAX_ENTRIES}; el servidor recortará el archivo a ese tamaño "
+            f"al guardar nuevas respuestas.",
+            file=sys.stderr
+        )
+
+    report = run_bulk_analysis(programs, provider or AnthropicBatchProvider(), cache=open_store(args.store, len(programs)))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for item in report["items"]:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    print(
+        f"Lotes: {len(report['batches'])}, enviados: {report['submitted']}, correctos: {report['succeeded']}, "
+        f"ya en caché: {report['cached']}, fallidos: {report['failed']}"
+    )
+    print(
+        f"Guardados en {args.store}: {report['stored']} (vigentes por "
+        f"{llm_service.LLM_CACHE_TTL_SECONDS / 86400:g} días, LLM_CACHE_TTL_SECONDS)"
+    )
+    return report
+
+if __name__ == "__main__":
+    main()
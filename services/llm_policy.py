@@ -0,0 +1,290 @@
+# -------------------------------------------------------------
+# Política de las llamadas al LLM: plazos, reintentos y solicitudes
+# duplicadas (hedging)
+#   - Plazo: cada intento espera como máximo LLM_ATTEMPT_TIMEOUT_SECONDS y
+#     nunca más de lo que le queda a la solicitud HTTP (request_deadline,
+#     fijado por AdmissionMiddleware según el pool).
+#   - Reintentos: los errores transitorios (timeouts, conexión, 429, 5xx,
+#     529 overloaded) se reintentan con backoff exponencial y jitter, o
+#     tras el Retry-After del proveedor, mientras quede plazo.
+#   - Hedging (opcional, solo en el cliente asíncrono): si un intento tarda
+#     más que el percentil LLM_HEDGE_PERCENTILE de las latencias recientes,
+#     se lanza una copia y se usa la primera respuesta. Duplica el costo de
+#     las llamadas lentas, por eso está desactivado por defecto.
+# Los errores se convierten en subclases de LLMError con el código HTTP
+# que deben responder los endpoints.
+# -------------------------------------------------------------
+
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import anthropic
+
+from services.admission import request_deadline
+
+
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+# 0 desactiva el hedging; p. ej. 95 duplica los intentos más lentos que el p95
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+# Latencias necesarias antes de calcular el percentil
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Latencias recientes que se conservan por tipo de llamada
+LATENCY_WINDOW = 200
+
+
+# -------------------------------------------------------------
+# Errores tipados
+# -------------------------------------------------------------
+
+class LLMError(Exception):
+    """Error de una llamada al LLM, con el código HTTP que debe responderse."""
+
+    status_code = 502
+    # Se puede reintentar (error transitorio del proveedor)
+    retryable = False
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMTimeoutError(LLMError):
+    """El intento o el plazo de la solicitud se agotaron esperando al modelo (504)."""
+
+    status_code = 504
+    retryable = True
+
+
+class LLMRateLimitError(LLMError):
+    """El proveedor limitó la tasa de llamadas (503 con Retry-After)."""
+
+    status_code = 503
+    retryable = True
+
+
+class LLMUnavailableError(LLMError):
+    """Error de conexión, 5xx o sobrecarga del proveedor (503)."""
+
+    status_code = 503
+    retryable = True
+
+
+class LLMRequestError(LLMError):
+    """El proveedor rechazó la solicitud (4xx no transitorio); no se reintenta (502)."""
+
+
+class LLMResponseError(LLMError):
+    """La respuesta del modelo está vacía o no es el JSON esperado (502)."""
+
+
+def _retry_after(error) -> float:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def llm_error(error: BaseException):
+    """LLMError equivalente a una excepción del SDK o del plazo, o None si no es de la llamada."""
+    if isinstance(error, LLMError):
+        return error
+    if isinstance(error, (anthropic.APITimeoutError, asyncio.TimeoutError, TimeoutError)):
+        return LLMTimeoutError("El modelo no respondió dentro del plazo.")
+    if isinstance(error, anthropic.RateLimitError):
+        return LLMRateLimitError("El proveedor del LLM limitó la tasa de llamadas.", _retry_after(error))
+    if isinstance(error, anthropic.APIStatusError):
+        if error.status_code >= 500 or error.status_code in (408, 409):
+            return LLMUnavailableError(
+                f"El proveedor del LLM no está disponible ({error.status_code}).", _retry_after(error)
+            )
+        return LLMRequestError(f"El proveedor del LLM rechazó la solicitud ({error.status_code}): {error.message}")
+    if isinstance(error, anthropic.APIConnectionError):
+        return LLMUnavailableError("No se pudo conectar con el proveedor del LLM.")
+    return None
+
+
+# -------------------------------------------------------------
+# Política
+# -------------------------------------------------------------
+
+class LLMCallPolicy:
+    """
+    Ejecuta una llamada al modelo con plazo, reintentos y hedging. La
+    llamada es una función que recibe el timeout del intento en segundos.
+    Los contadores y las latencias se comparten entre hilos (cliente
+    síncrono en el threadpool), así que se protegen con un lock.
+    """
+
+    def __init__(self, max_retries=LLM_MAX_RETRIES, attempt_timeout=LLM_ATTEMPT_TIMEOUT_SECONDS,
+                 backoff_base=LLM_BACKOFF_BASE_SECONDS, backoff_max=LLM_BACKOFF_MAX_SECONDS,
+                 hedge_percentile=LLM_HEDGE_PERCENTILE, hedge_min_samples=LLM_HEDGE_MIN_SAMPLES,
+                 clock=time.monotonic):
+        self.max_retries = max_retries
+        self.attempt_timeout = attempt_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.clock = clock
+        self.latencies = {}  # tipo de llamada → deque de latencias (s)
+        self._lock = threading.Lock()
+        # Métricas
+        self.attempts = 0
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.errors = {}     # clase de LLMError → llamadas fallidas
+
+    # --- Plazos -------------------------------------------------------
+
+    def timeout(self) -> float:
+        """Timeout del próximo intento; LLMTimeoutError si la solicitud ya venció."""
+        deadline = request_deadline.get()
+        if deadline is None:
+            return self.attempt_timeout
+        remaining = deadline - self.clock()
+        if remaining <= 0:
+            raise LLMTimeoutError("Se agotó el plazo de la solicitud antes de obtener la respuesta del modelo.")
+        return min(self.attempt_timeout, remaining)
+
+    def retry_delay(self, attempt: int, error: BaseException) -> float:
+        """
+        Segundos antes del reintento número attempt + 1. Lanza el LLMError
+        si no se puede reintentar: error no transitorio, reintentos agotados
+        o plazo insuficiente para esperar.
+        """
+        typed = llm_error(error)
+        if typed is None:
+            raise error
+        if not typed.retryable or attempt >= self.max_retries:
+            self._count_error(typed)
+            raise typed
+        delay = typed.retry_after
+        if delay is None:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        deadline = request_deadline.get()
+        if deadline is not None and self.clock() + delay >= deadline:
+            self._count_error(typed)
+            raise typed
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    def _count_error(self, error: LLMError):
+        with self._lock:
+            name = type(error).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    # --- Latencias y hedging -------------------------------------------
+
+    def record_latency(self, kind, seconds: float):
+        with self._lock:
+            self.latencies.setdefault(kind, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def hedge_delay(self, kind):
+        """Segundos tras los que se duplica un intento, o None sin hedging."""
+        if self.hedge_percentile <= 0:
+            return None
+        with self._lock:
+            samples = sorted(self.latencies.get(kind, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[max(0, math.ceil(self.hedge_percentile / 100 * len(samples)) - 1)]
+
+    # --- Ejecución ------------------------------------------------------
+
+    def call(self, fn, kind=None):
+        """Llamada síncrona con plazo y reintentos (sin hedging)."""
+        attempt = 0
+        while True:
+            timeout = self.timeout()
+            start = self.clock()
+            with self._lock:
+                self.attempts += 1
+            try:
+                result = fn(timeout)
+            except Exception as e:
+                time.sleep(self.retry_delay(attempt, e))
+                attempt += 1
+                continue
+            self.record_latency(kind, self.clock() - start)
+            return result
+
+    async def call_async(self, fn, kind=None):
+        """Llamada asíncrona con plazo, reintentos y hedging; fn devuelve un awaitable."""
+        attempt = 0
+        while True:
+            timeout = self.timeout()
+            try:
+                return await self._hedged_attempt(fn, timeout, kind)
+            except Exception as e:
+                await asyncio.sleep(self.retry_delay(attempt, e))
+                attempt += 1
+
+    async def _timed(self, fn, timeout, kind):
+        start = self.clock()
+        with self._lock:
+            self.attempts += 1
+        # wait_for además del timeout del cliente: este acota solo cada
+        # lectura, no la duración total del intento
+        result = await asyncio.wait_for(fn(timeout), timeout)
+        self.record_latency(kind, self.clock() - start)
+        return result
+
+    async def _hedged_attempt(self, fn, timeout, kind):
+        """
+        Un intento; si supera hedge_delay sin responder, lanza una copia con
+        el plazo restante. Devuelve la primera respuesta correcta; si fallan
+        todas, lanza el error de la última en terminar.
+        """
+        primary = asyncio.ensure_future(self._timed(fn, timeout, kind))
+        tasks = [primary]
+        try:
+            delay = self.hedge_delay(kind)
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    with self._lock:
+                        self.hedged += 1
+                    tasks.append(asyncio.ensure_future(self._timed(fn, timeout - delay, kind)))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "errors": dict(self.errors),
+            }
+
+
+# Política compartida del proceso
+llm_policy = LLMCallPolicy()
@@ -3,128 +3,509 @@ Servicio para interactuar con APIs de modelos de lenguaje (LLM)
 Actualmente soporta Claude de Anthropic
 """
 
+import asyncio
+import hashlib
+import json
 import os
-from anthropic import Anthropic
+import threading
+from contextlib import nullcontext
+from typing import NamedTuple, Union
+
+import httpx
+from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
+
+from services.json_stream import JSONObjectExtractor
+from services.llm_policy import LLMCallPolicy, LLMError, LLMResponseError, llm_error, llm_policy
+from services.result_cache import ResultCache, SQLiteCacheBackend
+from services.single_flight import SingleFlight
+
+
+# Modelo por defecto si no se define CLAUDE_MODEL
+DEFAULT_MODEL = "claude-3-5-sonnet-20240620"
+
+# Pool de conexiones de los clientes compartidos. El SDK cierra una conexión
+# ociosa a los 5 s; las llamadas al LLM son espaciadas, así que se conserva
+# más tiempo para no repetir el handshake TCP/TLS en cada solicitud. El
+# máximo acota las llamadas simultáneas del cliente asíncrono: las demás
+# esperan una conexión libre.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "256"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+
+
+# Caché de respuestas del modelo: LRU en memoria, opcionalmente delante de
+# un archivo SQLite que sobrevive reinicios y se comparte entre workers.
+# El archivo es opcional (LLM_CACHE_SQLITE_PATH, sin valor: solo memoria) y
+# se crea en la primera escritura. LLM_CACHE_MAX_ENTRIES=0 desactiva la caché.
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "10000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "")
+
+
+def get_model_name() -> str:
+    """Modelo configurado para las llamadas al LLM"""
+    return os.getenv("CLAUDE_MODEL", DEFAULT_MODEL)
+
+
+def _get_api_key() -> str:
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "ANTHROPIC_API_KEY no está configurada. "
+            "Por favor, configura tu API key en el archivo .env"
+        )
+    return api_key
+
+
+# -------------------------------------------------------------
+# Clientes de Anthropic compartidos por toda la aplicación
+# Se crean una sola vez (en el lifespan de FastAPI o en la primera
+# llamada) y todos los servicios reutilizan su pool de conexiones
+# keep-alive. httpx.Client es seguro entre hilos; el cliente asíncrono
+# debe usarse desde el event loop del servidor. Los reintentos del SDK se
+# desactivan: los decide LLMCallPolicy (services/llm_policy.py).
+# -------------------------------------------------------------
+
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS
+    )
+
+
+def create_client(base_url: str = None) -> Anthropic:
+    """Cliente de Anthropic con el pool de conexiones ajustado."""
+    return Anthropic(
+        api_key=_get_api_key(),
+        base_url=base_url,
+        max_retries=0,
+        http_client=DefaultHttpxClient(limits=_pool_limits())
+    )
+
+
+def create_async_client(base_url: str = None) -> AsyncAnthropic:
+    """Cliente asíncrono de Anthropic con el pool de conexiones ajustado."""
+    return AsyncAnthropic(
+        api_key=_get_api_key(),
+        base_url=base_url,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(limits=_pool_limits())
+    )
+
+
+def get_client() -> Anthropic:
+    """Cliente compartido; lo crea en la primera llamada."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client()
+    return _client
+
+
+def get_async_client() -> AsyncAnthropic:
+    """Cliente asíncrono compartido; lo crea en la primera llamada."""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = create_async_client()
+    return _async_client
+
+
+def init_client():
+    """
+    Crea los clientes compartidos al iniciar la aplicación. Sin
+    ANTHROPIC_API_KEY no hace nada: los endpoints del LLM responderán el
+    error de configuración y el resto de la API funciona igual.
+    """
+    if os.getenv("ANTHROPIC_API_KEY"):
+        get_client()
+        get_async_client()
+
+
+async def close_client():
+    """Cierra las conexiones de los clientes compartidos (al apagar)."""
+    global _client, _async_client
+    with _client_lock:
+        client, _client = _client, None
+        async_client, _async_client = _async_client, None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.close()
+
+
+# -------------------------------------------------------------
+# Caché de respuestas del modelo
+# Clave: modelo + max_tokens + hash del prompt completo. Se guarda el
+# texto de la respuesta (y su uso de tokens), no el resultado procesado,
+# así que la extracción del JSON es la misma con o sin caché.
+# -------------------------------------------------------------
+
+def _create_response_cache():
+    if LLM_CACHE_MAX_ENTRIES <= 0:
+        return None
+    backend = None
+    if LLM_CACHE_SQLITE_PATH:
+        backend = SQLiteCacheBackend(LLM_CACHE_SQLITE_PATH, max_entries=LLM_CACHE_DISK_MAX_ENTRIES)
+    return ResultCache(max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS, backend=backend)
+
+
+# Caché compartida del proceso (None si está desactivada)
+llm_response_cache = _create_response_cache()
+
+
+# Llamadas asíncronas en curso, agrupadas por la misma clave de la caché
+llm_flights = SingleFlight()
+
+
+def response_cache_key(model: str, max_tokens: int, prompt: "Prompt") -> str:
+    """Clave de caché de una llamada al modelo."""
+    prompt_hash = hashlib.sha256(_prompt_text(prompt).encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{model}\n{max_tokens}\n{prompt_hash}".encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------------------
+# Prompt caching del proveedor
+# Un prompt con una parte fija grande (instrucciones, gramática) se envía
+# como CachedPrompt: el prefijo se marca con cache_control y la API lo
+# guarda unos minutos, así que las llamadas siguientes lo leen de su caché
+# (más barato y con menos tiempo hasta el primer token) y solo procesan
+# el sufijo. El prefijo debe ser idéntico byte a byte entre llamadas.
+# -------------------------------------------------------------
+
+class CachedPrompt(NamedTuple):
+    """Prompt dividido en un prefijo estático cacheable y un sufijo variable."""
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        """Prompt completo, tal como lo lee el modelo."""
+        return self.prefix + self.suffix
+
+
+Prompt = Union[str, CachedPrompt]
+
+
+def _prompt_text(prompt: Prompt) -> str:
+    return prompt.text if isinstance(prompt, CachedPrompt) else prompt
+
+
+def _messages_api(client, prompt: Prompt):
+    """Recurso de mensajes del cliente: el de prompt caching si hay prefijo."""
+    if isinstance(prompt, CachedPrompt):
+        return client.beta.prompt_caching.messages
+    return client.messages
+
+
+# -------------------------------------------------------------
+# Procesamiento común de las respuestas (síncrono y asíncrono)
+# -------------------------------------------------------------
+
+def _message_params(model: str, prompt: Prompt, max_tokens: int) -> dict:
+    content = prompt
+    if isinstance(prompt, CachedPrompt):
+        content = [
+            {"type": "text", "text": prompt.prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt.suffix}
+        ]
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "messages": [
+            {
+                "role": "user",
+                "content": content
+            }
+        ]
+    }
+
+
+# input_tokens no incluye los del prompt caching: cache_creation_input_tokens
+# (prefijo escrito en la caché del proveedor) y cache_read_input_tokens
+# (prefijo leído de ella) se informan aparte
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+def _message_usage(message) -> dict:
+    """Tokens de la respuesta (None en los campos que no informa)."""
+    usage = getattr(message, "usage", None)
+    return {field: getattr(usage, field, None) for field in _USAGE_FIELDS}
+
+
+def usage_tokens(usage: dict):
+    """
+    Tokens con los campos de TokenUsage a partir de un uso con los campos
+    de la API (_USAGE_FIELDS), o None si no hay uso.
+    """
+    if usage is None:
+        return None
+    input_tokens = usage.get("input_tokens") or 0
+    output_tokens = usage.get("output_tokens") or 0
+    cache_creation = usage.get("cache_creation_input_tokens")
+    cache_read = usage.get("cache_read_input_tokens")
+    return {
+        "input": input_tokens,
+        "output": output_tokens,
+        "total": input_tokens + output_tokens + (cache_creation or 0) + (cache_read or 0),
+        "cache_creation_input": cache_creation,
+        "cache_read_input": cache_read
+    }
+
+
+def _message_text(message) -> str:
+    """Texto de la respuesta del modelo."""
+    if message.content and len(message.content) > 0:
+        return message.content[0].text
+    raise LLMResponseError("La respuesta del modelo está vacía")
+
+
+def extract_json(response_text: str) -> dict:
+    """
+    Extrae y parsea el primer objeto JSON completo de la respuesta del
+    modelo, que puede venir envuelto en un bloque de markdown o rodeado de
+    texto. Una sola pasada (JSONObjectExtractor): las llaves dentro de
+    cadenas, como las de los diagramas Mermaid, no cuentan. Si no hay un
+    objeto completo se parsea el texto entero, lo que lanza
+    json.JSONDecodeError.
+    """
+    json_str = JSONObjectExtractor().feed(response_text)
+    return json.loads(json_str if json_str is not None else response_text.strip())
 
 
 class LLMService:
     """Servicio para consumir APIs de modelos de lenguaje"""
     
-    def __init__(self):
-        """Inicializa el servicio con las credenciales del entorno"""
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            raise ValueError(
-                "ANTHROPIC_API_KEY no está configurada. "
-                "Por favor, configura tu API key en el archivo .env"
-            )
+    cache = None
+    # Resultado de la caché en la última llamada: hit, miss, disabled o
+    # coalesced (esperó la misma llamada iniciada por otra solicitud)
+    cache_status = None
+    # Tokens de la última llamada (ver _message_usage); en un acierto de la
+    # caché, los de la llamada que generó la respuesta guardada
+    usage = None
+    # Plazos, reintentos y hedging de las llamadas (services/llm_policy.py)
+    policy = llm_policy
+    
+    def __init__(self, client: Anthropic = None, policy: LLMCallPolicy = None):
+        """
+        Inicializa el servicio. Sin `client` usa el cliente compartido de la
+        aplicación, así que construir el servicio por solicitud no abre
+        conexiones nuevas. Sin `policy` usa la política compartida de
+        plazos, reintentos y hedging.
+        """
+        self.client = client or get_client()
+        self.model = get_model_name()
+        self.cache = llm_response_cache
+        self.policy = policy or llm_policy
+    
+    def _cached_text(self, key: str, timer=None):
+        """Texto guardado para la llamada o None; actualiza cache_status."""
+        if self.cache is None:
+            self.cache_status = "disabled"
+            return None
+        with timer.stage("llm_cache") if timer else nullcontext():
+            entry = self.cache.get(key)
+        self.cache_status = "hit" if entry is not None else "miss"
+        if entry is None:
+            return None
+        self.usage = {field: entry.get(field) for field in _USAGE_FIELDS}
+        return entry["text"]
+    
+    def _store_response(self, key: str, message, text: str):
+        """
+        Guarda la respuesta. Una respuesta cortada por max_tokens no se
+        guarda: es incompleta y la siguiente solicitud debe reintentarla.
+        """
+        if self.cache is not None and getattr(message, "stop_reason", None) != "max_tokens":
+            self.cache.set(key, {"text": text, **_message_usage(message)})
+    
+    def token_usage(self):
+        """Tokens de la última llamada con los campos de TokenUsage, o None."""
+        return usage_tokens(self.usage)
+    
+    def _request_text(self, prompt: Prompt, max_tokens: int, timer=None) -> str:
+        """Texto de la respuesta del modelo, desde la caché o llamando a la API."""
+        key = response_cache_key(self.model, max_tokens, prompt)
+        text = self._cached_text(key, timer)
+        if text is not None:
+            return text
+        
+        api = _messages_api(self.client, prompt)
+        params = _message_params(self.model, prompt, max_tokens)
+        with timer.stage("llm_wait") if timer else nullcontext():
+            message = self.policy.call(lambda timeout: api.create(**params, timeout=timeout), kind=max_tokens)
         
-        self.client = Anthropic(api_key=api_key)
-        self.model = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20240620")
+        text = _message_text(message)
+        self.usage = _message_usage(message)
+        self._store_response(key, message, text)
+        return text
     
-    def generate_completion(self, prompt: str, max_tokens: int = 2000) -> str:
+    def generate_completion(self, prompt: Prompt, max_tokens: int = 2000, timer=None) -> str:
         """
         Genera una completación usando Claude
         
         Args:
-            prompt: El prompt completo a enviar al modelo
+            prompt: El prompt completo a enviar al modelo, o un CachedPrompt
+                cuyo prefijo se cachea en el proveedor
             max_tokens: Número máximo de tokens en la respuesta
+            timer: StageTimer opcional; mide la consulta a la caché
+                ("llm_cache") y la espera del modelo ("llm_wait")
             
         Returns:
             El texto generado por el modelo
             
         Raises:
-            Exception: Si hay un error al comunicarse con la API
+            LLMError: Si la llamada falla tras los reintentos o vence el plazo
+            Exception: Si hay otro error al comunicarse con la API
         """
         try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            # Extraer el texto de la respuesta
-            if message.content and len(message.content) > 0:
-                return message.content[0].text
-            else:
-                raise Exception("La respuesta del modelo está vacía")
+            return self._request_text(prompt, max_tokens, timer)
                 
+        except LLMError:
+            raise
         except Exception as e:
             raise Exception(f"Error al comunicarse con la API de Claude: {str(e)}")
     
-    def generate_json_completion(self, prompt: str, max_tokens: int = 4000) -> dict:
+    def generate_json_completion(self, prompt: Prompt, max_tokens: int = 4000, timer=None) -> dict:
         """
         Genera una completación en formato JSON usando Claude
         
         Args:
             prompt: El prompt completo a enviar al modelo
             max_tokens: Número máximo de tokens en la respuesta
+            timer: StageTimer opcional; mide "llm_cache", "llm_wait" y
+                "json_extraction"
             
         Returns:
             El JSON generado por el modelo como diccionario
             
         Raises:
-            Exception: Si hay un error al comunicarse con la API o al parsear JSON
+            LLMResponseError: Si la respuesta no es un JSON válido
+            LLMError: Si la llamada falla tras los reintentos o vence el plazo
+            Exception: Si hay otro error al comunicarse con la API
         """
-        import json
-        import re
-        
         try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            # Extraer el texto de la respuesta
-            if message.content and len(message.content) > 0:
-                response_text = message.content[0].text.strip()
-                
-                # Intentar extraer JSON del texto (puede venir envuelto en markdown)
-                # Primero intentar encontrar bloques de código JSON
-                json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                else:
-                    # Si no hay bloques de código, buscar directamente el JSON
-                    # Buscar desde el primer { hasta el último } balanceado
-                    brace_count = 0
-                    start_idx = response_text.find('{')
-                    if start_idx != -1:
-                        for i in range(start_idx, len(response_text)):
-                            if response_text[i] == '{':
-                                brace_count += 1
-                            elif response_text[i] == '}':
-                                brace_count -= 1
-                                if brace_count == 0:
-                                    json_str = response_text[start_idx:i+1]
-                                    break
-                        else:
-                            # Si no se encontró el cierre balanceado, usar todo el texto
-                            json_str = response_text
-                    else:
-                        json_str = response_text
+            response_text = self._request_text(prompt, max_tokens, timer)
+            with timer.stage("json_extraction") if timer else nullcontext():
+                return extract_json(response_text)
                 
-                # Limpiar el JSON (remover espacios al inicio/final)
-                json_str = json_str.strip()
+        except json.JSONDecodeError as e:
+            raise LLMResponseError(f"Error al parsear JSON de la respuesta: {str(e)}")
+        except LLMError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al comunicarse con la API de Claude: {str(e)}")
+
+
+class AsyncLLMService(LLMService):
+    """
+    Variante asíncrona de LLMService sobre el cliente AsyncAnthropic
+    compartido: mientras espera al modelo no ocupa un hilo, así que un
+    worker puede mantener cientos de llamadas en curso.
+    """
+    
+    def __init__(self, client: AsyncAnthropic = None, policy: LLMCallPolicy = None):
+        super().__init__(client or get_async_client(), policy)
+    
+    async def _request_text(self, prompt: Prompt, max_tokens: int, timer=None) -> str:
+        """
+        Como LLMService._request_text, pero las llamadas idénticas en curso
+        se agrupan: solo la primera llega al modelo y las demás esperan su
+        respuesta (cache_status "coalesced").
+        """
+        key = response_cache_key(self.model, max_tokens, prompt)
+        text = self._cached_text(key, timer)
+        if text is not None:
+            return text
+        
+        with timer.stage("llm_wait") if timer else nullcontext():
+            (text, self.usage), shared = await llm_flights.run(
+                key, lambda: self._call_model(key, prompt, max_tokens)
+            )
+        if shared:
+            self.cache_status = "coalesced"
+        return text
+    
+    async def _call_model(self, key: str, prompt: Prompt, max_tokens: int):
+        """(texto, tokens) de la llamada; se comparte con las solicitudes agrupadas."""
+        api = _messages_api(self.client, prompt)
+        params = _message_params(self.model, prompt, max_tokens)
+        message = await self.policy.call_async(lambda timeout: api.create(**params, timeout=timeout), kind=max_tokens)
+        text = _message_text(message)
+        self._store_response(key, message, text)
+        return text, _message_usage(message)
+    
+    async def generate_completion(self, prompt: Prompt, max_tokens: int = 2000, timer=None) -> str:
+        """Versión asíncrona de LLMService.generate_completion."""
+        try:
+            return await self._request_text(prompt, max_tokens, timer)
                 
-                # Parsear el JSON
-                return json.loads(json_str)
-            else:
-                raise Exception("La respuesta del modelo está vacía")
+        except LLMError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al comunicarse con la API de Claude: {str(e)}")
+    
+    async def generate_json_completion(self, prompt: Prompt, max_tokens: int = 4000, timer=None) -> dict:
+        """Versión asíncrona de LLMService.generate_json_completion."""
+        try:
+            response_text = await self._request_text(prompt, max_tokens, timer)
+            with timer.stage("json_extraction") if timer else nullcontext():
+                return extract_json(response_text)
                 
         except json.JSONDecodeError as e:
-            raise Exception(f"Error al parsear JSON de la respuesta: {str(e)}")
+            raise LLMResponseError(f"Error al parsear JSON de la respuesta: {str(e)}")
+        except LLMError:
+            raise
         except Exception as e:
             raise Exception(f"Error al comunicarse con la API de Claude: {str(e)}")
-
+    
+    async def stream_completion(self, prompt: Prompt, max_tokens: int = 2000):
+        """
+        Genera el texto del modelo por fragmentos, a medida que llega
+        (streaming de la API). Un acierto de la caché se entrega en un solo
+        fragmento; al terminar, la respuesta completa se guarda en la caché.
+        Las llamadas en streaming no se agrupan con otras en curso. Un error
+        antes del primer fragmento se reintenta según la política; después
+        ya no, porque el cliente recibió parte del texto.
+        
+        Raises:
+            LLMError: Si la llamada falla tras los reintentos o vence el plazo
+            Exception: Si hay otro error al comunicarse con la API
+        """
+        key = response_cache_key(self.model, max_tokens, prompt)
+        text = self._cached_text(key)
+        if text is not None:
+            yield text
+            return
+        
+        api = _messages_api(self.client, prompt)
+        params = _message_params(self.model, prompt, max_tokens)
+        parts = []
+        attempt = 0
+        while True:
+            try:
+                async with api.stream(**params, timeout=self.policy.timeout()) as stream:
+                    async for delta in stream.text_stream:
+                        parts.append(delta)
+                        yield delta
+                    message = await stream.get_final_message()
+                break
+            except Exception as e:
+                error = llm_error(e)
+                if error is None:
+                    raise Exception(f"Error al comunicarse con la API de Claude: {str(e)}")
+                if parts:
+                    raise error
+                await asyncio.sleep(self.policy.retry_delay(attempt, error))
+                attempt += 1
+        
+        self.usage = _message_usage(message)
+        self._store_response(key, message, "".join(parts))
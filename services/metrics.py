@@ -0,0 +1,335 @@
+# -------------------------------------------------------------
+# Métricas en formato de texto de Prometheus (GET /metrics)
+# Contadores e histogramas en memoria con un lock por registro; el
+# estado de otros componentes (cachés, admisión, ejecutor) se lee en el
+# momento del scrape mediante colectores. Con varios workers de uvicorn
+# cada proceso vuelca su instantánea en METRICS_MULTIPROC_DIR y /metrics
+# suma las de todos.
+# -------------------------------------------------------------
+
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+
+# Directorio compartido entre workers (sin valor: solo el proceso actual).
+# Debe vaciarse al iniciar el servidor, como en prometheus_client.
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+# Cada cuántos segundos vuelca cada proceso su instantánea al directorio
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))
+
+# Starlette agrega "; charset=utf-8" a los tipos text/*
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Segundos: de 1 ms (análisis en caché) a 60 s (análisis por LLM)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Las etapas del análisis suelen durar fracciones de milisegundo
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005) + LATENCY_BUCKETS
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # La última barra es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso. Las etiquetas se guardan como tuplas
+    de pares (nombre, valor) para que registrar una observación sea una
+    búsqueda en un diccionario.
+    """
+
+    def __init__(self, multiproc_dir=METRICS_MULTIPROC_DIR):
+        self.multiproc_dir = multiproc_dir
+        self.lock = threading.Lock()
+        self.descriptions = {}  # nombre → (tipo, ayuda, barras)
+        self.counters = {}      # (nombre, etiquetas) → valor
+        self.histograms = {}    # (nombre, etiquetas) → _Histogram
+        self.collectors = []    # funciones que devuelven muestras al momento del scrape
+        self.derived = []       # funciones que calculan gauges a partir de los contadores agregados
+        self._flusher = None
+
+    # --- Definición -------------------------------------------------
+
+    def describe(self, name, kind, help_text, buckets=None):
+        """Declara una métrica: kind es counter, gauge o histogram."""
+        self.descriptions[name] = (kind, help_text, tuple(buckets) if buckets else None)
+
+    def add_collector(self, collector):
+        """
+        Registra una función sin argumentos que devuelve muestras
+        (nombre, {etiquetas}, valor) leídas del estado de otro componente.
+        """
+        self.collectors.append(collector)
+
+    def add_derived(self, derive):
+        """
+        Registra una función que recibe los contadores ya sumados entre
+        procesos ({(nombre, etiquetas): valor}) y devuelve gauges calculados
+        (p. ej. proporciones, que no pueden sumarse por proceso).
+        """
+        self.derived.append(derive)
+
+    # --- Registro ---------------------------------------------------
+
+    def inc(self, name, labels=(), amount=1.0):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0.0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram(self.descriptions[name][2] or LATENCY_BUCKETS)
+            histogram.observe(value)
+
+    # --- Instantáneas y agregación entre procesos -------------------
+
+    def snapshot(self):
+        """Estado del proceso serializable a JSON (incluye los colectores)."""
+        with self.lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [
+                [name, list(labels), list(h.counts), h.sum, h.count]
+                for (name, labels), h in self.histograms.items()
+            ]
+        gauges = []
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                target = counters if self.descriptions[name][0] == "counter" else gauges
+                target.append([name, sorted(labels.items()), value])
+        return {"pid": os.getpid(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.multiproc_dir, f"metrics-{pid}.json")
+
+    def flush(self):
+        """Escribe la instantánea del proceso en el directorio compartido (reemplazo atómico)."""
+        path = self._snapshot_path(os.getpid())
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+    def start_flusher(self):
+        """Hilo que vuelca la instantánea cada METRICS_FLUSH_SECONDS (solo en modo multiproceso)."""
+        if not self.multiproc_dir or self._flusher is not None:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+
+        def loop():
+            while True:
+                time.sleep(METRICS_FLUSH_SECONDS)
+                try:
+                    self.flush()
+                except OSError:
+                    pass  # Directorio no disponible: se reintenta en el próximo ciclo
+
+        self._flusher = threading.Thread(target=loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def collect(self):
+        """
+        Instantáneas de todos los procesos: la propia (al momento) y, en modo
+        multiproceso, las de los demás workers. Los contadores e histogramas
+        de procesos terminados se conservan; sus gauges se descartan.
+        """
+        own = self.snapshot()
+        if not self.multiproc_dir:
+            return [own]
+
+        snapshots = [own]
+        for path in glob.glob(os.path.join(self.multiproc_dir, "metrics-*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if other["pid"] == own["pid"]:
+                continue
+            if not _process_alive(other["pid"]):
+                other["gauges"] = []
+            snapshots.append(other)
+        return snapshots
+
+    # --- Exposición -------------------------------------------------
+
+    def render(self):
+        """Todas las métricas agregadas, en el formato de texto de Prometheus."""
+        counters, gauges, histograms = {}, {}, {}
+        for snapshot in self.collect():
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            for name, labels, value in snapshot["gauges"]:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0.0) + value
+            for name, labels, counts, total, count in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+
+        for derive in self.derived:
+            for name, labels, value in derive(counters):
+                gauges[(name, tuple(sorted(labels.items())))] = value
+
+        samples = {}  # nombre → líneas
+        for (name, labels), value in sorted({**counters, **gauges}.items()):
+            samples.setdefault(name, []).append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            buckets = self.descriptions[name][2] or LATENCY_BUCKETS
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        output = []
+        for name in sorted(samples):
+            kind, help_text, _ = self.descriptions.get(name, ("untyped", "", None))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# --- Métricas de la aplicación ------------------------------------
+
+metrics = MetricsRegistry()
+
+metrics.describe("complexity_http_requests_total", "counter", "Solicitudes HTTP por endpoint, método y código")
+metrics.describe("complexity_http_request_duration_seconds", "histogram", "Latencia de las solicitudes HTTP por endpoint")
+metrics.describe("complexity_http_requests_in_flight", "gauge", "Solicitudes HTTP en curso")
+metrics.describe(
+    "complexity_stage_duration_seconds", "histogram", "Duración de cada etapa del pipeline por endpoint", STAGE_BUCKETS
+)
+metrics.describe("complexity_llm_requests_total", "counter", "Análisis por LLM completados por modelo")
+metrics.describe("complexity_llm_tokens_total", "counter", "Tokens consumidos por modelo y tipo (input/output)")
+metrics.describe("complexity_llm_cost_usd_total", "counter", "Costo estimado acumulado de las llamadas al LLM (USD)")
+
+_in_flight = [0]
+
+
+def record_request(endpoint, method, status, duration_seconds):
+    """Registra una solicitud terminada (lo llama MetricsMiddleware)."""
+    labels = (("endpoint", endpoint), ("method", method))
+    with metrics.lock:
+        key = ("complexity_http_requests_total", labels + (("status", str(status)),))
+        metrics.counters[key] = metrics.counters.get(key, 0.0) + 1
+        key = ("complexity_http_request_duration_seconds", labels)
+        histogram = metrics.histograms.get(key)
+        if histogram is None:
+            histogram = metrics.histograms[key] = _Histogram(LATENCY_BUCKETS)
+        histogram.observe(duration_seconds)
+
+
+_stage_histograms = {}  # endpoint → {etapa: _Histogram}, para no armar etiquetas por solicitud
+
+
+def record_stages(endpoint, stages):
+    """Registra las etapas (ms) de un StageTimer en el histograma por etapa."""
+    by_stage = _stage_histograms.get(endpoint)
+    if by_stage is None:
+        by_stage = _stage_histograms.setdefault(endpoint, {})
+    bisect_left = bisect.bisect_left
+    with metrics.lock:
+        for stage, duration_ms in stages.items():
+            histogram = by_stage.get(stage)
+            if histogram is None:
+                histogram = by_stage[stage] = metrics.histograms[
+                    ("complexity_stage_duration_seconds", (("endpoint", endpoint), ("stage", stage)))
+                ] = _Histogram(STAGE_BUCKETS)
+            seconds = duration_ms / 1000
+            histogram.counts[bisect_left(histogram.buckets, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+
+def record_llm_usage(model, input_tokens, output_tokens, cost_usd):
+    """Registra el consumo de un análisis por LLM (de LLMMetadata)."""
+    model_label = (("model", model),)
+    metrics.inc("complexity_llm_requests_total", model_label)
+    metrics.inc("complexity_llm_tokens_total", model_label + (("kind", "input"),), input_tokens or 0)
+    metrics.inc("complexity_llm_tokens_total", model_label + (("kind", "output"),), output_tokens or 0)
+    if cost_usd:
+        metrics.inc("complexity_llm_cost_usd_total", model_label, cost_usd)
+
+
+metrics.add_collector(lambda: [("complexity_http_requests_in_flight", {}, _in_flight[0])])
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: cuenta las solicitudes y mide su latencia por plantilla
+    de ruta (p. ej. /analyze-by-system/{content_hash}) para no crear una
+    serie por cada hash. La latencia llega hasta el último byte enviado.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        _in_flight[0] += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_flight[0] -= 1
+            route = scope.get("route")
+            endpoint = route.path if route is not None else "unmatched"
+            record_request(endpoint, scope["method"], status[0], time.perf_counter() - start)
@@ -0,0 +1,269 @@
+# -------------------------------------------------------------
+# Caché de resultados de /analyze-by-system direccionada por contenido
+# Clave: hash del pseudocódigo normalizado + versión del analizador +
+# probabilidades del caso promedio. LRU en memoria con límite de
+# tamaño y TTL, y opcionalmente un respaldo compartido en SQLite.
+# -------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+
+from analyzer.complexity import ANALYZER_VERSION
+from services.analysis_service import analyze_pseudocode
+
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+RESULT_CACHE_SQLITE_PATH = os.getenv("RESULT_CACHE_SQLITE_PATH")  # Sin valor: solo memoria
+
+# Cadenas (se conservan tal cual), comentarios (► hasta fin de línea) y
+# espacios (la gramática ignora estos dos últimos)
+_SOURCE_TOKEN_RE = re.compile(r'("[^"]*")|(?:\s|►[^\n]*)+')
+
+
+def _normalize_token(match) -> str:
+    return match.group(1) or " "
+
+
+def normalize_source(text: str) -> str:
+    """
+    Quita comentarios y colapsa espacios fuera de las cadenas: textos
+    equivalentes para el parser. Un ► o varios espacios dentro de "..."
+    forman parte del literal y cambian la clave.
+    """
+    return _SOURCE_TOKEN_RE.sub(_normalize_token, text).strip()
+
+
+def cache_key(text: str, probabilities: dict = None) -> str:
+    """Clave de caché de un análisis."""
+    payload = json.dumps(
+        {
+            "version": ANALYZER_VERSION,
+            "source": normalize_source(text),
+            "probabilities": probabilities or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """
+    Respaldo compartido entre workers: un archivo SQLite en disco local,
+    creado en la primera escritura. Cada operación abre su propia conexión
+    y la cierra al terminar, así que es seguro entre hilos y procesos. El
+    modo WAL queda guardado en el archivo, por lo que se fija una sola vez; el recorte a
+    max_entries corre cada TRIM_INTERVAL inserciones, así que el archivo
+    puede pasarse del límite por unas pocas entradas.
+    """
+
+    TRIM_INTERVAL = 64
+
+    def __init__(self, path: str, max_entries: int = None):
+        self.path = path
+        # Límite propio del archivo; sin valor se usa el de la caché en memoria
+        self.max_entries = max_entries
+        self.inserts = 0
+        self.lock = threading.Lock()
+        self.ready = False
+
+    def _ensure_schema(self):
+        """
+        Crea el directorio, el archivo y la tabla en la primera escritura (no
+        al construir el respaldo, que suele ocurrir al importar el módulo).
+        """
+        if self.ready:
+            return
+        with self.lock:
+            if self.ready:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with closing(sqlite3.connect(self.path, timeout=5)) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+            with self._transaction() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+                )
+            self.ready = True
+
+    @contextmanager
+    def _transaction(self):
+        """Conexión que confirma (o revierte) la transacción y se cierra al salir."""
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn:
+            with conn:
+                yield conn
+
+    def get(self, key: str, max_age: float, now: float):
+        # Una lectura no crea el archivo: si no existe, no hay nada guardado
+        if not self.ready and not os.path.exists(self.path):
+            return None
+        self._ensure_schema()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value, stored_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > max_age:
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str, now: float, max_entries: int):
+        self._ensure_schema()
+        with self.lock:
+            self.inserts += 1
+            trim = self.inserts % self.TRIM_INTERVAL == 0
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, now),
+            )
+            if trim:
+                self._trim(conn, self.max_entries or max_entries)
+
+    @staticmethod
+    def _trim(conn, max_entries: int):
+        """Conserva solo las max_entries entradas más recientes."""
+        conn.execute(
+            "DELETE FROM results WHERE key NOT IN "
+            "(SELECT key FROM results ORDER BY stored_at DESC LIMIT ?)",
+            (max_entries,),
+        )
+
+    def size(self) -> int:
+        self._ensure_schema()
+        with self._transaction() as conn:
+            return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        self._ensure_schema()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM results")
+
+
+class ResultCache:
+    """
+    LRU en memoria con TTL. Los valores se guardan serializados en JSON, de
+    modo que cada lectura devuelve una copia independiente.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+                 backend=None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.clock = clock
+        self.entries = OrderedDict()  # clave → (valor JSON, instante de guardado)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.shared_hits = 0
+
+    @classmethod
+    def from_env(cls):
+        """Crea la caché con la configuración de las variables de entorno."""
+        backend = SQLiteCacheBackend(RESULT_CACHE_SQLITE_PATH) if RESULT_CACHE_SQLITE_PATH else None
+        return cls(backend=backend)
+
+    def get(self, key: str):
+        """Devuelve una copia del resultado guardado o None."""
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                del self.entries[key]
+                self.expirations += 1
+
+        value = self.backend.get(key, self.ttl_seconds, now) if self.backend else None
+
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.shared_hits += 1
+            self._store(key, value, now)
+        return json.loads(value)
+
+    def set(self, key: str, result: dict):
+        """Guarda un resultado en memoria (y en el respaldo compartido)."""
+        value = json.dumps(result, ensure_ascii=False)
+        now = self.clock()
+        with self.lock:
+            self._store(key, value, now)
+        if self.backend:
+            self.backend.set(key, value, now, self.max_entries)
+
+    def _store(self, key, value, now):
+        self.entries[key] = (value, now)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Vacía la caché (memoria y respaldo) sin reiniciar los contadores."""
+        with self.lock:
+            self.entries.clear()
+        if self.backend:
+            self.backend.clear()
+
+    def stats(self):
+        """Contadores de la caché para el endpoint de estadísticas."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "shared_hits": self.shared_hits,
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "backend": "sqlite" if self.backend else "memory",
+                "analyzer_version": ANALYZER_VERSION,
+            }
+
+
+# Caché compartida del proceso
+result_cache = ResultCache.from_env()
+
+
+def get_cached_analysis(text: str, probabilities: dict = None, cache: ResultCache = None):
+    """Resultado en caché para el programa o None."""
+    return (cache or result_cache).get(cache_key(text, probabilities))
+
+
+def store_analysis(text: str, probabilities: dict, result: dict, cache: ResultCache = None):
+    """
+    Guarda un resultado si es cacheable. Solo se guardan análisis completos:
+    los errores (cuya posición depende del formato original) y los
+    resultados truncados por presupuesto se recalculan siempre.
+    """
+    if "error" not in result and not result.get("truncated"):
+        (cache or result_cache).set(cache_key(text, probabilities), result)
+
+
+def analyze_with_cache(text: str, probabilities: dict = None, budget=None, cache: ResultCache = None):
+    """analyze_pseudocode con caché de resultados."""
+    result = get_cached_analysis(text, probabilities, cache)
+    if result is not None:
+        return result
+
+    result = analyze_pseudocode(text, probabilities, budget)
+    store_analysis(text, probabilities, result, cache)
+    return result
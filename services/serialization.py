@@ -0,0 +1,202 @@
+# -------------------------------------------------------------
+# Serialización rápida de las respuestas
+# Los endpoints construyen y validan sus modelos Pydantic una sola vez y
+# devuelven ModelResponse: FastAPI no vuelve a validarlos contra
+# response_model (que se conserva solo para la documentación OpenAPI) y
+# el cuerpo se genera con orjson, o con el serializador de Pydantic si
+# orjson no está instalado.
+#
+# Negociación de contenido (Accept / Accept-Encoding) para las llamadas
+# entre servicios: MessagePack con el mismo esquema de los modelos y
+# compresión gzip o brotli de los cuerpos grandes.
+# -------------------------------------------------------------
+
+import gzip
+import json
+import os
+import time
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: se usa el serializador de Pydantic
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Dependencia opcional: sin ella solo se ofrece JSON
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional: sin ella solo se ofrece gzip
+    brotli = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_JSON_RANGES = {JSON_MEDIA_TYPE, "application/*", "*/*"}
+_MSGPACK_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+
+# Los cuerpos más pequeños se envían sin comprimir: no compensa el costo
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Representaciones que pueden negociar los endpoints de análisis (para OpenAPI)
+NEGOTIATED_CONTENT = {"content": {MSGPACK_MEDIA_TYPE: {}}}
+
+# Server-Sent Events. Sin caché ni buffering de proxies (nginx): cada
+# evento debe llegar al cliente en cuanto se genera.
+SSE_MEDIA_TYPE = "text/event-stream"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+SSE_CONTENT = {"content": {SSE_MEDIA_TYPE: {}}}
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serializa un modelo Pydantic, o datos ya compatibles con JSON, a bytes
+    UTF-8 sin pasar por jsonable_encoder.
+    """
+    if isinstance(content, BaseModel):
+        if orjson is not None:
+            return orjson.dumps(content.model_dump())
+        return content.model_dump_json().encode("utf-8")
+
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Evento SSE con los datos en JSON (siempre en una sola línea)."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class ModelResponse(JSONResponse):
+    """
+    Respuesta JSON para un modelo ya validado (o un diccionario que ya pasó
+    por uno, como los guardados en caché). Al devolver una instancia de
+    Response, FastAPI omite la validación de response_model y el encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _parse_header_list(header: str):
+    """
+    Lista de valores con peso de un header (Accept, Accept-Encoding):
+    "a;q=0.5, b" → [("a", 0.5), ("b", 1.0)].
+    """
+    items = []
+    for part in (header or "").split(","):
+        value, *params = (piece.strip() for piece in part.split(";"))
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        items.append((value.lower(), quality))
+    return items
+
+
+def _best(candidates):
+    """El candidato de mayor peso; ante un empate, el primero del header."""
+    best, best_quality = None, 0.0
+    for value, quality in candidates:
+        if quality > best_quality:
+            best, best_quality = value, quality
+    return best
+
+
+class Representation:
+    """Formato (media type) y codificación elegidos para una respuesta."""
+
+    def __init__(self, media_type: str = JSON_MEDIA_TYPE, encoding: str = None):
+        self.media_type = media_type
+        self.encoding = encoding
+
+    @property
+    def etag_suffix(self) -> str:
+        """Sufijo del ETag: cada formato es una representación distinta."""
+        return "-msgpack" if self.media_type == MSGPACK_MEDIA_TYPE else ""
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            data = content.model_dump() if isinstance(content, BaseModel) else content
+            return msgpack.packb(data)
+        return dumps(content)
+
+    def response(self, content: Any, headers: dict = None, timer=None) -> Response:
+        """
+        Respuesta con el cuerpo en el formato negociado, comprimido si supera
+        COMPRESSION_MIN_BYTES. El ETag del cuerpo comprimido lleva el sufijo
+        de la codificación, como exige un ETag fuerte.
+
+        Con timer (StageTimer) se mide la etapa "serialization", se agrega
+        el header Server-Timing con todas las etapas de la solicitud y se
+        registran en /metrics.
+        """
+        start = time.perf_counter()
+        body = self.render(content)
+        headers = {**(headers or {}), "Vary": "Accept, Accept-Encoding"}
+
+        if self.encoding and len(body) >= COMPRESSION_MIN_BYTES:
+            body = compress(body, self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if "ETag" in headers:
+                headers["ETag"] = headers["ETag"][:-1] + f'-{self.encoding}"'
+
+        if timer is not None:
+            timer.add("serialization", (time.perf_counter() - start) * 1000)
+            headers["Server-Timing"] = timer.finish()
+        return Response(body, media_type=self.media_type, headers=headers)
+
+    def not_modified(self, headers: dict, timer=None) -> Response:
+        """Respuesta 304 para esta representación."""
+        headers = {**headers, "Vary": "Accept, Accept-Encoding"}
+        if timer is not None:
+            headers["Server-Timing"] = timer.finish()
+        return Response(status_code=304, headers=headers)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def negotiate(accept: str = None, accept_encoding: str = None) -> Representation:
+    """
+    Elige formato y codificación según Accept y Accept-Encoding.
+    MessagePack y brotli solo se ofrecen si sus paquetes están instalados;
+    si el cliente no acepta nada de lo disponible se responde JSON.
+    """
+    formats = []
+    for value, quality in _parse_header_list(accept):
+        if value in _MSGPACK_TYPES and msgpack is not None:
+            formats.append((MSGPACK_MEDIA_TYPE, quality))
+        elif value in _JSON_RANGES:
+            formats.append((JSON_MEDIA_TYPE, quality))
+    media_type = _best(formats) or JSON_MEDIA_TYPE
+
+    encodings = []
+    for value, quality in _parse_header_list(accept_encoding):
+        if value == "br" and brotli is not None:
+            encodings.append(("br", quality))
+        elif value in ("gzip", "x-gzip"):
+            encodings.append(("gzip", quality))
+    # Brotli primero: a igual peso comprime más
+    encodings.sort(key=lambda item: item[0] != "br")
+
+    return Representation(media_type, _best(encodings))
@@ -0,0 +1,78 @@
+# -------------------------------------------------------------
+# Coalescencia de llamadas idénticas en curso (single-flight)
+# Mientras una llamada con cierta clave está en curso, las siguientes
+# con la misma clave esperan su resultado en lugar de repetirla. Se
+# usa desde el event loop, así que no necesita lock.
+# -------------------------------------------------------------
+
+import asyncio
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas asíncronas por clave. La llamada corre en su propia
+    tarea: si el solicitante que la inició se cancela, las demás siguen
+    esperando el mismo resultado; solo se cancela cuando ya no la espera
+    nadie. Un error se propaga a todos los que esperaban.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.started = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def run(self, key, factory):
+        """
+        Devuelve (resultado, compartido). `factory` crea la corrutina de la
+        llamada; solo se invoca si no hay otra en curso con la misma clave.
+        """
+        flight = self.flights.get(key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self.flights[key] = flight
+            self.started += 1
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Último en esperar: se cancela la llamada y los que lleguen
+                # después inician una nueva
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.cancelled += 1
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key, flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    def _finish(self, key, flight):
+        self._forget(key, flight)
+        # Marca la excepción como recuperada si nadie quedó esperándola
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self.flights),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+        }
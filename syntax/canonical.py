@@ -0,0 +1,201 @@
+# canonical.py
+# ----------------------------------------------------------
+# Forma canónica del AST y huella (fingerprint) estable del programa
+# Dos programas que solo difieren en nombres, espacios, comentarios
+# u orden de operandos conmutativos producen la misma huella
+# ----------------------------------------------------------
+
+import hashlib
+import json
+
+# Cambiar si cambia la forma canónica (invalida huellas anteriores)
+FINGERPRINT_VERSION = "1"
+
+# Operadores cuyo orden de operandos no afecta el análisis
+COMMUTATIVE_OPS = {"+", "*"}
+SYMMETRIC_COMPARISONS = {"=", "≠"}
+
+# Prefijos de los nombres canónicos. Empiezan con "_", que la gramática no
+# permite al inicio de un NAME, así que no chocan con nombres conservados.
+PREFIXES = {
+    "var": "_v",
+    "subroutine": "_f",
+    "class": "_c",
+    "field": "_a",
+}
+
+
+def canonicalize(ast):
+    """
+    Devuelve una copia alfa-normalizada del AST generado por PseudocodeTransformer.
+
+    - Variables, subrutinas, clases y atributos se renombran por orden de
+      aparición (_v1, _f1, _c1, _a1, ...).
+    - Los nombres que aparecen en el reporte de complejidad (variables de
+      tamaño de los límites de ciclos, arreglos declarados, objetos, argumentos
+      de length y subarreglos) se conservan: así dos programas con la misma
+      huella producen exactamente el mismo análisis.
+    - Los operandos de + y * y las comparaciones = / ≠ se ordenan.
+    - Los comentarios y espacios no forman parte del AST.
+    """
+    return _Canonicalizer(ast).canonicalize()
+
+
+def fingerprint(ast):
+    """Huella SHA-256 de la forma canónica del AST (clave para deduplicar y cachear)."""
+    payload = json.dumps(canonicalize(ast), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{FINGERPRINT_VERSION}:{payload}".encode("utf-8")).hexdigest()
+
+
+class _Canonicalizer:
+    def __init__(self, ast):
+        self.ast = ast
+        self.names = {kind: {} for kind in PREFIXES}
+        self.preserved = {kind: set() for kind in PREFIXES}
+
+    def canonicalize(self):
+        self._collect_preserved(self.ast)
+        ordered = self._order_operands(self.ast)
+        return self._rename(ordered)
+
+    # ------------------------------------------------------
+    # Nombres que aparecen en el reporte
+    # ------------------------------------------------------
+
+    def _collect_preserved(self, node):
+        if isinstance(node, list):
+            for item in node:
+                self._collect_preserved(item)
+            return
+        if not isinstance(node, dict):
+            return
+
+        nodetype = node.get("type")
+
+        if nodetype == "for":
+            self._preserve_vars(node.get("end"))
+        elif nodetype in ("while", "repeat"):
+            self._preserve_vars(node.get("condition"))
+        elif nodetype == "array_decl":
+            self.preserved["var"].add(node.get("name"))
+            self._preserve_vars(node.get("size"))
+        elif nodetype == "object":
+            self.preserved["var"].add(node.get("name"))
+            self.preserved["class"].add(node.get("class"))
+        elif nodetype == "length":
+            self._preserve_vars(node.get("arg"))
+        elif nodetype == "range":
+            self._preserve_vars(node.get("start"))
+            self._preserve_vars(node.get("end"))
+        elif nodetype == "param":
+            self._preserve_vars(node.get("dims"))
+        elif nodetype == "assignment":
+            expr = node.get("expr")
+            if isinstance(expr, dict) and expr.get("type") == "length":
+                # n 🡨 length(A): n pasa a ser una variable de tamaño
+                self._preserve_vars(node.get("var"))
+        elif nodetype == "var" and self._has_range(node):
+            # Subarreglo A[1..j]: el reporte de espacio nombra a A
+            self.preserved["var"].add(node.get("name"))
+
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                self._collect_preserved(value)
+
+    def _preserve_vars(self, node):
+        if isinstance(node, list):
+            for item in node:
+                self._preserve_vars(item)
+            return
+        if not isinstance(node, dict):
+            return
+        if node.get("type") == "var":
+            self.preserved["var"].add(node.get("name"))
+            if node.get("field"):
+                self.preserved["field"].add(node.get("field"))
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                self._preserve_vars(value)
+
+    def _has_range(self, var):
+        for acc in var.get("access") or []:
+            index = acc.get("index") if isinstance(acc, dict) else None
+            if isinstance(index, dict) and index.get("type") == "range":
+                return True
+        return False
+
+    # ------------------------------------------------------
+    # Operandos conmutativos
+    # ------------------------------------------------------
+
+    def _order_operands(self, node):
+        if isinstance(node, list):
+            return [self._order_operands(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+
+        ordered = {key: self._order_operands(value) for key, value in node.items()}
+
+        commutative = (
+            (ordered.get("type") == "binop" and ordered.get("op") in COMMUTATIVE_OPS)
+            or (ordered.get("type") == "comparison" and ordered.get("op") in SYMMETRIC_COMPARISONS)
+        )
+        if commutative and self._shape(ordered["right"]) < self._shape(ordered["left"]):
+            ordered["left"], ordered["right"] = ordered["right"], ordered["left"]
+
+        return ordered
+
+    def _shape(self, node):
+        """Clave de orden independiente de los nombres renombrables."""
+        def erase(value, key=None):
+            if isinstance(value, dict):
+                return {k: erase(v, k) for k, v in value.items()}
+            if isinstance(value, list):
+                return [erase(item) for item in value]
+            if key in ("name", "field", "var", "class") and isinstance(value, str):
+                preserved = value in self.preserved["var"] or value in self.preserved["field"]
+                return value if preserved else "_"
+            return value
+
+        return json.dumps(erase(node), sort_keys=True, ensure_ascii=False)
+
+    # ------------------------------------------------------
+    # Renombrado posicional
+    # ------------------------------------------------------
+
+    def _canonical_name(self, kind, name):
+        if not isinstance(name, str) or name in self.preserved[kind]:
+            return name
+        table = self.names[kind]
+        if name not in table:
+            table[name] = f"{PREFIXES[kind]}{len(table) + 1}"
+        return table[name]
+
+    def _rename(self, node):
+        if isinstance(node, list):
+            return [self._rename(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+
+        nodetype = node.get("type")
+        renamed = {}
+
+        for key, value in node.items():
+            if key == "name" and nodetype in ("subroutine", "call"):
+                renamed[key] = self._canonical_name("subroutine", value)
+            elif key == "name" and nodetype in ("class", "graph_class"):
+                renamed[key] = self._canonical_name("class", value)
+            elif key == "name" and nodetype in ("var", "param", "array_decl", "object", "graph_instance"):
+                renamed[key] = self._canonical_name("var", value)
+            elif key == "var" and nodetype == "for":
+                renamed[key] = self._canonical_name("var", value)
+            elif key == "class" and nodetype in ("object", "param"):
+                renamed[key] = self._canonical_name("class", value)
+            elif key == "field" and nodetype == "var":
+                renamed[key] = self._canonical_name("field", value)
+            elif key == "attrs" and nodetype in ("class", "graph_class"):
+                renamed[key] = [self._canonical_name("field", attr) for attr in value]
+            else:
+                renamed[key] = self._rename(value)
+
+        return renamed
@@ -1,4 +1,5 @@
 # parser.py
+from contextlib import nullcontext
 from lark import Lark, Transformer, Token, Tree
 import os
 
@@ -10,10 +11,33 @@ class PseudocodeParser:
         
         self.lark = Lark.open(grammar_path, start="program", parser="lalr")
 
-    def parse(self, text):
-        tree = self.lark.parse(text)
-        transformed = PseudocodeTransformer().transform(tree)
-        return transformed
+    def parse(self, text, budget=None, timer=None):
+        """
+        Parsea el texto y lo transforma en AST.
+        Si se recibe un presupuesto (AnalysisBudget), se consume un tick por
+        token y por nodo transformado; al agotarse se lanza BudgetExceededError.
+        Si se recibe un timer (StageTimer), mide las etapas "parse" y "transform".
+        """
+        parse_stage = timer.stage("parse") if timer else nullcontext()
+        transform_stage = timer.stage("transform") if timer else nullcontext()
+
+        if budget is None:
+            with parse_stage:
+                tree = self.lark.parse(text)
+            with transform_stage:
+                return PseudocodeTransformer().transform(tree)
+
+        # Parseo interactivo: permite revisar el presupuesto token a token
+        with parse_stage:
+            interactive = self.lark.parse_interactive(text)
+            last_token = None
+            for last_token in interactive.iter_parse():
+                budget.tick("parse")
+            # El último token da la posición correcta a un error de fin de entrada
+            tree = interactive.feed_eof(last_token)
+
+        with transform_stage:
+            return PseudocodeTransformer(budget).transform(tree)
 
 
 class PseudocodeTransformer(Transformer):
@@ -21,6 +45,16 @@ class PseudocodeTransformer(Transformer):
     Transformer robusto que maneja todos los casos de la gramática.
     """
 
+    def __init__(self, budget=None):
+        super().__init__()
+        self.budget = budget
+
+    def _call_userfunc(self, tree, new_children=None):
+        # Cada nodo transformado consume presupuesto (si hay uno)
+        if self.budget is not None:
+            self.budget.tick("transform")
+        return super()._call_userfunc(tree, new_children)
+
     def program(self, items):
         return {"type": "program", "body": items}
 
@@ -162,10 +196,27 @@ class PseudocodeTransformer(Transformer):
         return items
 
     def param(self, items):
-        return items[0] if items else None
+        # param: NAME | NAME array_dims | NAME NAME (Clase objeto)
+        if not items:
+            return None
+        if len(items) == 2 and isinstance(items[1], list):
+            # Arreglo con dimensiones: A[n][m] → dims = [n, m]
+            return {"type": "param", "name": self._extract_value(items[0]), "dims": items[1]}
+        if len(items) == 2:
+            return {
+                "type": "param",
+                "class": self._extract_value(items[0]),
+                "name": self._extract_value(items[1])
+            }
+        return {"type": "param", "name": self._extract_value(items[0])}
 
     def array_dims(self, items):
-        return items
+        # Una entrada por dimensión, en orden: A[][m] → [None, m]
+        return list(items)
+
+    def array_dim(self, items):
+        # Tamaño de la dimensión o None si se omite ([])
+        return items[0] if items else None
 
     # ---- Variables ----
     
@@ -27,13 +27,19 @@ def test_repeat_until_loop_increment():
         "O": "O(n)",
         "Omega": "Ω(n)",
         "Theta": "Θ(n)",
+        "fingerprint": "48e35ecb6c0c8b157bfcba81f6e7567d67350c510bedc265e1112af8c97321f0",
+        "space": {
+            "O": "O(1)",
+            "details": []
+        },
         "details": {
             "loops": [
                 "Ciclo REPEAT → O(n)"
             ],
             "recursion": None,
             "combination": "Suma de complejidades secuenciales",
-            "early_exit_detected": False
+            "early_exit_detected": False,
+            "average_case": []
         }
     }
     
@@ -44,12 +50,14 @@ def test_repeat_until_loop_increment():
     assert "O" in result, "El resultado debe contener 'O'"
     assert "Omega" in result, "El resultado debe contener 'Omega'"
     assert "Theta" in result, "El resultado debe contener 'Theta'"
+    assert "space" in result, "El resultado debe contener 'space'"
     assert "details" in result, "El resultado debe contener 'details'"
     
     # Verificar los valores de complejidad
     assert result["O"] == expected_result["O"], f"O esperado: {expected_result['O']}, obtenido: {result['O']}"
     assert result["Omega"] == expected_result["Omega"], f"Omega esperado: {expected_result['Omega']}, obtenido: {result['Omega']}"
     assert result["Theta"] == expected_result["Theta"], f"Theta esperado: {expected_result['Theta']}, obtenido: {result['Theta']}"
+    assert result["space"] == expected_result["space"], f"Space esperado: {expected_result['space']}, obtenido: {result['space']}"
     
     # Verificar los detalles
     assert "loops" in result["details"], "El resultado debe contener 'loops' en details"
@@ -65,6 +73,9 @@ def test_repeat_until_loop_increment():
     assert result["details"]["early_exit_detected"] == expected_result["details"]["early_exit_detected"], \
         f"Early exit detected esperado: {expected_result['details']['early_exit_detected']}, obtenido: {result['details']['early_exit_detected']}"
     
+    assert result["details"]["average_case"] == expected_result["details"]["average_case"], \
+        f"Average case esperado: {expected_result['details']['average_case']}, obtenido: {result['details']['average_case']}"
+    
     # Verificación final: comparar el resultado completo
     assert result == expected_result, f"Resultado completo no coincide.\nEsperado: {expected_result}\nObtenido: {result}"
 
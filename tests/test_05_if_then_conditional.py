@@ -27,11 +27,17 @@ def test_if_then_conditional():
         "O": "O(1)",
         "Omega": "Ω(1)",
         "Theta": "Θ(1)",
+        "fingerprint": "99086ef13614d89ca4e4fa7d78dae39ef9baae588f24e5c76e55f3fd420efd2c",
+        "space": {
+            "O": "O(1)",
+            "details": []
+        },
         "details": {
             "loops": [],
             "recursion": None,
             "combination": "Suma de complejidades secuenciales",
-            "early_exit_detected": False
+            "early_exit_detected": False,
+            "average_case": []
         }
     }
     
@@ -42,12 +48,14 @@ def test_if_then_conditional():
     assert "O" in result, "El resultado debe contener 'O'"
     assert "Omega" in result, "El resultado debe contener 'Omega'"
     assert "Theta" in result, "El resultado debe contener 'Theta'"
+    assert "space" in result, "El resultado debe contener 'space'"
     assert "details" in result, "El resultado debe contener 'details'"
     
     # Verificar los valores de complejidad
     assert result["O"] == expected_result["O"], f"O esperado: {expected_result['O']}, obtenido: {result['O']}"
     assert result["Omega"] == expected_result["Omega"], f"Omega esperado: {expected_result['Omega']}, obtenido: {result['Omega']}"
     assert result["Theta"] == expected_result["Theta"], f"Theta esperado: {expected_result['Theta']}, obtenido: {result['Theta']}"
+    assert result["space"] == expected_result["space"], f"Space esperado: {expected_result['space']}, obtenido: {result['space']}"
     
     # Verificar los detalles
     assert "loops" in result["details"], "El resultado debe contener 'loops' en details"
@@ -63,6 +71,9 @@ def test_if_then_conditional():
     assert result["details"]["early_exit_detected"] == expected_result["details"]["early_exit_detected"], \
         f"Early exit detected esperado: {expected_result['details']['early_exit_detected']}, obtenido: {result['details']['early_exit_detected']}"
     
+    assert result["details"]["average_case"] == expected_result["details"]["average_case"], \
+        f"Average case esperado: {expected_result['details']['average_case']}, obtenido: {result['details']['average_case']}"
+    
     # Verificación final: comparar el resultado completo
     assert result == expected_result, f"Resultado completo no coincide.\nEsperado: {expected_result}\nObtenido: {result}"
 
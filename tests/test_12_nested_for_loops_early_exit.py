@@ -14,7 +14,8 @@ def test_nested_for_loops_early_exit():
     PRUEBA: Bucles FOR anidados con salida temprana
     
     Verifica que bucles FOR anidados con una condición que puede causar
-    salida temprana genere la complejidad O(n^2), Ω(1) y Theta N/A.
+    salida temprana genere la complejidad O(n^2), Ω(1) y Θ(n^2) en el caso promedio
+    (posición uniforme del elemento buscado).
     """
     # Pseudocódigo a evaluar
     pseudocode = "for i 🡨 1 to n do begin for j 🡨 1 to n do begin if (matriz = valor) then begin return j end end end"
@@ -26,7 +27,12 @@ def test_nested_for_loops_early_exit():
     expected_result = {
         "O": "O(n^2)",
         "Omega": "Ω(1)",
-        "Theta": "N/A",
+        "Theta": "Θ(n^2)",
+        "fingerprint": "5389ea4bf54b6390dfbe90cde99e87da66e520912c6952022fb20ed0d1ce8340",
+        "space": {
+            "O": "O(1)",
+            "details": []
+        },
         "details": {
             "loops": [
                 "Ciclo FOR con salida temprana → Ω(1), O(n)",
@@ -34,7 +40,11 @@ def test_nested_for_loops_early_exit():
             ],
             "recursion": None,
             "combination": "Suma de complejidades secuenciales",
-            "early_exit_detected": True
+            "early_exit_detected": True,
+            "average_case": [
+                "Ciclo FOR (posición uniforme, q = 0.5): E[iteraciones] = 0.5·(n + 1)/2 + 0.5·n → Θ(n)",
+                "Ciclo FOR (posición uniforme, q = 0.5): E[iteraciones] = 0.5·(n + 1)/2 + 0.5·n → Θ(n)"
+            ]
         }
     }
     
@@ -45,12 +55,14 @@ def test_nested_for_loops_early_exit():
     assert "O" in result, "El resultado debe contener 'O'"
     assert "Omega" in result, "El resultado debe contener 'Omega'"
     assert "Theta" in result, "El resultado debe contener 'Theta'"
+    assert "space" in result, "El resultado debe contener 'space'"
     assert "details" in result, "El resultado debe contener 'details'"
     
     # Verificar los valores de complejidad
     assert result["O"] == expected_result["O"], f"O esperado: {expected_result['O']}, obtenido: {result['O']}"
     assert result["Omega"] == expected_result["Omega"], f"Omega esperado: {expected_result['Omega']}, obtenido: {result['Omega']}"
     assert result["Theta"] == expected_result["Theta"], f"Theta esperado: {expected_result['Theta']}, obtenido: {result['Theta']}"
+    assert result["space"] == expected_result["space"], f"Space esperado: {expected_result['space']}, obtenido: {result['space']}"
     
     # Verificar los detalles
     assert "loops" in result["details"], "El resultado debe contener 'loops' en details"
@@ -66,6 +78,9 @@ def test_nested_for_loops_early_exit():
     assert result["details"]["early_exit_detected"] == expected_result["details"]["early_exit_detected"], \
         f"Early exit detected esperado: {expected_result['details']['early_exit_detected']}, obtenido: {result['details']['early_exit_detected']}"
     
+    assert result["details"]["average_case"] == expected_result["details"]["average_case"], \
+        f"Average case esperado: {expected_result['details']['average_case']}, obtenido: {result['details']['average_case']}"
+    
     # Verificación final: comparar el resultado completo
     assert result == expected_result, f"Resultado completo no coincide.\nEsperado: {expected_result}\nObtenido: {result}"
 
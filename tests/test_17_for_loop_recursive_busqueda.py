@@ -28,13 +28,21 @@ def test_for_loop_recursive_busqueda():
         "O": "O(n log n)",
         "Omega": "Ω(n log n)",
         "Theta": "Θ(n log n)",
+        "fingerprint": "b27ae76e193ca9a03f60210670ab4812a6ed7e76299a06857ef42b4555a2a0c5",
+        "space": {
+            "O": "O(log n)",
+            "details": [
+                "Pila de recursión (profundidad log n) → O(log n)"
+            ]
+        },
         "details": {
             "loops": [
                 "Ciclo FOR → O(n)"
             ],
             "recursion": "T(n) = T(n/2) + cost",
             "combination": "Suma de complejidades secuenciales",
-            "early_exit_detected": False
+            "early_exit_detected": False,
+            "average_case": []
         }
     }
     
@@ -45,12 +53,14 @@ def test_for_loop_recursive_busqueda():
     assert "O" in result, "El resultado debe contener 'O'"
     assert "Omega" in result, "El resultado debe contener 'Omega'"
     assert "Theta" in result, "El resultado debe contener 'Theta'"
+    assert "space" in result, "El resultado debe contener 'space'"
     assert "details" in result, "El resultado debe contener 'details'"
     
     # Verificar los valores de complejidad
     assert result["O"] == expected_result["O"], f"O esperado: {expected_result['O']}, obtenido: {result['O']}"
     assert result["Omega"] == expected_result["Omega"], f"Omega esperado: {expected_result['Omega']}, obtenido: {result['Omega']}"
     assert result["Theta"] == expected_result["Theta"], f"Theta esperado: {expected_result['Theta']}, obtenido: {result['Theta']}"
+    assert result["space"] == expected_result["space"], f"Space esperado: {expected_result['space']}, obtenido: {result['space']}"
     
     # Verificar los detalles
     assert "loops" in result["details"], "El resultado debe contener 'loops' en details"
@@ -66,6 +76,9 @@ def test_for_loop_recursive_busqueda():
     assert result["details"]["early_exit_detected"] == expected_result["details"]["early_exit_detected"], \
         f"Early exit detected esperado: {expected_result['details']['early_exit_detected']}, obtenido: {result['details']['early_exit_detected']}"
     
+    assert result["details"]["average_case"] == expected_result["details"]["average_case"], \
+        f"Average case esperado: {expected_result['details']['average_case']}, obtenido: {result['details']['average_case']}"
+    
     # Verificación final: comparar el resultado completo
     assert result == expected_result, f"Resultado completo no coincide.\nEsperado: {expected_result}\nObtenido: {result}"
 
@@ -15,7 +15,9 @@ def test_recursive_process_for_loops_early_exit():
     
     Verifica que un proceso recursivo que divide n por la mitad, combinado
     con bucles FOR que tienen salida temprana mediante break, genere la
-    complejidad O(n^2), Ω(n log n) y Theta N/A.
+    complejidad O(n^2), Ω(n) y Θ(n) en el caso promedio (el break del ciclo
+    interno sigue una distribución geométrica). El break solo termina el
+    ciclo interno: el externo siempre recorre sus n iteraciones.
     """
     # Pseudocódigo a evaluar
     pseudocode = "proceso(n) begin if (n = 1) then begin return 1 end mitad 🡨 n div 2 CALL proceso(mitad) end for i 🡨 1 to n do begin if (i mod 2 = 0) then begin for j 🡨 1 to n do begin if (arr = target) then begin break end end end else begin CALL proceso(n) end end"
@@ -26,16 +28,26 @@ def test_recursive_process_for_loops_early_exit():
     # Resultado esperado
     expected_result = {
         "O": "O(n^2)",
-        "Omega": "Ω(log n)",
-        "Theta": "N/A",
+        "Omega": "Ω(n)",
+        "Theta": "Θ(n)",
+        "fingerprint": "ab7076809cf398f44c388f8dcd6c89da1d82c9aa967a838bb1afc3b95797b06c",
+        "space": {
+            "O": "O(log n)",
+            "details": [
+                "Pila de recursión (profundidad log n) → O(log n)"
+            ]
+        },
         "details": {
             "loops": [
                 "Ciclo FOR con salida temprana → Ω(1), O(n)",
-                "Ciclo FOR con salida temprana → Ω(1), O(n)"
+                "Ciclo FOR → O(n)"
             ],
             "recursion": "T(n) = T(n/2) + cost",
             "combination": "Suma de complejidades secuenciales",
-            "early_exit_detected": True
+            "early_exit_detected": True,
+            "average_case": [
+                "Ciclo FOR (geométrica, p = 0.5): E[iteraciones] = (1 - 0.5^n) / 0.5 ≤ 2 → Θ(1)"
+            ]
         }
     }
     
@@ -46,12 +58,14 @@ def test_recursive_process_for_loops_early_exit():
     assert "O" in result, "El resultado debe contener 'O'"
     assert "Omega" in result, "El resultado debe contener 'Omega'"
     assert "Theta" in result, "El resultado debe contener 'Theta'"
+    assert "space" in result, "El resultado debe contener 'space'"
     assert "details" in result, "El resultado debe contener 'details'"
     
     # Verificar los valores de complejidad
     assert result["O"] == expected_result["O"], f"O esperado: {expected_result['O']}, obtenido: {result['O']}"
     assert result["Omega"] == expected_result["Omega"], f"Omega esperado: {expected_result['Omega']}, obtenido: {result['Omega']}"
     assert result["Theta"] == expected_result["Theta"], f"Theta esperado: {expected_result['Theta']}, obtenido: {result['Theta']}"
+    assert result["space"] == expected_result["space"], f"Space esperado: {expected_result['space']}, obtenido: {result['space']}"
     
     # Verificar los detalles
     assert "loops" in result["details"], "El resultado debe contener 'loops' en details"
@@ -67,6 +81,9 @@ def test_recursive_process_for_loops_early_exit():
     assert result["details"]["early_exit_detected"] == expected_result["details"]["early_exit_detected"], \
         f"Early exit detected esperado: {expected_result['details']['early_exit_detected']}, obtenido: {result['details']['early_exit_detected']}"
     
+    assert result["details"]["average_case"] == expected_result["details"]["average_case"], \
+        f"Average case esperado: {expected_result['details']['average_case']}, obtenido: {result['details']['average_case']}"
+    
     # Verificación final: comparar el resultado completo
     assert result == expected_result, f"Resultado completo no coincide.\nEsperado: {expected_result}\nObtenido: {result}"
 
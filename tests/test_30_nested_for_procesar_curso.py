@@ -14,7 +14,9 @@ def test_nested_for_procesar_curso():
     PRUEBA: Bucles FOR anidados para procesar curso y calcular promedios
     
     Verifica que el algoritmo que procesa un curso con estudiantes y calcula
-    promedios (con bucles anidados) genere la complejidad O(n^2), Ω(n^2) y Θ(n^2).
+    promedios (con bucles anidados) genere la complejidad O(n * numNotas),
+    Ω(n * numNotas) y Θ(n * numNotas): el ciclo interno depende del número
+    de notas de cada estudiante, no del número de estudiantes.
     """
     # Pseudocódigo a evaluar
     pseudocode = "Estudiante {nombre edad notas promedio} Curso {nombre estudiantes capacidad} procesarCurso(c) begin Curso miCurso miCurso 🡨 c n 🡨 length(miCurso.estudiantes) suma 🡨 0 for i 🡨 1 to n do begin Estudiante est est 🡨 miCurso.estudiantes[i] numNotas 🡨 length(est.notas) sumaNotas 🡨 0 for j 🡨 1 to numNotas do begin sumaNotas 🡨 sumaNotas + est.notas[j] end est.promedio 🡨 sumaNotas / numNotas suma 🡨 suma + est.promedio end promedioCurso 🡨 suma / n return promedioCurso end"
@@ -24,17 +26,26 @@ def test_nested_for_procesar_curso():
     
     # Resultado esperado
     expected_result = {
-        "O": "O(n^2)",
-        "Omega": "Ω(n^2)",
-        "Theta": "Θ(n^2)",
+        "O": "O(n * numNotas)",
+        "Omega": "Ω(n * numNotas)",
+        "Theta": "Θ(n * numNotas)",
+        "fingerprint": "8f1dff0d965fe92b086510743d1b7414319c5dcba34144bda2db97709fe9d3c5",
+        "space": {
+            "O": "O(1)",
+            "details": [
+                "Objeto miCurso (Curso) → O(1)",
+                "Objeto est (Estudiante) → O(1)"
+            ]
+        },
         "details": {
             "loops": [
-                "Ciclo FOR → O(n)",
+                "Ciclo FOR → O(numNotas)",
                 "Ciclo FOR → O(n)"
             ],
             "recursion": None,
             "combination": "Suma de complejidades secuenciales",
-            "early_exit_detected": False
+            "early_exit_detected": False,
+            "average_case": []
         }
     }
     
@@ -45,12 +56,14 @@ def test_nested_for_procesar_curso():
     assert "O" in result, "El resultado debe contener 'O'"
     assert "Omega" in result, "El resultado debe contener 'Omega'"
     assert "Theta" in result, "El resultado debe contener 'Theta'"
+    assert "space" in result, "El resultado debe contener 'space'"
     assert "details" in result, "El resultado debe contener 'details'"
     
     # Verificar los valores de complejidad
     assert result["O"] == expected_result["O"], f"O esperado: {expected_result['O']}, obtenido: {result['O']}"
     assert result["Omega"] == expected_result["Omega"], f"Omega esperado: {expected_result['Omega']}, obtenido: {result['Omega']}"
     assert result["Theta"] == expected_result["Theta"], f"Theta esperado: {expected_result['Theta']}, obtenido: {result['Theta']}"
+    assert result["space"] == expected_result["space"], f"Space esperado: {expected_result['space']}, obtenido: {result['space']}"
     
     # Verificar los detalles
     assert "loops" in result["details"], "El resultado debe contener 'loops' en details"
@@ -66,6 +79,9 @@ def test_nested_for_procesar_curso():
     assert result["details"]["early_exit_detected"] == expected_result["details"]["early_exit_detected"], \
         f"Early exit detected esperado: {expected_result['details']['early_exit_detected']}, obtenido: {result['details']['early_exit_detected']}"
     
+    assert result["details"]["average_case"] == expected_result["details"]["average_case"], \
+        f"Average case esperado: {expected_result['details']['average_case']}, obtenido: {result['details']['average_case']}"
+    
     # Verificación final: comparar el resultado completo
     assert result == expected_result, f"Resultado completo no coincide.\nEsperado: {expected_result}\nObtenido: {result}"
 
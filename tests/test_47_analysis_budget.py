@@ -0,0 +1,111 @@
+"""
+Test para verificar el presupuesto de análisis (nodos y tiempo) y el
+resultado parcial marcado como truncado cuando se agota.
+
+Pseudocódigo evaluado:
+for i 🡨 1 to n do begin x 🡨 1 end for i 🡨 1 to n do begin for j 🡨 1 to m do begin y 🡨 1 end end
+"""
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.analysis_service import analyze_pseudocode
+from analyzer.budget import ENDPOINT_BUDGETS, AnalysisBudget
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin x 🡨 1 end for i 🡨 1 to n do begin for j 🡨 1 to m do begin y 🡨 1 end end"
+
+
+def test_analysis_budget_not_exhausted():
+    """
+    PRUEBA: Presupuesto suficiente
+
+    Verifica que con un presupuesto amplio el resultado sea idéntico al
+    análisis sin presupuesto y no se marque como truncado.
+    """
+    budget = AnalysisBudget(max_nodes=10000, max_time_ms=10000)
+
+    result = analyze_pseudocode(PSEUDOCODE, budget=budget)
+
+    assert result == analyze_pseudocode(PSEUDOCODE), "El presupuesto no debe alterar el resultado"
+    assert "truncated" not in result, "El resultado no debe estar truncado"
+    assert budget.report()["exhausted"] is False, "El presupuesto no debe agotarse"
+    assert budget.report()["nodes_used"] > 0, "Se deben contabilizar los nodos procesados"
+
+
+def test_analysis_budget_exhausted_during_analysis():
+    """
+    PRUEBA: Presupuesto agotado durante el análisis
+
+    Verifica que al agotarse el presupuesto en el analizador el resultado se
+    marque como truncado sin cotas (el costo de lo no analizado es
+    desconocido) y que los detalles describan solo lo visitado.
+    """
+    # Nodos suficientes para parsear y analizar solo el primer ciclo
+    full_budget = AnalysisBudget(max_nodes=10000, max_time_ms=10000)
+    analyze_pseudocode(PSEUDOCODE, budget=full_budget)
+    budget = AnalysisBudget(max_nodes=full_budget.nodes - 6, max_time_ms=10000)
+
+    result = analyze_pseudocode(PSEUDOCODE, budget=budget)
+
+    assert "error" not in result, f"Error en el análisis: {result.get('error', 'Desconocido')}"
+    assert result["truncated"] is True, "El resultado debe marcarse como truncado"
+    assert (result["O"], result["Omega"], result["Theta"]) == (None, None, None), \
+        f"Un resultado truncado no debe publicar cotas: {result['O']}, {result['Omega']}, {result['Theta']}"
+    assert result["space"]["O"] is None, f"Tampoco la cota espacial: {result['space']['O']}"
+    assert result["details"]["loops"] == ["Ciclo FOR → O(n)"], \
+        f"Solo el primer ciclo debe estar descrito: {result['details']['loops']}"
+    assert result["budget"]["exhausted"] is True, "El presupuesto debe reportarse como agotado"
+    assert result["budget"]["stage"] == "analysis", f"Etapa esperada: analysis, obtenida: {result['budget']['stage']}"
+
+
+def test_analysis_budget_exhausted_during_parse():
+    """
+    PRUEBA: Presupuesto agotado durante el parseo
+
+    Verifica que si el presupuesto se agota antes de construir el AST se
+    devuelva un error marcado como truncado con el presupuesto consumido.
+    """
+    budget = AnalysisBudget(max_nodes=5, max_time_ms=10000)
+
+    result = analyze_pseudocode(PSEUDOCODE, budget=budget)
+
+    assert "error" in result, "Debe devolverse un error cuando no hay AST"
+    assert result["truncated"] is True, "El error debe marcarse como truncado"
+    assert result["budget"]["stage"] == "parse", f"Etapa esperada: parse, obtenida: {result['budget']['stage']}"
+
+
+def test_requested_budget():
+    """
+    PRUEBA: Presupuesto pedido por el cliente
+
+    Verifica que el campo "budget" de /analyze-by-system y de
+    /analyze-by-system/batch reemplace al presupuesto por defecto, que se
+    acote al máximo del endpoint y que un presupuesto agotado responda
+    truncado con cotas null.
+    """
+    client = TestClient(app)
+    limits = ENDPOINT_BUDGETS["analyze-by-system"]
+
+    small = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE, "budget": {"max_nodes": 5}})
+    assert small.status_code == 200, f"Código esperado: 200, obtenido: {small.status_code}"
+    assert small.json()["truncated"] is True, "Un presupuesto de 5 nodos debe agotarse"
+    assert small.json()["budget"]["max_nodes"] == 5, "Debe usarse el presupuesto pedido"
+
+    large = client.post("/analyze-by-system", json={
+        "pseudocode": PSEUDOCODE, "budget": {"max_nodes": 10 ** 9, "max_time_ms": 10 ** 9}
+    })
+    body = large.json()
+    assert body["O"] == "O(n * m)", f"El análisis completo debe tener cota: {body['O']}"
+    assert body["budget"]["max_nodes"] == limits["max_nodes_limit"], "max_nodes debe acotarse al máximo"
+    assert body["budget"]["max_time_ms"] == limits["max_time_ms_limit"], "max_time_ms debe acotarse al máximo"
+
+    # Otro programa: un acierto de la caché de resultados no consume presupuesto
+    program = PSEUDOCODE + " for k 🡨 1 to n do begin z 🡨 1 end"
+    batch = client.post("/analyze-by-system/batch", json={"programs": [program], "budget": {"max_nodes": 5}})
+    result = batch.json()["results"][0]
+    assert result["truncated"] is True and result["budget"]["max_nodes"] == 5, \
+        f"El lote debe usar el presupuesto pedido: {result}"
+
+    invalid = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE, "budget": {"max_nodes": 0}})
+    assert invalid.status_code == 422, "Un presupuesto no positivo debe rechazarse"
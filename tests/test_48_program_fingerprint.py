@@ -0,0 +1,64 @@
+"""
+Test para verificar la huella (fingerprint) canónica del programa: igual para
+programas que solo difieren en nombres, espacios, comentarios u orden de
+operandos conmutativos, y distinta cuando cambia el análisis.
+
+Pseudocódigo base:
+suma(A, n) begin total 🡨 0 for i 🡨 1 to n do begin total 🡨 total + A[i] end return total end
+"""
+
+from services.analysis_service import analyze_pseudocode
+
+
+BASE = "suma(A, n) begin total 🡨 0 for i 🡨 1 to n do begin total 🡨 total + A[i] end return total end"
+
+
+def _without_fingerprint(result):
+    return {key: value for key, value in result.items() if key != "fingerprint"}
+
+
+def test_fingerprint_equivalent_programs():
+    """
+    PRUEBA: Programas equivalentes
+
+    Verifica que renombrar variables locales y subrutinas, cambiar espacios,
+    agregar comentarios e intercambiar operandos de + produzca la misma huella
+    y exactamente el mismo análisis.
+    """
+    variantes = [
+        "acumular(B, n) begin s 🡨 0 for k 🡨 1 to n do begin s 🡨 s + B[k] end return s end",
+        "suma(A, n)\nbegin\n    ► acumula los elementos\n    total 🡨 0\n    for i 🡨 1 to n do\n    begin\n        total 🡨 A[i] + total\n    end\n    return total\nend",
+    ]
+
+    base = analyze_pseudocode(BASE)
+    assert "error" not in base, f"Error en el análisis: {base.get('error', 'Desconocido')}"
+    assert len(base["fingerprint"]) == 64, "La huella debe ser un SHA-256 en hexadecimal"
+
+    for variante in variantes:
+        result = analyze_pseudocode(variante)
+        assert "error" not in result, f"Error en el análisis: {result.get('error', 'Desconocido')}"
+        assert result["fingerprint"] == base["fingerprint"], f"La huella debe coincidir para:\n{variante}"
+        assert _without_fingerprint(result) == _without_fingerprint(base), \
+            "Programas con la misma huella deben producir el mismo análisis"
+
+
+def test_fingerprint_different_programs():
+    """
+    PRUEBA: Programas distintos
+
+    Verifica que cambiar la estructura o la variable de tamaño que aparece en
+    el reporte (n → m) produzca una huella distinta.
+    """
+    base = analyze_pseudocode(BASE)
+
+    anidado = analyze_pseudocode(
+        "suma(A, n) begin total 🡨 0 for i 🡨 1 to n do begin for j 🡨 1 to n do begin total 🡨 total + A[i] end end return total end"
+    )
+    otro_tamano = analyze_pseudocode(
+        "suma(A, m) begin total 🡨 0 for i 🡨 1 to m do begin total 🡨 total + A[i] end return total end"
+    )
+
+    assert anidado["fingerprint"] != base["fingerprint"], "Un ciclo adicional debe cambiar la huella"
+    assert otro_tamano["fingerprint"] != base["fingerprint"], \
+        "Renombrar la variable de tamaño cambia el reporte y por lo tanto la huella"
+    assert otro_tamano["O"] == "O(m)", f"O esperado: O(m), obtenido: {otro_tamano['O']}"
@@ -0,0 +1,55 @@
+"""
+Test para verificar el análisis por lotes en el pool de procesos: orden de
+los resultados, errores por elemento y equivalencia con el análisis individual.
+
+Programas evaluados:
+for i 🡨 1 to n do begin x 🡨 1 end
+for i 🡨 1 to n do begin (programa con error de sintaxis)
+for i 🡨 1 to n do begin for j 🡨 1 to n do begin x 🡨 1 end end
+"""
+
+from services.analysis_service import analyze_pseudocode
+from services.batch_service import analyze_batch, shutdown_pool
+
+
+PROGRAMS = [
+    "for i 🡨 1 to n do begin x 🡨 1 end",
+    "for i 🡨 1 to n do begin",
+    "for i 🡨 1 to n do begin for j 🡨 1 to n do begin x 🡨 1 end end",
+]
+
+
+def test_batch_analysis_order_and_errors():
+    """
+    PRUEBA: Lote con un programa inválido
+
+    Verifica que los resultados lleguen en el orden de entrada, que el
+    programa inválido devuelva su propio error sin afectar a los demás y que
+    cada resultado coincida con el análisis individual.
+    """
+    try:
+        results = analyze_batch(PROGRAMS)
+    finally:
+        shutdown_pool()
+
+    assert len(results) == len(PROGRAMS), f"Se esperaban {len(PROGRAMS)} resultados, obtenidos: {len(results)}"
+
+    assert results[0]["O"] == "O(n)", f"O esperado: O(n), obtenido: {results[0].get('O')}"
+    assert results[1]["error"] == "Error de sintaxis en el pseudocódigo.", \
+        f"Error esperado en el segundo programa, obtenido: {results[1]}"
+    assert results[2]["O"] == "O(n^2)", f"O esperado: O(n^2), obtenido: {results[2].get('O')}"
+
+    for text, result in zip(PROGRAMS, results):
+        assert result["budget"]["exhausted"] is False, "El presupuesto del lote no debe agotarse"
+        individual = analyze_pseudocode(text)
+        assert {key: value for key, value in result.items() if key != "budget"} == individual, \
+            f"El resultado del lote debe coincidir con el análisis individual de:\n{text}"
+
+
+def test_batch_analysis_empty():
+    """
+    PRUEBA: Lote vacío
+
+    Verifica que un lote vacío no inicie el pool y devuelva una lista vacía.
+    """
+    assert analyze_batch([]) == [], "Un lote vacío debe devolver una lista vacía"
@@ -0,0 +1,111 @@
+"""
+Test para verificar el análisis por lotes en streaming NDJSON: lectura
+incremental de líneas, índice de cada resultado y errores por línea.
+
+Líneas evaluadas:
+{"pseudocode": "for i 🡨 1 to n do begin x 🡨 1 end"}
+esto no es json
+{"pseudocode": "for i 🡨 1 to n do begin for j 🡨 1 to n do begin x 🡨 1 end end"}
+"""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.batch_service import OversizedLine, analyze_stream, iter_ndjson, shutdown_pool
+
+
+BODY = (
+    json.dumps({"pseudocode": "for i 🡨 1 to n do begin x 🡨 1 end"}, ensure_ascii=False) + "\n"
+    + "esto no es json\n"
+    + "\n"
+    + json.dumps({"pseudocode": "for i 🡨 1 to n do begin for j 🡨 1 to n do begin x 🡨 1 end end"}, ensure_ascii=False)
+).encode("utf-8")
+
+
+async def _chunks(data, size):
+    # Fragmentos pequeños: las líneas (y los caracteres UTF-8) quedan partidos
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _collect(window):
+    return [item async for item in analyze_stream(iter_ndjson(_chunks(BODY, 7)), window)]
+
+
+def test_ndjson_stream_service():
+    """
+    PRUEBA: Flujo NDJSON en fragmentos
+
+    Verifica que las líneas partidas entre fragmentos se reconstruyan, que las
+    líneas vacías se ignoren, que cada resultado lleve el índice de su línea y
+    que una línea inválida devuelva su propio error, incluso con ventana 1.
+    """
+    try:
+        results = dict(asyncio.run(_collect(window=1)))
+    finally:
+        shutdown_pool()
+
+    assert sorted(results) == [0, 1, 2], f"Índices esperados: [0, 1, 2], obtenidos: {sorted(results)}"
+    assert results[0]["O"] == "O(n)", f"O esperado: O(n), obtenido: {results[0].get('O')}"
+    assert results[1]["error"] == "Línea NDJSON inválida.", f"Error esperado en la línea 1, obtenido: {results[1]}"
+    assert results[2]["O"] == "O(n^2)", f"O esperado: O(n^2), obtenido: {results[2].get('O')}"
+
+
+def test_ndjson_stream_endpoint():
+    """
+    PRUEBA: Endpoint /analyze-by-system/stream
+
+    Verifica que la respuesta sea NDJSON con una línea por programa y el
+    campo "index" para reordenar los resultados.
+    """
+    with TestClient(app) as client:
+        response = client.post(
+            "/analyze-by-system/stream",
+            content=BODY,
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+
+    assert response.status_code == 200, f"Código esperado: 200, obtenido: {response.status_code}"
+    assert response.headers["content-type"] == "application/x-ndjson", \
+        f"Content-Type esperado: application/x-ndjson, obtenido: {response.headers['content-type']}"
+
+    lines = {item["index"]: item for item in map(json.loads, response.text.splitlines())}
+    assert sorted(lines) == [0, 1, 2], f"Índices esperados: [0, 1, 2], obtenidos: {sorted(lines)}"
+    assert lines[0]["O"] == "O(n)", f"O esperado: O(n), obtenido: {lines[0].get('O')}"
+    assert lines[1]["error"] == "Línea NDJSON inválida.", f"Error esperado en la línea 1, obtenido: {lines[1]}"
+    assert lines[2]["O"] == "O(n^2)", f"O esperado: O(n^2), obtenido: {lines[2].get('O')}"
+
+
+def test_ndjson_line_limit():
+    """
+    PRUEBA: Líneas demasiado largas
+
+    Verifica que una línea que supera el máximo de bytes (también la última,
+    sin salto de línea) se entregue como OversizedLine sin retener su
+    contenido, que las demás líneas sigan leyéndose y que el flujo responda
+    el error en esa línea.
+    """
+    long_line = b'{"pseudocode": "' + b"x" * 5000 + b'"}'
+    body = BODY.split(b"\n")[0] + b"\n" + long_line + b"\n" + BODY.split(b"\n")[0] + b"\n" + long_line
+
+    async def lines():
+        return [line async for line in iter_ndjson(_chunks(body, 7), max_line_bytes=1000)]
+
+    result = asyncio.run(lines())
+    assert [type(line) for line in result] == [bytes, OversizedLine, bytes, OversizedLine], \
+        f"Tipos de línea inesperados: {[type(line).__name__ for line in result]}"
+    assert result[1].size == len(long_line), f"Tamaño esperado: {len(long_line)}, obtenido: {result[1].size}"
+    assert result[0] == result[2] == BODY.split(b"\n")[0], "Las líneas cortas deben reconstruirse completas"
+
+    async def collect():
+        return [item async for item in analyze_stream(iter_ndjson(_chunks(body, 7), max_line_bytes=1000), 2)]
+
+    try:
+        results = dict(asyncio.run(collect()))
+    finally:
+        shutdown_pool()
+    assert results[1]["error"] == "Línea NDJSON demasiado larga.", f"Error esperado en la línea 1, obtenido: {results[1]}"
+    assert results[2]["O"] == "O(n)", f"La línea siguiente debe analizarse: {results[2]}"
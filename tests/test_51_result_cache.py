@@ -0,0 +1,141 @@
+"""
+Test para verificar la caché de resultados de /analyze-by-system: aciertos por
+texto normalizado, separación por probabilidades, límite LRU, TTL y respaldo
+compartido en SQLite.
+
+Pseudocódigo evaluado:
+for i 🡨 1 to n do begin x 🡨 1 end
+"""
+
+from services.analysis_service import analyze_pseudocode
+from services.result_cache import ResultCache, SQLiteCacheBackend, analyze_with_cache, cache_key
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin x 🡨 1 end"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_result_cache_hits_and_normalization():
+    """
+    PRUEBA: Aciertos con texto normalizado
+
+    Verifica que el mismo programa con otros espacios y comentarios se
+    resuelva desde la caché con el mismo resultado, y que cambiar las
+    probabilidades del caso promedio use otra entrada.
+    """
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+    reformateado = "for i 🡨 1 to n do\nbegin\n    ► asignación constante\n    x 🡨 1\nend\n"
+
+    first = analyze_with_cache(PSEUDOCODE, cache=cache)
+    second = analyze_with_cache(reformateado, cache=cache)
+    analyze_with_cache(PSEUDOCODE, {"if_condition": 0.9, "search_hit": 0.5, "break_condition": 0.5}, cache=cache)
+
+    assert first == analyze_pseudocode(PSEUDOCODE), "El resultado en caché debe coincidir con el análisis"
+    assert second == first, "El texto reformateado debe devolver el resultado en caché"
+    assert second is not first, "Cada lectura debe devolver una copia independiente"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2), \
+        f"Esperado hits=1, misses=2, size=2; obtenido: {stats}"
+
+
+def test_result_cache_skips_errors():
+    """
+    PRUEBA: Errores no se guardan
+
+    Verifica que un error de sintaxis no se guarde en la caché.
+    """
+    cache = ResultCache(max_entries=10, ttl_seconds=60)
+
+    result = analyze_with_cache("for i 🡨 1 to n do begin", cache=cache)
+
+    assert "error" in result, "Se esperaba un error de sintaxis"
+    assert cache.stats()["size"] == 0, "Los errores no deben guardarse en la caché"
+
+
+def test_result_cache_lru_and_ttl():
+    """
+    PRUEBA: Límite de tamaño y TTL
+
+    Verifica que al superar max_entries se descarte la entrada menos usada y
+    que una entrada vencida cuente como expiración y fallo.
+    """
+    clock = FakeClock()
+    cache = ResultCache(max_entries=2, ttl_seconds=60, clock=clock)
+
+    cache.set("a", {"O": "O(1)"})
+    cache.set("b", {"O": "O(n)"})
+    cache.get("a")                      # "a" pasa a ser la más reciente
+    cache.set("c", {"O": "O(n^2)"})     # descarta "b"
+
+    assert cache.get("b") is None, "La entrada menos usada debe descartarse"
+    assert cache.get("a") == {"O": "O(1)"}, "La entrada usada recientemente debe conservarse"
+
+    clock.now += 61
+    assert cache.get("c") is None, "La entrada vencida no debe devolverse"
+
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"]) == (1, 1), \
+        f"Esperado evictions=1, expirations=1; obtenido: {stats}"
+
+
+def test_result_cache_sqlite_backend(tmp_path):
+    """
+    PRUEBA: Respaldo compartido en SQLite
+
+    Verifica que un resultado guardado por un worker (una caché) se obtenga
+    desde otro worker (otra caché con el mismo archivo) como acierto compartido.
+    """
+    path = str(tmp_path / "results.sqlite")
+    worker_1 = ResultCache(max_entries=10, ttl_seconds=60, backend=SQLiteCacheBackend(path))
+    worker_2 = ResultCache(max_entries=10, ttl_seconds=60, backend=SQLiteCacheBackend(path))
+
+    first = analyze_with_cache(PSEUDOCODE, cache=worker_1)
+    second = worker_2.get(cache_key(PSEUDOCODE))
+
+    assert second == first, "El segundo worker debe leer el resultado del respaldo compartido"
+    assert worker_2.stats()["shared_hits"] == 1, f"Se esperaba un acierto compartido: {worker_2.stats()}"
+
+
+def test_normalization_keeps_string_literals():
+    """
+    PRUEBA: Cadenas fuera de la normalización
+
+    Verifica que los espacios y el ► dentro de una cadena formen parte de la
+    clave (programas que solo difieren en el literal no comparten entrada),
+    mientras que los de fuera se sigan ignorando.
+    """
+    base = 'print("a  b")\nx 🡨 1'
+
+    assert cache_key(base) == cache_key('print("a  b")   ► comentario\n  x 🡨 1'), \
+        "Los espacios y comentarios fuera de la cadena no deben cambiar la clave"
+    assert cache_key(base) != cache_key('print("a b")\nx 🡨 1'), \
+        "Los espacios dentro de la cadena deben cambiar la clave"
+    assert cache_key('print("► uno")') != cache_key('print("► dos")'), \
+        "Un ► dentro de la cadena no es un comentario"
+
+
+def test_sqlite_backend_periodic_trim(tmp_path):
+    """
+    PRUEBA: Recorte periódico del respaldo SQLite
+
+    Verifica que el archivo no se recorte en cada inserción sino cada
+    TRIM_INTERVAL, conservando entonces las entradas más recientes.
+    """
+    backend = SQLiteCacheBackend(str(tmp_path / "results.sqlite"), max_entries=2)
+    interval = SQLiteCacheBackend.TRIM_INTERVAL
+
+    for i in range(interval - 1):
+        backend.set(f"k{i}", "{}", float(i), 10)
+    assert backend.size() == interval - 1, "No debe recortarse antes de TRIM_INTERVAL inserciones"
+
+    backend.set("ultima", "{}", float(interval), 10)
+    assert backend.size() == 2, f"Debe recortarse a max_entries; quedan {backend.size()}"
+    assert backend.get("ultima", 60, float(interval)) == "{}", "Debe conservarse la entrada más reciente"
@@ -0,0 +1,156 @@
+"""
+Test para verificar la caché HTTP condicional de los endpoints de análisis:
+ETags (débiles en los POST, cuyo cuerpo cambia entre solicitudes),
+If-None-Match → 304 y forma GET direccionada por contenido.
+
+Pseudocódigo evaluado:
+for i 🡨 1 to n do begin for j 🡨 1 to n do begin x 🡨 1 end end
+"""
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.http_cache import LLM_CACHE_CONTROL, llm_analysis_key, llm_result_cache, make_etag
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin for j 🡨 1 to n do begin x 🡨 1 end end"
+
+client = TestClient(app)
+
+
+def test_analyze_by_system_etag_flow():
+    """
+    PRUEBA: ETag, 304 y forma GET en /analyze-by-system
+
+    Verifica que el POST devuelva un ETag débil (el presupuesto reportado
+    cambia entre un acierto y un fallo de caché) y Content-Location, que
+    repetirlo con If-None-Match responda 304 sin cuerpo y que la forma GET
+    devuelva el mismo análisis, sin "budget", con ETag fuerte y caché
+    pública inmutable (y 304 con If-None-Match).
+    """
+    first = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE})
+    cached = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE})
+    etag = first.headers.get("etag")
+    location = first.headers.get("content-location")
+
+    assert first.status_code == 200, f"Código esperado: 200, obtenido: {first.status_code}"
+    assert etag and etag.startswith('W/"'), f"Se esperaba un ETag débil, obtenido: {etag}"
+    assert cached.headers.get("etag") == etag, "Un acierto de caché debe repetir el ETag"
+    assert location == f"/analyze-by-system/{etag.removeprefix('W/').strip(chr(34))}", \
+        f"Content-Location inesperado: {location}"
+
+    repeated = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE}, headers={"If-None-Match": etag})
+    assert repeated.status_code == 304, f"Código esperado: 304, obtenido: {repeated.status_code}"
+    assert repeated.content == b"", "La respuesta 304 no debe tener cuerpo"
+    assert repeated.headers.get("etag") == etag, "La respuesta 304 debe repetir el ETag"
+
+    by_hash = client.get(location)
+    assert by_hash.status_code == 200, f"Código esperado: 200, obtenido: {by_hash.status_code}"
+    assert by_hash.json()["O"] == first.json()["O"] == "O(n^2)", f"O esperado: O(n^2), obtenido: {by_hash.json()['O']}"
+    assert by_hash.json()["fingerprint"] == first.json()["fingerprint"], "La forma GET debe devolver el mismo análisis"
+    assert "budget" not in by_hash.json() or by_hash.json()["budget"] is None, \
+        "La forma GET no debe incluir datos propios de una solicitud"
+    assert by_hash.headers.get("etag") == etag.removeprefix("W/"), "La forma GET debe llevar un ETag fuerte"
+    assert "immutable" in by_hash.headers.get("cache-control", ""), "La forma GET debe ser cacheable e inmutable"
+
+    conditional_get = client.get(location, headers={"If-None-Match": etag})
+    assert conditional_get.status_code == 304, f"Código esperado: 304, obtenido: {conditional_get.status_code}"
+
+
+def test_analyze_by_system_etag_changes_with_input():
+    """
+    PRUEBA: ETag según el contenido
+
+    Verifica que otro programa o cambiar las probabilidades produzca otro
+    ETag, que un hash desconocido responda 404 y que un error de sintaxis no
+    lleve ETag.
+    """
+    base = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE}).headers["etag"]
+    other = client.post("/analyze-by-system", json={"pseudocode": "for i 🡨 1 to n do begin x 🡨 1 end"}).headers["etag"]
+    with_probabilities = client.post(
+        "/analyze-by-system",
+        json={"pseudocode": PSEUDOCODE, "probabilities": {"if_condition": 0.9}}
+    ).headers["etag"]
+    invalid = client.post("/analyze-by-system", json={"pseudocode": "for i 🡨 1 to n do begin"})
+
+    assert len({base, other, with_probabilities}) == 3, "Cada contenido debe tener su propio ETag"
+    assert "etag" not in invalid.headers, "Un error no debe llevar ETag"
+    assert client.get("/analyze-by-system/" + "0" * 64).status_code == 404, "Un hash desconocido debe responder 404"
+
+
+def test_analyze_by_llm_not_modified():
+    """
+    PRUEBA: 304 en /analyze-by-llm
+
+    Verifica que con If-None-Match igual al ETag del contenido (débil o no,
+    la comparación es débil) se responda 304 con un ETag débil, sin invocar
+    al LLM (no se requiere API key).
+    """
+    etag = make_etag(llm_analysis_key(PSEUDOCODE), weak=True)
+
+    response = client.post("/analyze-by-llm", json={"pseudocode": PSEUDOCODE}, headers={"If-None-Match": etag})
+    strong = client.post(
+        "/analyze-by-llm", json={"pseudocode": PSEUDOCODE},
+        headers={"If-None-Match": make_etag(llm_analysis_key(PSEUDOCODE))}
+    )
+
+    assert response.status_code == 304, f"Código esperado: 304, obtenido: {response.status_code}"
+    assert response.headers.get("etag") == etag, "La respuesta 304 debe repetir el ETag débil"
+    assert strong.status_code == 304, f"La comparación debe ser débil, obtenido: {strong.status_code}"
+
+
+def test_llm_get_form_not_immutable():
+    """
+    PRUEBA: Caché de la forma GET de /analyze-by-llm
+
+    Verifica que la forma GET lleve un ETag débil y un Cache-Control sin
+    immutable cuya vigencia es el TTL de la copia en memoria del servidor.
+    """
+    content_hash = llm_analysis_key(PSEUDOCODE)
+    llm_result_cache.set(content_hash, {"explanation": "análisis guardado"})
+
+    response = client.get(f"/analyze-by-llm/{content_hash}")
+    cache_control = response.headers.get("cache-control", "")
+
+    assert response.status_code == 200, f"Código esperado: 200, obtenido: {response.status_code}"
+    assert response.headers.get("etag") == make_etag(content_hash, weak=True), "Se esperaba un ETag débil"
+    assert "immutable" not in cache_control, f"La salida del modelo no es inmutable: {cache_control}"
+    assert cache_control == LLM_CACHE_CONTROL == f"public, max-age={int(llm_result_cache.ttl_seconds)}", \
+        f"Cache-Control inesperado: {cache_control}"
+
+
+def test_if_none_match_wildcard():
+    """
+    PRUEBA: If-None-Match: *
+
+    Verifica que el comodín se ignore en el POST (se analiza y responde
+    200), que en la forma GET responda 304 solo si el resultado existe y
+    404 si no.
+    """
+    post = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE}, headers={"If-None-Match": "*"})
+    assert post.status_code == 200, f"El POST debe ignorar el comodín; código obtenido: {post.status_code}"
+    assert post.json()["O"] == "O(n^2)", f"O esperado: O(n^2), obtenido: {post.json().get('O')}"
+
+    existing = client.get(post.headers["content-location"], headers={"If-None-Match": "*"})
+    assert existing.status_code == 304, f"Código esperado: 304, obtenido: {existing.status_code}"
+
+    missing = client.get("/analyze-by-system/" + "e" * 64, headers={"If-None-Match": "*"})
+    assert missing.status_code == 404, f"Sin resultado el comodín no coincide; código obtenido: {missing.status_code}"
+
+
+def test_debug_get_form_weak_etag():
+    """
+    PRUEBA: ETag de la forma GET con ?debug=true
+
+    Verifica que el cuerpo con timings lleve un ETag débil distinto del
+    ETag fuerte del cuerpo normal.
+    """
+    location = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE}).headers["content-location"]
+
+    plain = client.get(location)
+    debug = client.get(location + "?debug=true")
+
+    assert "timings" in debug.json(), "La forma GET con debug debe incluir los tiempos"
+    assert not plain.headers["etag"].startswith("W/"), f"Se esperaba un ETag fuerte: {plain.headers['etag']}"
+    assert debug.headers["etag"] == "W/" + plain.headers["etag"], \
+        f"Se esperaba un ETag débil para debug, obtenido: {debug.headers['etag']}"
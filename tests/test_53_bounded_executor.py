@@ -0,0 +1,105 @@
+"""
+Test para verificar la capa de ejecución acotada del análisis: ejecución en
+el pool, rechazo cuando el pool y su cola están llenos y respuesta 503 con
+Retry-After en /analyze-by-system.
+"""
+
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+import main
+from services.executor import AnalysisExecutor, ExecutorSaturatedError
+
+
+def test_bounded_executor_rejects_when_saturated():
+    """
+    PRUEBA: Pool de 1 hilo sin cola
+
+    Verifica que con una tarea en ejecución la siguiente se rechace con
+    ExecutorSaturatedError y que, al terminar, el pool vuelva a aceptar tareas.
+    """
+    executor = AnalysisExecutor(kind="thread", max_workers=1, max_queue=0, retry_after=3)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+
+        try:
+            await executor.run(sum, [1, 2])
+            rejected = None
+        except ExecutorSaturatedError as e:
+            rejected = e
+
+        release.set()
+        await running
+        return rejected, await executor.run(sum, [1, 2])
+
+    try:
+        rejected, after = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert rejected is not None, "La segunda tarea debe rechazarse mientras el pool está lleno"
+    assert rejected.retry_after == 3, f"Retry-After esperado: 3, obtenido: {rejected.retry_after}"
+    assert after == 3, f"El pool debe aceptar tareas al liberarse, obtenido: {after}"
+    assert executor.stats()["rejected"] == 1, f"Se esperaba 1 rechazo: {executor.stats()}"
+
+
+
+def test_cancelled_request_keeps_slot_until_task_ends():
+    """
+    PRUEBA: Cancelación del cliente
+
+    Verifica que al cancelar la espera de una tarea que ya corre en el pool
+    su cupo siga ocupado (in_flight = 1 y la siguiente se rechaza) hasta que
+    la tarea termina de verdad.
+    """
+    executor = AnalysisExecutor(kind="thread", max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        await asyncio.sleep(0.05)
+        during = executor.stats()["in_flight"]
+
+        try:
+            await executor.run(sum, [1, 2])
+            rejected = False
+        except ExecutorSaturatedError:
+            rejected = True
+
+        release.set()
+        await asyncio.sleep(0.05)
+        return during, rejected, executor.stats()["in_flight"]
+
+    try:
+        during, rejected, after = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert during == 1, f"La tarea cancelada sigue en el pool y debe contar, in_flight={during}"
+    assert rejected, "Mientras la tarea cancelada corre, el pool sigue lleno"
+    assert after == 0, f"El cupo debe liberarse cuando la tarea termina, in_flight={after}"
+
+def test_analyze_endpoint_returns_503_when_saturated(monkeypatch):
+    """
+    PRUEBA: 503 con Retry-After
+
+    Verifica que /analyze-by-system responda 503 con Retry-After cuando el
+    ejecutor no tiene cupo, sin afectar a /health.
+    """
+    saturated = AnalysisExecutor(kind="thread", max_workers=0, max_queue=0, retry_after=2)
+    monkeypatch.setattr(main, "analysis_executor", saturated)
+    client = TestClient(main.app)
+
+    # Programa que no está en la caché de resultados
+    response = client.post("/analyze-by-system", json={"pseudocode": "for k 🡨 1 to n do begin z 🡨 2 end"})
+
+    assert response.status_code == 503, f"Código esperado: 503, obtenido: {response.status_code}"
+    assert response.headers.get("retry-after") == "2", f"Retry-After esperado: 2, obtenido: {response.headers.get('retry-after')}"
+    assert client.get("/health").status_code == 200, "/health debe responder aunque el análisis esté saturado"
@@ -0,0 +1,159 @@
+"""
+Test para verificar el control de admisión por cliente: token bucket por
+API key, concurrencia por cliente con plazo de cola y pools separados para
+el analizador del sistema y los endpoints del LLM.
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from services.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    PoolLimits,
+    admission_controller,
+    client_key,
+    route_pool
+)
+from services.http_cache import llm_analysis_key, make_etag
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin x 🡨 1 end"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _limits(name, **overrides):
+    values = dict(max_concurrent=10, per_key_concurrent=10, rate_per_second=0, burst=1, queue_timeout_ms=1000)
+    values.update(overrides)
+    return PoolLimits(name, **values)
+
+
+def test_admission_token_bucket():
+    """
+    PRUEBA: Tasa por cliente (token bucket)
+
+    Verifica que con burst=2 y 1 solicitud/s la tercera solicitud seguida se
+    rechace con 429 y Retry-After, que otro cliente no se vea afectado y que
+    tras 1 segundo se admita de nuevo.
+    """
+    clock = FakeClock()
+    controller = AdmissionController({"system": _limits("system", rate_per_second=1.0, burst=2.0)}, clock=clock)
+
+    async def scenario():
+        outcomes = []
+        for key in ("a", "a", "a", "b"):
+            try:
+                await controller.acquire("system", key)
+                await controller.release("system", key)
+                outcomes.append(200)
+            except AdmissionRejected as e:
+                outcomes.append((e.status_code, e.retry_after))
+        clock.now += 1.0
+        await controller.acquire("system", "a")
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+
+    assert outcomes == [200, 200, (429, 1.0), 200], f"Resultados inesperados: {outcomes}"
+    assert controller.stats()["system"]["rejected_rate"] == 1, f"Se esperaba 1 rechazo por tasa: {controller.stats()}"
+
+
+def test_admission_per_key_concurrency_and_deadline():
+    """
+    PRUEBA: Concurrencia por cliente y plazo de cola
+
+    Verifica que con 1 solicitud simultánea por cliente la segunda del mismo
+    cliente espere en cola y se admita al liberarse el cupo, que otra espere
+    más que el plazo y se rechace con 503, y que otro cliente no espere.
+    """
+    controller = AdmissionController({"llm": _limits("llm", per_key_concurrent=1, queue_timeout_ms=50)})
+
+    async def scenario():
+        await controller.acquire("llm", "a")
+        await controller.acquire("llm", "b")  # Otro cliente: cupo inmediato
+
+        queued = asyncio.ensure_future(controller.acquire("llm", "a"))
+        await asyncio.sleep(0.01)
+        await controller.release("llm", "a")
+        await queued                          # Admitida al liberarse el cupo
+
+        try:
+            await controller.acquire("llm", "a")
+            return None
+        except AdmissionRejected as e:
+            return e.status_code
+
+    status = asyncio.run(scenario())
+    stats = controller.stats()["llm"]
+
+    assert status == 503, f"Código esperado al vencer el plazo: 503, obtenido: {status}"
+    assert (stats["admitted"], stats["queued"], stats["rejected_deadline"]) == (3, 2, 1), \
+        f"Esperado admitted=3, queued=2, rejected_deadline=1; obtenido: {stats}"
+    assert stats["wait_ms_max"] >= 5, f"La espera en cola debe registrarse: {stats}"
+
+
+def test_admission_middleware_separate_pools(monkeypatch):
+    """
+    PRUEBA: Pools separados en la aplicación
+
+    Verifica que al agotar la tasa del pool llm de un cliente sus solicitudes
+    al LLM reciban 429 con Retry-After, mientras /analyze-by-system (pool
+    system), la forma GET de /analyze-by-llm (búsqueda en caché) y /health
+    siguen respondiendo para ese mismo cliente.
+    """
+    monkeypatch.setattr(admission_controller, "pools", AdmissionController({
+        "system": _limits("system"),
+        "llm": _limits("llm", rate_per_second=0.01, burst=1.0),
+    }).pools)
+    client = TestClient(main.app)
+    headers = {"X-API-Key": "cliente-a", "If-None-Match": make_etag(llm_analysis_key(PSEUDOCODE))}
+
+    first = client.post("/analyze-by-llm", json={"pseudocode": PSEUDOCODE}, headers=headers)
+    second = client.post("/analyze-by-llm", json={"pseudocode": PSEUDOCODE}, headers=headers)
+    system = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE}, headers={"X-API-Key": "cliente-a"})
+    lookup = client.get("/analyze-by-llm/" + "0" * 64, headers={"X-API-Key": "cliente-a"})
+
+    assert first.status_code == 304, f"Código esperado: 304, obtenido: {first.status_code}"
+    assert second.status_code == 429, f"Código esperado: 429, obtenido: {second.status_code}"
+    assert int(second.headers["retry-after"]) >= 1, "El rechazo debe indicar Retry-After"
+    assert system.status_code == 200, f"El pool system no debe verse afectado, obtenido: {system.status_code}"
+    assert lookup.status_code == 404, f"La búsqueda GET no debe usar el pool llm, obtenido: {lookup.status_code}"
+    assert client.get("/health").status_code == 200, "/health no tiene control de admisión"
+    assert client.get("/admission/stats").json()["pools"]["llm"]["rejected_rate"] == 1, "Se debe registrar el rechazo"
+
+
+def test_route_pool_and_client_key():
+    """
+    PRUEBA: Pool por método y clave del cliente
+
+    Verifica que los GET de las rutas del LLM (búsquedas en caché por
+    content_hash) vayan al pool system, y que la IP de X-Forwarded-For solo
+    se use cuando el par TCP es un proxy de confianza, tomando la última
+    dirección que no es un proxy propio.
+    """
+    lookup = "/analyze-by-llm/" + "0" * 64
+    assert route_pool("/analyze-by-llm", "POST") == "llm", "El POST al LLM usa el pool llm"
+    assert route_pool(lookup, "GET") == "system", "La búsqueda GET usa el pool barato"
+    assert route_pool("/complete-code/stream", "POST") == "llm", "El streaming del LLM usa el pool llm"
+    assert route_pool("/health", "GET") is None, "/health no tiene control de admisión"
+
+    def scope(peer, forwarded=None):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return {"client": (peer, 5000), "headers": headers}
+
+    proxies = {"10.0.0.1", "10.0.0.2"}
+    assert client_key(scope("10.0.0.1")) == "ip:10.0.0.1", "Sin proxies de confianza se usa el par TCP"
+    assert client_key(scope("10.0.0.1", "1.2.3.4"), proxies) == "ip:1.2.3.4", "Detrás del proxy se usa el cliente"
+    assert client_key(scope("10.0.0.1", "6.6.6.6, 1.2.3.4, 10.0.0.2"), proxies) == "ip:1.2.3.4", \
+        "Se toma la última dirección que no es un proxy propio"
+    assert client_key(scope("5.5.5.5", "1.2.3.4"), proxies) == "ip:5.5.5.5", \
+        "X-Forwarded-For de un par que no es proxy propio se ignora"
@@ -0,0 +1,72 @@
+"""
+Test para verificar la serialización rápida de respuestas (ModelResponse):
+el cuerpo coincide con el del modelo Pydantic, con y sin orjson, y los
+endpoints de análisis no vuelven a validar contra response_model.
+
+Pseudocódigo evaluado:
+for i 🡨 1 to n do begin x 🡨 1 end
+"""
+
+import json
+
+import fastapi.routing
+from fastapi.testclient import TestClient
+
+import services.serialization
+from main import app
+from models.responses import AnalyzeCodeResponse
+from services.serialization import ModelResponse
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin x 🡨 1 end"
+
+client = TestClient(app)
+
+
+def test_model_response_matches_pydantic(monkeypatch):
+    """
+    PRUEBA: Cuerpo de ModelResponse
+
+    Verifica que el JSON generado sea equivalente al de model_dump_json,
+    conserve los caracteres Unicode sin escapar y que el respaldo sin
+    orjson produzca el mismo contenido.
+    """
+    model = AnalyzeCodeResponse(
+        O="O(n)", Omega="Ω(n)", Theta="Θ(n)",
+        space={"O": "O(1)", "details": []},
+        details={"loops": ["for i 🡨 1 to n"], "combination": "secuencial"},
+    )
+    expected = json.loads(model.model_dump_json())
+
+    fast = ModelResponse(model)
+    assert json.loads(fast.body) == expected, "El cuerpo debe coincidir con model_dump_json"
+    assert "Ω(n)".encode("utf-8") in fast.body, "Los caracteres Unicode no deben escaparse"
+    assert fast.headers["content-type"] == "application/json", f"Content-Type inesperado: {fast.headers['content-type']}"
+
+    monkeypatch.setattr(services.serialization, "orjson", None)
+    fallback = ModelResponse(model)
+    assert json.loads(fallback.body) == expected, "Sin orjson el cuerpo debe ser el mismo"
+    assert json.loads(ModelResponse({"a": [1, "Θ"]}).body) == {"a": [1, "Θ"]}, "Los diccionarios también deben serializarse"
+
+
+def test_endpoints_skip_response_model_validation(monkeypatch):
+    """
+    PRUEBA: Sin doble validación en /analyze-by-system
+
+    Verifica que el endpoint y su forma GET respondan sin pasar por la
+    validación de response_model de FastAPI (serialize_response) y que el
+    análisis y los headers de caché se mantengan.
+    """
+    def fail(*args, **kwargs):
+        raise AssertionError("serialize_response no debe ejecutarse")
+
+    monkeypatch.setattr(fastapi.routing, "serialize_response", fail)
+
+    response = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE})
+    assert response.status_code == 200, f"Código esperado: 200, obtenido: {response.status_code}"
+    assert response.json()["O"] == "O(n)", f"O esperado: O(n), obtenido: {response.json()['O']}"
+    assert response.headers.get("etag"), "La respuesta debe conservar el ETag"
+
+    by_hash = client.get(response.headers["content-location"])
+    assert by_hash.status_code == 200, f"Código esperado: 200, obtenido: {by_hash.status_code}"
+    assert by_hash.json()["fingerprint"] == response.json()["fingerprint"], "La forma GET debe devolver el mismo análisis"
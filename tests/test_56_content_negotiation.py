@@ -0,0 +1,110 @@
+"""
+Test para verificar la negociación de contenido de los endpoints de
+análisis: MessagePack según Accept, compresión gzip/brotli según
+Accept-Encoding y ETags distintos por representación.
+
+Pseudocódigo evaluado:
+for i 🡨 1 to n do begin for j 🡨 1 to n do begin x 🡨 1 end end
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import services.serialization
+from main import app
+from services.serialization import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, negotiate
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin for j 🡨 1 to n do begin x 🡨 1 end end"
+
+client = TestClient(app)
+
+
+def test_negotiate_headers(monkeypatch):
+    """
+    PRUEBA: Elección de formato y codificación
+
+    Verifica que se respeten los pesos q de Accept y Accept-Encoding, que
+    sin headers se responda JSON sin comprimir y que MessagePack y brotli
+    se omitan si sus paquetes no están instalados.
+    """
+    monkeypatch.setattr(services.serialization, "msgpack", object())
+    monkeypatch.setattr(services.serialization, "brotli", object())
+
+    default = negotiate(None, None)
+    assert (default.media_type, default.encoding) == (JSON_MEDIA_TYPE, None), "Sin headers se espera JSON sin comprimir"
+
+    preferred = negotiate("application/json;q=0.5, application/x-msgpack", "gzip;q=0.8, br")
+    assert preferred.media_type == MSGPACK_MEDIA_TYPE, f"Se esperaba MessagePack, obtenido: {preferred.media_type}"
+    assert preferred.encoding == "br", f"Se esperaba br, obtenido: {preferred.encoding}"
+    assert preferred.etag_suffix == "-msgpack", "MessagePack debe tener su propio ETag"
+
+    refused = negotiate("application/msgpack;q=0, */*", "br;q=0, gzip")
+    assert (refused.media_type, refused.encoding) == (JSON_MEDIA_TYPE, "gzip"), "q=0 debe excluir la opción"
+
+    monkeypatch.setattr(services.serialization, "msgpack", None)
+    monkeypatch.setattr(services.serialization, "brotli", None)
+    fallback = negotiate("application/msgpack", "br, gzip;q=0.1")
+    assert fallback.media_type == JSON_MEDIA_TYPE, "Sin msgpack instalado se debe responder JSON"
+    assert fallback.encoding == "gzip", "Sin brotli instalado se debe usar gzip"
+
+
+def test_msgpack_response_matches_json():
+    """
+    PRUEBA: MessagePack con el mismo esquema que JSON
+
+    Verifica que /analyze-by-system con Accept: application/msgpack devuelva
+    el mismo análisis que en JSON, con Vary y un ETag propio que responde
+    304 con If-None-Match.
+    """
+    msgpack = pytest.importorskip("msgpack")
+
+    as_json = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE})
+    packed = client.post(
+        "/analyze-by-system", json={"pseudocode": PSEUDOCODE}, headers={"Accept": MSGPACK_MEDIA_TYPE}
+    )
+
+    assert packed.status_code == 200, f"Código esperado: 200, obtenido: {packed.status_code}"
+    assert packed.headers["content-type"] == MSGPACK_MEDIA_TYPE, f"Content-Type inesperado: {packed.headers['content-type']}"
+    assert "Accept" in packed.headers.get("vary", ""), "La respuesta debe declarar Vary: Accept"
+
+    body = msgpack.unpackb(packed.content)
+    expected = as_json.json()
+    body.pop("budget"), expected.pop("budget")
+    assert body == expected, "El cuerpo MessagePack debe tener el mismo esquema y contenido que el JSON"
+
+    etag = packed.headers["etag"]
+    assert etag != as_json.headers["etag"], "Cada representación debe tener su propio ETag"
+    repeated = client.post(
+        "/analyze-by-system", json={"pseudocode": PSEUDOCODE},
+        headers={"Accept": MSGPACK_MEDIA_TYPE, "If-None-Match": etag}
+    )
+    assert repeated.status_code == 304, f"Código esperado: 304, obtenido: {repeated.status_code}"
+
+
+def test_gzip_compression_and_etag(monkeypatch):
+    """
+    PRUEBA: Compresión gzip
+
+    Verifica que con Accept-Encoding: gzip los cuerpos que superan el umbral
+    se compriman, que el ETag lleve el sufijo -gzip, que ese ETag también
+    produzca 304 y que los cuerpos pequeños se envíen sin comprimir.
+    """
+    small = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers, "Un cuerpo menor al umbral no debe comprimirse"
+
+    monkeypatch.setattr(services.serialization, "COMPRESSION_MIN_BYTES", 0)
+    compressed = client.post(
+        "/analyze-by-system", json={"pseudocode": PSEUDOCODE}, headers={"Accept-Encoding": "gzip"}
+    )
+    etag = compressed.headers["etag"]
+
+    assert compressed.headers.get("content-encoding") == "gzip", "Se esperaba Content-Encoding: gzip"
+    assert etag.endswith('-gzip"'), f"El ETag comprimido debe llevar el sufijo -gzip, obtenido: {etag}"
+    assert compressed.json()["O"] == "O(n^2)", f"O esperado: O(n^2), obtenido: {compressed.json()['O']}"
+
+    repeated = client.post(
+        "/analyze-by-system", json={"pseudocode": PSEUDOCODE},
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert repeated.status_code == 304, f"Código esperado: 304, obtenido: {repeated.status_code}"
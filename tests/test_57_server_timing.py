@@ -0,0 +1,78 @@
+"""
+Test para verificar los tiempos por etapa de cada solicitud: header
+Server-Timing en /analyze-by-system, campo "timings" con ?debug=true y
+etapas del pipeline del LLM.
+
+Pseudocódigo evaluado:
+for i 🡨 1 to n do begin for k 🡨 1 to n do begin total 🡨 total + k end end
+"""
+
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.llm_service import LLMService
+from services.timing import StageTimer
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin for k 🡨 1 to n do begin total 🡨 total + k end end"
+
+client = TestClient(app)
+
+
+def parse_server_timing(header):
+    """'parse;dur=1.2, total;dur=3.4' → {'parse': 1.2, 'total': 3.4}"""
+    stages = {}
+    for entry in header.split(","):
+        name, _, duration = entry.strip().partition(";dur=")
+        stages[name] = float(duration)
+    return stages
+
+
+def test_analyze_by_system_server_timing():
+    """
+    PRUEBA: Server-Timing en /analyze-by-system
+
+    Verifica que un análisis nuevo reporte las etapas del pipeline (parse,
+    transform, analysis, serialization, total), que con ?debug=true
+    aparezcan también en el cuerpo y que sin debug el campo sea nulo.
+    """
+    response = client.post("/analyze-by-system?debug=true", json={"pseudocode": PSEUDOCODE})
+    stages = parse_server_timing(response.headers["server-timing"])
+
+    assert response.status_code == 200, f"Código esperado: 200, obtenido: {response.status_code}"
+    for name in ("cache", "parse", "transform", "analysis", "validation", "serialization", "total"):
+        assert name in stages, f"Falta la etapa '{name}' en Server-Timing: {stages}"
+    assert all(duration >= 0 for duration in stages.values()), f"Duraciones negativas: {stages}"
+
+    timings = response.json()["timings"]
+    assert timings is not None and "parse" in timings, f"Se esperaban los tiempos en el cuerpo, obtenido: {timings}"
+    assert "serialization" not in timings, "La serialización no puede medirse dentro del propio cuerpo"
+
+    cached = client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE})
+    cached_stages = parse_server_timing(cached.headers["server-timing"])
+    assert "parse" not in cached_stages, "Un acierto de caché no debe parsear"
+    assert cached.json()["timings"] is None, "Sin ?debug=true el campo timings debe ser nulo"
+
+
+def test_llm_pipeline_stages():
+    """
+    PRUEBA: Etapas del pipeline del LLM
+
+    Verifica que generate_json_completion mida la espera del modelo
+    (llm_wait) y la extracción del JSON (json_extraction), con un cliente
+    simulado que no llama a la API.
+    """
+    reply = SimpleNamespace(content=[SimpleNamespace(text='Análisis:\n```json\n{"ok": true}\n```')])
+    service = LLMService.__new__(LLMService)
+    service.model = "modelo-de-prueba"
+    service.client = SimpleNamespace(messages=SimpleNamespace(create=lambda **kwargs: reply))
+
+    timer = StageTimer()
+    result = service.generate_json_completion("prompt", timer=timer)
+
+    assert result == {"ok": True}, f"JSON esperado: {{'ok': True}}, obtenido: {result}"
+    assert list(timer.stages) == ["llm_wait", "json_extraction"], f"Etapas inesperadas: {list(timer.stages)}"
+    assert timer.header().startswith("llm_wait;dur="), f"Header inesperado: {timer.header()}"
+    assert "total;dur=" in timer.header(), "El header debe incluir el total"
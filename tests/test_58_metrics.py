@@ -0,0 +1,163 @@
+"""
+Test para verificar el endpoint /metrics (formato de texto de Prometheus):
+solicitudes y etapas por endpoint, cachés, consumo del LLM y agregación de
+las instantáneas de varios workers.
+
+Pseudocódigo evaluado:
+for i 🡨 1 to n do begin while (x > 0) do begin x 🡨 x - 1 end end
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import httpx
+from fastapi.testclient import TestClient
+
+import services.llm_service as llm_service
+from benchmarks.bench_serialization import sample_llm_response
+from benchmarks.stub_anthropic import StubAnthropicServer
+from main import app
+from services.llm_service import create_async_client
+from services.metrics import MetricsRegistry, record_llm_usage
+from services.result_cache import ResultCache
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin while (x > 0) do begin x 🡨 x - 1 end end"
+
+client = TestClient(app)
+
+
+def sample_value(text, prefix):
+    """Valor de la primera muestra cuya línea empieza con prefix."""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"No se encontró la muestra '{prefix}'")
+
+
+def test_metrics_endpoint():
+    """
+    PRUEBA: Exposición de métricas
+
+    Verifica que /metrics use el formato de Prometheus y cuente las
+    solicitudes por plantilla de ruta, las etapas del pipeline, la
+    proporción de aciertos de caché y el consumo de tokens del LLM.
+    """
+    before = client.get("/metrics").text
+    requests_prefix = 'complexity_http_requests_total{endpoint="/analyze-by-system",method="POST",status="200"}'
+    parse_prefix = 'complexity_stage_duration_seconds_count{endpoint="/analyze-by-system",stage="parse"}'
+    previous_requests = sample_value(before, requests_prefix) if requests_prefix in before else 0
+    previous_parses = sample_value(before, parse_prefix) if parse_prefix in before else 0
+
+    client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE})
+    client.post("/analyze-by-system", json={"pseudocode": PSEUDOCODE})
+    client.get("/analyze-by-system/" + "f" * 64)
+    record_llm_usage("modelo-de-prueba", 1200, 3400, 0.0546)
+
+    response = client.get("/metrics")
+    text = response.text
+
+    assert response.status_code == 200, f"Código esperado: 200, obtenido: {response.status_code}"
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4"), \
+        f"Content-Type inesperado: {response.headers['content-type']}"
+    assert "# TYPE complexity_http_request_duration_seconds histogram" in text, "Falta el histograma de latencia"
+
+    assert sample_value(text, requests_prefix) == previous_requests + 2, "Se esperaban 2 solicitudes POST más"
+    assert sample_value(text, parse_prefix) == previous_parses + 1, "Solo el análisis sin caché debe parsear"
+    assert 'endpoint="/analyze-by-system/{content_hash}",method="GET",status="404"' in text, \
+        "La ruta GET debe registrarse por su plantilla, no por el hash"
+    assert 0 < sample_value(text, 'complexity_cache_hit_ratio{cache="system"}') <= 1, "Proporción de aciertos inválida"
+
+    assert sample_value(text, 'complexity_llm_tokens_total{model="modelo-de-prueba",kind="output"}') >= 3400, \
+        "Faltan los tokens de salida del LLM"
+    assert sample_value(text, 'complexity_llm_cost_usd_total{model="modelo-de-prueba"}') >= 0.0546, \
+        "Falta el costo acumulado del LLM"
+
+
+def test_llm_usage_metrics_come_from_api(monkeypatch):
+    """
+    PRUEBA: Consumo del LLM informado por la API
+
+    Verifica que si el texto del modelo trae su propio llm_metadata (tokens
+    y costo inventados), la respuesta y /metrics usen los tokens que informó
+    la API (10 de entrada y 20 de salida en el servidor simulado) y no
+    registren costo.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setenv("CLAUDE_MODEL", "modelo-metricas-api")
+    monkeypatch.setattr(llm_service, "llm_response_cache", ResultCache(max_entries=8, ttl_seconds=60))
+    reply = sample_llm_response(3).model_dump(mode="json", exclude={"timings"})
+    reply["llm_metadata"] = {
+        "model_used": "modelo-inventado",
+        "tokens": {"input": 450, "output": 2100, "total": 2550},
+        "estimated_cost_usd": 0.01275,
+        "processing_time_ms": 3500,
+    }
+    # Recursivo: el analizador local no es concluyente y se usa el prompt completo
+    pseudocode = "Factorial(n)\nbegin\n    return n * call Factorial(n - 1)\nend"
+
+    async def run(base_url):
+        monkeypatch.setattr(llm_service, "_async_client", create_async_client(base_url=base_url))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/analyze-by-llm", json={"pseudocode": pseudocode}, headers={"X-API-Key": "metricas"})
+        await llm_service._async_client.close()
+        return response
+
+    with StubAnthropicServer(reply_text=json.dumps(reply, ensure_ascii=False)) as stub:
+        response = asyncio.run(run(stub.base_url))
+
+    assert response.status_code == 200, f"Código esperado: 200, obtenido: {response.status_code} {response.text}"
+    metadata = response.json()["llm_metadata"]
+    assert metadata["model_used"] == "modelo-metricas-api", f"El modelo debe ser el configurado: {metadata}"
+    assert (metadata["tokens"]["input"], metadata["tokens"]["output"]) == (10, 20), \
+        f"Los tokens deben ser los de la API: {metadata['tokens']}"
+    assert metadata["estimated_cost_usd"] is None, "El costo escrito por el modelo no debe conservarse"
+
+    text = client.get("/metrics").text
+    label = 'complexity_llm_tokens_total{model="modelo-metricas-api",kind='
+    assert sample_value(text, label + '"input"}') == 10, "/metrics debe registrar los tokens de entrada de la API"
+    assert sample_value(text, label + '"output"}') == 20, "/metrics debe registrar los tokens de salida de la API"
+    assert 'model="modelo-inventado"' not in text, "El modelo escrito por el modelo no debe exportarse"
+    assert 'complexity_llm_cost_usd_total{model="modelo-metricas-api"}' not in text, \
+        "El costo escrito por el modelo no debe exportarse"
+
+
+def test_metrics_multiprocess_aggregation(tmp_path):
+    """
+    PRUEBA: Agregación entre workers
+
+    Verifica que el scrape sume los contadores e histogramas de las
+    instantáneas de otros procesos y descarte los gauges de un proceso que
+    ya terminó.
+    """
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+
+    registry = MetricsRegistry(multiproc_dir=str(tmp_path))
+    registry.describe("requests_total", "counter", "Solicitudes")
+    registry.describe("in_flight", "gauge", "En curso")
+    registry.describe("latency_seconds", "histogram", "Latencia", (0.1, 1.0))
+    registry.add_collector(lambda: [("in_flight", {}, 1)])
+    registry.inc("requests_total", (("endpoint", "/a"),), 2)
+    registry.observe("latency_seconds", (), 0.05)
+
+    for pid, requests in ((finished.pid, 5), (os.getppid(), 3)):
+        snapshot = {
+            "pid": pid,
+            "counters": [["requests_total", [["endpoint", "/a"]], requests]],
+            "histograms": [["latency_seconds", [], [0, 1, 0], 0.5, 1]],
+            "gauges": [["in_flight", [], 4]],
+        }
+        (tmp_path / f"metrics-{pid}.json").write_text(json.dumps(snapshot))
+
+    text = registry.render()
+
+    assert sample_value(text, 'requests_total{endpoint="/a"}') == 10, "Los contadores deben sumarse entre procesos"
+    assert sample_value(text, "in_flight") == 5, "Solo deben sumarse los gauges de procesos vivos"
+    assert sample_value(text, 'latency_seconds_bucket{le="0.1"}') == 1, "Barra acumulada inesperada"
+    assert sample_value(text, 'latency_seconds_bucket{le="+Inf"}') == 3, "Barra +Inf inesperada"
+    assert sample_value(text, "latency_seconds_count") == 3, "El conteo del histograma debe sumarse"
@@ -0,0 +1,62 @@
+"""
+Test para verificar el cliente de Anthropic compartido: los servicios
+construidos en cada solicitud reutilizan un solo cliente y su pool
+keep-alive, sin abrir una conexión por llamada.
+
+Usa un servidor local que imita /v1/messages (benchmarks/stub_anthropic.py).
+"""
+
+import asyncio
+
+import services.llm_service as llm_service
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.completion_service import CompletionService
+from services.llm_analysis_service import LLMAnalysisService
+from services.llm_service import LLMService, create_client
+
+
+def test_services_share_client(monkeypatch):
+    """
+    PRUEBA: Cliente único por proceso
+
+    Verifica que los servicios del LLM creados por solicitud usen el mismo
+    cliente, que close_client lo libere y que sin API key init_client no
+    falle al iniciar la aplicación.
+    """
+    monkeypatch.setattr(llm_service, "_client", None)
+    monkeypatch.setattr(llm_service, "_async_client", None)
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    llm_service.init_client()
+    assert llm_service._client is None, "Sin API key no debe crearse el cliente al iniciar"
+
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    llm_service.init_client()
+    client = llm_service._client
+
+    assert client is not None, "init_client debe crear el cliente compartido"
+    assert LLMAnalysisService().llm_service.client is client, "El análisis por LLM debe usar el cliente compartido"
+    assert CompletionService().llm_service.client is client, "El completado debe usar el cliente compartido"
+
+    asyncio.run(llm_service.close_client())
+    assert llm_service._client is None, "close_client debe liberar el cliente compartido"
+
+
+def test_connection_reused_across_requests(monkeypatch):
+    """
+    PRUEBA: Reutilización de la conexión
+
+    Verifica que varias llamadas seguidas con el cliente compartido viajen
+    por una sola conexión TCP con el pool keep-alive ajustado.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    # Sin caché de respuestas: las 5 llamadas idénticas deben llegar al servidor
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+
+    with StubAnthropicServer(reply_text="hola") as stub:
+        client = create_client(base_url=stub.base_url)
+        texts = [LLMService(client).generate_completion("prompt") for _ in range(5)]
+        client.close()
+
+    assert texts == ["hola"] * 5, f"Respuestas inesperadas: {texts}"
+    assert stub.requests == 5, f"Solicitudes esperadas: 5, obtenidas: {stub.requests}"
+    assert stub.connections == 1, f"Conexiones esperadas: 1, obtenidas: {stub.connections}"
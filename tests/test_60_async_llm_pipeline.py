@@ -0,0 +1,96 @@
+"""
+Test para verificar el pipeline asíncrono del LLM: /complete-code y
+/analyze-by-llm esperan al modelo sin ocupar hilos, así que un worker
+atiende más llamadas simultáneas que su pool de hilos (40 por defecto).
+
+Usa un servidor local que imita /v1/messages con latencia de varios
+segundos (benchmarks/stub_anthropic.py).
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+import main
+import services.llm_service as llm_service
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.admission import AdmissionController, PoolLimits, admission_controller
+from services.llm_analysis_service import LLMAnalysisService
+from services.llm_service import AsyncLLMService, create_async_client
+
+
+PSEUDOCODE = "for i 🡨 1 to n do begin\n    ► completar: sumar i a total\nend"
+
+ANALYSIS = {
+    "complexity": {"worst_case": "O(n)", "best_case": "Ω(n)", "average_case": "Θ(n)"},
+    "llm_metadata": {"tokens": {"input": 10, "output": 20, "total": 30}, "estimated_cost_usd": 0.0003}
+}
+
+
+def unlimited_pools():
+    def limits(name):
+        return PoolLimits(name, max_concurrent=1000, per_key_concurrent=1000,
+                          rate_per_second=0, burst=1.0, queue_timeout_ms=10000.0)
+    return AdmissionController({"system": limits("system"), "llm": limits("llm")}).pools
+
+
+def test_async_analysis_service(monkeypatch):
+    """
+    PRUEBA: analyze_pseudocode_async
+
+    Verifica que la versión asíncrona del análisis por LLM extraiga el JSON,
+    complete los metadatos y no abra más de una conexión para llamadas
+    seguidas.
+    """
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+    async def run(base_url):
+        client = create_async_client(base_url=base_url)
+        service = LLMAnalysisService(AsyncLLMService(client))
+        results = [await service.analyze_pseudocode_async("x 🡨 1") for _ in range(3)]
+        await client.close()
+        return results
+
+    with StubAnthropicServer(reply_text="```json\n" + json.dumps(ANALYSIS) + "\n```") as stub:
+        results = asyncio.run(run(stub.base_url))
+
+    assert results[0]["complexity"]["worst_case"] == "O(n)", f"Análisis inesperado: {results[0]}"
+    assert results[0]["pseudocode"] == "x 🡨 1", "Debe incluirse el pseudocódigo analizado"
+    assert results[0]["llm_metadata"]["tokens"]["total"] == 30, "Deben conservarse los tokens reportados"
+    assert stub.connections == 1, f"Conexiones esperadas: 1, obtenidas: {stub.connections}"
+
+
+def test_concurrent_llm_requests_do_not_pin_threads(monkeypatch):
+    """
+    PRUEBA: Concurrencia de /complete-code
+
+    Con un modelo que tarda 2 s, 100 solicitudes simultáneas (con programas
+    distintos, para que no se agrupen en una sola llamada) deben terminar
+    en poco más de 2 s. Con llamadas bloqueantes en el pool de 40 hilos
+    tardarían al menos 3 tandas (6 s).
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(admission_controller, "pools", unlimited_pools())
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+
+    async def run(base_url):
+        monkeypatch.setattr(llm_service, "_async_client", create_async_client(base_url=base_url))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.post("/complete-code", json={"pseudocode": f"{PSEUDOCODE} ► {i}"}) for i in range(100)
+            ])
+            elapsed = time.perf_counter() - start
+        await llm_service._async_client.close()
+        return responses, elapsed
+
+    with StubAnthropicServer(reply_text="for i 🡨 1 to n do begin\n    total 🡨 total + i\nend", delay=2.0) as stub:
+        responses, elapsed = asyncio.run(run(stub.base_url))
+
+    statuses = {response.status_code for response in responses}
+    assert statuses == {200}, f"Códigos inesperados: {statuses}"
+    assert "total 🡨 total + i" in responses[0].json()["pseudocode"], "Se esperaba el código completado"
+    assert stub.requests == 100, f"Llamadas al modelo esperadas: 100, obtenidas: {stub.requests}"
+    assert elapsed < 4.5, f"Las llamadas deben solaparse; 100 solicitudes tardaron {elapsed:.1f} s"
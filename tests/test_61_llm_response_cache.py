@@ -0,0 +1,121 @@
+"""
+Test para verificar la caché de respuestas del LLM: clave por modelo,
+max_tokens y hash del prompt, LRU en memoria delante de SQLite en disco y
+el estado de la caché en llm_metadata.
+
+Usa un servidor local que imita /v1/messages (benchmarks/stub_anthropic.py).
+"""
+
+import asyncio
+import json
+import os
+
+import httpx
+
+import main
+import services.llm_service as llm_service
+from benchmarks.bench_serialization import sample_llm_response
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.llm_service import LLMService, create_async_client, create_client
+from services.result_cache import ResultCache, SQLiteCacheBackend
+
+
+def disk_cache(path):
+    return ResultCache(max_entries=8, ttl_seconds=60, backend=SQLiteCacheBackend(str(path), max_entries=100))
+
+
+def test_response_cache_memory_and_disk(tmp_path, monkeypatch):
+    """
+    PRUEBA: Caché en memoria y en disco
+
+    Verifica que un prompt repetido se responda sin llamar al modelo, que
+    otro max_tokens sea otra entrada, que tras un reinicio (caché nueva
+    sobre el mismo archivo) la respuesta salga del disco y que una
+    respuesta cortada por max_tokens no se guarde.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    path = tmp_path / "llm.sqlite3"
+    monkeypatch.setattr(llm_service, "llm_response_cache", disk_cache(path))
+
+    with StubAnthropicServer(reply_text="hola") as stub:
+        client = create_client(base_url=stub.base_url)
+        service = LLMService(client)
+        statuses = []
+        for max_tokens in (100, 100, 200):
+            assert service.generate_completion("prompt", max_tokens=max_tokens) == "hola", "Texto inesperado"
+            statuses.append(service.cache_status)
+        calls_before_restart = stub.requests
+
+        monkeypatch.setattr(llm_service, "llm_response_cache", disk_cache(path))
+        restarted = LLMService(client)
+        restarted.generate_completion("prompt", max_tokens=100)
+        client.close()
+
+    assert statuses == ["miss", "hit", "miss"], f"Estados inesperados: {statuses}"
+    assert calls_before_restart == 2, f"Llamadas esperadas: 2, obtenidas: {calls_before_restart}"
+    assert restarted.cache_status == "hit", "Tras el reinicio la respuesta debe salir del disco"
+    assert stub.requests == 2, "Un acierto en disco no debe llamar al modelo"
+    assert llm_service.llm_response_cache.stats()["shared_hits"] == 1, "Se esperaba un acierto del respaldo SQLite"
+
+    with StubAnthropicServer(reply_text="cortado", stop_reason="max_tokens") as stub:
+        client = create_client(base_url=stub.base_url)
+        service = LLMService(client)
+        service.generate_completion("otro prompt")
+        service.generate_completion("otro prompt")
+        client.close()
+
+    assert stub.requests == 2, "Una respuesta cortada por max_tokens no debe guardarse"
+
+
+def test_analyze_by_llm_cache_status(monkeypatch):
+    """
+    PRUEBA: cache_status en /analyze-by-llm
+
+    Verifica que la primera solicitud reporte miss y la segunda hit, con la
+    misma respuesta y una sola llamada al modelo.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", ResultCache(max_entries=8, ttl_seconds=60))
+    analysis = sample_llm_response(3).model_dump(mode="json", exclude={"llm_metadata", "timings"})
+
+    async def run(base_url):
+        monkeypatch.setattr(llm_service, "_async_client", create_async_client(base_url=base_url))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = [
+                await client.post("/analyze-by-llm", json={"pseudocode": "x 🡨 1"}, headers={"X-API-Key": f"cliente-{i}"})
+                for i in range(2)
+            ]
+        await llm_service._async_client.close()
+        return responses
+
+    with StubAnthropicServer(reply_text=json.dumps(analysis, ensure_ascii=False)) as stub:
+        first, second = asyncio.run(run(stub.base_url))
+
+    assert first.status_code == 200, f"Código esperado: 200, obtenido: {first.status_code} {first.text}"
+    assert first.json()["llm_metadata"]["cache_status"] == "miss", "La primera solicitud debe llamar al modelo"
+    assert second.json()["llm_metadata"]["cache_status"] == "hit", "La segunda solicitud debe salir de la caché"
+    assert second.json()["basic_complexity"] == first.json()["basic_complexity"], "El análisis en caché debe ser el mismo"
+    assert stub.requests == 1, f"Llamadas al modelo esperadas: 1, obtenidas: {stub.requests}"
+
+
+def test_disk_cache_opt_in_and_lazy(tmp_path):
+    """
+    PRUEBA: Archivo SQLite opcional y creado en la primera escritura
+
+    Verifica que sin LLM_CACHE_SQLITE_PATH la caché de respuestas quede solo
+    en memoria, y que el respaldo no cree su directorio ni su archivo al
+    construirse ni al leer, sino al guardar la primera respuesta.
+    """
+    path = tmp_path / "nuevo" / "llm.sqlite3"
+    cache = disk_cache(path)
+
+    assert llm_service.LLM_CACHE_SQLITE_PATH == os.getenv("LLM_CACHE_SQLITE_PATH", ""), \
+        "El archivo de la caché de respuestas no debe tener una ruta por defecto"
+    assert cache.get("clave") is None, "Una caché vacía no debe devolver nada"
+    assert not path.parent.exists(), "Construir o leer el respaldo no debe crear archivos"
+
+    cache.set("clave", {"text": "respuesta"})
+
+    assert path.exists(), "La primera escritura debe crear el archivo"
+    assert disk_cache(path).get("clave") == {"text": "respuesta"}, "Otra caché debe leer el mismo archivo"
@@ -0,0 +1,115 @@
+"""
+Test para verificar la coalescencia de llamadas idénticas al LLM
+(single-flight): solicitudes simultáneas con el mismo prompt esperan una
+sola llamada, los errores llegan a todas y la llamada se cancela solo
+cuando ya nadie la espera.
+"""
+
+import asyncio
+import json
+
+import httpx
+
+import main
+import services.llm_service as llm_service
+from benchmarks.bench_serialization import sample_llm_response
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.admission import AdmissionController, PoolLimits, admission_controller
+from services.llm_service import create_async_client
+from services.single_flight import SingleFlight
+
+
+def test_single_flight_sharing_errors_and_cancellation():
+    """
+    PRUEBA: SingleFlight
+
+    Verifica que 10 llamadas simultáneas con la misma clave ejecuten la
+    función una vez, que un error se propague a todas y libere la clave, y
+    que cancelar a uno de dos solicitantes no cancele la llamada pero
+    cancelar a ambos sí.
+    """
+    calls = []
+    cancelled = []
+
+    async def slow(value, fail=False):
+        calls.append(value)
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(value)
+            raise
+        if fail:
+            raise ValueError("fallo del modelo")
+        return value
+
+    async def scenario():
+        flights = SingleFlight()
+        shared = await asyncio.gather(*[flights.run("a", lambda: slow("a")) for _ in range(10)])
+
+        errors = await asyncio.gather(*[flights.run("b", lambda: slow("b", fail=True)) for _ in range(3)],
+                                      return_exceptions=True)
+        retry = await flights.run("b", lambda: slow("b"))
+
+        first = asyncio.ensure_future(flights.run("c", lambda: slow("c")))
+        second = asyncio.ensure_future(flights.run("c", lambda: slow("c")))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        survivor = await second
+
+        third = asyncio.ensure_future(flights.run("d", lambda: slow("d")))
+        fourth = asyncio.ensure_future(flights.run("d", lambda: slow("d")))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        fourth.cancel()
+        await asyncio.gather(third, fourth, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return flights.stats(), shared, errors, retry, survivor
+
+    stats, shared, errors, retry, survivor = asyncio.run(scenario())
+
+    assert shared == [("a", False)] + [("a", True)] * 9, f"Resultados inesperados: {shared}"
+    assert calls.count("a") == 1, f"La llamada 'a' debe ejecutarse una vez, se ejecutó {calls.count('a')}"
+    assert all(isinstance(error, ValueError) for error in errors), f"El error debe llegar a todos: {errors}"
+    assert retry == ("b", False) and calls.count("b") == 2, "Tras un error la clave debe quedar libre"
+    assert survivor == ("c", True) and "c" not in cancelled, "Con un solicitante vivo la llamada debe continuar"
+    assert cancelled == ["d"], f"Sin solicitantes la llamada debe cancelarse, canceladas: {cancelled}"
+    assert stats == {"in_flight": 0, "started": 5, "coalesced": 13, "cancelled": 1}, f"Estadísticas: {stats}"
+
+
+def test_identical_llm_requests_share_one_call(monkeypatch):
+    """
+    PRUEBA: Coalescencia en /analyze-by-llm
+
+    Verifica que 20 solicitudes simultáneas con el mismo pseudocódigo hagan
+    una sola llamada al modelo, que las demás reporten cache_status
+    "coalesced" y que /metrics cuente las solicitudes agrupadas.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+    monkeypatch.setattr(admission_controller, "pools", AdmissionController({
+        name: PoolLimits(name, max_concurrent=100, per_key_concurrent=100,
+                         rate_per_second=0, burst=1.0, queue_timeout_ms=10000.0)
+        for name in ("system", "llm")
+    }).pools)
+    coalesced_before = llm_service.llm_flights.coalesced
+    analysis = sample_llm_response(3).model_dump(mode="json", exclude={"llm_metadata", "timings"})
+
+    async def run(base_url):
+        monkeypatch.setattr(llm_service, "_async_client", create_async_client(base_url=base_url))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            responses = await asyncio.gather(*[
+                client.post("/analyze-by-llm", json={"pseudocode": "y 🡨 2"}) for _ in range(20)
+            ])
+            metrics = await client.get("/metrics")
+        await llm_service._async_client.close()
+        return responses, metrics.text
+
+    with StubAnthropicServer(reply_text=json.dumps(analysis, ensure_ascii=False), delay=0.5) as stub:
+        responses, metrics = asyncio.run(run(stub.base_url))
+
+    statuses = sorted(response.json()["llm_metadata"]["cache_status"] for response in responses)
+    assert stub.requests == 1, f"Llamadas al modelo esperadas: 1, obtenidas: {stub.requests}"
+    assert statuses == ["coalesced"] * 19 + ["disabled"], f"Estados inesperados: {statuses}"
+    assert llm_service.llm_flights.coalesced - coalesced_before == 19, "Se esperaban 19 solicitudes agrupadas"
+    assert "complexity_llm_calls_coalesced_total" in metrics, "Falta la métrica de llamadas agrupadas"
@@ -0,0 +1,125 @@
+"""
+Test para verificar el streaming del LLM por Server-Sent Events:
+/analyze-by-llm/stream emite cada sección del JSON en cuanto se cierra y
+/complete-code/stream reenvía los fragmentos de texto del modelo.
+
+Usa un servidor local que imita /v1/messages con streaming
+(benchmarks/stub_anthropic.py).
+"""
+
+import asyncio
+import json
+import random
+
+import httpx
+
+import main
+import services.llm_analysis_service as llm_analysis_service
+import services.llm_service as llm_service
+from benchmarks.bench_serialization import sample_llm_response
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.http_cache import llm_analysis_key
+from services.json_stream import JSONSectionParser
+from services.llm_service import create_async_client
+
+
+def parse_sse(body):
+    """Lista de (evento, datos) de un cuerpo text/event-stream."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def post_stream(monkeypatch, reply_text, path, payload):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+    # Todas las secciones las transmite el modelo (sin análisis híbrido)
+    monkeypatch.setattr(llm_analysis_service, "LLM_HYBRID_ANALYSIS", False)
+
+    async def run(base_url):
+        monkeypatch.setattr(llm_service, "_async_client", create_async_client(base_url=base_url))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(path, json=payload)
+            lookup = await client.get(f"/analyze-by-llm/{llm_analysis_key(payload['pseudocode'])}")
+        await llm_service._async_client.close()
+        return response, lookup
+
+    with StubAnthropicServer(reply_text=reply_text, chunk_chars=7) as stub:
+        response, lookup = asyncio.run(run(stub.base_url))
+    return response, lookup, stub
+
+
+def test_section_parser_random_chunks():
+    """
+    PRUEBA: Parser incremental de secciones
+
+    Verifica que, partiendo la respuesta en fragmentos aleatorios, el parser
+    entregue cada sección igual a json.loads, sin confundirse con las llaves
+    de Mermaid dentro de cadenas, comillas escapadas ni el texto que el
+    modelo agrega antes y después del JSON.
+    """
+    analysis = sample_llm_response(4).model_dump(mode="json")
+    analysis["execution_diagram"] = {"flowchart": {"format": "mermaid", "diagram": 'A["n \\" }"] --> B{"i ≤ n"}\n'}}
+    text = "Aquí está el análisis:\n```json\n" + json.dumps(analysis, ensure_ascii=False, indent=2) + "\n```"
+    generator = random.Random(7)
+
+    for _ in range(50):
+        parser = JSONSectionParser()
+        sections = []
+        position = 0
+        while position < len(text):
+            size = generator.randint(1, 64)
+            sections.extend(parser.feed(text[position:position + size]))
+            position += size
+
+        assert dict(sections) == analysis, "Las secciones deben coincidir con el JSON completo"
+        assert [key for key, _ in sections] == list(analysis), "Las secciones deben llegar en orden"
+        assert parser.done, "El parser debe reconocer el cierre del objeto"
+
+
+def test_analyze_by_llm_stream(monkeypatch):
+    """
+    PRUEBA: /analyze-by-llm/stream
+
+    Verifica que se emita un evento "section" por sección, en orden, y un
+    "done" con el análisis validado, que además queda disponible por GET.
+    """
+    analysis = sample_llm_response(3).model_dump(mode="json", exclude={"llm_metadata", "timings"})
+    reply = "```json\n" + json.dumps(analysis, ensure_ascii=False) + "\n```"
+    response, lookup, stub = post_stream(monkeypatch, reply, "/analyze-by-llm/stream", {"pseudocode": "x 🡨 1"})
+    events = parse_sse(response.text)
+
+    assert response.status_code == 200, f"Código esperado: 200, obtenido: {response.status_code}"
+    assert response.headers["content-type"].startswith("text/event-stream"), "Se esperaba text/event-stream"
+    assert [data["name"] for event, data in events if event == "section"] == list(analysis), \
+        f"Secciones inesperadas: {[data.get('name') for _, data in events]}"
+    assert events[-1][0] == "done", f"El último evento debe ser done, obtenido: {events[-1][0]}"
+    assert events[-1][1]["basic_complexity"] == analysis["basic_complexity"], "El resultado final debe ser el análisis"
+    assert events[-1][1]["llm_metadata"]["cache_status"] == "disabled", "Metadatos inesperados"
+    assert stub.requests == 1, f"Llamadas al modelo esperadas: 1, obtenidas: {stub.requests}"
+    assert lookup.status_code == 200, "El análisis transmitido debe quedar disponible por GET"
+
+
+def test_complete_code_stream(monkeypatch):
+    """
+    PRUEBA: /complete-code/stream
+
+    Verifica que los eventos "delta" reconstruyan el texto del modelo y que
+    "done" traiga el código limpio (sin el bloque de markdown).
+    """
+    code = "for i 🡨 1 to n do begin\n    total 🡨 total + i\nend"
+    response, _, _ = post_stream(
+        monkeypatch, "```\n" + code + "\n```", "/complete-code/stream",
+        {"pseudocode": "for i 🡨 1 to n do begin\n    ► completar\nend"}
+    )
+    events = parse_sse(response.text)
+    deltas = [data["text"] for event, data in events if event == "delta"]
+
+    assert len(deltas) > 1, f"Se esperaban varios fragmentos, obtenidos: {len(deltas)}"
+    assert "".join(deltas) == "```\n" + code + "\n```", "Los fragmentos deben reconstruir la respuesta del modelo"
+    assert events[-1][0] == "done", f"Evento final inesperado: {events[-1]}"
+    assert events[-1][1]["pseudocode"] == code, f"Evento final inesperado: {events[-1]}"
+    assert events[-1][1]["llm_metadata"] is not None, "El evento final debe incluir los metadatos del LLM"
@@ -0,0 +1,118 @@
+"""
+Test para verificar el prompt caching de /complete-code: las instrucciones
+y la gramática van en un prefijo estático marcado con cache_control, el
+pseudocódigo en el sufijo, y llm_metadata informa los tokens escritos y
+leídos de la caché de prompts del proveedor.
+
+Usa un servidor local que imita /v1/messages y el prompt caching
+(benchmarks/stub_anthropic.py).
+"""
+
+import asyncio
+
+import httpx
+
+import main
+import services.llm_service as llm_service
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.completion_service import CompletionService
+from services.llm_service import CachedPrompt, LLMService, create_async_client, create_client
+
+
+PROGRAMS = [f"for i 🡨 1 to n do begin\n    ► completar: sumar {i} a total\nend" for i in range(3)]
+
+
+def test_prompt_split():
+    """
+    PRUEBA: Prefijo estático y sufijo variable
+
+    Verifica que el prefijo sea idéntico para programas distintos, que
+    contenga la gramática y las reglas, y que prefijo + sufijo formen el
+    prompt completo que lee el modelo.
+    """
+    service = CompletionService(LLMService(client=object()))
+    prompts = [service._prepare_prompt(program) for program in PROGRAMS]
+
+    assert all(isinstance(prompt, CachedPrompt) for prompt in prompts), "El prompt debe dividirse en dos partes"
+    assert len({prompt.prefix for prompt in prompts}) == 1, "El prefijo no debe depender del pseudocódigo"
+    assert service._load_grammar() in prompts[0].prefix, "La gramática debe ir en el prefijo cacheado"
+    assert "REGLAS IMPORTANTES" in prompts[0].prefix, "Las reglas deben ir en el prefijo cacheado"
+    for prompt, program in zip(prompts, PROGRAMS):
+        assert program in prompt.suffix, "El pseudocódigo debe ir en el sufijo"
+        assert program not in prompt.prefix, "El pseudocódigo no debe ir en el prefijo"
+        assert prompt.text == prompt.prefix + prompt.suffix, "El texto debe ser prefijo + sufijo"
+
+
+def test_cache_tokens_in_metadata(monkeypatch):
+    """
+    PRUEBA: Tokens del prompt caching en llm_metadata
+
+    Verifica que la primera completación escriba el prefijo en la caché de
+    prompts (cache_creation_input) y las siguientes, con otro pseudocódigo,
+    lo lean (cache_read_input), tanto en /complete-code como en el evento
+    done de /complete-code/stream.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+
+    async def run(base_url):
+        monkeypatch.setattr(llm_service, "_async_client", create_async_client(base_url=base_url))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Una API key por solicitud: no cuentan contra la tasa del pool llm
+            first, second, streamed, plain = [
+                await client.post(path, json={"pseudocode": program}, headers={"X-API-Key": f"prompt-cache-{i}"})
+                for i, (path, program) in enumerate([
+                    ("/complete-code", PROGRAMS[0]),
+                    ("/complete-code", PROGRAMS[1]),
+                    ("/complete-code/stream", PROGRAMS[2]),
+                    ("/complete-code", "x 🡨 1")
+                ])
+            ]
+        await llm_service._async_client.close()
+        return first, second, streamed, plain
+
+    with StubAnthropicServer(reply_text="total 🡨 total + i") as stub:
+        first, second, streamed, plain = asyncio.run(run(stub.base_url))
+
+    assert first.status_code == 200 and second.status_code == 200, "Las completaciones deben responder 200"
+    created = first.json()["llm_metadata"]["tokens"]
+    read = second.json()["llm_metadata"]["tokens"]
+    assert created["cache_creation_input"] > 1024, "La primera llamada debe escribir el prefijo (gramática incluida)"
+    assert created["cache_read_input"] == 0, "La primera llamada no debe leer de la caché"
+    assert read["cache_read_input"] == created["cache_creation_input"], "La segunda llamada debe leer el prefijo"
+    assert read["cache_creation_input"] == 0, "La segunda llamada no debe volver a escribir el prefijo"
+    assert read["total"] == read["input"] + read["output"] + read["cache_read_input"], "El total debe sumar todo"
+
+    done = streamed.text.strip().split("\n\n")[-1]
+    assert done.startswith("event: done"), "El stream debe terminar con el evento done"
+    assert '"cache_read_input":' + str(created["cache_creation_input"]) in done, "El evento done debe informar la lectura"
+
+    assert plain.json()["llm_metadata"] is None, "Sin comentarios de completado no hay llamada ni metadatos"
+
+
+def test_cached_prompt_sync_client(monkeypatch):
+    """
+    PRUEBA: Prompt caching con el cliente síncrono
+
+    Verifica que LLMService envíe el CachedPrompt por la API de prompt
+    caching y que una respuesta servida por la caché de respuestas conserve
+    los tokens de la llamada original.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", llm_service.ResultCache(max_entries=8, ttl_seconds=60))
+    prompt = CachedPrompt("instrucciones fijas " * 100, "pseudocódigo")
+
+    with StubAnthropicServer(reply_text="hola") as stub:
+        client = create_client(base_url=stub.base_url)
+        service = LLMService(client)
+        assert service.generate_completion(prompt) == "hola", "Texto inesperado"
+        assert service.usage["cache_creation_input_tokens"] == 500, "Debe escribir el prefijo en la caché de prompts"
+
+        cached = LLMService(client)
+        assert cached.generate_completion(prompt) == "hola", "Texto inesperado"
+        assert cached.cache_status == "hit", "La segunda llamada debe salir de la caché de respuestas"
+        assert cached.usage == service.usage, "El acierto debe conservar los tokens originales"
+        client.close()
+
+    assert stub.requests == 1, "Solo la primera llamada debe llegar al modelo"
@@ -0,0 +1,166 @@
+"""
+Test para verificar el análisis híbrido de /analyze-by-llm: cuando el
+analizador local es concluyente, basic_complexity,
+mathematical_representation y cost_analysis se calculan localmente y el
+modelo solo recibe un prompt reducido para las secciones narrativas.
+
+Usa un servidor local que imita /v1/messages (benchmarks/stub_anthropic.py).
+"""
+
+import asyncio
+import json
+
+import httpx
+
+import main
+import services.llm_analysis_service as llm_analysis_service
+import services.llm_service as llm_service
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.hybrid_analysis import LOCAL_SECTIONS, local_sections
+from services.llm_analysis_service import LLMAnalysisService
+from services.llm_service import LLMService, create_async_client
+
+
+NESTED = """for i 🡨 1 to n do
+begin
+    for j 🡨 1 to n do
+    begin
+        x 🡨 x + 1
+    end
+end"""
+
+NESTED_BREAK = """for i 🡨 1 to n do
+begin
+    for j 🡨 1 to m do
+    begin
+        if (A[j] = x) then
+        begin
+            break
+        end
+    end
+end"""
+
+SINGLE_BREAK = """for j 🡨 1 to m do
+begin
+    if (A[j] = x) then
+    begin
+        break
+    end
+end"""
+
+RECURSIVE = """Factorial(n)
+begin
+    if (n ≤ 1) then
+    begin
+        return 1
+    end
+    else
+    begin
+        return n * call Factorial(n - 1)
+    end
+end"""
+
+NARRATIVE = {
+    "step_by_step_analysis": [],
+    "pattern_classification": {
+        "primary_pattern": "Fuerza Bruta", "confidence": 0.9, "characteristics": [],
+        "similar_algorithms": [], "alternative_approaches": None
+    },
+    "execution_diagram": {"recursion_tree": None, "flowchart": {"format": "mermaid", "diagram": "flowchart TD"}},
+}
+
+
+def test_local_sections_nested_loops():
+    """
+    PRUEBA: Secciones locales de dos ciclos anidados
+
+    Verifica las cotas, la sumatoria y que la tabla de costos tenga una fila
+    por sentencia con el número de ejecuciones de la traza del analizador.
+    """
+    local = local_sections(NESTED)
+
+    assert local is not None, "Dos ciclos anidados deben resolverse localmente"
+    assert set(local) == set(LOCAL_SECTIONS), "Deben calcularse las tres secciones cuantitativas"
+    assert local["basic_complexity"]["O"] == "O(n^2)", "El peor caso debe ser O(n^2)"
+    assert local["basic_complexity"]["tight_bound"] is True, "La cota debe ser ajustada"
+
+    math = local["mathematical_representation"]
+    assert math["summation"] == "T(n) = Σ(i=1 to n) Σ(j=1 to n) c", f"Sumatoria inesperada: {math['summation']}"
+    assert math["final_result"] == "O(n^2)", "El resultado final debe coincidir con la cota"
+
+    rows = local["cost_analysis"]["instruction_breakdown"]
+    assert [row["line"] for row in rows] == [1, 3, 5], "Debe haber una fila por línea con sentencia"
+    assert rows[-1]["executions_count"] == "n^2", "El cuerpo interno se ejecuta n^2 veces"
+    assert rows[-1]["operation_type"] == "assignment", "La asignación debe clasificarse como tal"
+
+
+def test_inconclusive_programs():
+    """
+    PRUEBA: Programas que no se resuelven localmente
+
+    Verifica que la recursión, un break dentro de un ciclo anidado, los
+    comentarios de completado y los errores de sintaxis dejen el análisis
+    completo al modelo, mientras que un break en un ciclo simple se sigue
+    resolviendo localmente.
+    """
+    assert local_sections(RECURSIVE) is None, "La recursión debe quedar para el modelo"
+    assert local_sections("for i 🡨 1 to n do\nbegin\n    ► completar\nend") is None, "El código incompleto no se resuelve"
+    assert local_sections("for i 🡨 1 to do") is None, "Un error de sintaxis no se resuelve"
+    assert local_sections(NESTED_BREAK) is None, "Un break en un ciclo anidado debe quedar para el modelo"
+    assert local_sections(SINGLE_BREAK) is not None, "Un break en un ciclo simple se resuelve localmente"
+
+
+def test_narrative_prompt(monkeypatch):
+    """
+    PRUEBA: Prompt reducido
+
+    Verifica que el prompt híbrido incluya los resultados locales y no pida
+    las secciones cuantitativas, y que con LLM_HYBRID_ANALYSIS desactivado
+    se use el prompt completo.
+    """
+    service = LLMAnalysisService(LLMService(client=object()))
+
+    prompt, local = service.plan(NESTED)
+    full, _ = service.plan(RECURSIVE)
+    assert local is not None, "El programa debe resolverse localmente"
+    assert "O(n^2)" in prompt, "El prompt debe incluir la cota calculada"
+    assert '"cost_analysis": {' not in prompt, "El prompt reducido no debe pedir cost_analysis"
+    assert len(prompt) < len(full), "El prompt reducido debe ser más corto que el completo"
+
+    monkeypatch.setattr(llm_analysis_service, "LLM_HYBRID_ANALYSIS", False)
+    prompt, local = service.plan(NESTED)
+    assert local is None, "Sin modo híbrido no debe haber secciones locales"
+    assert '"cost_analysis": {' in prompt, "Sin modo híbrido el prompt debe pedir cost_analysis"
+
+
+def test_endpoint_merges_sections(monkeypatch):
+    """
+    PRUEBA: /analyze-by-llm en modo híbrido
+
+    Verifica que la respuesta combine las secciones narrativas del modelo
+    con las calculadas localmente, que llm_metadata indique cuáles fueron
+    locales y que Server-Timing incluya la etapa local_analysis.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+    monkeypatch.setattr(llm_analysis_service, "LLM_HYBRID_ANALYSIS", True)
+
+    async def run(base_url):
+        monkeypatch.setattr(llm_service, "_async_client", create_async_client(base_url=base_url))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/analyze-by-llm", json={"pseudocode": NESTED},
+                                         headers={"X-API-Key": "hybrid-analysis"})
+        await llm_service._async_client.close()
+        return response
+
+    with StubAnthropicServer(reply_text=json.dumps(NARRATIVE)) as stub:
+        response = asyncio.run(run(stub.base_url))
+
+    assert response.status_code == 200, f"Respuesta inesperada: {response.text}"
+    body = response.json()
+    assert body["basic_complexity"]["O"] == "O(n^2)", "basic_complexity debe venir del analizador local"
+    assert body["cost_analysis"]["instruction_breakdown"], "cost_analysis debe venir del analizador local"
+    assert body["pattern_classification"]["primary_pattern"] == "Fuerza Bruta", "La narrativa debe venir del modelo"
+    assert body["llm_metadata"]["local_sections"] == list(LOCAL_SECTIONS), "Deben informarse las secciones locales"
+    assert "local_analysis" in response.headers.get("server-timing", ""), "Server-Timing debe medir el análisis local"
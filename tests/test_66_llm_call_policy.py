@@ -0,0 +1,179 @@
+"""
+Test para verificar la política de las llamadas al LLM: reintentos con
+backoff ante errores transitorios, timeout por intento y plazo de la
+solicitud, hedging de los intentos lentos y errores tipados con su código
+HTTP en los endpoints.
+
+Usa un servidor local que imita /v1/messages e inyecta demoras y fallas
+(benchmarks/stub_anthropic.py).
+"""
+
+import asyncio
+import time
+
+import httpx
+
+import main
+import services.llm_service as llm_service
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.admission import admission_controller
+from services.llm_policy import LLMCallPolicy, LLMRequestError, LLMUnavailableError, llm_policy
+from services.llm_service import AsyncLLMService, LLMService, create_async_client, create_client
+
+
+PROGRAM = "for i 🡨 1 to n do begin\n    ► completar: sumar i a total\nend"
+
+
+def fast_policy(**overrides):
+    """Política con backoff de milisegundos para las pruebas."""
+    values = dict(max_retries=2, attempt_timeout=5.0, backoff_base=0.01, backoff_max=0.02, hedge_percentile=0)
+    values.update(overrides)
+    return LLMCallPolicy(**values)
+
+
+def run_async(base_url, call):
+    async def run():
+        client = create_async_client(base_url=base_url)
+        try:
+            return await call(client)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+
+def test_retries_transient_errors(monkeypatch):
+    """
+    PRUEBA: Reintentos ante errores transitorios
+
+    Verifica que un 529 (overloaded) y un 429 con Retry-After se reintenten
+    hasta obtener la respuesta, con el cliente asíncrono, el síncrono y el
+    streaming (antes del primer fragmento), y que un 400 no se reintente.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+    faults = [{"status": 529}, {"status": 429, "retry_after": 0}]
+
+    policy = fast_policy()
+    with StubAnthropicServer(reply_text="hola", faults=faults) as stub:
+        text = run_async(stub.base_url, lambda client: AsyncLLMService(client, policy).generate_completion("p"))
+    assert text == "hola", "Texto inesperado"
+    assert stub.requests == 3, f"Se esperaban 3 intentos, hubo {stub.requests}"
+    assert policy.stats()["retries"] == 2, f"Se esperaban 2 reintentos: {policy.stats()}"
+
+    with StubAnthropicServer(reply_text="hola", faults=faults) as stub:
+        client = create_client(base_url=stub.base_url)
+        assert LLMService(client, fast_policy()).generate_completion("p") == "hola", "Texto inesperado (síncrono)"
+        client.close()
+    assert stub.requests == 3, "El cliente síncrono también debe reintentar"
+
+    async def stream(client):
+        return [delta async for delta in AsyncLLMService(client, fast_policy()).stream_completion("p")]
+
+    with StubAnthropicServer(reply_text="hola mundo", faults=faults) as stub:
+        assert "".join(run_async(stub.base_url, stream)) == "hola mundo", "El stream debe reintentarse"
+    assert stub.requests == 3, "El stream debe reintentar antes del primer fragmento"
+
+    policy = fast_policy()
+    with StubAnthropicServer(reply_text="hola", faults=[{"status": 400}]) as stub:
+        try:
+            run_async(stub.base_url, lambda client: AsyncLLMService(client, policy).generate_completion("p"))
+            error = None
+        except LLMRequestError as e:
+            error = e
+    assert error is not None and error.status_code == 502, "Un 400 debe ser LLMRequestError (502)"
+    assert stub.requests == 1, "Un 400 no debe reintentarse"
+    assert policy.stats()["errors"] == {"LLMRequestError": 1}, f"Error no contado: {policy.stats()}"
+
+
+def test_attempt_timeout_and_exhausted_retries(monkeypatch):
+    """
+    PRUEBA: Timeout por intento y reintentos agotados
+
+    Verifica que un intento más lento que el timeout se corte y se reintente,
+    y que tras agotar los reintentos se lance LLMUnavailableError (503) con
+    el Retry-After del proveedor.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+
+    policy = fast_policy(attempt_timeout=0.3)
+    with StubAnthropicServer(reply_text="hola", faults=[{"delay": 2.0}]) as stub:
+        start = time.perf_counter()
+        text = run_async(stub.base_url, lambda client: AsyncLLMService(client, policy).generate_completion("p"))
+        elapsed = time.perf_counter() - start
+    assert text == "hola", "El reintento debe responder"
+    assert elapsed < 1.5, f"El intento lento debe cortarse a los 0.3 s (tardó {elapsed:.2f} s)"
+
+    faults = [{"status": 503, "retry_after": 0}] * 3
+    with StubAnthropicServer(reply_text="hola", faults=faults) as stub:
+        try:
+            run_async(stub.base_url, lambda client: AsyncLLMService(client, fast_policy()).generate_completion("p"))
+            error = None
+        except LLMUnavailableError as e:
+            error = e
+    assert error is not None and error.status_code == 503, "Tras los reintentos debe lanzarse LLMUnavailableError"
+    assert error.retry_after == 0, "Debe conservar el Retry-After del proveedor"
+    assert stub.requests == 3, "Deben hacerse 1 intento y 2 reintentos"
+
+
+def test_hedged_request(monkeypatch):
+    """
+    PRUEBA: Hedging
+
+    Verifica que, con latencias previas de ~50 ms, un intento que tarda más
+    que el percentil lance una copia, que se use la respuesta de la copia
+    sin esperar al intento lento y que se cuente como ganada.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+    policy = fast_policy(hedge_percentile=90, hedge_min_samples=5)
+    for _ in range(5):
+        policy.record_latency(2000, 0.05)
+
+    with StubAnthropicServer(reply_text="hola", faults=[{"delay": 2.0}]) as stub:
+        start = time.perf_counter()
+        text = run_async(stub.base_url, lambda client: AsyncLLMService(client, policy).generate_completion("p"))
+        elapsed = time.perf_counter() - start
+
+    assert text == "hola", "Texto inesperado"
+    assert elapsed < 1.0, f"La copia debe responder antes que el intento lento (tardó {elapsed:.2f} s)"
+    assert stub.requests == 2, f"Se esperaban el intento y su copia, hubo {stub.requests}"
+    stats = policy.stats()
+    assert (stats["hedged"], stats["hedge_wins"], stats["retries"]) == (1, 1, 0), f"Estadísticas inesperadas: {stats}"
+
+
+def test_endpoint_error_codes(monkeypatch):
+    """
+    PRUEBA: Errores tipados en los endpoints
+
+    Verifica que /complete-code responda 503 con Retry-After si el proveedor
+    sigue sobrecargado tras los reintentos, y 504 antes del plazo de la
+    solicitud (request_timeout_ms del pool llm) si el modelo no responde.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    monkeypatch.setattr(llm_service, "llm_response_cache", None)
+    monkeypatch.setattr(llm_policy, "backoff_base", 0.01)
+    monkeypatch.setattr(llm_policy, "backoff_max", 0.02)
+
+    async def post(base_url, key):
+        monkeypatch.setattr(llm_service, "_async_client", create_async_client(base_url=base_url))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            response = await client.post("/complete-code", json={"pseudocode": PROGRAM}, headers={"X-API-Key": key})
+            elapsed = time.perf_counter() - start
+        await llm_service._async_client.close()
+        return response, elapsed
+
+    # Los primeros intentos piden reintentar de inmediato; el último, en 1 s
+    faults = [{"status": 529, "retry_after": 0}] * 2 + [{"status": 529, "retry_after": 1}]
+    with StubAnthropicServer(faults=faults) as stub:
+        overloaded, _ = asyncio.run(post(stub.base_url, "policy-overloaded"))
+    assert overloaded.status_code == 503, f"Código esperado: 503, obtenido: {overloaded.status_code}"
+    assert overloaded.headers.get("retry-after") == "1", "Debe propagarse el Retry-After del proveedor"
+
+    monkeypatch.setattr(admission_controller.pools["llm"].limits, "request_timeout_ms", 300.0)
+    with StubAnthropicServer(delay=2.0) as stub:
+        timed_out, elapsed = asyncio.run(post(stub.base_url, "policy-deadline"))
+    assert timed_out.status_code == 504, f"Código esperado: 504, obtenido: {timed_out.status_code}"
+    assert elapsed < 1.5, f"La solicitud debe terminar al vencer su plazo (tardó {elapsed:.2f} s)"
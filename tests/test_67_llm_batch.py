@@ -0,0 +1,208 @@
+"""
+Test para verificar el análisis masivo por LLM con Message Batches: los
+prompts son los del endpoint, los programas repetidos o ya cacheados no
+se envían, cada resultado se valida como AnalyzeByLLMResponse y las
+respuestas válidas quedan en la caché de respuestas, donde
+/analyze-by-llm las encuentra sin llamar al modelo.
+
+Usa el proveedor en memoria (LocalBatchProvider) y un servidor local que
+imita la API de Message Batches (benchmarks/stub_anthropic.py).
+"""
+
+import asyncio
+import json
+
+import anthropic
+import httpx
+
+import main
+import services.llm_service as llm_service
+from benchmarks.bench_serialization import sample_llm_response
+from benchmarks.stub_anthropic import StubAnthropicServer
+from services.llm_batch_service import (
+    AnthropicBatchProvider, LocalBatchProvider, main as batch_main, open_store, run_bulk_analysis
+)
+from services.llm_policy import LLMCallPolicy, LLMTimeoutError
+from services.llm_service import create_client
+from services.result_cache import ResultCache
+
+
+FACTORIAL = """Factorial(n)
+begin
+    if (n ≤ 1) then
+    begin
+        return 1
+    end
+    else
+    begin
+        return n * call Factorial(n - 1)
+    end
+end"""
+
+NESTED = """for i 🡨 1 to n do
+begin
+    for j 🡨 1 to n do
+    begin
+        x 🡨 x + 1
+    end
+end"""
+
+BROKEN = "while (x > 0) do\nbegin\n    x 🡨 x - 1\nend"
+
+REPLY = json.dumps(sample_llm_response(3).model_dump(mode="json", exclude={"llm_metadata", "timings"}), ensure_ascii=False)
+
+
+def respond(params):
+    """Respuesta del modelo simulado: falla para el programa BROKEN."""
+    if BROKEN in params["messages"][0]["content"]:
+        raise RuntimeError("modelo no disponible")
+    return REPLY
+
+
+def test_bulk_analysis_local_provider(monkeypatch):
+    """
+    PRUEBA: Job por lotes con el proveedor en memoria
+
+    Verifica los estados por programa, que los repetidos se envíen una vez,
+    que los lotes respeten max_requests, que una segunda corrida no vuelva
+    a enviar lo que ya está en la caché y que /analyze-by-llm sirva el
+    resultado del job como acierto de la caché.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    cache = ResultCache(max_entries=16, ttl_seconds=60)
+    programs = [("factorial", FACTORIAL), ("anidados", NESTED), ("copia", FACTORIAL), ("roto", BROKEN)]
+    provider = LocalBatchProvider(respond, polls=2)
+    sleeps = []
+
+    report = run_bulk_analysis(programs, provider, cache=cache, max_requests=2, poll_interval=5, sleep=sleeps.append)
+
+    assert report["submitted"] == 3, f"Los programas repetidos deben enviarse una vez: {report['submitted']}"
+    assert len(report["batches"]) == 2, f"3 solicitudes con max_requests=2 son 2 lotes: {report['batches']}"
+    assert sleeps == [5, 5], f"Cada lote debe consultarse hasta que termina: {sleeps}"
+    assert [item["status"] for item in report["items"]] == ["succeeded", "succeeded", "succeeded", "failed"], \
+        f"Estados inesperados: {[item['status'] for item in report['items']]}"
+    assert "modelo no disponible" in report["items"][3]["error"], "El error del elemento debe informarse"
+
+    factorial, nested = report["items"][0]["analysis"], report["items"][1]["analysis"]
+    assert factorial["llm_metadata"]["cache_status"] == "batch", "Los metadatos deben indicar el origen por lotes"
+    assert factorial["llm_metadata"]["tokens"]["input"] > 0, "Los tokens del mensaje deben informarse"
+    assert nested["llm_metadata"]["local_sections"], "El modo híbrido debe aplicarse como en el endpoint"
+    assert nested["basic_complexity"]["O"] == "O(n^2)", "Las secciones locales deben reemplazar las del modelo"
+
+    again = run_bulk_analysis(programs, LocalBatchProvider(respond), cache=cache, sleep=sleeps.append)
+    assert again["submitted"] == 1 and again["cached"] == 3, f"Solo el fallido debe reenviarse: {again}"
+
+    async def post():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/analyze-by-llm", json={"pseudocode": FACTORIAL}, headers={"X-API-Key": "bulk"})
+
+    # Sin servidor del modelo: la respuesta solo puede salir de la caché
+    monkeypatch.setattr(llm_service, "llm_response_cache", cache)
+    monkeypatch.setattr(llm_service, "_async_client", object())
+    response = asyncio.run(post())
+    assert response.status_code == 200, f"Respuesta inesperada: {response.text}"
+    assert response.json()["llm_metadata"]["cache_status"] == "hit", "El endpoint debe leer el resultado del job"
+
+
+def test_bulk_analysis_anthropic_provider(monkeypatch):
+    """
+    PRUEBA: Job por lotes con la API de Message Batches
+
+    Verifica que AnthropicBatchProvider envíe el lote, consulte su estado
+    hasta que termina y lea los resultados en JSONL.
+    """
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-prueba")
+    cache = ResultCache(max_entries=16, ttl_seconds=60)
+    sleeps = []
+
+    with StubAnthropicServer(reply_text=REPLY, batch_polls=2) as stub:
+        client = create_client(base_url=stub.base_url)
+        report = run_bulk_analysis(
+            [("factorial", FACTORIAL), ("anidados", NESTED)], AnthropicBatchProvider(client),
+            cache=cache, poll_interval=0.01, sleep=sleeps.append
+        )
+        client.close()
+
+    assert report["batches"] == ["msgbatch_stub1"], f"Lote inesperado: {report['batches']}"
+    assert (report["succeeded"], report["failed"]) == (2, 0), f"Ambos programas deben validarse: {report}"
+    assert len(sleeps) == 2, f"El lote figura en curso en las 2 primeras consultas: {sleeps}"
+    assert cache.stats()["size"] == 2, "Las respuestas deben guardarse en la caché"
+
+
+class FlakyBatchClient:
+    """Cliente que vence en el primer intento de cada método y responde en el siguiente."""
+
+    def __init__(self):
+        self.calls = {"post": 0, "get": 0}
+
+    def _call(self, method, path):
+        self.calls[method] += 1
+        if self.calls[method] == 1:
+            raise anthropic.APITimeoutError(request=httpx.Request(method.upper(), "http://stub" + path))
+        return {"id": "msgbatch_1", "processing_status": "ended"}
+
+    def post(self, path, **kwargs):
+        return self._call("post", path)
+
+    def get(self, path, **kwargs):
+        return self._call("get", path)
+
+
+def test_batch_submit_is_not_retried():
+    """
+    PRUEBA: Reintentos solo en las consultas
+
+    Verifica que un POST del lote que vence se informe como LLMTimeoutError
+    sin reenviarse (podría haber creado el lote y se duplicaría), mientras
+    que la consulta del estado (GET idempotente) se reintenta.
+    """
+    client = FlakyBatchClient()
+    provider = AnthropicBatchProvider(client, LLMCallPolicy(max_retries=2, backoff_base=0, backoff_max=0))
+
+    try:
+        provider.submit([])
+        error = None
+    except LLMTimeoutError as e:
+        error = e
+
+    assert error is not None, "El vencimiento del envío debe informarse como LLMTimeoutError"
+    assert client.calls["post"] == 1, f"El envío no debe reintentarse: {client.calls}"
+    assert provider.ended("msgbatch_1"), "La consulta debe reintentarse hasta responder"
+    assert client.calls["get"] == 2, f"La consulta debe reintentarse una vez: {client.calls}"
+
+
+def test_cli_requires_persistent_store(tmp_path, monkeypatch, capsys):
+    """
+    PRUEBA: Almacén persistente del job
+
+    Verifica que sin --store ni LLM_CACHE_SQLITE_PATH el job termine con
+    error antes de enviar nada, y que con --store las respuestas queden en
+    el archivo SQLite (que otra caché sobre el mismo archivo lee) y el
+    reporte informe cuántas se guardaron.
+    """
+    directory = tmp_path / "programas"
+    directory.mkdir()
+    (directory / "factorial.txt").write_text(FACTORIAL, encoding="utf-8")
+    (directory / "anidados.txt").write_text(NESTED, encoding="utf-8")
+    monkeypatch.setattr(llm_service, "LLM_CACHE_SQLITE_PATH", "")
+    provider = LocalBatchProvider(respond)
+
+    try:
+        batch_main([str(directory)], provider)
+        exit_code = None
+    except SystemExit as e:
+        exit_code = e.code
+    assert exit_code == 2, f"Sin almacén el job debe terminar con error, código: {exit_code}"
+    assert "--store" in capsys.readouterr().err, "El error debe indicar cómo configurar el almacén"
+    assert not provider.batches, "No debe enviarse ningún lote sin almacén"
+
+    store = str(tmp_path / "respuestas.sqlite3")
+    report = batch_main([str(directory), "--store", store], provider)
+
+    assert report["stored"] == report["succeeded"] == 2, f"Ambas respuestas deben guardarse: {report}"
+    assert "Guardados en" in capsys.readouterr().out, "El resumen debe informar lo guardado en el almacén"
+    again = run_bulk_analysis(
+        [("factorial", FACTORIAL), ("anidados", NESTED)], LocalBatchProvider(respond), cache=open_store(store)
+    )
+    assert again["cached"] == 2 and again["submitted"] == 0, f"Otra caché debe leer el archivo: {again}"
@@ -0,0 +1,111 @@
+"""
+Test para verificar la extracción del JSON de la respuesta del modelo
+(extract_json y JSONObjectExtractor): una sola pasada que sigue el estado
+de cadenas y escapes, encuentra el primer objeto completo aunque venga
+rodeado de texto o de un bloque ```json y puede recibir el texto en
+fragmentos, como los deltas de un stream.
+"""
+
+import json
+import random
+
+from services.json_stream import JSONObjectExtractor, JSONSectionParser
+from services.llm_service import extract_json
+
+
+# Piezas de diagramas Mermaid y texto con los caracteres que confunden a
+# una búsqueda de llaves que no distingue cadenas
+MERMAID_PIECES = [
+    "flowchart TD\n", "A[Inicio] --> B{\"¿i ≤ n?\"}", "B -->|sí| C[\"suma 🡨 suma + A[i]\"]",
+    "D{", "}", "{{hexágono}}", "E[\"abre {\"]", "\\", "\"", "```", "```json\n{", "} ```", "[", "]", "\n", " ",
+]
+
+
+def random_string(generator):
+    return "".join(generator.choice(MERMAID_PIECES) for _ in range(generator.randint(0, 12)))
+
+
+def random_value(generator, depth=0):
+    kind = generator.randint(0, 5 if depth < 3 else 2)
+    if kind == 0:
+        return random_string(generator)
+    if kind == 1:
+        return generator.choice([0, -3, 2.5, 1e-3])
+    if kind == 2:
+        return generator.choice([True, False, None])
+    if kind == 3:
+        return [random_value(generator, depth + 1) for _ in range(generator.randint(0, 3))]
+    return {random_string(generator): random_value(generator, depth + 1) for _ in range(generator.randint(0, 3))}
+
+
+def random_reply(generator, analysis):
+    """Texto del modelo con el objeto en alguna de las formas habituales."""
+    body = json.dumps(analysis, ensure_ascii=generator.random() < 0.5, indent=generator.choice([None, 2]))
+    preamble = generator.choice(["", "Aquí está el análisis:\n", "Resultado"])
+    fence = generator.choice([("", ""), ("```json\n", "\n```"), ("```\n", "\n```")])
+    trailer = generator.choice(["", "\nEspero que sirva.", "\n{\"otro\": 1}", "\nNota: } sin pareja"])
+    return preamble + fence[0] + body + fence[1] + trailer
+
+
+def test_extract_json_shapes():
+    """
+    PRUEBA: Formas de la respuesta del modelo
+
+    Verifica el bloque ```json, el texto antes y después, las llaves sin
+    pareja y la cerca ``` dentro de cadenas (que cortaban la regex anterior
+    y el conteo de llaves), que se tome el primer objeto y que una respuesta
+    sin objeto completo lance json.JSONDecodeError.
+    """
+    analysis = {
+        "execution_diagram": {"flowchart": {"format": "mermaid", "diagram": 'A["abre {"] --> B{"i ≤ n"}'}},
+        "explanation": "Un bloque de código termina en } ``` y sigue el texto",
+    }
+    body = json.dumps(analysis, ensure_ascii=False)
+
+    assert extract_json(body) == analysis, "Debe aceptar el JSON solo"
+    assert extract_json(f"```json\n{body}\n```") == analysis, "Debe aceptar un bloque ```json"
+    assert extract_json(f"Análisis:\n```\n{body}\n```\nListo.") == analysis, "Debe ignorar el texto alrededor"
+    assert extract_json(f"Análisis: {body} y además {{\"b\": 2}}") == analysis, "Debe tomar el primer objeto"
+
+    for reply in ['{"a": 1', "No puedo analizar este código.", ""]:
+        try:
+            extract_json(reply)
+            error = None
+        except json.JSONDecodeError as e:
+            error = e
+        assert error is not None, f"Debe lanzar JSONDecodeError para {reply!r}"
+
+
+def test_extractor_fuzz_mermaid_random_chunks():
+    """
+    PRUEBA: Fuzz con diagramas Mermaid y fragmentos aleatorios
+
+    Genera objetos con cadenas llenas de llaves, corchetes, comillas y
+    barras escapadas, cercas ``` y texto alrededor; los parte en fragmentos
+    aleatorios (de 1 carácter en adelante, cortando escapes y cadenas) y
+    verifica que JSONObjectExtractor, extract_json y JSONSectionParser (que
+    comparte el recorrido de cadenas) devuelvan el objeto original.
+    """
+    generator = random.Random(50)
+
+    for _ in range(300):
+        analysis = {random_string(generator): random_value(generator) for _ in range(generator.randint(1, 5))}
+        reply = random_reply(generator, analysis)
+
+        assert extract_json(reply) == analysis, f"extract_json no reconoce el objeto en {reply!r}"
+
+        extractor = JSONObjectExtractor()
+        parser = JSONSectionParser()
+        sections = []
+        position = 0
+        while position < len(reply):
+            size = generator.randint(1, 24)
+            chunk = reply[position:position + size]
+            extractor.feed(chunk)
+            if not parser.done:
+                sections.extend(parser.feed(chunk))
+            position += size
+
+        assert extractor.done, f"El extractor debe reconocer el cierre del objeto en {reply!r}"
+        assert json.loads(extractor.result) == analysis, f"Objeto inesperado en {reply!r}"
+        assert dict(sections) == analysis, f"Secciones inesperadas en {reply!r}"
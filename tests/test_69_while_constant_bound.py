@@ -0,0 +1,39 @@
+"""
+Test para verificar que un ciclo WHILE/REPEAT cuyo límite es una constante
+numérica tenga un número constante de iteraciones, igual que un FOR con
+límite constante.
+
+Pseudocódigos evaluados:
+while (x < 10) do begin x 🡨 x + 1 end
+repeat begin x 🡨 x + 1 end until (x >= 10)
+while (i > 0) do begin i 🡨 i - 1 end
+"""
+
+from services.analysis_service import analyze_pseudocode
+
+
+def test_while_constant_bound():
+    """
+    PRUEBA: Ciclos con límite constante
+
+    Verifica que "while (x < 10)" y "repeat ... until (x >= 10)" sean O(1)
+    como "for i 🡨 1 to 10", y que un contador que decrece hacia una
+    constante (while (i > 0)) siga dependiendo de su valor inicial → O(n).
+    """
+    cases = {
+        "while (x < 10) do begin x 🡨 x + 1 end": ("O(1)", "Ciclo WHILE → O(1)"),
+        "while (10 > x) do begin x 🡨 x + 1 end": ("O(1)", "Ciclo WHILE → O(1)"),
+        "repeat begin x 🡨 x + 1 end until (x >= 10)": ("O(1)", "Ciclo REPEAT → O(1)"),
+        "for i 🡨 1 to 10 do begin x 🡨 x + 1 end": ("O(1)", "Ciclo FOR → O(1)"),
+        "while (i > 0) do begin i 🡨 i - 1 end": ("O(n)", "Ciclo WHILE → O(n)"),
+    }
+
+    for pseudocode, (expected_O, expected_loop) in cases.items():
+        result = analyze_pseudocode(pseudocode)
+
+        assert "error" not in result, f"Error en el análisis: {result.get('error', 'Desconocido')}"
+        assert result["O"] == expected_O, f"O esperado para {pseudocode!r}: {expected_O}, obtenido: {result['O']}"
+        assert result["Omega"] == expected_O.replace("O", "Ω", 1), \
+            f"Omega inesperado para {pseudocode!r}: {result['Omega']}"
+        assert result["details"]["loops"] == [expected_loop], \
+            f"Loops esperado para {pseudocode!r}: {[expected_loop]}, obtenido: {result['details']['loops']}"